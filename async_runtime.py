@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+"""
+Асинхронний режим роботи бота (BOT_RUNTIME=async).
+
+Оновлення приймає AsyncTeleBot в одному циклі подій asyncio. Обробники з
+handlers/async_navigation.py виконуються як корутини: звернення до БД
+ідуть через AsyncDB на кілька виділених потоків БД, а виклики Telegram API
+- через aiohttp, тож очікування мережі не займає потік. Усі інші
+оновлення передаються в реєстр звичайних обробників config.bot (з його
+обмеженим пулом потоків), тому поведінка бота не змінюється, а обробники
+можна переносити в async поступово.
+
+Нативна корутина реєструється через runtime.replaces(sync_handler) і
+отримує рівно ті повідомлення, які реєстр config.bot віддав би
+sync_handler (з урахуванням порядку обробників і next step).
+
+Порядок у межах чату: нативні обробники й передача в потоковий реєстр
+одного чату виконуються на циклі ланцюжком, у порядку надходження. Якщо
+в черзі чату (ChatScheduler) ще є потокові завдання, нативний обробник не
+виконується, а повідомлення передається sync_handler через ту саму чергу,
+тож жодне оновлення не обганяє попереднє. BOT_RUNTIME=async лишається
+вимкненим за замовчуванням.
+"""
+
+import asyncio
+import functools
+import re
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from telebot import util
+from telebot.async_telebot import AsyncTeleBot
+
+from work_scheduler import chat_key
+
+DEFAULT_DB_THREADS = 2
+DEFAULT_IO_THREADS = 4
+DEFAULT_MAX_PENDING_BATCHES = 100       # webhook batches being processed on the loop
+CONTENT_TYPES = util.content_type_media + util.content_type_service
+
+
+def handler_matches(handler, message):
+    """True if the filters of a TeleBot message handler accept the message.
+
+    Mirrors TeleBot's dispatch check for the built-in filters; a handler with
+    any other (custom) filter is never claimed, so it stays on the threaded path.
+    """
+    for name, value in handler["filters"].items():
+        if value is None:
+            continue
+        if name == "content_types":
+            matched = message.content_type in value
+        elif name == "commands":
+            matched = message.content_type == "text" and util.extract_command(message.text) in value
+        elif name == "regexp":
+            matched = message.content_type == "text" and re.search(value, message.text, re.IGNORECASE)
+        elif name == "chat_types":
+            matched = message.chat.type in value
+        elif name == "func":
+            matched = value(message)
+        else:
+            return False
+        if not matched:
+            return False
+    return True
+
+
+def _warm_user(chat_id):
+    import db_manager
+    from config import user_state
+    db_manager.get_user_profile(chat_id)
+    user_state.get(chat_id)
+
+
+class AsyncDB:
+    """Coroutine versions of db_manager functions, run on a few dedicated DB threads.
+
+    ``await adb.get_user_words(chat_id)`` runs ``db_manager.get_user_words(chat_id)``
+    on a DB thread; ``await adb.run(fn, ...)`` does the same for any blocking
+    function that reads the database.
+    """
+
+    def __init__(self, threads=DEFAULT_DB_THREADS, module=None):
+        self.threads = threads
+        self._module = module
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="db")
+        self._calls = 0
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._prefetch_hits = 0
+
+    @property
+    def module(self):
+        if self._module is None:
+            import db_manager
+            self._module = db_manager
+        return self._module
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking DB function on the DB threads"""
+        self._calls += 1
+        self._in_flight += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        fn = getattr(self.module, name)
+        if not callable(fn):
+            raise AttributeError(f"db_manager.{name} is not a function")
+
+        @functools.wraps(fn)
+        async def call(*args, **kwargs):
+            return await self.run(fn, *args, **kwargs)
+
+        # Cached on the instance: __getattr__ is only consulted on misses
+        setattr(self, name, call)
+        return call
+
+    async def prefetch(self, chat_id):
+        """Load the user's profile and session off the loop, so in-memory helpers don't block it"""
+        from config import user_state
+        if self.module.user_profiles.peek(chat_id) is not None and user_state.is_resident(chat_id):
+            self._prefetch_hits += 1
+            return
+        await self.run(_warm_user, chat_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "threads": self.threads,
+            "calls": self._calls,
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "prefetch_hits": self._prefetch_hits,
+        }
+
+
+class AsyncRuntime:
+    """AsyncTeleBot front end with native coroutine handlers and a threaded fallback"""
+
+    def __init__(self, token, sync_bot, db_threads=DEFAULT_DB_THREADS, io_threads=DEFAULT_IO_THREADS,
+                 max_pending_batches=DEFAULT_MAX_PENDING_BATCHES):
+        self.sync_bot = sync_bot
+        self.bot = AsyncTeleBot(token)
+        self.db = AsyncDB(db_threads)
+        self.io_threads = io_threads
+        self._io = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="async-io")
+        self._pending_batches = threading.BoundedSemaphore(max_pending_batches)
+        self.loop = None
+        self._stopped = None
+        self._fallbacks_registered = False
+        # chat_id -> Future resolved when the chat's latest update on the loop is done
+        self._chat_tails = {}
+        self._native = 0
+        self._handed_back = 0
+        self._forwarded = 0
+        self._errors = 0
+
+    # --- handler registration ---
+
+    def routes_to(self, message, sync_handler):
+        """True if the threaded registry would dispatch this message to sync_handler"""
+        from config import user_state
+        next_steps = getattr(self.sync_bot.next_step_backend, "handlers", {})
+        if next_steps.get(message.chat.id):
+            return False
+        if not user_state.is_resident(message.chat.id):
+            # Filters would load the session on the loop; the fallback prefetches it first
+            return False
+        for handler in self.sync_bot.message_handlers:
+            if handler_matches(handler, message):
+                # The registry holds the metrics wrapper (metrics.install); compare the handler itself
+                function = handler["function"]
+                return getattr(function, "__wrapped__", function) is sync_handler
+        return False
+
+    def replaces(self, sync_handler):
+        """Decorator: the coroutine handles exactly the messages sync_handler would get"""
+        def decorator(handler):
+            @functools.wraps(handler)
+            async def native(message):
+                await self._in_chat_order(message, self._run_native, handler, message)
+
+            self.bot.register_message_handler(
+                native, content_types=["text"], func=lambda message: self.routes_to(message, sync_handler))
+            return handler
+        return decorator
+
+    def register_fallbacks(self):
+        """Forward everything the native handlers did not claim to the threaded registry.
+
+        Must run after all native handlers are registered: AsyncTeleBot uses the
+        first matching handler.
+        """
+        if self._fallbacks_registered:
+            return
+        self._fallbacks_registered = True
+        self.bot.register_message_handler(self._forward_message, func=lambda message: True,
+                                          content_types=CONTENT_TYPES)
+        self.bot.register_edited_message_handler(self._forward_edited_message, func=lambda message: True,
+                                                 content_types=CONTENT_TYPES)
+        self.bot.register_callback_query_handler(self._forward_callback_query, func=lambda call: True)
+
+    # --- per-chat ordering ---
+
+    async def _in_chat_order(self, item, fn, *args):
+        """Await fn(*args) after the chat's earlier native/forwarded updates have finished"""
+        chat_id = chat_key(item)
+        previous = self._chat_tails.get(chat_id)
+        done = asyncio.get_running_loop().create_future()
+        # Claimed before the first await, so the chain follows arrival order
+        self._chat_tails[chat_id] = done
+        try:
+            if previous is not None:
+                await previous
+            await fn(*args)
+        finally:
+            done.set_result(None)
+            if self._chat_tails.get(chat_id) is done:
+                del self._chat_tails[chat_id]
+
+    def _chat_busy(self, chat_id):
+        scheduler = getattr(self.sync_bot, "scheduler", None)
+        return scheduler is not None and scheduler.busy(chat_id)
+
+    async def _run_native(self, handler, message):
+        if self._chat_busy(message.chat.id):
+            # Threaded work for this chat is still queued: hand the message to the
+            # sync handler through the same mailbox instead of overtaking it
+            self._handed_back += 1
+            self.sync_bot.process_new_messages([message])
+            return
+        self._native += 1
+        try:
+            await handler(message)
+        except Exception as e:
+            self._errors += 1
+            print(f"Error in async handler {handler.__name__} for {message.chat.id}: {e}")
+            traceback.print_exc()
+
+    async def _forward(self, chat_id, process, item):
+        await self._in_chat_order(item, self._forward_now, chat_id, process, item)
+
+    async def _forward_now(self, chat_id, process, item):
+        self._forwarded += 1
+        # Handler filters read the session; load it on a DB thread first
+        await self.db.prefetch(chat_id)
+        # Only runs the filters and queues the handler into config.bot's worker pool
+        process([item])
+
+    async def _forward_message(self, message):
+        await self._forward(message.chat.id, self.sync_bot.process_new_messages, message)
+
+    async def _forward_edited_message(self, message):
+        await self._forward(message.chat.id, self.sync_bot.process_new_edited_messages, message)
+
+    async def _forward_callback_query(self, call):
+        await self._forward(call.from_user.id, self.sync_bot.process_new_callback_query, call)
+
+    # --- blocking calls other than the database ---
+
+    async def to_thread(self, fn, *args, **kwargs):
+        """Run a blocking network call (translation, file download) on the bounded I/O pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, functools.partial(fn, *args, **kwargs))
+
+    async def translate(self, text, src='de', dest='uk'):
+        from translation_service import translate
+        return await self.to_thread(translate, text, src, dest)
+
+    async def translate_many(self, texts, src='de', dest='uk'):
+        from translation_service import translate_many
+        return await self.to_thread(translate_many, texts, src, dest)
+
+    # --- running ---
+
+    def submit_updates(self, updates):
+        """Thread-safe entry point for WebhookServer: process a batch on the loop"""
+        self._pending_batches.acquire()
+        try:
+            future = asyncio.run_coroutine_threadsafe(self.bot.process_new_updates(updates), self.loop)
+        except Exception:
+            self._pending_batches.release()
+            raise
+        future.add_done_callback(lambda _: self._pending_batches.release())
+
+    def run(self, webhook_server=None, on_start=None, interval=0, timeout=30):
+        """Block in the event loop: long polling, or webhook_server feeding submit_updates.
+
+        on_start() is a blocking callable (e.g. setWebhook) run once updates can be accepted.
+        """
+        self.register_fallbacks()
+        try:
+            asyncio.run(self._main(webhook_server, on_start, interval, timeout))
+        finally:
+            self.db.shutdown()
+            self._io.shutdown(wait=False)
+
+    async def _main(self, webhook_server, on_start, interval, timeout):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        try:
+            if webhook_server is not None:
+                # The server must be built with process_updates=runtime.submit_updates
+                webhook_server.start()
+                if on_start is not None:
+                    await self.to_thread(on_start)
+                await self._stopped.wait()
+                await self.to_thread(webhook_server.stop)
+            else:
+                if on_start is not None:
+                    await self.to_thread(on_start)
+                await self.bot.polling(non_stop=True, interval=interval, timeout=timeout)
+        finally:
+            await self.bot.close_session()
+
+    def stop(self):
+        """Thread-safe: stop polling (or the webhook wait) and leave the loop"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._stop_on_loop)
+
+    def _stop_on_loop(self):
+        self.bot._polling = False
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def stats(self):
+        return {
+            "native": self._native,
+            "handed_back": self._handed_back,
+            "forwarded": self._forwarded,
+            "errors": self._errors,
+            "io_threads": self.io_threads,
+            "db": self.db.stats(),
+        }
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: вартість маршрутизації одного повідомлення.
+
+Порівнює ланцюжок предикатів на get_text (як було в handlers/*) зі
+зворотним індексом utils.command_router. Мова користувача вже в кеші
+профілів db_manager, тож старий варіант вимірюється в найкращому для нього
+випадку (без звернень до БД).
+
+Запуск:
+    python benchmark_command_router.py --updates 20000
+"""
+
+import argparse
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("TOKEN", "0:benchmark")
+os.environ.setdefault("ADMIN_ID", "0")
+
+import db_manager                                    # noqa: E402
+from user_profile_cache import UserProfile           # noqa: E402
+from utils import command_router                     # noqa: E402
+from utils.language_utils import get_text            # noqa: E402
+
+# (ключі локалізації, нелокалізовані тексти) - у порядку реєстрації обробників
+HANDLERS = [
+    (["edit_delete_single_word_button"], []),
+    (["bulk_delete_words_button"], []),
+    (["bulk_add_words_button"], []),
+    (["easy_level", "medium_level", "hard_level"], ["🟢 Легкий рівень", "🟠 Середній рівень", "🔴 Складний рівень"]),
+    (["personal_dictionary"], []),
+    (["edit_word"], ["✏️ Редаггувати слово"]),
+    (["advanced_game"], ["🧩 Складна гра"]),
+    (["word_typing"], ["📝 Введення слів"]),
+    (["article_typing"], ["🏷️ Введення артиклів"]),
+    (["choose_correct_spelling"], ["🔤 Вибір правильного написання"]),
+    (["fill_in_gaps"], ["📝 Заповніть пропуски"]),
+    (["cancel"], ["✖️ Відміна", "Відміна"]),
+    (["back_to_main_menu"], ["↩️ Повернутися до головного меню"]),
+    (["shared_dictionary"], ["👥 Спільний словник"]),
+    (["create_shared_dict"], ["🆕 Створити спільний словник"]),
+    (["join_shared_dict"], ["🔑 Вступити до спільного словника"]),
+    (["add_new_word"], ["➕ Додати нове слово"]),
+    (["learning_new_words"], []),
+    (["repetition"], []),
+    (["learn_articles"], []),
+]
+
+
+def old_predicate(keys, literals):
+    return lambda m: m.text in literals or any(m.text == get_text(k, m.chat.id) for k in keys)
+
+
+def new_predicate(keys, literals):
+    return command_router.on(*keys, aliases=literals)
+
+
+def route(predicates, message):
+    for i, predicate in enumerate(predicates):
+        if predicate(message):
+            return i
+    return None
+
+
+def run(predicates, texts, chat_ids):
+    started = time.perf_counter()
+    for text, chat_id in zip(texts, chat_ids):
+        route(predicates, SimpleNamespace(text=text, chat=SimpleNamespace(id=chat_id)))
+    return (time.perf_counter() - started) / len(texts) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark localized command dispatch")
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--free-text", type=float, default=0.5, help="share of non-button messages")
+    args = parser.parse_args()
+
+    languages = ["uk", "en", "ru", "tr", "ar"]
+    chat_ids = [random.randrange(1, 1000) for _ in range(args.updates)]
+    for chat_id in set(chat_ids):
+        db_manager.user_profiles.put(UserProfile(chat_id, language=random.choice(languages)))
+
+    texts = []
+    for chat_id in chat_ids:
+        if random.random() < args.free_text:
+            texts.append(f"das Wort {random.randrange(10000)}")
+        else:
+            keys, _ = random.choice(HANDLERS)
+            texts.append(get_text(random.choice(keys), chat_id))
+
+    old = [old_predicate(keys, literals) for keys, literals in HANDLERS]
+    new = [new_predicate(keys, literals) for keys, literals in HANDLERS]
+    command_router.rebuild_index()
+
+    # Обидва варіанти мають знаходити той самий обробник
+    sample = list(zip(texts, chat_ids))[:1000]
+    mismatches = sum(
+        route(old, SimpleNamespace(text=t, chat=SimpleNamespace(id=c)))
+        != route(new, SimpleNamespace(text=t, chat=SimpleNamespace(id=c)))
+        for t, c in sample
+    )
+
+    old_us = run(old, texts, chat_ids)
+    new_us = run(new, texts, chat_ids)
+    print(f"{args.updates} updates, {len(HANDLERS)} handlers, {args.free_text:.0%} free text")
+    print(f"index: {command_router.stats()}")
+    print(f"get_text predicates: {old_us:.2f} us per update")
+    print(f"reverse index:       {new_us:.2f} us per update")
+    print(f"routing mismatches in first {len(sample)} updates: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
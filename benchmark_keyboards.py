@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: вартість одного показу меню.
+
+Порівнює побудову нового ReplyKeyboardMarkup з get_text для кожної кнопки
+та його серіалізацію (як було в utils/keyboards) з готовою клавіатурою з
+utils.keyboard_cache.
+
+Запуск:
+    python benchmark_keyboards.py --renders 20000
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("TOKEN", "0:benchmark")
+os.environ.setdefault("ADMIN_ID", "0")
+
+import telebot                                      # noqa: E402
+from telebot import apihelper                       # noqa: E402
+
+import db_manager                                   # noqa: E402
+from user_profile_cache import UserProfile          # noqa: E402
+from utils import keyboards                         # noqa: E402
+from utils.language_utils import get_text           # noqa: E402
+
+LANGUAGES = ["uk", "en", "ru", "tr", "ar"]
+
+
+def old_main_menu_keyboard(chat_id):
+    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
+    keyboard.row(get_text("add_new_word", chat_id), get_text("edit_word", chat_id))
+    keyboard.row(get_text("easy_level", chat_id), get_text("medium_level", chat_id))
+    keyboard.row(get_text("hard_level", chat_id))
+    keyboard.row(get_text("personal_dictionary", chat_id), get_text("shared_dictionary", chat_id))
+    return keyboard
+
+
+def old_hard_level_keyboard(chat_id):
+    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
+    keyboard.row(get_text("advanced_game", chat_id), get_text("word_typing", chat_id))
+    keyboard.row(get_text("article_typing", chat_id))
+    keyboard.row(get_text("learn_possessive_pronouns", chat_id) + " (" + get_text("hard_level", chat_id) + ")")
+    keyboard.row(get_text("back_to_main_menu", chat_id))
+    return keyboard
+
+
+def render(builders, chat_ids):
+    started = time.perf_counter()
+    for i, chat_id in enumerate(chat_ids):
+        # те, що робить send_message з reply_markup
+        apihelper._convert_markup(builders[i % len(builders)](chat_id))
+    return (time.perf_counter() - started) / len(chat_ids) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark menu keyboard rendering")
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    chat_ids = [random.randrange(1, 1000) for _ in range(args.renders)]
+    for chat_id in set(chat_ids):
+        db_manager.user_profiles.put(UserProfile(chat_id, language=random.choice(LANGUAGES)))
+
+    old = [old_main_menu_keyboard, old_hard_level_keyboard]
+    new = [keyboards.main_menu_keyboard, keyboards.hard_level_keyboard]
+    mismatches = sum(
+        apihelper._convert_markup(o(c)) != apihelper._convert_markup(n(c))
+        for c in chat_ids[:500] for o, n in zip(old, new)
+    )
+
+    old_us = render(old, chat_ids)
+    new_us = render(new, chat_ids)
+    print(f"{args.renders} renders, {len(LANGUAGES)} languages")
+    print(f"build + serialize: {old_us:.2f} us per render")
+    print(f"cached keyboard:   {new_us:.2f} us per render")
+    print(f"JSON mismatches in first 500 chats: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
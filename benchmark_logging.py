@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: витрати на логування одного оновлення до і після log_pipeline.
+
+Кожне оновлення логується так, як у боті: слухач оновлень
+(main.log_all_updates), debug_logger.log_message для вхідного
+повідомлення і debug_logger.log_response для відповіді.
+- legacy: відтворення старого коду - відкриття і дозапис кількох файлів
+  та print() на кожен виклик;
+- development / production: справжні функції через log_pipeline
+  (у окремому процесі для кожного профілю).
+Вимірюється час у потоці обробника на оновлення і повний час разом із
+записом черги на диск. stdout перенаправлено в /dev/null.
+
+Запуск:
+    python benchmark_logging.py --updates 5000
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import telebot
+
+
+def make_messages(count):
+    return [telebot.types.Message.de_json({
+        "message_id": i, "date": 0, "text": "/start" if i % 10 == 0 else f"Слово {i}",
+        "chat": {"id": 1000 + i % 200, "type": "private"},
+        "from": {"id": 1000 + i % 200, "is_bot": False, "first_name": "Test", "username": f"user{i % 200}"},
+    }) for i in range(count)]
+
+
+def run_legacy(messages, log_dir):
+    """The pre-pipeline code paths, copied: open/append/close per file plus print()"""
+    debug_log = os.path.join(log_dir, "debug.log")
+    command_log = os.path.join(log_dir, "commands.log")
+    user_input_log = os.path.join(log_dir, "user_inputs.log")
+    logging.basicConfig(filename=os.path.join(log_dir, "bot2.log"), level=logging.INFO,
+                        format='%(asctime)s %(message)s')
+
+    def append(path, line):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(f"{line}\n")
+
+    def log_all_updates(batch):
+        for message in batch:
+            log_str = f"INCOMING | From: {message.chat.id} | Text: {message.text}"
+            logging.info(log_str)
+            print(f"[SERVER LOG] {log_str}")
+
+    def log_message(message):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        user = message.from_user
+        log_str = f"[{timestamp}] User {user.id} ({user.username}/{user.first_name}) sent: '{message.text}'"
+        if message.text.startswith('/'):
+            append(command_log, log_str)
+        append(user_input_log, log_str)
+        append(debug_log, log_str)
+        print(f"📩 INPUT: {log_str}")
+
+    def log_response(user_id, text):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        log_str = f"[{timestamp}] Response to User {user_id}: '{text[:100]}'"
+        append(debug_log, log_str)
+        print(f"📤 OUTPUT: {log_str}")
+
+    started = time.perf_counter()
+    for message in messages:
+        log_all_updates([message])
+        log_message(message)
+        log_response(message.chat.id, "Відповідь бота")
+    caller = time.perf_counter() - started
+    logging.shutdown()
+    return caller, time.perf_counter() - started
+
+
+def run_pipeline(messages, log_dir, profile):
+    os.environ["LOG_PROFILE"] = profile
+    os.environ["LOG_DIR"] = log_dir
+    os.environ.setdefault("TOKEN", "0:benchmark")
+    os.environ.setdefault("ADMIN_ID", "0")
+    import config
+    import debug_logger
+    import log_pipeline
+    import main
+    main.setup_logging()
+
+    started = time.perf_counter()
+    for message in messages:
+        main.log_all_updates([message])
+        debug_logger.log_message(message)
+        # config.send_message_with_logging logs responses only in DEBUG_MODE
+        if config.DEBUG_MODE:
+            debug_logger.log_response(message.chat.id, "Відповідь бота")
+    caller = time.perf_counter() - started
+    stats = log_pipeline.get_pipeline().stats()
+    log_pipeline.shutdown()
+    return caller, time.perf_counter() - started, stats
+
+
+def child(mode, count):
+    messages = make_messages(count)
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Консольний вивід (print і StreamHandler) - у /dev/null, як у фоновому сервісі
+        saved = os.dup(1)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        try:
+            if mode == "legacy":
+                caller, total = run_legacy(messages, log_dir)
+                stats = {}
+            else:
+                caller, total, stats = run_pipeline(messages, log_dir, mode)
+            sys.stdout.flush()
+        finally:
+            os.dup2(saved, 1)
+        size = sum(os.path.getsize(os.path.join(log_dir, name)) for name in os.listdir(log_dir))
+    sys.__stdout__.write(json.dumps({"caller": caller, "total": total, "bytes": size, "stats": stats}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-update logging overhead before and after log_pipeline")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        child(args.mode, args.updates)
+        return
+
+    print(f"{args.updates} updates (incoming message + bot response each)")
+    for mode in ("legacy", "development", "production"):
+        output = subprocess.run([sys.executable, __file__, "--mode", mode, "--updates", str(args.updates)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        per_update = result["caller"] / args.updates * 1e6
+        print(f"{mode:12s} {per_update:7.1f} us/update in the handler, total with disk "
+              f"{result['total']:.2f} s, {result['bytes'] / 1024:.0f} KB written {result['stats'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: ціна інструментування metrics для гарячих шляхів.
+
+- порожній обробник без обгортки і з metrics.instrument_handler;
+- execute_query("SELECT 1") на тимчасовій БД з таймером і без
+  (тіло execute_query до змін скопійоване як run_legacy_query);
+- час registry.render() для --handlers серій обробників.
+Кожен вимір - найкращий з п'яти проходів по --calls викликів.
+
+Запуск:
+    python benchmark_metrics.py --calls 200000 --handlers 60
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import metrics
+
+
+def best_of(fn, calls, rounds=5):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(calls)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls * 1e6
+
+
+def handler(message):
+    return message
+
+
+def run_legacy_query(conn, query):
+    """execute_query without the timer"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        result = cursor.fetchone()
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"SQL Error: {e}")
+        result = None
+    return result
+
+
+def run_timed_query(conn, query):
+    statement = metrics.statement_type(query)
+    started = time.perf_counter()
+    result = run_legacy_query(conn, query)
+    metrics.db_query_seconds.observe(time.perf_counter() - started, statement)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the metrics instrumentation")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--handlers", type=int, default=60)
+    args = parser.parse_args()
+
+    timed = metrics.instrument_handler(handler)
+
+    def plain_calls(count):
+        for i in range(count):
+            handler(i)
+
+    def timed_calls(count):
+        for i in range(count):
+            timed(i)
+
+    plain = best_of(plain_calls, args.calls)
+    instrumented = best_of(timed_calls, args.calls)
+    print(f"empty handler:        {plain:6.2f} us plain, {instrumented:6.2f} us timed "
+          f"(+{instrumented - plain:.2f} us per call)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        queries = max(args.calls // 10, 1)
+        plain = best_of(lambda count: [run_legacy_query(conn, "SELECT 1") for _ in range(count)], queries)
+        instrumented = best_of(lambda count: [run_timed_query(conn, "SELECT 1") for _ in range(count)], queries)
+        conn.close()
+    print(f"execute_query SELECT: {plain:6.2f} us plain, {instrumented:6.2f} us timed "
+          f"(+{instrumented - plain:.2f} us per query)")
+
+    for index in range(args.handlers):
+        for value in (0.001, 0.02, 0.3):
+            metrics.handler_seconds.observe(value, f"handlers.module.handler_{index}")
+    started = time.perf_counter()
+    body = metrics.registry.render()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"/metrics render:      {elapsed:6.2f} ms for {len(body.splitlines())} lines, {len(body) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: відправка повідомлень напряму проти outbound.OutboundDispatcher.
+
+Імітований Telegram відповідає за --api-ms і повертає 429 (retry_after),
+якщо перевищено ліміт на бот або на чат. Під час розсилки --broadcast
+повідомлень користувачі надсилають --interactive відповідей; міряється
+затримка відповідей і кількість 429.
+
+Запуск:
+    python benchmark_outbound.py --broadcast 600 --interactive 100
+"""
+
+import argparse
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from telebot.apihelper import ApiTelegramException
+
+from latency import percentile
+from outbound import BROADCAST, INTERACTIVE, OutboundDispatcher
+
+
+class FakeTelegram:
+    """Bot API limits: 30 messages in any one-second window, 1 msg/s per chat with a burst of 3"""
+
+    def __init__(self, api_ms, global_rate=30, chat_burst=3):
+        self.api_ms = api_ms
+        self.global_rate = global_rate
+        self.chat_burst = chat_burst
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.per_chat = {}      # chat_id -> (tokens, updated)
+        self.rejected = 0
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.api_ms / 1000)
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            tokens, updated = self.per_chat.get(chat_id, (self.chat_burst, now))
+            tokens = min(self.chat_burst, tokens + (now - updated))
+            if len(self.recent) >= self.global_rate or tokens < 1:
+                self.rejected += 1
+                raise ApiTelegramException("sendMessage", None, {
+                    "error_code": 429, "description": "Too Many Requests",
+                    "parameters": {"retry_after": 1}})
+            self.recent.append(now)
+            self.per_chat[chat_id] = (tokens - 1, now)
+        return text
+
+
+def workload(broadcast, interactive):
+    """(chat_id, priority, start offset in seconds) for a broadcast with replies mixed in"""
+    jobs = [(100000 + i, BROADCAST, 0.0) for i in range(broadcast)]
+    jobs += [(i % 20, INTERACTIVE, 0.5 + i * 0.05) for i in range(interactive)]
+    return jobs
+
+
+def run_direct(api, jobs, threads):
+    latencies, failed = defaultdict(list), [0]
+
+    def send(chat_id, priority, offset, started):
+        delay = started + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        queued = time.monotonic()
+        for attempt in range(4):
+            try:
+                api.send_message(chat_id, "x")
+                latencies[priority].append((time.monotonic() - queued) * 1000)
+                return
+            except ApiTelegramException as e:
+                # what urllib3 Retry did: block this thread, then try again
+                time.sleep(e.result_json["parameters"]["retry_after"])
+        failed[0] += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for chat_id, priority, offset in jobs:
+            pool.submit(send, chat_id, priority, offset, started)
+    return time.monotonic() - started, latencies, failed[0]
+
+
+def run_dispatcher(api, jobs, concurrency):
+    dispatcher = OutboundDispatcher(global_rate=25, concurrency=concurrency, name="bench")
+    latencies, failed = defaultdict(list), [0]
+    started = time.monotonic()
+    futures = []
+    for chat_id, priority, offset in sorted(jobs, key=lambda job: job[2]):
+        delay = started + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        queued = time.monotonic()
+        future = dispatcher.submit(chat_id, "send_message", lambda c=chat_id: api.send_message(c, "x"), priority)
+        futures.append((future, priority, queued))
+        future.add_done_callback(lambda f, p=priority, q=queued: latencies[p].append((time.monotonic() - q) * 1000)
+                                 if f.exception() is None else None)
+    for future, _, _ in futures:
+        if future.exception() is not None:
+            failed[0] += 1
+    elapsed = time.monotonic() - started
+    stats = dispatcher.stats()
+    dispatcher.close()
+    return elapsed, latencies, failed[0], stats
+
+
+def report(name, elapsed, latencies, failed, rejected):
+    interactive, broadcast = latencies[INTERACTIVE], latencies[BROADCAST]
+    print(f"{name}: {elapsed:.1f} s, 429 responses {rejected}, failed {failed}")
+    print(f"  interactive p50 {percentile(interactive, 0.5):.0f} ms, p99 {percentile(interactive, 0.99):.0f} ms")
+    print(f"  broadcast   p50 {percentile(broadcast, 0.5):.0f} ms, p99 {percentile(broadcast, 0.99):.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare direct sends with the outbound dispatcher")
+    parser.add_argument("--broadcast", type=int, default=600)
+    parser.add_argument("--interactive", type=int, default=100)
+    parser.add_argument("--api-ms", type=float, default=40)
+    parser.add_argument("--threads", type=int, default=12, help="handler threads sending directly")
+    args = parser.parse_args()
+
+    jobs = workload(args.broadcast, args.interactive)
+    api = FakeTelegram(args.api_ms)
+    elapsed, latencies, failed = run_direct(api, jobs, args.threads)
+    report("direct + blocking retry", elapsed, latencies, failed, api.rejected)
+
+    api = FakeTelegram(args.api_ms)
+    elapsed, latencies, failed, stats = run_dispatcher(api, jobs, 8)
+    report("outbound dispatcher", elapsed, latencies, failed, api.rejected)
+    print(f"  stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: ціна QueryProfiler на запит і що він знаходить.
+
+Тимчасова БД з --rows словами. Запити з бота: пошук за первинним ключем,
+LOWER(word) = LOWER(?) (german_article_finder), ORDER BY RANDOM() LIMIT 1
+(possessive_articles) і перевірка sqlite_master. Кожен запит виконується
+--calls разів на з'єднанні без профайлера і з ним (трасування + progress
+handler), по черзі п'ять разів, береться найкращий прохід; далі - звіт
+профайлера з планами запитів.
+
+Запуск:
+    python benchmark_query_profiler.py --rows 20000 --calls 200
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from query_profiler import QueryProfiler, format_report
+
+QUERIES = (
+    ("primary key", "SELECT word FROM words WHERE id = ?", lambda i: (i,)),
+    ("sqlite_master", "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", lambda i: ("words",)),
+    ("LOWER(word)", "SELECT id FROM words WHERE LOWER(word) = LOWER(?)", lambda i: (f"wort{i}",)),
+    ("RANDOM()", "SELECT word FROM words ORDER BY RANDOM() LIMIT 1", lambda i: ()),
+)
+
+
+def make_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, word TEXT)")
+    conn.executemany("INSERT INTO words (word) VALUES (?)", [(f"Wort{i}",) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def run(conn, sql, params, calls):
+    started = time.perf_counter()
+    for i in range(calls):
+        conn.execute(sql, params(i)).fetchall()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead and findings of the SQLite query profiler")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--slow-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        make_database(path, args.rows)
+        profiler = QueryProfiler(slow_ms=args.slow_ms)
+        plain = sqlite3.connect(path)
+        traced = profiler.connect(path)
+        print(f"{args.rows} rows, {args.calls} calls per query, slow >= {args.slow_ms:g} ms")
+        for name, sql, params in QUERIES:
+            run(plain, sql, params, 10)     # warm the page cache
+            before = after = None
+            for _ in range(5):
+                elapsed = run(plain, sql, params, args.calls)
+                before = elapsed if before is None else min(before, elapsed)
+                elapsed = run(traced, sql, params, args.calls)
+                after = elapsed if after is None else min(after, elapsed)
+            print(f"{name:14s} {before:9.1f} us plain, {after:9.1f} us profiled (+{after - before:.1f} us)")
+        traced.close()
+        plain.close()
+        print()
+        print(format_report(profiler.report(limit=len(QUERIES)), len(QUERIES)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: стара послідовна розсилка нагадувань проти ReminderBroadcast.
+
+Тимчасова БД з --users неактивними користувачами; кожен --blocked-every
+користувач заблокував бота (403). Імітований Telegram відповідає за
+--api-ms. Стара розсилка: один SELECT усіх, запит мови на кожного
+користувача і блокуюча відправка по одному. Нова: сторінки по chat_id,
+текст з каталогу, відправка через OutboundDispatcher; далі перевіряється
+продовження перерваної розсилки (без дублікатів) і пропуск заблокованих.
+Наприкінці - розподіл за хвилинними кошиками (run_due) проти однієї
+розсилки всім о 18:00.
+
+Запуск:
+    python benchmark_reminders.py --users 5000 --api-ms 5
+"""
+
+import argparse
+import collections
+import datetime
+import functools
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+import db_init
+from outbound import BROADCAST, OutboundDispatcher
+from reminder_broadcast import ReminderBroadcast, reminder_key
+
+LANGUAGES = ("uk", "en", "ru", "tr", "ar")
+
+
+class FakeTelegram:
+    def __init__(self, api_ms, blocked_every):
+        self.api_ms = api_ms
+        self.blocked_every = blocked_every
+        self.lock = threading.Lock()
+        self.delivered = collections.Counter()
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.api_ms / 1000)
+        if chat_id % self.blocked_every == 0:
+            raise ApiTelegramException("sendMessage", None, {
+                "error_code": 403, "description": "Forbidden: bot was blocked by the user"})
+        with self.lock:
+            self.delivered[chat_id] += 1
+        return text
+
+
+def make_database(path, users):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE users (chat_id INTEGER PRIMARY KEY, language TEXT DEFAULT 'uk', "
+                   "last_active TEXT, streak INTEGER DEFAULT 0)")
+    db_init.create_reminder_tables(cursor)
+    old = (datetime.date.today() - datetime.timedelta(days=3)).isoformat()
+    cursor.executemany("INSERT INTO users (chat_id, language, last_active, active_days) VALUES (?, ?, ?, ?)",
+                       [(1000 + i, LANGUAGES[i % len(LANGUAGES)], old if i % 4 else None, i % 10)
+                        for i in range(users)])
+    conn.commit()
+    conn.close()
+
+
+def run_legacy(path, api):
+    """The old send_reminder loop: every user at once, a language lookup and a blocking send per user"""
+    from locales.catalog import get_catalog
+    catalog = get_catalog()
+    started = time.perf_counter()
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute("SELECT chat_id, language, active_days FROM users WHERE last_active < ? OR last_active IS NULL",
+                   (yesterday,))
+    sent = 0
+    for chat_id, _, active_days in cursor.fetchall():
+        lookup = sqlite3.connect(path)
+        language = lookup.execute("SELECT language FROM users WHERE chat_id = ?", (chat_id,)).fetchone()[0]
+        lookup.close()
+        try:
+            api.send_message(chat_id, catalog.format(reminder_key(active_days), language))
+            sent += 1
+        except ApiTelegramException:
+            pass
+    conn.close()
+    return time.perf_counter() - started, sent
+
+
+def make_engine(path, api, concurrency):
+    dispatcher = OutboundDispatcher(global_rate=100000, chat_rate=100000, concurrency=concurrency, name="bench")
+
+    def send(chat_id, text):
+        return dispatcher.submit(chat_id, "send_message", functools.partial(api.send_message, chat_id, text),
+                                 BROADCAST)
+    return ReminderBroadcast(lambda: sqlite3.connect(path), send, page_size=500), dispatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the old reminder loop with ReminderBroadcast")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--api-ms", type=float, default=5)
+    parser.add_argument("--blocked-every", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        make_database(path, args.users)
+        print(f"{args.users} inactive users, API {args.api_ms:g} ms, 1 in {args.blocked_every} blocked")
+
+        api = FakeTelegram(args.api_ms, args.blocked_every)
+        elapsed, sent = run_legacy(path, api)
+        print(f"legacy loop:       {elapsed:.1f} s, {sent / elapsed:.0f} msg/s, sent {sent}")
+
+        # Перервана розсилка: зупиняємо на третині й продовжуємо тим самим run_id
+        api = FakeTelegram(args.api_ms, args.blocked_every)
+        engine, dispatcher = make_engine(path, api, args.concurrency)
+        threading.Timer(args.users * args.api_ms / 1000 / args.concurrency / 3, engine.stop).start()
+        first = engine.run("bench")
+        second = engine.run("bench")
+        elapsed = first["elapsed_s"] + second["elapsed_s"]
+        sent = first["sent"] + second["sent"]
+        duplicates = sum(1 for count in api.delivered.values() if count > 1)
+        print(f"ReminderBroadcast: {elapsed:.1f} s, {sent / elapsed:.0f} msg/s, sent {sent}, "
+              f"blocked {first['blocked'] + second['blocked']}")
+        print(f"  interrupted after {first['sent']} sent, resumed: {second['sent']} more, duplicates {duplicates}")
+
+        delivered = sum(api.delivered.values())
+        engine.run("bench")
+        print(f"  same run_id again: sent {sum(api.delivered.values()) - delivered} (already finished)")
+        third = engine.run("next-day")
+        print(f"  next run: sent {third['sent']}, blocked {third['blocked']} (blocked users skipped)")
+
+        # Хвилинні кошики: кожен тік надсилає лише свою хвилину
+        engine.assign_default_slots()
+        per_minute = []
+        tick = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1), datetime.time(16, 59))
+        engine.run_due(tick)
+        for _ in range(121):
+            tick += datetime.timedelta(minutes=1)
+            delivered = sum(api.delivered.values())
+            engine.run_due(tick)
+            per_minute.append(sum(api.delivered.values()) - delivered)
+        print(f"minute buckets: {sum(per_minute)} sent over {sum(1 for n in per_minute if n)} minutes, "
+              f"peak {max(per_minute)} per minute (one 18:00 run: {third['sent']} at once)")
+        dispatcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: таблиці user_{chat_id} проти єдиної таблиці user_words.
+
+Будує дві тимчасові бази з однаковими даними і вимірює:
+  * час відкриття з'єднання + першого запиту (парсинг схеми sqlite_master);
+  * середній час вибірки слів одного користувача.
+
+Запуск:
+    python benchmark_user_words.py --users 10000 100000 --words-per-user 20
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+WORDS_COUNT = 2000
+
+
+def _create_words(cursor):
+    cursor.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, word TEXT, translation TEXT)")
+    cursor.executemany(
+        "INSERT INTO words (id, word, translation) VALUES (?, ?, ?)",
+        ((i, f"wort{i}", f"word{i}") for i in range(1, WORDS_COUNT + 1)),
+    )
+
+
+def _user_rows(users, words_per_user, seed=42):
+    rng = random.Random(seed)
+    for chat_id in range(1, users + 1):
+        for word_id in rng.sample(range(1, WORDS_COUNT + 1), words_per_user):
+            yield chat_id, word_id, round(rng.uniform(0, 5), 2)
+
+
+def build_legacy_db(path, users, words_per_user):
+    """Стара схема: окрема таблиця на кожного користувача"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    _create_words(cursor)
+    current = None
+    batch = []
+    for chat_id, word_id, rating in _user_rows(users, words_per_user):
+        if chat_id != current:
+            if batch:
+                cursor.executemany(f"INSERT INTO user_{current} (word_id, rating) VALUES (?, ?)", batch)
+                batch = []
+            current = chat_id
+            cursor.execute(f"""
+            CREATE TABLE user_{chat_id} (
+                word_id INTEGER PRIMARY KEY,
+                rating REAL DEFAULT 0.0,
+                FOREIGN KEY (word_id) REFERENCES words(id)
+            )
+            """)
+        batch.append((word_id, rating))
+    if batch:
+        cursor.executemany(f"INSERT INTO user_{current} (word_id, rating) VALUES (?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def build_user_words_db(path, users, words_per_user):
+    """Нова схема: одна таблиця user_words з складеним ключем"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    _create_words(cursor)
+    cursor.execute("""
+    CREATE TABLE user_words (
+        chat_id INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        rating REAL DEFAULT 0.0,
+        added_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (chat_id, word_id),
+        FOREIGN KEY (word_id) REFERENCES words(id)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX idx_user_words_rating ON user_words(chat_id, rating)")
+    cursor.executemany(
+        "INSERT INTO user_words (chat_id, word_id, rating) VALUES (?, ?, ?)",
+        _user_rows(users, words_per_user),
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure_open(path, repeats=5):
+    """Середній час відкриття з'єднання та першого запиту (мс)"""
+    total = 0.0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        conn = sqlite3.connect(path)
+        conn.execute("SELECT COUNT(*) FROM words").fetchone()
+        total += time.perf_counter() - started
+        conn.close()
+    return total / repeats * 1000
+
+
+def measure_queries(path, users, legacy, queries=2000, seed=7):
+    """Середній час вибірки словника одного користувача (мкс)"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    chat_ids = [rng.randint(1, users) for _ in range(queries)]
+    started = time.perf_counter()
+    for chat_id in chat_ids:
+        if legacy:
+            cursor.execute(f"""
+            SELECT w.word, w.translation, u.rating
+            FROM words w JOIN user_{chat_id} u ON w.id = u.word_id
+            """)
+        else:
+            cursor.execute("""
+            SELECT w.word, w.translation, u.rating
+            FROM user_words u JOIN words w ON w.id = u.word_id
+            WHERE u.chat_id = ?
+            """, (chat_id,))
+        cursor.fetchall()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed / queries * 1_000_000
+
+
+def run(users, words_per_user):
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        new_path = os.path.join(tmp, "user_words.db")
+
+        print(f"\n=== {users} users x {words_per_user} words ===")
+        started = time.perf_counter()
+        build_legacy_db(legacy_path, users, words_per_user)
+        print(f"legacy build:     {time.perf_counter() - started:.1f} s, "
+              f"{os.path.getsize(legacy_path) / 1024 / 1024:.1f} MB")
+        started = time.perf_counter()
+        build_user_words_db(new_path, users, words_per_user)
+        print(f"user_words build: {time.perf_counter() - started:.1f} s, "
+              f"{os.path.getsize(new_path) / 1024 / 1024:.1f} MB")
+
+        print(f"open+first query: legacy {measure_open(legacy_path):.2f} ms | "
+              f"user_words {measure_open(new_path):.2f} ms")
+        print(f"per-user select:  legacy {measure_queries(legacy_path, users, True):.1f} us | "
+              f"user_words {measure_queries(new_path, users, False):.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-user tables vs user_words")
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--words-per-user", type=int, default=20)
+    args = parser.parse_args()
+    for users in args.users:
+        run(users, args.words_per_user)
+
+
+if __name__ == "__main__":
+    main()
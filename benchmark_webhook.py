@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: webhook проти polling.
+
+Програє записані оновлення (JSON Lines, наприклад з WEBHOOK_RECORD) або
+згенеровані текстові повідомлення через два шляхи приймання:
+- webhook: POST на локальний WebhookServer з кількох клієнтських потоків;
+- polling: bot.polling() з get_updates, що віддає ті самі оновлення з
+  пам'яті з тим самим темпом надходження.
+Для кожного оновлення міряється час від надходження до запуску обробника.
+
+Запуск:
+    python benchmark_webhook.py --count 2000 --rate 500
+    python benchmark_webhook.py --updates logs/webhook_updates.jsonl
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+
+os.environ.setdefault("TOKEN", "0:benchmark")
+os.environ.setdefault("ADMIN_ID", "0")
+
+import telebot                                      # noqa: E402
+from telebot import types                           # noqa: E402
+
+from latency import percentile   # noqa: E402
+from webhook_server import SECRET_HEADER, WebhookServer   # noqa: E402
+
+SECRET = "benchmark-secret"
+CONTENT_TYPES = ["text", "photo", "voice", "document", "sticker", "audio", "video", "location", "contact"]
+
+
+def synthesize(count, chats):
+    now = int(time.time())
+    return [{
+        "update_id": i + 1,
+        "message": {
+            "message_id": i + 1,
+            "date": now,
+            "chat": {"id": 1000 + i % chats, "type": "private"},
+            "from": {"id": 1000 + i % chats, "is_bot": False, "first_name": "bench"},
+            "text": f"word {i}",
+        },
+    } for i in range(count)]
+
+
+def load_updates(path, count):
+    updates = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                updates.append(json.loads(line))
+    # Renumber so completion can be matched to the send time
+    for i, update in enumerate(updates[:count] if count else updates):
+        update["update_id"] = i + 1
+    return updates[:count] if count else updates
+
+
+class Recorder:
+    """Send and handler-start times per update_id"""
+
+    def __init__(self, total):
+        self.total = total
+        self.sent = {}
+        self.done = {}
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def mark_sent(self, update_id):
+        self.sent[update_id] = time.perf_counter()
+
+    def mark_done(self, update_id):
+        with self.lock:
+            self.done.setdefault(update_id, time.perf_counter())
+            if len(self.done) >= self.total:
+                self.finished.set()
+
+    def latencies_ms(self):
+        return [(self.done[u] - self.sent[u]) * 1000 for u in self.done if u in self.sent]
+
+
+class HarnessBot(telebot.TeleBot):
+    """Tags every message/callback with its update_id so handlers can report completion"""
+
+    def process_new_updates(self, updates):
+        for update in updates:
+            for name, value in vars(update).items():
+                if name != "update_id" and value is not None:
+                    try:
+                        value.harness_update_id = update.update_id
+                    except AttributeError:
+                        pass
+        super().process_new_updates(updates)
+
+
+def make_bot(recorder, work_ms, bot_class=None):
+    bot = (bot_class or HarnessBot)("0:benchmark", threaded=True, num_threads=4)
+    bot._user = types.User(0, True, "benchmark")       # polling would call getMe otherwise
+
+    def handle(obj):
+        recorder.mark_done(getattr(obj, "harness_update_id", None))
+        if work_ms:
+            time.sleep(work_ms / 1000)
+
+    # Звичайні обробники виконуються в пулі потоків бота, як у main.py
+    bot.register_message_handler(handle, func=lambda message: True, content_types=CONTENT_TYPES)
+    bot.register_callback_query_handler(handle, func=lambda call: True)
+    return bot
+
+
+def paced(updates, rate):
+    started = time.perf_counter()
+    for i, update in enumerate(updates):
+        if rate:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield update
+
+
+def run_webhook(updates, rate, clients, work_ms, timeout):
+    recorder = Recorder(len(updates))
+    bot = make_bot(recorder, work_ms)
+    server = WebhookServer(bot, host="127.0.0.1", port=0, secret_token=SECRET,
+                           max_queue=max(1000, len(updates)))
+    port = server.start()
+    bodies = queue.Queue(maxsize=clients * 4)
+    post_ms = []
+    rejected = []
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        headers = {"Content-Type": "application/json", SECRET_HEADER: SECRET}
+        while True:
+            item = bodies.get()
+            if item is None:
+                break
+            update_id, body = item
+            started = time.perf_counter()
+            recorder.mark_sent(update_id)
+            conn.request("POST", server.path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            post_ms.append((time.perf_counter() - started) * 1000)
+            if response.status != 200:
+                rejected.append(response.status)
+        conn.close()
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    for update in paced(updates, rate):
+        bodies.put((update["update_id"], json.dumps(update).encode("utf-8")))
+    for _ in threads:
+        bodies.put(None)
+    for thread in threads:
+        thread.join()
+    recorder.finished.wait(timeout)
+    elapsed = time.perf_counter() - started
+    server_stats = server.stats()
+    server.stop()
+    bot.worker_pool.close()
+    return recorder, elapsed, {"post": post_ms, "rejected": len(rejected), "server": server_stats}
+
+
+class ReplayBot(HarnessBot):
+    """TeleBot whose getUpdates is served from an in-memory feed"""
+
+    feed = None
+
+    def get_updates(self, offset=None, limit=None, timeout=20, allowed_updates=None, long_polling_timeout=20):
+        batch = []
+        try:
+            batch.append(self.feed.get(timeout=long_polling_timeout))
+            while len(batch) < (limit or 100):
+                batch.append(self.feed.get_nowait())
+        except queue.Empty:
+            pass
+        return [types.Update.de_json(update) for update in batch]
+
+
+def run_polling(updates, rate, interval, work_ms, timeout):
+    recorder = Recorder(len(updates))
+    bot = make_bot(recorder, work_ms, ReplayBot)
+    bot.feed = queue.Queue()
+    poller = threading.Thread(
+        target=bot.polling,
+        kwargs={"non_stop": True, "interval": interval, "timeout": 1, "long_polling_timeout": 1},
+        daemon=True)
+    poller.start()
+    started = time.perf_counter()
+    for update in paced(updates, rate):
+        recorder.mark_sent(update["update_id"])
+        bot.feed.put(update)
+    recorder.finished.wait(timeout)
+    elapsed = time.perf_counter() - started
+    bot.stop_polling()
+    poller.join(5)
+    return recorder, elapsed
+
+
+def report(name, recorder, elapsed):
+    latencies = recorder.latencies_ms()
+    print(f"{name}:")
+    print(f"  handled {len(recorder.done)}/{recorder.total} in {elapsed:.2f} s "
+          f"({len(recorder.done) / elapsed:.0f} updates/s)")
+    print(f"  ingest->handler p50 {percentile(latencies, 0.50):.1f} ms, "
+          f"p99 {percentile(latencies, 0.99):.1f} ms, max {max(latencies, default=0):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare webhook and polling ingestion")
+    parser.add_argument("--updates", help="JSON Lines file with recorded updates")
+    parser.add_argument("--count", type=int, default=2000, help="updates to replay (0 = whole file)")
+    parser.add_argument("--chats", type=int, default=200, help="distinct chats for synthesized updates")
+    parser.add_argument("--rate", type=float, default=500, help="updates per second (0 = as fast as possible)")
+    parser.add_argument("--clients", type=int, default=8, help="parallel webhook connections")
+    parser.add_argument("--interval", type=float, default=1, help="polling interval as in main.py")
+    parser.add_argument("--work-ms", type=float, default=0, help="simulated handler time")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--skip-polling", action="store_true")
+    args = parser.parse_args()
+
+    if args.updates:
+        updates = load_updates(args.updates, args.count)
+    else:
+        updates = synthesize(args.count, args.chats)
+    print(f"{len(updates)} updates at {args.rate or 'max'} updates/s")
+
+    recorder, elapsed, extra = run_webhook(updates, args.rate, args.clients, args.work_ms, args.timeout)
+    report("webhook", recorder, elapsed)
+    print(f"  POST p50 {percentile(extra['post'], 0.50):.2f} ms, p99 {percentile(extra['post'], 0.99):.2f} ms, "
+          f"non-200: {extra['rejected']}")
+    print(f"  server: {extra['server']}")
+
+    if not args.skip_polling:
+        recorder, elapsed = run_polling(updates, args.rate, args.interval, args.work_ms, args.timeout)
+        report(f"polling (interval={args.interval:g} s)", recorder, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: df.sample по всьому DataFrame проти FenwickSampler.
+
+Запуск:
+    python benchmark_word_sampler.py --words 50000 --k 10
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from word_sampler import FenwickSampler, rating_weight
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark weighted word sampling")
+    parser.add_argument("--words", type=int, default=50000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    df = pd.DataFrame({
+        "id": range(args.words),
+        "word": [f"wort{i}" for i in range(args.words)],
+        "priority": [round(random.uniform(0, 5), 1) for _ in range(args.words)],
+    })
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        df.copy().sort_values(by="priority", ascending=False).sample(args.k)
+    old = (time.perf_counter() - started) / args.rounds * 1000
+
+    started = time.perf_counter()
+    sampler = FenwickSampler.from_ratings(df["priority"].to_numpy())
+    build = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        df.iloc[sampler.sample(args.k)]
+    new = (time.perf_counter() - started) / args.rounds * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        sampler.update(random.randrange(args.words), rating_weight(random.uniform(0, 5)))
+    update = (time.perf_counter() - started) / args.rounds * 1_000_000
+
+    print(f"{args.words} words, k={args.k}")
+    print(f"copy+sort+df.sample: {old:.3f} ms per round")
+    print(f"Fenwick build:       {build:.3f} ms (once per cached deck)")
+    print(f"Fenwick draw+iloc:   {new:.3f} ms per round")
+    print(f"Fenwick update:      {update:.1f} us per rating change")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк: пул потоків telebot проти work_scheduler.ChatScheduler.
+
+Кожен чат надсилає кілька швидких натискань; обробник читає лічильник зі
+стану чату, "працює" work_ms і записує лічильник + 1 (як обробники з
+user_state[chat_id]). У спільному пулі натискання одного чату виконуються
+паралельно і частина записів губиться; у ChatScheduler - по черзі.
+
+Запуск:
+    python benchmark_work_scheduler.py --chats 200 --taps 5 --work-ms 5
+"""
+
+import argparse
+import threading
+import time
+
+import telebot
+from telebot import util
+
+from work_scheduler import ChatScheduler
+
+
+def make_handler(state, lock):
+    def handler(chat_id, work_ms):
+        with lock:
+            value = state.get(chat_id, 0)
+        time.sleep(work_ms / 1000)
+        with lock:
+            state[chat_id] = value + 1
+    return handler
+
+
+def run_thread_pool(chats, taps, work_ms, workers):
+    state, lock = {}, threading.Lock()
+    handler = make_handler(state, lock)
+    done = threading.Semaphore(0)
+
+    def task(chat_id):
+        handler(chat_id, work_ms)
+        done.release()
+
+    pool = util.ThreadPool(telebot.TeleBot("0:benchmark", threaded=False), num_threads=workers)
+    started = time.perf_counter()
+    for chat_id in range(chats):
+        for _ in range(taps):
+            pool.put(task, chat_id)
+    for _ in range(chats * taps):
+        done.acquire()
+    elapsed = time.perf_counter() - started
+    pool.close()
+    return elapsed, chats * taps - sum(state.values())
+
+
+def run_scheduler(chats, taps, work_ms, workers):
+    state, lock = {}, threading.Lock()
+    handler = make_handler(state, lock)
+    scheduler = ChatScheduler(max_workers=workers, name="bench")
+    started = time.perf_counter()
+    futures = [scheduler.submit(chat_id, handler, chat_id, work_ms)
+               for chat_id in range(chats) for _ in range(taps)]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - started
+    stats = scheduler.stats()
+    scheduler.close()
+    return elapsed, chats * taps - sum(state.values()), stats
+
+
+def run_flood(taps, max_per_chat):
+    scheduler = ChatScheduler(max_workers=1, max_per_chat=max_per_chat, name="flood")
+    running, gate = threading.Event(), threading.Event()
+    scheduler.submit(1, lambda: running.set() or gate.wait())     # keep the chat busy while it floods
+    running.wait()
+    futures = [scheduler.submit(1, lambda: None) for _ in range(taps)]
+    gate.set()
+    executed = sum(1 for future in futures if not future.cancelled() and future.result() is None)
+    stats = scheduler.stats()
+    scheduler.close()
+    return executed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the telebot thread pool with ChatScheduler")
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--taps", type=int, default=5, help="quick taps per chat")
+    parser.add_argument("--work-ms", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    total = args.chats * args.taps
+    print(f"{args.chats} chats x {args.taps} taps, {args.work_ms:g} ms per task, {args.workers} workers")
+    elapsed, lost = run_thread_pool(args.chats, args.taps, args.work_ms, args.workers)
+    print(f"telebot ThreadPool: {elapsed:.2f} s, {total / elapsed:.0f} tasks/s, lost updates: {lost}")
+    elapsed, lost, stats = run_scheduler(args.chats, args.taps, args.work_ms, args.workers)
+    print(f"ChatScheduler:      {elapsed:.2f} s, {total / elapsed:.0f} tasks/s, lost updates: {lost}")
+    print(f"  wait p50 {stats['wait_p50_ms']} ms, p99 {stats['wait_p99_ms']} ms, max depth {stats['max_depth']}")
+
+    executed, stats = run_flood(100, 20)
+    print(f"flood of 100 taps from one busy chat: {executed} ran, "
+          f"{stats['dropped_overflow']} oldest dropped (max_per_chat=20)")
+
+
+if __name__ == "__main__":
+    main()
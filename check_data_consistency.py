@@ -57,15 +57,9 @@ def check_data_consistency():
             cursor.execute("SELECT 1 FROM users WHERE chat_id = ?", (chat_id,))
             user_exists = cursor.fetchone() is not None
             
-            # Перевіряємо наявність таблиці користувача
-            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='user_{chat_id}'")
-            table_exists = cursor.fetchone() is not None
-            
-            # Якщо таблиця існує, підрахуємо кількість слів у ній
-            word_count_user_db = 0
-            if table_exists:
-                cursor.execute(f"SELECT COUNT(*) FROM user_{chat_id}")
-                word_count_user_db = cursor.fetchone()[0]
+            # Підраховуємо кількість слів користувача в user_words
+            cursor.execute("SELECT COUNT(*) FROM user_words WHERE chat_id = ?", (chat_id,))
+            word_count_user_db = cursor.fetchone()[0]
             
             print(f"User {chat_id}: CSV={word_count_csv}, SQLite={word_count_user_db}, "
                   f"{'✅' if word_count_csv == word_count_user_db else '❌'}")
@@ -38,7 +38,7 @@ def check_table_references():
     tables = structure.get('tables', {})
     
     # Список таблиць з бази даних
-    shared_dict_tables = [name for name in tables.keys() if name.startswith('shared_dict_') and name not in ['shared_dict_users']]
+    shared_dict_tables = [name for name in tables.keys() if name.startswith('shared_dict_') and name not in ['shared_dict_users', 'shared_dict_words', 'shared_dict_ratings']]
     user_tables = [name for name in tables.keys() if name.startswith('user_')]
     
     print(f"Знайдено спільних словників: {len(shared_dict_tables)}")
@@ -99,7 +99,7 @@ def test_database_queries():
         actual_tables = [row[0] for row in cursor.fetchall()]
         
         # Перевірка спільних словників
-        shared_dicts = [t for t in actual_tables if t.startswith('shared_dict_') and t != 'shared_dict_users']
+        shared_dicts = [t for t in actual_tables if t.startswith('shared_dict_') and t not in ('shared_dict_users', 'shared_dict_words', 'shared_dict_ratings')]
         print(f"Знайдено спільних словників у БД: {len(shared_dicts)}")
         
         for dict_table in shared_dicts[:3]:  # Перевіряємо перші 3
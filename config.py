@@ -6,6 +6,12 @@ from apscheduler.schedulers.background import BackgroundScheduler
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from session_store import MemorySessionBackend, SessionStore, SQLiteSessionBackend
+from work_scheduler import ChatScheduler, ScheduledTeleBot
+from outbound import OutboundDispatcher
+import log_pipeline
+import metrics
+import query_profiler
 
 # Try to load environment variables, fallback to hardcoded values if dotenv is not installed
 
@@ -15,12 +21,66 @@ print("Using environment variables from .env file")
 TOKEN = os.getenv('TOKEN')
 ADMIN_ID = int(os.getenv('ADMIN_ID'))
 
+# Логування: LOG_PROFILE=production (за замовчуванням: INFO, семплінг, консоль лише WARNING+)
+# або development для налагодження (усе, DEBUG у консоль). Конвеєр запускає main.setup_logging()
+LOG_PROFILE = os.getenv('LOG_PROFILE', 'production')
+LOG_OPTIONS = dict(
+    log_dir=os.getenv('LOG_DIR', 'logs'),
+    max_bytes=int(os.getenv('LOG_MAX_MB', 20)) * 1024 * 1024,
+    backups=int(os.getenv('LOG_BACKUPS', 7)),
+    sampling=log_pipeline.parse_sampling(os.getenv('LOG_SAMPLING')),     # напр. "update=0.2,response=0"
+)
+
+
+# Єдиний пул для обробників і фонової роботи: завдання одного чату виконуються по черзі
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', 8))
+work_scheduler = ChatScheduler(
+    max_workers=WORKER_THREADS,
+    max_pending=int(os.getenv('WORK_QUEUE_MAX', 10000)),
+    max_per_chat=int(os.getenv('WORK_QUEUE_PER_CHAT', 20)),
+)
 
 # Глобальні об'єкти
-bot = telebot.TeleBot(TOKEN, num_threads=4)  # Збільшуємо кількість потоків
+bot = ScheduledTeleBot(TOKEN, work_scheduler)
+# До імпорту обробників: кожен зареєстрований обробник отримує таймер (metrics.handler_seconds)
+metrics.install(bot)
 translator = Translator()
 scheduler = BackgroundScheduler()
-user_state = {}
+
+# Стан користувачів: SESSION_BACKEND=sqlite (за замовчуванням, переживає рестарт) або memory
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
+user_state = SessionStore(
+    backend=SQLiteSessionBackend() if SESSION_BACKEND == 'sqlite' else MemorySessionBackend(),
+    idle_ttl=int(os.getenv('SESSION_IDLE_TTL', 30 * 60)),
+    max_bytes=int(os.getenv('SESSION_MAX_MB', 64)) * 1024 * 1024,
+)
+
+# Отримання оновлень: BOT_MODE=polling (за замовчуванням) або webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')              # публічна https-адреса, напр. https://bot.example.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')          # без нього генерується на кожен запуск (потрібен WEBHOOK_URL)
+WEBHOOK_SSL_CERT = os.getenv('WEBHOOK_SSL_CERT')    # лише якщо TLS не завершується на проксі
+WEBHOOK_SSL_KEY = os.getenv('WEBHOOK_SSL_KEY')
+WEBHOOK_RECORD = os.getenv('WEBHOOK_RECORD')        # JSON Lines файл для запису оновлень
+
+# Виконання обробників: BOT_RUNTIME=threads (за замовчуванням) або async (AsyncTeleBot, див. async_runtime.py;
+# експериментальний: лише частина обробників нативна, решта йде в потоковий реєстр)
+BOT_RUNTIME = os.getenv('BOT_RUNTIME', 'threads')
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 2))
+ASYNC_IO_THREADS = int(os.getenv('ASYNC_IO_THREADS', 4))
+
+# Метрики Prometheus: GET http://METRICS_HOST:METRICS_PORT/metrics (METRICS_PORT=0 - вимкнено)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+
+# Профайлер SQL: час кожного запиту за відбитком, EXPLAIN QUERY PLAN для повільних (/queries)
+query_profiler.profiler.configure(
+    enabled=os.getenv('QUERY_PROFILER', 'on') != 'off',
+    slow_ms=float(os.getenv('SLOW_QUERY_MS', query_profiler.DEFAULT_SLOW_MS)),
+)
 
 # Створюємо директорію для словників, якщо її немає
 USER_DICT_DIR = "user_dictionaries"
@@ -53,26 +113,43 @@ def can_edit_common_dict(user_id):
     """Check if user has rights to edit the common dictionary"""
     return user_id == ADMIN_ID
 
+# Вихідні запити: ліміти Telegram (token bucket), retry_after і пріоритет відповідей над розсилками
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))
+outbound = OutboundDispatcher(
+    global_rate=float(os.getenv('SEND_RATE_GLOBAL', 30)),
+    chat_rate=float(os.getenv('SEND_RATE_CHAT', 1)),
+    group_rate=float(os.getenv('SEND_RATE_GROUP_PER_MIN', 20)) / 60,
+    concurrency=SEND_CONCURRENCY,
+)
+outbound.add_request_hook(metrics.observe_api_call)
+
 # Налаштування таймаутів для запитів до API Telegram
+# 429 обробляє outbound (retry_after), а не Retry, який блокує потік на секунди
 retry_strategy = Retry(
     total=3,
-    status_forcelist=[429, 500, 502, 503, 504],
+    status_forcelist=[500, 502, 503, 504],
     allowed_methods=["GET", "POST"],
     backoff_factor=1
 )
-adapter = HTTPAdapter(max_retries=retry_strategy)
+# Keep-alive з'єднання: по одному на потік відправки, на робочий потік (get_file, download_file)
+# плюс getUpdates/службові запити
+adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=4,
+                      pool_maxsize=SEND_CONCURRENCY + WORKER_THREADS + 4)
 bot_session = requests.Session()
 bot_session.mount("https://", adapter)
 bot_session.mount("http://", adapter)
 
-# Встановлюємо цю сесію для telebot
+# Встановлюємо цю сесію для telebot (apihelper читає саме `session`; з нею
+# _get_req_session() повертає одну сесію всім потокам). Спільна Session безпечна
+# між потоками: пул urllib3 потокобезпечний і розрахований на всі потоки вище,
+# а cookies Telegram API не використовує
 import telebot.apihelper
-telebot.apihelper.SESSION = bot_session
+telebot.apihelper.session = bot_session
 telebot.apihelper.CONNECT_TIMEOUT = 60  # Збільшуємо таймаут підключення
 telebot.apihelper.READ_TIMEOUT = 60     # Збільшуємо таймаут читання
 
-# Enable debug mode
-DEBUG_MODE = True
+# Debug-only output (responses in the log, ...) is off in the production profile
+DEBUG_MODE = LOG_PROFILE != 'production'
 
 # Original send_message function to be patched for debug logging
 original_send_message = telebot.TeleBot.send_message
@@ -88,9 +165,12 @@ def send_message_with_logging(self, chat_id, text, *args, **kwargs):
             from debug_logger import log_response
             log_response(chat_id, text)
         except Exception as e:
-            print(f"Error in debug logging: {e}")
+            log_pipeline.get_logger("response").warning("Error in debug logging: %s", e)
     
     return result
 
 # Apply the patch
 telebot.TeleBot.send_message = send_message_with_logging
+
+# Після патча: обгортки outbound викликають send_message_with_logging
+outbound.install(bot)
@@ -1,7 +1,11 @@
 import sqlite3
 import openai
 import os
+import sys
 import logging
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # корінь проєкту для translation_cache
+from translation_cache import TranslationCache
+from db_init import create_translation_cache_table
 from dotenv import load_dotenv
 load_dotenv()
 print("Using environment variables from .env file")
@@ -12,7 +16,19 @@ HEADERS = {"Authorization": f"Bearer {API_KEY}"}
 
 DB_PATH = "database/german_words.db"
 
+LANG_CODES = {"Russian": "ru", "Ukrainian": "uk", "Turkish": "tr", "Arabic": "ar"}
+
+# Спільний кеш перекладів бота; відповіді LLM зберігаються з backend="llm"
+with sqlite3.connect(DB_PATH) as _conn:
+    create_translation_cache_table(_conn.cursor())
+_conn.close()
+translation_cache = TranslationCache(connect=lambda: sqlite3.connect(DB_PATH))
+
 def translate(word: str, lang: str) -> str:
+    """Translate a German word into target lang, asking the LLM only on a cache miss."""
+    return translation_cache.cached(word, "de", LANG_CODES.get(lang, lang), lambda w: _ask_llm(w, lang), backend="llm")
+
+def _ask_llm(word: str, lang: str) -> str:
     """Ask OpenAI to translate a German word into target lang."""
     prompt = f"Translate the German word '{word}' into {lang}."
     resp = openai.ChatCompletion.create(
@@ -28,7 +44,7 @@ def main():
 
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
-    cur.execute("SELECT id, word, ru_tran, uk_tran, tr_tran, ar_tran FROM words")
+    cur.execute("SELECT id, word, ru_tran, uk_tran, tr_tran, ar_tran, article_id FROM words")
     rows = cur.fetchall()
 
     logging.info(f"Fetched {len(rows)} words from database")
@@ -78,6 +94,8 @@ def main():
             # For now, it will log and continue to the next word.
 
     conn.close()
+    translation_cache.close()
+    logging.info(f"Translation cache: {translation_cache.stats()}")
     logging.info("Script finished.")
 
 if __name__ == "__main__":
@@ -83,27 +83,184 @@ def create_database():
     # Створюємо індекс для швидкого пошуку слів
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_word ON words(word)')
     
+    # Єдина таблиця персональних словників замість user_{chat_id}
+    create_user_words_table(cursor)
+    
+    # Розклад інтервальних повторень
+    create_review_tables(cursor)
+    
+    # Кеш перекладів (translation_service)
+    create_translation_cache_table(cursor)
+    
+    # Сесії користувачів (session_store.SQLiteSessionBackend)
+    create_sessions_table(cursor)
+    
+    # Прогрес розсилок нагадувань і заблоковані користувачі (reminder_broadcast)
+    create_reminder_tables(cursor)
+    
     # Зберігаємо зміни і закриваємо з'єднання
     conn.commit()
     conn.close()
     
     print("Database initialized successfully")
 
+def create_user_words_table(cursor):
+    """Create the shared user_words table that stores every personal dictionary"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_words (
+        chat_id INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        rating REAL DEFAULT 0.0,
+        added_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (chat_id, word_id),
+        FOREIGN KEY (word_id) REFERENCES words(id)
+    ) WITHOUT ROWID
+    ''')
+    # Вибірка слів користувача, відсортованих за рейтингом
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_words_rating ON user_words(chat_id, rating)')
+    # Пошук усіх користувачів, що мають слово (видалення/статистика)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_words_word ON user_words(word_id)')
+
+def ensure_user_words_table():
+    """Create user_words in an existing database if it is missing"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        create_user_words_table(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_review_tables(cursor):
+    """Create the spaced-repetition schedule and the precomputed daily queue"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS review_schedule (
+        chat_id INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        due_at INTEGER NOT NULL,
+        interval_days REAL DEFAULT 0.0,
+        ease REAL DEFAULT 2.5,
+        reps INTEGER DEFAULT 0,
+        lapses INTEGER DEFAULT 0,
+        last_review INTEGER,
+        PRIMARY KEY (chat_id, word_id),
+        FOREIGN KEY (word_id) REFERENCES words(id)
+    ) WITHOUT ROWID
+    ''')
+    # "Наступні N слів до повторення" - діапазонний запит по індексу
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_schedule_due ON review_schedule(chat_id, due_at)')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS review_queue (
+        chat_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        queue_date TEXT NOT NULL,
+        PRIMARY KEY (chat_id, position)
+    ) WITHOUT ROWID
+    ''')
+
+def ensure_review_tables():
+    """Create the spaced-repetition tables in an existing database if they are missing"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        create_review_tables(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_translation_cache_table(cursor):
+    """Create the persistent (normalized word, src, dest, backend) -> translation cache"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS translation_cache (
+        word TEXT NOT NULL,
+        src TEXT NOT NULL,
+        dest TEXT NOT NULL,
+        backend TEXT NOT NULL DEFAULT '',
+        translation TEXT NOT NULL,
+        created_at INTEGER,
+        PRIMARY KEY (word, src, dest, backend)
+    ) WITHOUT ROWID
+    ''')
+
+def ensure_translation_cache_table():
+    """Create the translation cache table in an existing database if it is missing"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        create_translation_cache_table(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_sessions_table(cursor):
+    """Create the table that persists pickled user sessions (config.user_state)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sessions (
+        chat_id INTEGER PRIMARY KEY,
+        data BLOB NOT NULL,
+        created_at REAL,
+        updated_at REAL
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)')
+
+def ensure_sessions_table():
+    """Create the sessions table in an existing database if it is missing"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        create_sessions_table(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_reminder_tables(cursor):
+    """Create the reminder run log, the per-user reminder slots and the users columns reminders read"""
+    cursor.execute("PRAGMA table_info(users)")
+    columns = [col[1] for col in cursor.fetchall()]
+    # active_days раніше додавався лише при першому track_activity()
+    if 'active_days' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN active_days INTEGER DEFAULT 0")
+    # Користувачі, що заблокували бота, пропускаються наступними розсилками
+    if 'blocked_at' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN blocked_at TEXT")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reminder_runs (
+        run_id TEXT PRIMARY KEY,
+        cutoff TEXT NOT NULL,
+        minute INTEGER,
+        last_chat_id INTEGER DEFAULT 0,
+        sent INTEGER DEFAULT 0,
+        failed INTEGER DEFAULT 0,
+        blocked INTEGER DEFAULT 0,
+        started_at REAL,
+        updated_at REAL,
+        finished_at REAL
+    )
+    ''')
+    # Хвилина доби для нагадування кожного користувача (NULL - вимкнено)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reminder_slots (
+        chat_id INTEGER PRIMARY KEY,
+        minute INTEGER,
+        source TEXT NOT NULL DEFAULT 'default',
+        updated_at REAL
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reminder_slots_minute ON reminder_slots(minute, chat_id)')
+
+def ensure_reminder_tables():
+    """Create the reminder tables and columns in an existing database if they are missing"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        create_reminder_tables(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
 def create_user_table(chat_id):
-    """Create a table for a specific user"""
+    """Register a user; personal words live in the shared user_words table"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Створюємо таблицю для зберігання слів конкретного користувача
-    cursor.execute(f'''
-    CREATE TABLE IF NOT EXISTS user_{chat_id} (
-        id INTEGER PRIMARY KEY,
-        word_id INTEGER,
-        rating REAL DEFAULT 0.0,
-        FOREIGN KEY (word_id) REFERENCES words(id),
-        UNIQUE(word_id)
-    )
-    ''')
+    create_user_words_table(cursor)
     
     # Перевіряємо, чи користувач вже існує в таблиці користувачів
     cursor.execute('SELECT 1 FROM users WHERE chat_id = ?', (chat_id,))
@@ -113,7 +270,7 @@ def create_user_table(chat_id):
     conn.commit()
     conn.close()
     
-    print(f"User table for {chat_id} created successfully")
+    print(f"User {chat_id} registered successfully")
 
 def migrate_from_csv():
     """Migrate data from CSV files to SQLite database"""
@@ -219,21 +376,12 @@ def migrate_from_csv():
                 print(f"  - Error creating/updating user: {e}")
                 continue
             
-            # Створюємо таблицю для користувача
+            # Персональні слова зберігаються в спільній таблиці user_words
             try:
-                cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS user_{chat_id} (
-                    id INTEGER PRIMARY KEY,
-                    word_id INTEGER,
-                    rating REAL DEFAULT 0.0,
-                    FOREIGN KEY (word_id) REFERENCES words(id),
-                    UNIQUE(word_id)
-                )
-                ''')
+                create_user_words_table(cursor)
                 conn.commit()
-                print(f"  - Table user_{chat_id} created or already exists")
             except Exception as e:
-                print(f"  - Error creating table for user {chat_id}: {e}")
+                print(f"  - Error creating user_words table: {e}")
                 continue
             
             # Обробляємо кожне слово
@@ -272,10 +420,10 @@ def migrate_from_csv():
                         word_id = cursor.fetchone()[0]
                     
                     # Додаємо слово в таблицю користувача з рейтингом
-                    cursor.execute(f'''
-                    INSERT OR REPLACE INTO user_{chat_id} (word_id, rating)
-                    VALUES (?, ?)
-                    ''', (word_id, priority))
+                    cursor.execute('''
+                    INSERT OR REPLACE INTO user_words (chat_id, word_id, rating)
+                    VALUES (?, ?, ?)
+                    ''', (chat_id, word_id, priority))
                     conn.commit()
                     
                     words_added += 1
@@ -288,6 +436,10 @@ def migrate_from_csv():
         except Exception as e:
             print(f"Error processing file {file_path}: {e}")
     
+    # Закриваємо з'єднання
+    conn.commit()
+    conn.close()
+    
     # Додаткова перевірка успішної міграції
     try:
         conn = sqlite3.connect(DB_PATH)
@@ -301,24 +453,20 @@ def migrate_from_csv():
         cursor.execute("SELECT COUNT(*) FROM users")
         user_count = cursor.fetchone()[0]
         
-        # Перевірка, чи є користувацькі таблиці
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'user_%'")
-        user_tables = cursor.fetchall()
+        # Перевірка персональних словників
+        cursor.execute("SELECT COUNT(DISTINCT chat_id) FROM user_words")
+        dictionary_count = cursor.fetchone()[0]
         
         print("\n=== MIGRATION STATISTICS ===")
         print(f"Total words migrated: {word_count}")
         print(f"Total users migrated: {user_count}")
-        print(f"Total user tables created: {len(user_tables)}")
+        print(f"Total personal dictionaries: {dictionary_count}")
         print("===========================")
         
         conn.close()
     except Exception as e:
         print(f"Error checking migration statistics: {e}")
     
-    # Закриваємо з'єднання
-    conn.commit()
-    conn.close()
-    
     print(f"Migration complete. Processed {migrated_users} user dictionaries.")
 
 if __name__ == "__main__":
@@ -5,44 +5,104 @@ import random
 import string
 import datetime
 import sqlite3
+import threading
+import time
 import pandas as pd
 import traceback # Added for more detailed error logging
-from config import ADMIN_ID
+from config import ADMIN_ID, work_scheduler
+import metrics
+from query_profiler import profiler as query_profiler
 from db_init import create_user_table, create_database, migrate_from_csv
 from utils.logging_utils import log_language, log_error, log_language_event
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from db_pool import ConnectionPool
+from deck_cache import DeckCache
+from write_queue import CoalescingWriteQueue
+from translation_backfill import TranslationBackfill
+from user_profile_cache import UserProfile, UserProfileCache
+from reminder_broadcast import assign_default_slot
 
 # Шлях до бази даних - використовуємо абсолютний шлях відносно поточного файлу
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_DIR = os.path.join(SCRIPT_DIR, "database")
 DB_PATH = os.path.join(DB_DIR, "german_words.db")
 
-# глобальний пул потоків для I/O-завдань
-executor = ThreadPoolExecutor()
+# Пул з'єднань: одне налаштоване з'єднання на потік замість нового на кожен запит
+pool = ConnectionPool(DB_PATH)
+# Кожен запит пулу проходить через профайлер (трасування і progress handler на з'єднанні)
+pool.add_connect_hook(lambda conn: query_profiler.attach(conn, DB_PATH))
+# Обробники й фонові задачі починають з чистого з'єднання, навіть якщо попередня задача не викликала close()
+work_scheduler.add_task_hook(pool.reset_thread)
+_db_checked = False
+_db_check_lock = threading.Lock()
 
+# Кеш колод слів для ігор, щоб кожен раунд не перечитував весь словник
+deck_cache = DeckCache()
+
+# Відкладений запис змін рейтингу: відповіді не чекають на commit
+rating_queue = CoalescingWriteQueue(lambda batch: _flush_rating_changes(batch), name="rating-queue")
+
+# Фонове заповнення відсутніх перекладів замість перекладу під час читання колоди
+translation_backfill = TranslationBackfill(lambda dest, rows: _store_backfilled_translations(dest, rows))
+
+# Профілі користувачів (мова, словник, права) - один запит на користувача замість запиту на кожен виклик
+user_profiles = UserProfileCache(lambda chat_id: _load_user_profile(chat_id))
+
+def _ensure_database():
+    """Create the database directory and schema once per process"""
+    global _db_checked
+    if _db_checked:
+        return
+    with _db_check_lock:
+        if _db_checked:
+            return
+        # Убедимся, что директория для базы данных существует
+        if not os.path.exists(DB_DIR):
+            print(f"Database directory {DB_DIR} does not exist. Creating...")
+            os.makedirs(DB_DIR)
+
+        full_db_path = os.path.abspath(DB_PATH)
+        print(f"Database path: {full_db_path}")
+
+        # Проверяем существование базы данных
+        if not os.path.exists(DB_PATH):
+            print(f"Database file {DB_PATH} does not exist. Creating new database...")
+            create_database()
+            migrate_from_csv()
+        else:
+            print(f"Database file {DB_PATH} found. Size: {os.path.getsize(DB_PATH)} bytes")
+        _db_checked = True
+
+@metrics.db_acquire_seconds.time()
 def get_connection():
-    """Get a connection to the database, creating it if needed"""
-    # Убедимся, что директория для базы данных существует
-    if not os.path.exists(DB_DIR):
-        print(f"Database directory {DB_DIR} does not exist. Creating...")
-        os.makedirs(DB_DIR)
-        
-    # Логируем полный путь к базе данных
-    full_db_path = os.path.abspath(DB_PATH)
-    print(f"Database path: {full_db_path}")
-    
-    # Проверяем существование базы данных
-    if not os.path.exists(DB_PATH):
-        print(f"Database file {DB_PATH} does not exist. Creating new database...")
-        create_database()
-        migrate_from_csv()
-    else:
-        print(f"Database file {DB_PATH} found. Size: {os.path.getsize(DB_PATH)} bytes")
-    
-    # відкриваємо з таймаутом та вмикаємо WAL
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    return conn
+    """Get a pooled connection to the database, creating it if needed.
+
+    The returned connection is shared by the current thread; calling close()
+    hands it back to the pool instead of closing it.
+    """
+    _ensure_database()
+    return pool.acquire()
+
+@contextmanager
+def connection():
+    """Context manager version of get_connection()"""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def get_pool_stats():
+    """Return connection pool statistics"""
+    return pool.stats()
+
+def get_deck_cache_stats():
+    """Return word deck cache statistics"""
+    return deck_cache.stats()
+
+def get_user_profile_stats():
+    """Return user profile cache statistics"""
+    return user_profiles.stats()
 
 def execute_query(query, params=None, fetch_mode=None, commit=True):
     """
@@ -57,78 +117,71 @@ def execute_query(query, params=None, fetch_mode=None, commit=True):
     Returns:
         Результат запроса или None
     """
-    conn = get_connection()
-    cursor = conn.cursor()
     result = None
+    statement = metrics.statement_type(query)
+    started = time.perf_counter()
     
-    try:
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-            
-        if fetch_mode == 'one':
-            result = cursor.fetchone()
-        elif fetch_mode == 'all':
-            result = cursor.fetchall()
-            
-        if commit:
-            conn.commit()
-            
-    except sqlite3.Error as e: # More specific exception
-        print(f"SQL Error: {e}")
-        print(f"Query: {query}")
-        if params:
-            print(f"Params: {params}")
-        traceback.print_exc()
-    except Exception as e: # Catch other potential errors
-        print(f"Unexpected Error in execute_query: {e}")
-        print(f"Query: {query}")
-        if params:
-            print(f"Params: {params}")
-        traceback.print_exc()
-        
-    finally:
-        conn.close()
-        
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+                
+            if fetch_mode == 'one':
+                result = cursor.fetchone()
+            elif fetch_mode == 'all':
+                result = cursor.fetchall()
+                
+            if commit:
+                conn.commit()
+                
+        except sqlite3.Error as e: # More specific exception
+            metrics.db_query_errors.inc(statement)
+            print(f"SQL Error: {e}")
+            print(f"Query: {query}")
+            if params:
+                print(f"Params: {params}")
+            traceback.print_exc()
+        except Exception as e: # Catch other potential errors
+            metrics.db_query_errors.inc(statement)
+            print(f"Unexpected Error in execute_query: {e}")
+            print(f"Query: {query}")
+            if params:
+                print(f"Params: {params}")
+            traceback.print_exc()
+        
+    metrics.db_query_seconds.observe(time.perf_counter() - started, statement)
     return result
 
 def user_exists(chat_id):
     """Check if user exists in database"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('SELECT 1 FROM users WHERE chat_id = ?', (chat_id,))
-    result = cursor.fetchone() is not None
+        cursor.execute('SELECT 1 FROM users WHERE chat_id = ?', (chat_id,))
+        result = cursor.fetchone() is not None
     
-    conn.close()
     
-    return result
+        return result
 
 def initialize_user(chat_id, language):
     """Initialize a new user in the database with specified language"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Add user to users table if not exists
-        cursor.execute('INSERT OR IGNORE INTO users (chat_id, language) VALUES (?, ?)', 
-                     (chat_id, language))
-        
-        # Create user dictionary table if not exists
-        cursor.execute(f'''
-        CREATE TABLE IF NOT EXISTS user_{chat_id} (
-            id INTEGER PRIMARY KEY,
-            word_id INTEGER,
-            rating REAL DEFAULT 0.0,
-            FOREIGN KEY (word_id) REFERENCES words(id),
-            UNIQUE(word_id)
-        )
-        ''')
+            # Add user to users table if not exists.
+            # Personal words are stored in the shared user_words table, so no per-user table is needed.
+            cursor.execute('INSERT OR IGNORE INTO users (chat_id, language) VALUES (?, ?)', 
+                         (chat_id, language))
+            # Default reminder time right away; activity tracking moves it later
+            assign_default_slot(cursor, chat_id)
         
-        conn.commit()
-        conn.close()
-        return True
+            conn.commit()
+            user_profiles.invalidate(chat_id)
+            return True
     except sqlite3.Error as e:
         print(f"Error initializing user {chat_id}: {e}")
         traceback.print_exc()
@@ -148,48 +201,45 @@ def set_user_language(chat_id, language):
         print(f"DB: Setting language for user {chat_id} to {language}")
         
         # Get a connection
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Check if the user exists
-        cursor.execute("SELECT COUNT(*) FROM users WHERE chat_id = ?", (chat_id,))
-        user_exists = cursor.fetchone()[0] > 0
-        
-        # Debug output - show table structure
-        cursor.execute("PRAGMA table_info(users)")
-        columns = cursor.fetchall()
-        print(f"DB DEBUG: Users table columns: {columns}")
+        with connection() as conn:
+            cursor = conn.cursor()
+        
+            # Check if the user exists
+            cursor.execute("SELECT COUNT(*) FROM users WHERE chat_id = ?", (chat_id,))
+            user_exists = cursor.fetchone()[0] > 0
+        
+            # Debug output - show table structure
+            cursor.execute("PRAGMA table_info(users)")
+            columns = cursor.fetchall()
+            print(f"DB DEBUG: Users table columns: {columns}")
+        
+            # Update or insert language
+            if user_exists:
+                print(f"DB: User {chat_id} exists, updating language to {language}")
+                cursor.execute("UPDATE users SET language = ? WHERE chat_id = ?", (language, chat_id))
+            else:
+                print(f"DB: User {chat_id} does not exist, inserting with language {language}")
+                cursor.execute("INSERT INTO users (chat_id, language) VALUES (?, ?)", (chat_id, language))
         
-        # Update or insert language
-        if user_exists:
-            print(f"DB: User {chat_id} exists, updating language to {language}")
-            cursor.execute("UPDATE users SET language = ? WHERE chat_id = ?", (language, chat_id))
-        else:
-            print(f"DB: User {chat_id} does not exist, inserting with language {language}")
-            cursor.execute("INSERT INTO users (chat_id, language) VALUES (?, ?)", (chat_id, language))
+            # Commit and close
+            rows_affected = cursor.rowcount
+            conn.commit()
+            print(f"DB: Updated {rows_affected} rows")
         
-        # Commit and close
-        conn.commit()
-        rows_affected = conn.total_changes
-        print(f"DB: Updated {rows_affected} rows")
+            # Verify language was set correctly
+            cursor.execute("SELECT language FROM users WHERE chat_id = ?", (chat_id,))
+            result = cursor.fetchone()
+            print(f"DB: Verified language for user {chat_id}: {result[0] if result else 'None'}")
         
-        # Verify language was set correctly
-        cursor.execute("SELECT language FROM users WHERE chat_id = ?", (chat_id,))
-        result = cursor.fetchone()
-        print(f"DB: Verified language for user {chat_id}: {result[0] if result else 'None'}")
         
-        conn.close()
+            # Decks are keyed by language, drop the ones built for the old language
+            deck_cache.invalidate(chat_id=chat_id)
+            if user_exists:
+                user_profiles.update(chat_id, language=language)
+            else:
+                user_profiles.invalidate(chat_id)
         
-        # Also clear the language cache in language_utils if it exists
-        try:
-            from utils.language_utils import clear_language_cache # Ensure this import is correct
-            clear_language_cache(chat_id)
-        except ImportError:
-            print("Warning: clear_language_cache not found or language_utils not available.")
-        except Exception as e:
-            print(f"Error clearing language cache for user {chat_id}: {e}")
-            
-        return True
+            return True
     except sqlite3.Error as e:
         print(f"Database error setting language for user {chat_id}: {e}")
         traceback.print_exc()
@@ -199,100 +249,154 @@ def set_user_language(chat_id, language):
         traceback.print_exc()
         return False
 
-def get_user_language(chat_id):
-    """Get user language from database"""
-    log_language("GET_LANG", chat_id, "Retrieving language from database")
-    
+def _load_user_profile(chat_id):
+    """Load language, dictionary selection, shared-dictionary admin flag and streak in one query"""
+    log_language("GET_LANG", chat_id, "Retrieving user profile from database")
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT language FROM users WHERE chat_id = ?', (chat_id,))
-        result = cursor.fetchone()
-        
-        if result and result[0]:
-            log_language_event(chat_id, "Language retrieved", result[0])
-            return result[0]
-        else:
-            log_language_event(chat_id, "Language not found", "None")
-            return None
-    except sqlite3.Error as e:
-        log_error(e, f"Database error getting language for user {chat_id}")
-        return None
+        with connection() as conn:
+            try:
+                row = conn.execute('''
+                    SELECT u.language, u.dict_type, u.shared_dict_id, u.streak,
+                           sd.id IS NOT NULL, COALESCE(sdu.is_admin, 0)
+                    FROM users u
+                    LEFT JOIN shared_dictionaries sd ON sd.id = u.shared_dict_id
+                    LEFT JOIN shared_dict_users sdu ON sdu.user_id = u.chat_id AND sdu.dict_id = u.shared_dict_id
+                    WHERE u.chat_id = ?
+                ''', (chat_id,)).fetchone()
+            except sqlite3.OperationalError:
+                # Shared dictionary tables/columns are not created yet
+                row = conn.execute('SELECT language, NULL, NULL, streak, 0, 0 FROM users WHERE chat_id = ?',
+                                   (chat_id,)).fetchone()
     except Exception as e:
-        log_error(e, f"Unexpected error getting language for user {chat_id}")
+        log_error(e, f"Database error loading profile for user {chat_id}")
         return None
+    if row is None:
+        log_language_event(chat_id, "Language not found", "None")
+        return UserProfile(chat_id, exists=False)
+    language, dict_type, shared_dict_id, streak, dict_exists, is_admin = row
+    log_language_event(chat_id, "Language retrieved", language)
+    shared = dict_type == "shared" and bool(shared_dict_id)
+    return UserProfile(
+        chat_id,
+        language=language or None,
+        dict_type=dict_type,
+        shared_dict_id=shared_dict_id or None,
+        shared_dict_exists=bool(dict_exists),
+        is_admin=shared and bool(is_admin),
+        streak=streak,
+    )
+
+def get_user_profile(chat_id):
+    """Return the cached UserProfile (exists=False for unknown users); falls back to an uncached empty profile on DB errors"""
+    profile = user_profiles.get(chat_id)
+    return profile if profile is not None else UserProfile(chat_id, exists=False)
+
+def invalidate_user_profile(chat_id=None):
+    """Drop cached profile data after writing users/shared_dict_users outside db_manager"""
+    user_profiles.invalidate(chat_id)
+
+def get_user_language(chat_id):
+    """Get user language from database"""
+    return get_user_profile(chat_id).language
 
 def get_user_words(chat_id, dict_type="personal"):
-    """Get words for a user as a DataFrame"""
+    """Get words for a user as a DataFrame (served from the deck cache when possible)"""
+    key = deck_cache.make_key(chat_id, dict_type, None, get_user_language(chat_id))
+    return deck_cache.get_or_load(key, lambda: _load_user_words(chat_id, dict_type))
+
+def sample_words(chat_id, k=1, dict_type="personal", shared_dict_id=None, with_articles=False):
+    """
+    Draw k distinct words from the user's deck, weighted by rating (harder words more often).
+    
+    Words due for spaced-repetition review come first. The rest are drawn with
+    the cached deck's Fenwick sampler, so a draw is O(k log n) instead of
+    copying and sampling the whole DataFrame every round.
+    
+    Returns:
+        DataFrame with up to k rows (empty if the dictionary has no words)
+    """
+    from word_sampler import sample_frame
+    from spaced_repetition import get_due_word_ids
+    
+    if dict_type == "shared":
+        if not shared_dict_id:
+            loader = get_shared_dictionary_words_with_articles if with_articles else get_shared_dictionary_words
+            return sample_frame(loader(chat_id), k)
+        if with_articles:
+            loader = lambda: _load_shared_dictionary_words_with_articles(chat_id, shared_dict_id)
+        else:
+            loader = lambda: _load_shared_dictionary_words(chat_id, shared_dict_id)
+    elif with_articles:
+        loader = lambda: _load_user_words_with_articles(chat_id, dict_type)
+    else:
+        loader = lambda: _load_user_words(chat_id, dict_type)
+    
+    key = deck_cache.make_key(chat_id, dict_type, shared_dict_id, get_user_language(chat_id),
+                              "articles" if with_articles else "all")
+    # Due words of other dictionaries must not take the deck's slots
+    due_in_deck = lambda deck_ids: get_due_word_ids(chat_id, k, word_ids=deck_ids)
+    return deck_cache.sample_or_load(key, loader, k, first_ids=due_in_deck)
+
+def _load_user_words(chat_id, dict_type="personal"):
+    """Load words for a user from the database as a DataFrame"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Визначаємо, який словник використовувати
-        if dict_type == "common":
-            # Загальний словник - вибираємо всі слова
-            language = get_user_language(chat_id) or "en" # Default to 'en' if no language
-            print(f"Getting common dictionary words for user {chat_id} in language {language}")
+        with connection() as conn:
+            cursor = conn.cursor()
+        
+            # Визначаємо, який словник використовувати
+            if dict_type == "common":
+                # Загальний словник - вибираємо всі слова
+                language = get_user_language(chat_id) or "en" # Default to 'en' if no language
+                print(f"Getting common dictionary words for user {chat_id} in language {language}")
             
-            # Handle different languages
-            if language in ["en", "uk", "ru", "tr", "ar"]:
-                query = f'''
-                SELECT w.id, w.word, w.{language}_tran as translation, a.article, 0.0 as rating
-                FROM words w
-                LEFT JOIN article a ON w.article_id = a.id
-                WHERE w.{language}_tran IS NOT NULL
-                ORDER BY w.word
-                '''
+                # Handle different languages
+                if language in ["en", "uk", "ru", "tr", "ar"]:
+                    query = f'''
+                    SELECT w.id, w.word, w.{language}_tran as translation, a.article, 0.0 as rating
+                    FROM words w
+                    LEFT JOIN article a ON w.article_id = a.id
+                    WHERE w.{language}_tran IS NOT NULL
+                    ORDER BY w.word
+                    '''
+                else:
+                    print(f"Unsupported language '{language}' for common dictionary. Defaulting to 'en'.")
+                    query = '''
+                    SELECT w.id, w.word, w.en_tran as translation, a.article, 0.0 as rating
+                    FROM words w
+                    LEFT JOIN article a ON w.article_id = a.id
+                    WHERE w.en_tran IS NOT NULL
+                    ORDER BY w.word
+                    '''
+                cursor.execute(query)
             else:
-                print(f"Unsupported language '{language}' for common dictionary. Defaulting to 'en'.")
-                query = '''
-                SELECT w.id, w.word, w.en_tran as translation, a.article, 0.0 as rating
-                FROM words w
-                LEFT JOIN article a ON w.article_id = a.id
-                WHERE w.en_tran IS NOT NULL
-                ORDER BY w.word
-                '''
-            cursor.execute(query)
-        else:
-            # Персональний словник - вибираємо слова користувача
-            language = get_user_language(chat_id)
-            if not language:
-                print(f"No language set for user {chat_id}. Cannot fetch personal dictionary.")
-                return pd.DataFrame(columns=['id', 'word', 'translation', 'article', 'priority'])
+                # Персональний словник - вибираємо слова користувача
+                language = get_user_language(chat_id)
+                if not language:
+                    print(f"No language set for user {chat_id}. Cannot fetch personal dictionary.")
+                    return pd.DataFrame(columns=['id', 'word', 'translation', 'article', 'priority'])
             
-            print(f"Getting personal dictionary for user {chat_id} in language {language}")
+                print(f"Getting personal dictionary for user {chat_id} in language {language}")
             
-            # Перевіряємо, чи існує таблиця для користувача
-            cursor.execute(f"""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='user_{chat_id}'
-            """)
-            if not cursor.fetchone():
-                print(f"Personal dictionary table user_{chat_id} does not exist.")
-                return pd.DataFrame(columns=['id', 'word', 'translation', 'article', 'priority'])
-            
-            query = f'''
-            SELECT w.id, w.word, w.{language}_tran as translation, a.article, u.rating
-            FROM user_{chat_id} u
-            JOIN words w ON u.word_id = w.id
-            LEFT JOIN article a ON w.article_id = a.id
-            WHERE w.{language}_tran IS NOT NULL
-            ORDER BY u.rating ASC
-            '''
-            cursor.execute(query)
-        
-        # Отримуємо результати
-        results = cursor.fetchall()
+                query = f'''
+                SELECT w.id, w.word, w.{language}_tran as translation, a.article, u.rating
+                FROM user_words u
+                JOIN words w ON u.word_id = w.id
+                LEFT JOIN article a ON w.article_id = a.id
+                WHERE u.chat_id = ? AND w.{language}_tran IS NOT NULL
+                ORDER BY u.rating ASC
+                '''
+                cursor.execute(query, (chat_id,))
         
-        # Convert results to DataFrame
-        columns = ['id', 'word', 'translation', 'article', 'priority']
-        df = pd.DataFrame(results, columns=columns)
+            # Отримуємо результати
+            results = cursor.fetchall()
         
-        print(f"Found {len(df)} words for user {chat_id} with dict_type={dict_type}")
+            # Convert results to DataFrame
+            columns = ['id', 'word', 'translation', 'article', 'priority']
+            df = pd.DataFrame(results, columns=columns)
         
-        conn.close()
-        return df
+            print(f"Found {len(df)} words for user {chat_id} with dict_type={dict_type}")
+        
+            return df
     except sqlite3.Error as e:
         print(f"Database error in get_user_words for user {chat_id}, dict_type {dict_type}: {e}")
         traceback.print_exc()
@@ -304,72 +408,70 @@ def get_user_words(chat_id, dict_type="personal"):
 
 
 def get_user_words_with_articles(chat_id, dict_type="personal"):
+    """Get words with defined articles for a user (served from the deck cache when possible)"""
+    key = deck_cache.make_key(chat_id, dict_type, None, get_user_language(chat_id), "articles")
+    return deck_cache.get_or_load(key, lambda: _load_user_words_with_articles(chat_id, dict_type))
+
+def _load_user_words_with_articles(chat_id, dict_type="personal"):
     """Get words with defined articles (not NULL/empty) for a user as a DataFrame"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Визначаємо, який словник використовувати
-        if dict_type == "common":
-            # Загальний словник - вибираємо всі слова з артиклями
-            language = get_user_language(chat_id) or "en"
-            print(f"Getting common dictionary words with articles for user {chat_id} in language {language}")
+        with connection() as conn:
+            cursor = conn.cursor()
+        
+            # Визначаємо, який словник використовувати
+            if dict_type == "common":
+                # Загальний словник - вибираємо всі слова з артиклями
+                language = get_user_language(chat_id) or "en"
+                print(f"Getting common dictionary words with articles for user {chat_id} in language {language}")
             
-            # Handle different languages
-            if language in ["en", "uk", "ru", "tr", "ar"]:
-                query = f'''
-                SELECT w.id, w.word, w.{language}_tran as translation, a.article, 0.0 as rating
-                FROM words w
-                JOIN article a ON w.article_id = a.id
-                WHERE w.{language}_tran IS NOT NULL AND a.article IS NOT NULL AND a.article != '' AND w.article_id != 4
-                ORDER BY w.word
-                '''
+                # Handle different languages
+                if language in ["en", "uk", "ru", "tr", "ar"]:
+                    query = f'''
+                    SELECT w.id, w.word, w.{language}_tran as translation, a.article, 0.0 as rating
+                    FROM words w
+                    JOIN article a ON w.article_id = a.id
+                    WHERE w.{language}_tran IS NOT NULL AND a.article IS NOT NULL AND a.article != '' AND w.article_id != 4
+                    ORDER BY w.word
+                    '''
+                else:
+                    print(f"Unsupported language '{language}' for common dictionary with articles. Defaulting to 'en'.")
+                    query = '''
+                    SELECT w.id, w.word, w.en_tran as translation, a.article, 0.0 as rating
+                    FROM words w
+                    JOIN article a ON w.article_id = a.id
+                    WHERE w.en_tran IS NOT NULL AND a.article IS NOT NULL AND a.article != '' AND w.article_id != 4
+                    ORDER BY w.word
+                    '''
+                cursor.execute(query)
             else:
-                print(f"Unsupported language '{language}' for common dictionary with articles. Defaulting to 'en'.")
-                query = '''
-                SELECT w.id, w.word, w.en_tran as translation, a.article, 0.0 as rating
-                FROM words w
+                # Персональний словник - вибираємо слова користувача з артиклями
+                language = get_user_language(chat_id)
+                if not language:
+                    print(f"No language set for user {chat_id}. Cannot fetch personal dictionary with articles.")
+                    return pd.DataFrame(columns=['id', 'word', 'translation', 'article', 'priority'])
+
+                print(f"Getting personal dictionary with articles for user {chat_id} in language {language}")
+
+                query = f'''
+                SELECT w.id, w.word, w.{language}_tran as translation, a.article, u.rating
+                FROM user_words u
+                JOIN words w ON u.word_id = w.id
                 JOIN article a ON w.article_id = a.id
-                WHERE w.en_tran IS NOT NULL AND a.article IS NOT NULL AND a.article != '' AND w.article_id != 4
-                ORDER BY w.word
+                WHERE u.chat_id = ? AND w.{language}_tran IS NOT NULL AND a.article IS NOT NULL AND a.article != '' AND w.article_id != 4
+                ORDER BY u.rating ASC
                 '''
-            cursor.execute(query)
-        else:
-            # Персональний словник - вибираємо слова користувача з артиклями
-            language = get_user_language(chat_id)
-            if not language:
-                print(f"No language set for user {chat_id}. Cannot fetch personal dictionary with articles.")
-                return pd.DataFrame(columns=['id', 'word', 'translation', 'article', 'priority'])
-
-            print(f"Getting personal dictionary with articles for user {chat_id} in language {language}")
-            
-            # Перевіряємо, чи існує таблиця для користувача
-            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='user_{chat_id}'")
-            if not cursor.fetchone():
-                print(f"Personal dictionary table user_{chat_id} does not exist.")
-                return pd.DataFrame(columns=['id', 'word', 'translation', 'article', 'priority'])
-
-            query = f'''
-            SELECT w.id, w.word, w.{language}_tran as translation, a.article, u.rating
-            FROM user_{chat_id} u
-            JOIN words w ON u.word_id = w.id
-            JOIN article a ON w.article_id = a.id
-            WHERE w.{language}_tran IS NOT NULL AND a.article IS NOT NULL AND a.article != '' AND w.article_id != 4
-            ORDER BY u.rating ASC
-            '''
-            cursor.execute(query)
-        
-        # Отримуємо результати
-        results = cursor.fetchall()
+                cursor.execute(query, (chat_id,))
         
-        # Convert results to DataFrame
-        columns = ['id', 'word', 'translation', 'article', 'priority']
-        df = pd.DataFrame(results, columns=columns)
+            # Отримуємо результати
+            results = cursor.fetchall()
         
-        print(f"Found {len(df)} words with articles for user {chat_id} with dict_type={dict_type}")
+            # Convert results to DataFrame
+            columns = ['id', 'word', 'translation', 'article', 'priority']
+            df = pd.DataFrame(results, columns=columns)
         
-        conn.close()
-        return df
+            print(f"Found {len(df)} words with articles for user {chat_id} with dict_type={dict_type}")
+        
+            return df
     except sqlite3.Error as e:
         print(f"Database error in get_user_words_with_articles for user {chat_id}, dict_type {dict_type}: {e}")
         traceback.print_exc()
@@ -390,157 +492,145 @@ def add_word(chat_id, word, translation, dict_type="personal", article=None):
             print(f"User {chat_id} (not admin) attempted to add to common dictionary.")
             return None
         
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Get user language
-        language = get_user_language(chat_id)
-        if not language:
-            print(f"Cannot add word for user {chat_id}: language not set.")
-            conn.close()
-            return None
+            # Get user language
+            language = get_user_language(chat_id)
+            if not language:
+                print(f"Cannot add word for user {chat_id}: language not set.")
+                return None
+        
+            # Перевіряємо, чи є в слові артикль
+            word_to_store = word # Default to original word
+            extracted_article = None
+            if isinstance(word, str): # Ensure word is a string
+                article_match = re.match(r'^(der|die|das)\s+(.+)$', word, re.IGNORECASE)
+                if article_match:
+                    extracted_article = article_match.group(1).lower()
+                    word_to_store = article_match.group(2) # Word without article
         
-        # Перевіряємо, чи є в слові артикль
-        word_to_store = word # Default to original word
-        extracted_article = None
-        if isinstance(word, str): # Ensure word is a string
-            article_match = re.match(r'^(der|die|das)\s+(.+)$', word, re.IGNORECASE)
-            if article_match:
-                extracted_article = article_match.group(1).lower()
-                word_to_store = article_match.group(2) # Word without article
-        
-        # Визначаємо ID артикля (якщо він є)
-        article_id_to_use = None # Use this to store the ID of the article to be used
-        final_article_text = article if article else extracted_article
-
-        if final_article_text:
-            cursor.execute('SELECT id FROM article WHERE LOWER(article) = LOWER(?)', (final_article_text,))
-            article_row = cursor.fetchone()
-            if article_row:
-                article_id_to_use = article_row[0]
+            # Визначаємо ID артикля (якщо він є)
+            article_id_to_use = None # Use this to store the ID of the article to be used
+            final_article_text = article if article else extracted_article
+
+            if final_article_text:
+                cursor.execute('SELECT id FROM article WHERE LOWER(article) = LOWER(?)', (final_article_text,))
+                article_row = cursor.fetchone()
+                if article_row:
+                    article_id_to_use = article_row[0]
+                else:
+                    # If article not found, add it (optional, or use default)
+                    # For now, let's assume we use a default if not found, or handle as error
+                    print(f"Article '{final_article_text}' not found in article table. Using default or skipping.")
+                    # Default to "no article" (ID 4) if specific article not found
+                    article_id_to_use = 4 # Assuming 4 is 'no article' or a placeholder
             else:
-                # If article not found, add it (optional, or use default)
-                # For now, let's assume we use a default if not found, or handle as error
-                print(f"Article '{final_article_text}' not found in article table. Using default or skipping.")
-                # Default to "no article" (ID 4) if specific article not found
-                article_id_to_use = 4 # Assuming 4 is 'no article' or a placeholder
-        else:
-            # Якщо артикль не знайдено, використовуємо порожній артикль (ID = 4)
-            article_id_to_use = 4 # Assuming 4 is 'no article'
-        
-        # Перевірка на дублікати - шукаємо слово не залежно від регістру
-        cursor.execute('SELECT id, article_id FROM words WHERE LOWER(word) = LOWER(?)', (word_to_store,))
-        existing_words_matches = cursor.fetchall()
-        
-        final_word_id = None # Initialize word_id to be returned
-
-        if existing_words_matches:
-            # Word exists, check if article matches or needs update
-            # We might have multiple entries if word casing was different but LOWER(word) is same.
-            # Prefer exact match if possible, or update existing.
-            # This logic can be complex. For simplicity, take the first match.
-            existing_word_id, existing_article_id = existing_words_matches[0]
-            final_word_id = existing_word_id
+                # Якщо артикль не знайдено, використовуємо порожній артикль (ID = 4)
+                article_id_to_use = 4 # Assuming 4 is 'no article'
+        
+            # Перевірка на дублікати - шукаємо слово не залежно від регістру
+            cursor.execute('SELECT id, article_id FROM words WHERE LOWER(word) = LOWER(?)', (word_to_store,))
+            existing_words_matches = cursor.fetchall()
+        
+            final_word_id = None # Initialize word_id to be returned
+            shared_word_changed = False # article/translation of an existing word changed for everyone
+
+            if existing_words_matches:
+                # Word exists, check if article matches or needs update
+                # We might have multiple entries if word casing was different but LOWER(word) is same.
+                # Prefer exact match if possible, or update existing.
+                # This logic can be complex. For simplicity, take the first match.
+                existing_word_id, existing_article_id = existing_words_matches[0]
+                final_word_id = existing_word_id
             
-            # If a new article is provided and it's different, update it
-            if article_id_to_use is not None and article_id_to_use != existing_article_id:
-                cursor.execute('UPDATE words SET article_id = ? WHERE id = ?', (article_id_to_use, final_word_id))
-                print(f"Updated article for existing word ID {final_word_id} to article_id {article_id_to_use}")
+                # If a new article is provided and it's different, update it
+                if article_id_to_use is not None and article_id_to_use != existing_article_id:
+                    cursor.execute('UPDATE words SET article_id = ? WHERE id = ?', (article_id_to_use, final_word_id))
+                    shared_word_changed = True
+                    print(f"Updated article for existing word ID {final_word_id} to article_id {article_id_to_use}")
 
-            # Update translation if it's different or missing for the user's language
-            # This assumes translations are stored in columns like en_tran, uk_tran, etc.
-            translation_column = f"{language}_tran"
-            cursor.execute(f'SELECT {translation_column} FROM words WHERE id = ?', (final_word_id,))
-            current_translation_row = cursor.fetchone()
-            current_translation = current_translation_row[0] if current_translation_row else None
+                # Update translation if it's different or missing for the user's language
+                # This assumes translations are stored in columns like en_tran, uk_tran, etc.
+                translation_column = f"{language}_tran"
+                cursor.execute(f'SELECT {translation_column} FROM words WHERE id = ?', (final_word_id,))
+                current_translation_row = cursor.fetchone()
+                current_translation = current_translation_row[0] if current_translation_row else None
 
-            if translation != current_translation:
-                 cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ?', (translation, final_word_id))
-                 print(f"Updated {language} translation for existing word ID {final_word_id}")
+                if translation != current_translation:
+                     cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ?', (translation, final_word_id))
+                     shared_word_changed = True
+                     print(f"Updated {language} translation for existing word ID {final_word_id}")
 
-        else:
-            # Word does not exist, insert new word
-            cursor.execute('INSERT INTO words (word, article_id) VALUES (?, ?)', (word_to_store, article_id_to_use))
-            final_word_id = cursor.lastrowid
-            # Add translation for the user's language
-            translation_column = f"{language}_tran"
-            cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ?', (translation, final_word_id))
-            print(f"Added new word '{word_to_store}' with ID {final_word_id} and {language} translation.")
-        
-        # If it's a personal dictionary, add reference to user's table
-        if dict_type == "personal" and final_word_id is not None:
-            # Ensure user's personal table exists
-            ensure_user_table_exists(chat_id) # This function should create if not exists
-            cursor.execute(f'INSERT OR IGNORE INTO user_{chat_id} (word_id) VALUES (?)', (final_word_id,))
-            print(f"Linked word ID {final_word_id} to personal dictionary of user {chat_id}.")
+            else:
+                # Word does not exist, insert new word
+                cursor.execute('INSERT INTO words (word, article_id) VALUES (?, ?)', (word_to_store, article_id_to_use))
+                final_word_id = cursor.lastrowid
+                # Add translation for the user's language
+                translation_column = f"{language}_tran"
+                cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ?', (translation, final_word_id))
+                print(f"Added new word '{word_to_store}' with ID {final_word_id} and {language} translation.")
+        
+            # If it's a personal dictionary, add reference to user's dictionary
+            if dict_type == "personal" and final_word_id is not None:
+                cursor.execute('INSERT OR IGNORE INTO user_words (chat_id, word_id) VALUES (?, ?)', (chat_id, final_word_id))
+                print(f"Linked word ID {final_word_id} to personal dictionary of user {chat_id}.")
             
-        conn.commit()
-        conn.close()
-        return final_word_id
+            conn.commit()
+        
+            if shared_word_changed:
+                deck_cache.invalidate()
+            else:
+                deck_cache.invalidate(chat_id=chat_id)
+                deck_cache.invalidate(dict_type="common")
+            return final_word_id
     except sqlite3.Error as e:
         print(f"Database error in add_word for user {chat_id}, word '{word}': {e}")
         traceback.print_exc()
-        if 'conn' in locals() and conn: conn.close() # Ensure connection is closed on error
         return None
     except Exception as e:
         print(f"Unexpected error in add_word for user {chat_id}, word '{word}': {e}")
         traceback.print_exc()
-        if 'conn' in locals() and conn: conn.close() # Ensure connection is closed on error
         return None
 
 def ensure_user_table_exists(chat_id):
-    """Ensure that the user-specific table exists and return (table_created, has_words)."""
+    """Return (table_created, has_words) for the user's personal dictionary.
+
+    Personal dictionaries live in the shared user_words table, so nothing has to
+    be created any more; table_created is always False and is kept for callers.
+    """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if table exists before creating
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='user_{chat_id}'")
-        table_existed = cursor.fetchone() is not None
-        
-        cursor.execute(f'''
-        CREATE TABLE IF NOT EXISTS user_{chat_id} (
-            id INTEGER PRIMARY KEY,
-            word_id INTEGER,
-            rating REAL DEFAULT 0.0,
-            FOREIGN KEY (word_id) REFERENCES words(id),
-            UNIQUE(word_id)
-        )
-        ''')
-        
-        # Check if table has any words
-        cursor.execute(f"SELECT COUNT(*) FROM user_{chat_id}")
-        word_count = cursor.fetchone()[0]
-        has_words = word_count > 0
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM user_words WHERE chat_id = ?)", (chat_id,))
+            has_words = bool(cursor.fetchone()[0])
         
-        conn.commit()
-        conn.close()
         
-        return (not table_existed, has_words)  # (table_created, has_words)
+            return (False, has_words)  # (table_created, has_words)
         
     except sqlite3.Error as e:
-        print(f"Error ensuring user table for {chat_id}: {e}")
+        print(f"Error checking personal dictionary for {chat_id}: {e}")
         traceback.print_exc()
         return (False, False)
     except Exception as e:
-        print(f"Unexpected error ensuring user table for {chat_id}: {e}")
+        print(f"Unexpected error checking personal dictionary for {chat_id}: {e}")
         traceback.print_exc()
         return (False, False)
 
 def add_word_async(chat_id, word, translation, dict_type="personal", article=None):
-    """Асинхронна версія add_word: виконується в пулі потоків."""
-    return executor.submit(add_word, chat_id, word, translation, dict_type, article)
+    """Асинхронна версія add_word: виконується в черзі завдань чату (work_scheduler)."""
+    return work_scheduler.submit(chat_id, add_word, chat_id, word, translation, dict_type, article)
 
 # New helper for duplicate detection
 def get_word_id_by_word(chat_id, word):
     """Return the ID of an existing word by its text (case-insensitive), or None if not found."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM words WHERE LOWER(word) = LOWER(?)', (word.strip(),))
-        row = cursor.fetchone()
-        conn.close()
-        return row[0] if row else None
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM words WHERE LOWER(word) = LOWER(?)', (word.strip(),))
+            row = cursor.fetchone()
+            return row[0] if row else None
     except Exception as e:
         print(f"Error retrieving word ID for duplicate check: {e}")
         return None
@@ -565,277 +655,234 @@ def get_word_id_by_german(german_word):
 def is_user_admin_of_shared_dict(user_id, shared_dict_id):
     """Return True if the user is marked as admin in shared_dict_users."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT is_admin FROM shared_dict_users WHERE user_id = ? AND dict_id = ?',
-            (user_id, shared_dict_id)
-        )
-        row = cursor.fetchone()
-        conn.close()
-        return bool(row and row[0])
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT is_admin FROM shared_dict_users WHERE user_id = ? AND dict_id = ?',
+                (user_id, shared_dict_id)
+            )
+            row = cursor.fetchone()
+            return bool(row and row[0])
     except Exception as e:
         print(f"Error checking admin rights for user {user_id} on shared dict {shared_dict_id}: {e}")
         return False
 
+def is_shared_dict_admin(user_id, shared_dict_id):
+    """Alias kept for callers in utils.dictionary_helpers"""
+    return is_user_admin_of_shared_dict(user_id, shared_dict_id)
+
 def get_user_dictionary_info(user_id):
     """Retrieve shared dictionary id and admin status for the given user."""
+    profile = get_user_profile(user_id)
+    if not profile.exists:
+        return ("personal", None, False)
+    return (profile.dict_type, profile.shared_dict_id, profile.is_admin)
+
+def update_user_dictionary_type(user_id, dict_type, shared_dict_id=None):
+    """Select the user's active dictionary ("personal", "shared" or "common")"""
+    if dict_type != "shared":
+        shared_dict_id = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT dict_type, shared_dict_id FROM users WHERE chat_id = ?', (user_id,))
-        row = cursor.fetchone()
-        
-        if not row:
-            conn.close()
-            return ("personal", None, False)
-        
-        dict_type = row[0] if row[0] else "personal"
-        shared_dict_id = row[1] if row[1] else None
-        is_admin = False
-        
-        if shared_dict_id and dict_type == "shared":
-            cursor.execute(
-                'SELECT is_admin FROM shared_dict_users WHERE user_id = ? AND dict_id = ?',
-                (user_id, shared_dict_id)
-            )
-            admin_row = cursor.fetchone()
-            is_admin = bool(admin_row and admin_row[0])
-        
-        conn.close()
-        return (dict_type, shared_dict_id, is_admin)
+        with connection() as conn:
+            conn.execute("UPDATE users SET dict_type = ?, shared_dict_id = ? WHERE chat_id = ?",
+                         (dict_type, shared_dict_id, user_id))
+            conn.commit()
     except Exception as e:
-        print(f"Error retrieving shared dictionary info for user {user_id}: {e}")
-        return ("personal", None, False)
+        print(f"Error updating dictionary type for user {user_id}: {e}")
+        return False
+    finally:
+        user_profiles.invalidate(user_id)
+    return True
+
+def _queue_missing_translations(words_to_translate, src_language, dest_language):
+    """Hand words without a translation to the background backfill instead of translating them here"""
+    return translation_backfill.enqueue_many(
+        zip(words_to_translate['id'].tolist(), words_to_translate['other_translation'].tolist()),
+        src_language, dest_language)
+
+def _store_backfilled_translations(dest_language, rows):
+    """Save [(word_id, translation), ...] from the backfill worker; never overwrites an existing translation"""
+    if dest_language not in ["en", "uk", "ru", "tr", "ar"]:
+        print(f"Backfill: unsupported language '{dest_language}'")
+        return 0
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(f'''
+        UPDATE words SET {dest_language}_tran = ?
+        WHERE id = ? AND ({dest_language}_tran IS NULL OR {dest_language}_tran = '')
+        ''', [(tr, word_id) for word_id, tr in rows])
+        updated = cursor.rowcount
+        conn.commit()
+    if updated:
+        # Shared decks filter out untranslated words, so the new ones only appear after a reload
+        deck_cache.invalidate(dict_type="shared")
+    return updated
+
+def get_translation_backfill_stats():
+    """Return background translation backfill metrics (queue depth, fill rate)"""
+    return translation_backfill.stats()
 
 def get_shared_dictionary_words_with_articles(chat_id, shared_dict_id=None):
-    """Get words with articles from a shared dictionary for a specific user"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # If shared_dict_id not provided, get it from user profile
+    """Get words with articles from a shared dictionary (served from the deck cache when possible)"""
     if not shared_dict_id:
-        cursor.execute('SELECT shared_dict_id FROM users WHERE chat_id = ?', (chat_id,))
-        result = cursor.fetchone()
-        if not result or not result[0]:
-            conn.close()
-            return pd.DataFrame()
-        shared_dict_id = result[0]
-    
-    # Verify user has access to this dictionary
-    cursor.execute('''
-    SELECT 1 FROM shared_dict_users 
-    WHERE user_id = ? AND dict_id = ?
-    ''', (chat_id, shared_dict_id))
+        return _load_shared_dictionary_words_with_articles(chat_id)
+    key = deck_cache.make_key(chat_id, "shared", shared_dict_id, get_user_language(chat_id), "articles")
+    return deck_cache.get_or_load(
+        key, lambda: _load_shared_dictionary_words_with_articles(chat_id, shared_dict_id))
+
+def _load_shared_dictionary_words_with_articles(chat_id, shared_dict_id=None):
+    """Get words with articles from a shared dictionary for a specific user"""
+    with connection() as conn:
+        cursor = conn.cursor()
     
-    if not cursor.fetchone():
-        print(f"User {chat_id} does not have access to shared dictionary {shared_dict_id}")
-        conn.close()
-        return pd.DataFrame()
+        # If shared_dict_id not provided, get it from user profile
+        if not shared_dict_id:
+            cursor.execute('SELECT shared_dict_id FROM users WHERE chat_id = ?', (chat_id,))
+            result = cursor.fetchone()
+            if not result or not result[0]:
+                return pd.DataFrame()
+            shared_dict_id = result[0]
     
-    # Get user language
-    language = get_user_language(chat_id) or "uk"
-    other_language = "uk" if language == "ru" else "ru"
+        # Verify user has access to this dictionary
+        cursor.execute('''
+        SELECT 1 FROM shared_dict_users 
+        WHERE user_id = ? AND dict_id = ?
+        ''', (chat_id, shared_dict_id))
     
-    # Verify shared dictionary table exists
-    cursor.execute(f"""
-    SELECT name FROM sqlite_master 
-    WHERE type='table' AND name='shared_dict_{shared_dict_id}'
-    """)
-    if not cursor.fetchone():
-        conn.close()
-        return pd.DataFrame()
+        if not cursor.fetchone():
+            print(f"User {chat_id} does not have access to shared dictionary {shared_dict_id}")
+            return pd.DataFrame()
     
-    # Ensure user column exists in shared dictionary table
-    cursor.execute(f"PRAGMA table_info(shared_dict_{shared_dict_id})")
-    columns = [col[1] for col in cursor.fetchall()]
-    user_col = f"user_{chat_id}"
+        # Get user language
+        language = get_user_language(chat_id) or "uk"
+        other_language = "uk" if language == "ru" else "ru"
     
-    if user_col not in columns:
-        # Add column if it doesn't exist
-        cursor.execute(f'''
-        ALTER TABLE shared_dict_{shared_dict_id} ADD COLUMN {user_col} REAL DEFAULT 0.0
-        ''')
-        conn.commit()
+        # Get words with articles (article_id != 4 excludes words without articles)
+        # Ratings live in shared_dict_ratings, so the query shape does not depend on membership size
+        query = f'''
+        SELECT w.id, w.word, w.{language}_tran as translation, w.{other_language}_tran as other_translation,
+               a.article, COALESCE(r.rating, 0.0) as priority
+        FROM shared_dict_words sd
+        JOIN words w ON sd.word_id = w.id
+        JOIN article a ON w.article_id = a.id
+        LEFT JOIN shared_dict_ratings r
+               ON r.dict_id = sd.dict_id AND r.user_id = ? AND r.word_id = sd.word_id
+        WHERE sd.dict_id = ? AND w.article_id != 4 AND w.article_id IS NOT NULL
+        ORDER BY priority DESC
+        '''
     
-    # Get words with articles (article_id != 4 excludes words without articles)
-    query = f'''
-    SELECT w.id, w.word, w.{language}_tran as translation, w.{other_language}_tran as other_translation,
-           a.article, COALESCE(sd.{user_col}, 0.0) as priority
-    FROM shared_dict_{shared_dict_id} sd
-    JOIN words w ON sd.word_id = w.id
-    JOIN article a ON w.article_id = a.id
-    WHERE w.article_id != 4 AND w.article_id IS NOT NULL
-    ORDER BY priority DESC
-    '''
+        cursor.execute(query, (chat_id, shared_dict_id))
     
-    cursor.execute(query)
+        # Get results
+        results = cursor.fetchall()
     
-    # Get results
-    results = cursor.fetchall()
+        # Convert results to DataFrame
+        columns = ['id', 'word', 'translation', 'other_translation', 'article', 'priority']
+        df = pd.DataFrame(results, columns=columns)
     
-    # Convert results to DataFrame
-    columns = ['id', 'word', 'translation', 'other_translation', 'article', 'priority']
-    df = pd.DataFrame(results, columns=columns)
     
-    # Auto-translate missing translations if needed
-    words_to_translate = df[df['translation'].isnull() & df['other_translation'].notnull()]
-    # закриваємо початкове з’єднання до мережевих викликів
-    conn.close()
-
-    if not words_to_translate.empty:
-        from config import translator
-        # нове з’єднання для оновлень
-        conn2 = get_connection()
-        cursor2 = conn2.cursor()
-        for idx, row in words_to_translate.iterrows():
-            try:
-                tr = translator.translate(
-                    row['other_translation'],
-                    src=other_language, dest=language
-                ).text
-                cursor2.execute(
-                    f"UPDATE words SET {language}_tran = ? WHERE id = ?",
-                    (tr, row['id'])
-                )
-                df.at[idx, 'translation'] = tr
-                conn2.commit()  # коміт одразу після UPDATE
-            except Exception as e:
-                print(f"Auto-translate error for word {row['id']}: {e}")
-        conn2.close()
-    # …далі повернення df…
-    df = df[df['translation'].notnull()]
+        # Missing translations are filled in the background; show only translated words now
+        words_to_translate = df[df['translation'].isnull() & df['other_translation'].notnull()]
+        if not words_to_translate.empty:
+            _queue_missing_translations(words_to_translate, other_language, language)
+        df = df[df['translation'].notnull()]
     
-    # Remove the now-unnecessary other_translation column
-    if 'other_translation' in df.columns:
-        df = df.drop(columns=['other_translation'])
+        # Remove the now-unnecessary other_translation column
+        if 'other_translation' in df.columns:
+            df = df.drop(columns=['other_translation'])
     
   
-    return df
+        return df
 
 def get_shared_dictionary_words(chat_id, shared_dict_id=None):
-    """Get all words from a shared dictionary for a specific user"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # If shared_dict_id not provided, get it from user profile
+    """Get all words from a shared dictionary (served from the deck cache when possible)"""
     if not shared_dict_id:
-        cursor.execute('SELECT shared_dict_id FROM users WHERE chat_id = ?', (chat_id,))
-        result = cursor.fetchone()
-        if not result or not result[0]:
-            conn.close()
-            return pd.DataFrame()
-        shared_dict_id = result[0]
-    
-    # Verify user has access to this dictionary
-    cursor.execute('''
-    SELECT 1 FROM shared_dict_users 
-    WHERE user_id = ? AND dict_id = ?
-    ''', (chat_id, shared_dict_id))
+        return _load_shared_dictionary_words(chat_id)
+    key = deck_cache.make_key(chat_id, "shared", shared_dict_id, get_user_language(chat_id))
+    return deck_cache.get_or_load(key, lambda: _load_shared_dictionary_words(chat_id, shared_dict_id))
+
+def _load_shared_dictionary_words(chat_id, shared_dict_id=None):
+    """Get all words from a shared dictionary for a specific user"""
+    with connection() as conn:
+        cursor = conn.cursor()
     
-    if not cursor.fetchone():
-        print(f"User {chat_id} does not have access to shared dictionary {shared_dict_id}")
-        conn.close()
-        return pd.DataFrame()
+        # If shared_dict_id not provided, get it from user profile
+        if not shared_dict_id:
+            cursor.execute('SELECT shared_dict_id FROM users WHERE chat_id = ?', (chat_id,))
+            result = cursor.fetchone()
+            if not result or not result[0]:
+                return pd.DataFrame()
+            shared_dict_id = result[0]
     
-    # Get user language
-    language = get_user_language(chat_id) or "uk"
-    other_language = "uk" if language == "ru" else "ru"
+        # Verify user has access to this dictionary
+        cursor.execute('''
+        SELECT 1 FROM shared_dict_users 
+        WHERE user_id = ? AND dict_id = ?
+        ''', (chat_id, shared_dict_id))
     
-    # Verify shared dictionary table exists
-    cursor.execute(f"""
-    SELECT name FROM sqlite_master 
-    WHERE type='table' AND name='shared_dict_{shared_dict_id}'
-    """)
-    if not cursor.fetchone():
-        conn.close()
-        return pd.DataFrame()
+        if not cursor.fetchone():
+            print(f"User {chat_id} does not have access to shared dictionary {shared_dict_id}")
+            return pd.DataFrame()
     
-    # Ensure user column exists in shared dictionary table
-    cursor.execute(f"PRAGMA table_info(shared_dict_{shared_dict_id})")
-    columns = [col[1] for col in cursor.fetchall()]
-    user_col = f"user_{chat_id}"
+        # Get user language
+        language = get_user_language(chat_id) or "uk"
+        other_language = "uk" if language == "ru" else "ru"
     
-    if user_col not in columns:
-        # Add column if it doesn't exist
-        cursor.execute(f'''
-        ALTER TABLE shared_dict_{shared_dict_id} ADD COLUMN {user_col} REAL DEFAULT 0.0
-        ''')
-        conn.commit()
+        # Get all words (including those without articles)
+        query = f'''
+        SELECT w.id, w.word, w.{language}_tran as translation, w.{other_language}_tran as other_translation,
+               a.article, COALESCE(r.rating, 0.0) as priority
+        FROM shared_dict_words sd
+        JOIN words w ON sd.word_id = w.id
+        LEFT JOIN article a ON w.article_id = a.id
+        LEFT JOIN shared_dict_ratings r
+               ON r.dict_id = sd.dict_id AND r.user_id = ? AND r.word_id = sd.word_id
+        WHERE sd.dict_id = ?
+        ORDER BY priority DESC
+        '''
     
-    # Get all words (including those without articles)
-    query = f'''
-    SELECT w.id, w.word, w.{language}_tran as translation, w.{other_language}_tran as other_translation,
-           a.article, COALESCE(sd.{user_col}, 0.0) as priority
-    FROM shared_dict_{shared_dict_id} sd
-    JOIN words w ON sd.word_id = w.id
-    LEFT JOIN article a ON w.article_id = a.id
-    ORDER BY priority DESC
-    '''
+        cursor.execute(query, (chat_id, shared_dict_id))
     
-    cursor.execute(query)
+        # Get results
+        results = cursor.fetchall()
     
-    # Get results
-    results = cursor.fetchall()
+        # Convert results to DataFrame
+        columns = ['id', 'word', 'translation', 'other_translation', 'article', 'priority']
+        df = pd.DataFrame(results, columns=columns)
     
-    # Convert results to DataFrame
-    columns = ['id', 'word', 'translation', 'other_translation', 'article', 'priority']
-    df = pd.DataFrame(results, columns=columns)
     
-    # Auto-translate missing translations if needed
-    words_to_translate = df[df['translation'].isnull() & df['other_translation'].notnull()]
-    # Close initial connection before network calls
-    conn.close()
-
-    if not words_to_translate.empty:
-        from config import translator
-        # New connection for updates
-        conn2 = get_connection()
-        cursor2 = conn2.cursor()
-        for idx, row in words_to_translate.iterrows():
-            try:
-                tr = translator.translate(
-                    row['other_translation'],
-                    src=other_language, dest=language
-                ).text
-                cursor2.execute(
-                    f"UPDATE words SET {language}_tran = ? WHERE id = ?",
-                    (tr, row['id'])
-                )
-                df.at[idx, 'translation'] = tr
-                conn2.commit()  # Commit immediately after UPDATE
-            except Exception as e:
-                print(f"Auto-translate error for word {row['id']}: {e}")
-        conn2.close()
-    df = df[df['translation'].notnull()]
+        # Missing translations are filled in the background; show only translated words now
+        words_to_translate = df[df['translation'].isnull() & df['other_translation'].notnull()]
+        if not words_to_translate.empty:
+            _queue_missing_translations(words_to_translate, other_language, language)
+        df = df[df['translation'].notnull()]
     
-    # Remove the now-unnecessary other_translation column
-    if 'other_translation' in df.columns:
-        df = df.drop(columns=['other_translation'])
+        # Remove the now-unnecessary other_translation column
+        if 'other_translation' in df.columns:
+            df = df.drop(columns=['other_translation'])
     
-    return df
+        return df
 
 def get_user_shared_dictionaries(chat_id):
     """Retrieve shared dictionaries for a user."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
 
-        # Query to get shared dictionaries for the user
-        cursor.execute('''
-        SELECT sd.id, sd.name, sd.code, sdu.is_admin
-        FROM shared_dictionaries sd
-        JOIN shared_dict_users sdu ON sd.id = sdu.dict_id
-        WHERE sdu.user_id = ?
-        ''', (chat_id,))
+            # Query to get shared dictionaries for the user
+            cursor.execute('''
+            SELECT sd.id, sd.name, sd.code, sdu.is_admin
+            FROM shared_dictionaries sd
+            JOIN shared_dict_users sdu ON sd.id = sdu.dict_id
+            WHERE sdu.user_id = ?
+            ''', (chat_id,))
 
-        shared_dicts = [
-            {"id": row[0], "name": row[1], "code": row[2], "is_admin": bool(row[3])}
-            for row in cursor.fetchall()
-        ]
+            shared_dicts = [
+                {"id": row[0], "name": row[1], "code": row[2], "is_admin": bool(row[3])}
+                for row in cursor.fetchall()
+            ]
 
-        conn.close()
-        return shared_dicts
+            return shared_dicts
     except sqlite3.Error as e:
         print(f"Database error retrieving shared dictionaries for user {chat_id}: {e}")
         traceback.print_exc()
@@ -868,93 +915,102 @@ def add_words_to_dictionary(chat_id, words_data, dict_type="personal", shared_di
             print(f"User {chat_id} is not an admin of shared dict {shared_dict_id}. Cannot add words.")
             return 0, len(words_data)
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
     
-    language = get_user_language(chat_id)
-    if not language:
-        print(f"Cannot add words for user {chat_id}: language not set.")
-        conn.close()
-        return 0, len(words_data)
+        language = get_user_language(chat_id)
+        if not language:
+            print(f"Cannot add words for user {chat_id}: language not set.")
+            return 0, len(words_data)
 
-    translation_column = f"{language}_tran"
-    cursor.execute("PRAGMA table_info(words)")
-    columns = [col[1] for col in cursor.fetchall()]
-    if translation_column not in columns:
-        print(f"Translation column {translation_column} does not exist.")
-        conn.close()
-        return 0, len(words_data)
+        translation_column = f"{language}_tran"
+        cursor.execute("PRAGMA table_info(words)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if translation_column not in columns:
+            print(f"Translation column {translation_column} does not exist.")
+            return 0, len(words_data)
 
-    added_count = 0
-    failed_count = 0
-    
-    if dict_type == "personal":
-        ensure_user_table_exists(chat_id)
+        added_count = 0
+        failed_count = 0
 
-    for word_info in words_data:
-        word = word_info.get('word')
-        translation = word_info.get('translation')
-        article = word_info.get('article')
+        for word_info in words_data:
+            word = word_info.get('word')
+            translation = word_info.get('translation')
+            article = word_info.get('article')
 
-        if not word or not translation:
-            failed_count += 1
-            continue
+            if not word or not translation:
+                failed_count += 1
+                continue
 
-        try:
-            word_to_store = word
-            extracted_article = None
-            if isinstance(word, str):
-                article_match = re.match(r'^(der|die|das)\\s+(.+)$', word, re.IGNORECASE)
-                if article_match:
-                    extracted_article = article_match.group(1).lower()
-                    word_to_store = article_match.group(2)
+            try:
+                word_to_store = word
+                extracted_article = None
+                if isinstance(word, str):
+                    article_match = re.match(r'^(der|die|das)\\s+(.+)$', word, re.IGNORECASE)
+                    if article_match:
+                        extracted_article = article_match.group(1).lower()
+                        word_to_store = article_match.group(2)
 
-            final_article_text = article if article else extracted_article
-            article_id_to_use = 4
+                final_article_text = article if article else extracted_article
+                article_id_to_use = 4
 
-            if final_article_text:
-                cursor.execute('SELECT id FROM article WHERE LOWER(article) = LOWER(?)', (final_article_text,))
-                article_row = cursor.fetchone()
-                if article_row:
-                    article_id_to_use = article_row[0]
+                if final_article_text:
+                    cursor.execute('SELECT id FROM article WHERE LOWER(article) = LOWER(?)', (final_article_text,))
+                    article_row = cursor.fetchone()
+                    if article_row:
+                        article_id_to_use = article_row[0]
 
-            cursor.execute('SELECT id FROM words WHERE LOWER(word) = LOWER(?)', (word_to_store,))
-            existing_word = cursor.fetchone()
+                cursor.execute('SELECT id FROM words WHERE LOWER(word) = LOWER(?)', (word_to_store,))
+                existing_word = cursor.fetchone()
 
-            word_id = None
-            if existing_word:
-                word_id = existing_word[0]
-                cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ? AND ({translation_column} IS NULL OR {translation_column} != ?)', 
-                             (translation, word_id, translation))
-                cursor.execute('UPDATE words SET article_id = ? WHERE id = ? AND article_id != ?', 
-                             (article_id_to_use, word_id, article_id_to_use))
-            else:
-                cursor.execute('INSERT INTO words (word, article_id) VALUES (?, ?)', (word_to_store, article_id_to_use))
-                word_id = cursor.lastrowid
-                cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ?', (translation, word_id))
+                word_id = None
+                if existing_word:
+                    word_id = existing_word[0]
+                    cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ? AND ({translation_column} IS NULL OR {translation_column} != ?)', 
+                                 (translation, word_id, translation))
+                    cursor.execute('UPDATE words SET article_id = ? WHERE id = ? AND article_id != ?', 
+                                 (article_id_to_use, word_id, article_id_to_use))
+                else:
+                    cursor.execute('INSERT INTO words (word, article_id) VALUES (?, ?)', (word_to_store, article_id_to_use))
+                    word_id = cursor.lastrowid
+                    cursor.execute(f'UPDATE words SET {translation_column} = ? WHERE id = ?', (translation, word_id))
 
-            if dict_type == "personal":
-                cursor.execute(f'INSERT OR IGNORE INTO user_{chat_id} (word_id) VALUES (?)', (word_id,))
-            elif dict_type == "shared":
-                cursor.execute(f'INSERT OR IGNORE INTO shared_dict_{shared_dict_id} (word_id) VALUES (?)', (word_id,))
+                if dict_type == "personal":
+                    cursor.execute('INSERT OR IGNORE INTO user_words (chat_id, word_id) VALUES (?, ?)', (chat_id, word_id))
+                elif dict_type == "shared":
+                    cursor.execute('INSERT OR IGNORE INTO shared_dict_words (dict_id, word_id) VALUES (?, ?)', (shared_dict_id, word_id))
             
-            if cursor.rowcount > 0:
-                added_count += 1
+                if cursor.rowcount > 0:
+                    added_count += 1
 
-        except sqlite3.Error as e:
-            print(f"DB error processing word '{word}': {e}")
-            failed_count += 1
+            except sqlite3.Error as e:
+                print(f"DB error processing word '{word}': {e}")
+                failed_count += 1
     
-    conn.commit()
-    conn.close()
+        conn.commit()
     
-    print(f"Batch add complete for user {chat_id}. Added: {added_count}, Failed: {failed_count}")
-    return added_count, failed_count
+        # Existing words may have received new translations/articles, so drop every deck
+        deck_cache.invalidate()
+    
+        print(f"Batch add complete for user {chat_id}. Added: {added_count}, Failed: {failed_count}")
+        return added_count, failed_count
 
 def init_db():
     """Initialize database via db_init.create_database"""
-    from db_init import create_database
+    from db_init import (create_database, ensure_user_words_table, ensure_review_tables,
+                         ensure_translation_cache_table, ensure_sessions_table, ensure_reminder_tables)
+    from migration_tools import migrate_user_tables_to_user_words, import_csv_priorities
     create_database()
+    # create_database() skips existing databases, so make sure newer tables exist
+    ensure_user_words_table()
+    ensure_review_tables()
+    ensure_translation_cache_table()
+    ensure_sessions_table()
+    ensure_reminder_tables()
+    # Fold any legacy user_{chat_id} tables into user_words
+    migrate_user_tables_to_user_words(DB_PATH)
+    # Fold priorities from the old per-user dictionary.csv files (once per file)
+    import_csv_priorities(DB_PATH)
 
 def validate_shared_dictionary_access(user_id, shared_dict_id):
     """
@@ -968,34 +1024,31 @@ def validate_shared_dictionary_access(user_id, shared_dict_id):
         tuple: (exists, has_access, dict_name)
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if dictionary exists
-        cursor.execute('SELECT name FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return (False, False, None)
+            # Check if dictionary exists
+            cursor.execute('SELECT name FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
+            result = cursor.fetchone()
+            if not result:
+                return (False, False, None)
         
-        dict_name = result[0]
+            dict_name = result[0]
         
-        # Check if user has access (is creator or member)
-        cursor.execute('SELECT created_by FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
-        creator_result = cursor.fetchone()
-        is_creator = creator_result and creator_result[0] == user_id
+            # Check if user has access (is creator or member)
+            cursor.execute('SELECT created_by FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
+            creator_result = cursor.fetchone()
+            is_creator = creator_result and creator_result[0] == user_id
         
-        if is_creator:
-            conn.close()
-            return (True, True, dict_name)
+            if is_creator:
+                return (True, True, dict_name)
         
-        # Check if user is a member
-        cursor.execute('SELECT 1 FROM shared_dict_users WHERE user_id = ? AND dict_id = ?', (user_id, shared_dict_id))
-        member_result = cursor.fetchone()
-        has_access = bool(member_result)
+            # Check if user is a member
+            cursor.execute('SELECT 1 FROM shared_dict_users WHERE user_id = ? AND dict_id = ?', (user_id, shared_dict_id))
+            member_result = cursor.fetchone()
+            has_access = bool(member_result)
         
-        conn.close()
-        return (True, has_access, dict_name)
+            return (True, has_access, dict_name)
     except Exception as e:
         print(f"Error validating shared dictionary access: {e}")
         return (False, False, None)
@@ -1008,13 +1061,18 @@ def reset_to_personal_dictionary(user_id):
         user_id: User's chat ID
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET dict_type = 'personal', shared_dict_id = NULL WHERE chat_id = ?", (user_id,))
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE users SET dict_type = 'personal', shared_dict_id = NULL WHERE chat_id = ?", (user_id,))
+            conn.commit()
+            user_profiles.update(user_id, dict_type="personal", shared_dict_id=None, shared_dict_exists=False, is_admin=False)
     except Exception as e:
         print(f"Error resetting to personal dictionary: {e}")
+        user_profiles.invalidate(user_id)
+
+def reset_user_dictionary(user_id):
+    """Alias of reset_to_personal_dictionary used by the state helpers"""
+    reset_to_personal_dictionary(user_id)
 
 def sync_user_state_with_db(chat_id):
     """
@@ -1051,49 +1109,78 @@ def sync_user_state_with_db(chat_id):
 def create_shared_dictionary_tables():
     """Create tables for shared dictionaries functionality"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Create shared_dictionaries table if it doesn't exist
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS shared_dictionaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            code TEXT UNIQUE NOT NULL,
-            created_by INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Create shared_dict_users table if it doesn't exist
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS shared_dict_users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            dict_id INTEGER NOT NULL,
-            is_admin INTEGER DEFAULT 0,
-            joined_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (dict_id) REFERENCES shared_dictionaries(id),
-            UNIQUE(user_id, dict_id)
-        )
-        ''')
-        
-        # Add shared dictionary columns to users table if they don't exist
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'dict_type' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN dict_type TEXT DEFAULT 'personal'")
-        
-        if 'shared_dict_id' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN shared_dict_id INTEGER")
+        with connection() as conn:
+            cursor = conn.cursor()
+        
+            # Create shared_dictionaries table if it doesn't exist
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shared_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                code TEXT UNIQUE NOT NULL,
+                created_by INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+        
+            # Create shared_dict_users table if it doesn't exist
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shared_dict_users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                dict_id INTEGER NOT NULL,
+                is_admin INTEGER DEFAULT 0,
+                joined_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (dict_id) REFERENCES shared_dictionaries(id),
+                UNIQUE(user_id, dict_id)
+            )
+            ''')
+        
+            # Words of every shared dictionary (replaces per-dictionary shared_dict_{id} tables)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shared_dict_words (
+                dict_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                added_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (dict_id, word_id),
+                FOREIGN KEY (dict_id) REFERENCES shared_dictionaries(id),
+                FOREIGN KEY (word_id) REFERENCES words(id)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_shared_dict_words_word ON shared_dict_words(word_id)')
+        
+            # Per-member word ratings (replaces dynamic user_{chat_id} columns)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shared_dict_ratings (
+                dict_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                rating REAL DEFAULT 0.0,
+                PRIMARY KEY (dict_id, user_id, word_id),
+                FOREIGN KEY (dict_id) REFERENCES shared_dictionaries(id),
+                FOREIGN KEY (word_id) REFERENCES words(id)
+            ) WITHOUT ROWID
+            ''')
+        
+            # Add shared dictionary columns to users table if they don't exist
+            cursor.execute("PRAGMA table_info(users)")
+            columns = [col[1] for col in cursor.fetchall()]
+        
+            if 'dict_type' not in columns:
+                cursor.execute("ALTER TABLE users ADD COLUMN dict_type TEXT DEFAULT 'personal'")
+        
+            if 'shared_dict_id' not in columns:
+                cursor.execute("ALTER TABLE users ADD COLUMN shared_dict_id INTEGER")
             
-        if 'shared_dict_admin' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN shared_dict_admin INTEGER DEFAULT 0")
+            if 'shared_dict_admin' not in columns:
+                cursor.execute("ALTER TABLE users ADD COLUMN shared_dict_admin INTEGER DEFAULT 0")
         
-        conn.commit()
-        conn.close()
-        print("Shared dictionary tables created/updated successfully")
+            conn.commit()
+            print("Shared dictionary tables created/updated successfully")
+        
+            # Fold any legacy shared_dict_{id} tables into the normalized tables
+            from migration_tools import migrate_shared_dict_tables
+            migrate_shared_dict_tables(DB_PATH)
         
     except Exception as e:
         print(f"Error creating shared dictionary tables: {e}")
@@ -1103,52 +1190,43 @@ def create_shared_dictionary_tables():
 def create_shared_dictionary(creator_id, name):
     """Create a new shared dictionary and return access code and dictionary ID"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Generate unique 6-character code
-        code = None
-        while True:
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            cursor.execute('SELECT id FROM shared_dictionaries WHERE code = ?', (code,))
-            if not cursor.fetchone():
-                break
+        with connection() as conn:
+            cursor = conn.cursor()
+        
+            # Generate unique 6-character code
+            code = None
+            while True:
+                code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+                cursor.execute('SELECT id FROM shared_dictionaries WHERE code = ?', (code,))
+                if not cursor.fetchone():
+                    break
+        
+            # Create shared dictionary record
+            cursor.execute('''
+            INSERT INTO shared_dictionaries (name, code, created_by)
+            VALUES (?, ?, ?)
+            ''', (name, code, creator_id))
+        
+            shared_dict_id = cursor.lastrowid
+        
+            # Add creator to shared_dict_users as admin
+            cursor.execute('''
+            INSERT INTO shared_dict_users (user_id, dict_id, is_admin)
+            VALUES (?, ?, 1)
+            ''', (creator_id, shared_dict_id))
+        
+            # Update creator's user record
+            cursor.execute('''
+            UPDATE users SET dict_type = 'shared', shared_dict_id = ?, shared_dict_admin = 1
+            WHERE chat_id = ?
+            ''', (shared_dict_id, creator_id))
         
-        # Create shared dictionary record
-        cursor.execute('''
-        INSERT INTO shared_dictionaries (name, code, created_by)
-        VALUES (?, ?, ?)
-        ''', (name, code, creator_id))
-        
-        shared_dict_id = cursor.lastrowid
-        
-        # Create shared dictionary table for words
-        cursor.execute(f'''
-        CREATE TABLE IF NOT EXISTS shared_dict_{shared_dict_id} (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            word_id INTEGER NOT NULL,
-            FOREIGN KEY (word_id) REFERENCES words(id),
-            UNIQUE(word_id)
-        )
-        ''')
-        
-        # Add creator to shared_dict_users as admin
-        cursor.execute('''
-        INSERT INTO shared_dict_users (user_id, dict_id, is_admin)
-        VALUES (?, ?, 1)
-        ''', (creator_id, shared_dict_id))
-        
-        # Update creator's user record
-        cursor.execute('''
-        UPDATE users SET dict_type = 'shared', shared_dict_id = ?, shared_dict_admin = 1
-        WHERE chat_id = ?
-        ''', (shared_dict_id, creator_id))
-        
-        conn.commit()
-        conn.close()
+            conn.commit()
+            user_profiles.update(creator_id, dict_type="shared", shared_dict_id=shared_dict_id,
+                                 shared_dict_exists=True, is_admin=True)
         
-        print(f"Created shared dictionary '{name}' with code {code} for user {creator_id}")
-        return code, shared_dict_id
+            print(f"Created shared dictionary '{name}' with code {code} for user {creator_id}")
+            return code, shared_dict_id
         
     except Exception as e:
         print(f"Error creating shared dictionary: {e}")
@@ -1159,40 +1237,41 @@ def create_shared_dictionary(creator_id, name):
 def join_shared_dictionary(user_id, code):
     """Join a shared dictionary using access code"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Find dictionary by code
-        cursor.execute('SELECT id, name FROM shared_dictionaries WHERE code = ?', (code.upper(),))
-        result = cursor.fetchone()
+            # Find dictionary by code
+            cursor.execute('SELECT id, name FROM shared_dictionaries WHERE code = ?', (code.upper(),))
+            result = cursor.fetchone()
         
-        if not result:
-            return False, "Словник з таким кодом не знайдено"
+            if not result:
+                return False, "Словник з таким кодом не знайдено"
         
-        dict_id, dict_name = result
+            dict_id, dict_name = result
         
-        # Check if user is already a member
-        cursor.execute('SELECT 1 FROM shared_dict_users WHERE user_id = ? AND dict_id = ?', (user_id, dict_id))
-        if cursor.fetchone():
-            return False, f"Ви вже є учасником словника '{dict_name}'"
+            # Check if user is already a member
+            cursor.execute('SELECT 1 FROM shared_dict_users WHERE user_id = ? AND dict_id = ?', (user_id, dict_id))
+            if cursor.fetchone():
+                return False, f"Ви вже є учасником словника '{dict_name}'"
         
-        # Add user to shared dictionary
-        cursor.execute('''
-        INSERT INTO shared_dict_users (user_id, dict_id, is_admin)
-        VALUES (?, ?, 0)
-        ''', (user_id, dict_id))
+            # Add user to shared dictionary
+            cursor.execute('''
+            INSERT INTO shared_dict_users (user_id, dict_id, is_admin)
+            VALUES (?, ?, 0)
+            ''', (user_id, dict_id))
         
-        # Update user's dictionary settings
-        cursor.execute('''
-        UPDATE users SET dict_type = 'shared', shared_dict_id = ?, shared_dict_admin = 0
-        WHERE chat_id = ?
-        ''', (dict_id, user_id))
+            # Update user's dictionary settings
+            cursor.execute('''
+            UPDATE users SET dict_type = 'shared', shared_dict_id = ?, shared_dict_admin = 0
+            WHERE chat_id = ?
+            ''', (dict_id, user_id))
         
-        conn.commit()
-        conn.close()
+            conn.commit()
+            user_profiles.update(user_id, dict_type="shared", shared_dict_id=dict_id,
+                                 shared_dict_exists=True, is_admin=False)
         
-        print(f"User {user_id} joined shared dictionary '{dict_name}' (ID: {dict_id})")
-        return True, dict_name
+            print(f"User {user_id} joined shared dictionary '{dict_name}' (ID: {dict_id})")
+            return True, dict_name
         
     except Exception as e:
         print(f"Error joining shared dictionary: {e}")
@@ -1203,31 +1282,30 @@ def join_shared_dictionary(user_id, code):
 def check_database_integrity():
     """Check database integrity and basic tables"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if basic tables exist
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+            # Check if basic tables exist
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [row[0] for row in cursor.fetchall()]
         
-        required_tables = ['users', 'words', 'article']
-        missing_tables = [table for table in required_tables if table not in tables]
+            required_tables = ['users', 'words', 'article']
+            missing_tables = [table for table in required_tables if table not in tables]
         
-        if missing_tables:
-            print(f"WARNING: Missing required tables: {missing_tables}")
-            return False
+            if missing_tables:
+                print(f"WARNING: Missing required tables: {missing_tables}")
+                return False
         
-        # Check if there's any data
-        cursor.execute("SELECT COUNT(*) FROM users")
-        user_count = cursor.fetchone()[0]
+            # Check if there's any data
+            cursor.execute("SELECT COUNT(*) FROM users")
+            user_count = cursor.fetchone()[0]
         
-        cursor.execute("SELECT COUNT(*) FROM words")
-        word_count = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM words")
+            word_count = cursor.fetchone()[0]
         
-        print(f"Database integrity check: {len(tables)} tables, {user_count} users, {word_count} words")
+            print(f"Database integrity check: {len(tables)} tables, {user_count} users, {word_count} words")
         
-        conn.close()
-        return True
+            return True
         
     except Exception as e:
         print(f"Database integrity check failed: {e}")
@@ -1235,7 +1313,7 @@ def check_database_integrity():
 
 def add_word_to_shared_dictionary(chat_id, word_id, shared_dict_id):
     """
-    Add a word to a shared dictionary by creating a link in shared_dict_{id} table.
+    Add a word to a shared dictionary by creating a link in shared_dict_words.
     
     Args:
         chat_id: User's chat ID
@@ -1246,163 +1324,270 @@ def add_word_to_shared_dictionary(chat_id, word_id, shared_dict_id):
         tuple: (success: bool, message: str)
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Check if the shared dictionary exists and user has access
-        cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
-        dict_info = cursor.fetchone()
-        if not dict_info:
-            conn.close()
-            return False, "Словник не знайдено"
-        
-        dict_name = dict_info[0]
-        
-        # Check if user has admin rights or is a member
-        cursor.execute("SELECT is_admin FROM shared_dict_users WHERE user_id = ? AND dict_id = ?", 
-                      (chat_id, shared_dict_id))
-        user_info = cursor.fetchone()
-        if not user_info:
-            conn.close()
-            return False, "Немає доступу до словника"
-        
-        # Check if word exists
-        cursor.execute("SELECT word FROM words WHERE id = ?", (word_id,))
-        word_info = cursor.fetchone()
-        if not word_info:
-            conn.close()
-            return False, "Слово не знайдено"
-        
-        word = word_info[0]
-        
-        # Check if shared_dict_{id} table exists
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='shared_dict_{shared_dict_id}'")
-        if not cursor.fetchone():
-            conn.close()
-            return False, f"Таблиця shared_dict_{shared_dict_id} не існує"
+        with connection() as conn:
+            cursor = conn.cursor()
+        
+            # Check if the shared dictionary exists and user has access
+            cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
+            dict_info = cursor.fetchone()
+            if not dict_info:
+                return False, "Словник не знайдено"
+        
+            dict_name = dict_info[0]
+        
+            # Check if user has admin rights or is a member
+            cursor.execute("SELECT is_admin FROM shared_dict_users WHERE user_id = ? AND dict_id = ?", 
+                          (chat_id, shared_dict_id))
+            user_info = cursor.fetchone()
+            if not user_info:
+                return False, "Немає доступу до словника"
+        
+            # Check if word exists
+            cursor.execute("SELECT word FROM words WHERE id = ?", (word_id,))
+            word_info = cursor.fetchone()
+            if not word_info:
+                return False, "Слово не знайдено"
+        
+            word = word_info[0]
+        
+            # Add word to shared dictionary (primary key rejects duplicates)
+            cursor.execute("INSERT OR IGNORE INTO shared_dict_words (dict_id, word_id) VALUES (?, ?)",
+                          (shared_dict_id, word_id))
+            if cursor.rowcount == 0:
+                return False, f"Слово '{word}' вже є в словнику '{dict_name}'"
         
-        # Check if word is already in the shared dictionary
-        cursor.execute(f"SELECT id FROM shared_dict_{shared_dict_id} WHERE word_id = ?", (word_id,))
-        if cursor.fetchone():
-            conn.close()
-            return False, f"Слово '{word}' вже є в словнику '{dict_name}'"
-        
-        # Add word to shared dictionary
-        cursor.execute(f"INSERT INTO shared_dict_{shared_dict_id} (word_id) VALUES (?)", (word_id,))
-        
-        conn.commit()
-        conn.close()
+            conn.commit()
+            deck_cache.invalidate(shared_dict_id=shared_dict_id)
         
-        return True, f"Слово '{word}' додано до словника '{dict_name}'"
+            return True, f"Слово '{word}' додано до словника '{dict_name}'"
         
     except Exception as e:
         print(f"Error adding word to shared dictionary: {e}")
-        if 'conn' in locals():
-            conn.close()
         return False, "Виникла помилка при додаванні слова до словника"
 
 def delete_word_from_shared_dict(chat_id, word_id, shared_dict_id):
     """Delete a word from a shared dictionary."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Check admin rights
-        if not is_user_admin_of_shared_dict(chat_id, shared_dict_id):
-            conn.close()
-            return False
+            # Check admin rights
+            if not is_user_admin_of_shared_dict(chat_id, shared_dict_id):
+                return False
         
-        # Delete from shared_dict_{id} table
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='shared_dict_{shared_dict_id}'")
-        if cursor.fetchone():
-            cursor.execute(f"DELETE FROM shared_dict_{shared_dict_id} WHERE word_id = ?", (word_id,))
+            # Delete the word and every member's rating for it
+            cursor.execute("DELETE FROM shared_dict_words WHERE dict_id = ? AND word_id = ?",
+                          (shared_dict_id, word_id))
             rows_affected = cursor.rowcount
-        else:
-            print(f"Shared dictionary table shared_dict_{shared_dict_id} not found")
-            conn.close()
-            return False
+            cursor.execute("DELETE FROM shared_dict_ratings WHERE dict_id = ? AND word_id = ?",
+                          (shared_dict_id, word_id))
         
-        conn.commit()
-        conn.close()
-        return rows_affected > 0
+            conn.commit()
+            deck_cache.invalidate(shared_dict_id=shared_dict_id)
+            return rows_affected > 0
         
     except Exception as e:
         print(f"Error deleting word from shared dictionary: {e}")
-        if 'conn' in locals():
-            conn.close()
         return False
 
 def delete_word_from_personal_dict(chat_id, word_id):
     """Delete a word from user's personal dictionary."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute(f"DELETE FROM user_{chat_id} WHERE word_id = ?", (word_id,))
+            cursor.execute("DELETE FROM user_words WHERE chat_id = ? AND word_id = ?", (chat_id, word_id))
         
-        conn.commit()
-        conn.close()
-        return cursor.rowcount > 0
+            conn.commit()
+            deck_cache.invalidate(chat_id=chat_id, dict_type="personal")
+            return cursor.rowcount > 0
         
     except Exception as e:
         print(f"Error deleting word from personal dictionary: {e}")
-        if 'conn' in locals():
-            conn.close()
         return False
 
 def update_word_translation_shared_dict(chat_id, word_id, new_translation, shared_dict_id):
     """Update word translation in shared dictionary."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Check admin rights
-        if not is_user_admin_of_shared_dict(chat_id, shared_dict_id):
-            conn.close()
-            return False
+            # Check admin rights
+            if not is_user_admin_of_shared_dict(chat_id, shared_dict_id):
+                return False
         
-        # Get user language and update translation
-        language = get_user_language(chat_id)
-        if not language:
-            conn.close()
-            return False
+            # Get user language and update translation
+            language = get_user_language(chat_id)
+            if not language:
+                return False
         
-        translation_column = f"{language}_tran"
-        cursor.execute(f"UPDATE words SET {translation_column} = ? WHERE id = ?", 
-                      (new_translation, word_id))
+            translation_column = f"{language}_tran"
+            cursor.execute(f"UPDATE words SET {translation_column} = ? WHERE id = ?", 
+                          (new_translation, word_id))
         
-        conn.commit()
-        conn.close()
-        return cursor.rowcount > 0
+            conn.commit()
+            # Translations live in the shared words table, so any cached deck may hold this word
+            deck_cache.invalidate()
+            return cursor.rowcount > 0
         
     except Exception as e:
         print(f"Error updating word translation in shared dictionary: {e}")
-        if 'conn' in locals():
-            conn.close()
         return False
 
 def update_word_translation_personal_dict(chat_id, word_id, new_translation):
     """Update word translation in personal dictionary."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
         
-        # Get user language and update translation
-        language = get_user_language(chat_id)
-        if not language:
-            conn.close()
-            return False
+            # Get user language and update translation
+            language = get_user_language(chat_id)
+            if not language:
+                return False
         
-        translation_column = f"{language}_tran"
-        cursor.execute(f"UPDATE words SET {translation_column} = ? WHERE id = ?", 
-                      (new_translation, word_id))
+            translation_column = f"{language}_tran"
+            cursor.execute(f"UPDATE words SET {translation_column} = ? WHERE id = ?", 
+                          (new_translation, word_id))
         
-        conn.commit()
-        conn.close()
-        return cursor.rowcount > 0
+            conn.commit()
+            # Translations live in the shared words table, so any cached deck may hold this word
+            deck_cache.invalidate()
+            return cursor.rowcount > 0
         
     except Exception as e:
         print(f"Error updating word translation in personal dictionary: {e}")
-        if 'conn' in locals():
-            conn.close()
+        return False
+
+# Межі рейтингу слова (0 - вивчене, 5 - найскладніше)
+RATING_MIN = 0.0
+RATING_MAX = 5.0
+
+def update_word_rating_personal_dict(chat_id, word_id, rating_change):
+    """
+    Queue a rating delta for a word in the user's personal dictionary (write-behind).
+    
+    Returns False without queueing if the word is not in the user's dictionary.
+    """
+    try:
+        word_id = int(word_id)
+        with connection() as conn:
+            owned = conn.execute('SELECT 1 FROM user_words WHERE chat_id = ? AND word_id = ?',
+                                 (chat_id, word_id)).fetchone()
+        if not owned:
+            print(f"Word {word_id} is not in the personal dictionary of user {chat_id}")
+            return False
+        rating_queue.add(("personal", None, chat_id, word_id), rating_change)
+        return True
+    except Exception as e:
+        print(f"Error queueing rating update for personal dictionary: {e}")
+        return False
+
+def update_word_rating(chat_id, word_id, rating_change):
+    """Backward-compatible alias used by the game handlers for personal dictionaries."""
+    return update_word_rating_personal_dict(chat_id, word_id, rating_change)
+
+def update_word_rating_for_dict(chat_id, word_id, rating_change, dict_type="personal", shared_dict_id=None):
+    """
+    Queue a rating delta for whichever dictionary the user is playing.
+    
+    The common dictionary has no per-user ratings (its decks always report 0.0),
+    so only the spaced-repetition schedule tracks progress there.
+    """
+    if not word_id:
+        return False
+    if dict_type == "shared":
+        if not shared_dict_id:
+            return False
+        return update_word_rating_shared_dict(chat_id, word_id, rating_change, shared_dict_id)
+    if dict_type == "common":
+        return True
+    return update_word_rating_personal_dict(chat_id, word_id, rating_change)
+
+def update_word_rating_shared_dict(chat_id, word_id, rating_change, shared_dict_id):
+    """Queue a rating delta for a word for one member of a shared dictionary (write-behind)."""
+    try:
+        rating_queue.add(("shared", shared_dict_id, chat_id, int(word_id)), rating_change)
+        return True
+    except Exception as e:
+        print(f"Error queueing rating update for shared dictionary: {e}")
+        return False
+
+def _flush_rating_changes(batch):
+    """
+    Write coalesced rating deltas in a single transaction.
+    
+    Args:
+        batch: {(dict_type, shared_dict_id, chat_id, word_id): summed_delta}
+    
+    Raises on database errors so the write queue can retry the batch.
+    """
+    personal = []
+    shared = []
+    for (dict_type, shared_dict_id, chat_id, word_id), delta in batch.items():
+        if not delta:
+            continue
+        if dict_type == "shared":
+            shared.append((shared_dict_id, chat_id, word_id, delta))
+        else:
+            personal.append((chat_id, word_id, delta))
+    
+    new_ratings = []
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if personal:
+                cursor.executemany('''
+                UPDATE user_words
+                SET rating = MAX(?, MIN(?, COALESCE(rating, 0.0) + ?))
+                WHERE chat_id = ? AND word_id = ?
+                ''', [(RATING_MIN, RATING_MAX, delta, chat_id, word_id) for chat_id, word_id, delta in personal])
+            if shared:
+                cursor.executemany('''
+                INSERT INTO shared_dict_ratings (dict_id, user_id, word_id, rating)
+                VALUES (?, ?, ?, MAX(?, MIN(?, ?)))
+                ON CONFLICT(dict_id, user_id, word_id)
+                DO UPDATE SET rating = MAX(?, MIN(?, COALESCE(rating, 0.0) + ?))
+                ''', [(dict_id, chat_id, word_id, RATING_MIN, RATING_MAX, delta, RATING_MIN, RATING_MAX, delta)
+                      for dict_id, chat_id, word_id, delta in shared])
+            
+            # Read back the clamped values to patch cached decks
+            for chat_id, word_id, _ in personal:
+                cursor.execute('SELECT rating FROM user_words WHERE chat_id = ? AND word_id = ?', (chat_id, word_id))
+                row = cursor.fetchone()
+                if row:
+                    new_ratings.append((chat_id, word_id, row[0], "personal", None))
+            for dict_id, chat_id, word_id, _ in shared:
+                cursor.execute('''
+                SELECT rating FROM shared_dict_ratings WHERE dict_id = ? AND user_id = ? AND word_id = ?
+                ''', (dict_id, chat_id, word_id))
+                row = cursor.fetchone()
+                if row:
+                    new_ratings.append((chat_id, word_id, row[0], "shared", dict_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    # Refresh only the changed rows in cached decks
+    for chat_id, word_id, rating, dict_type, dict_id in new_ratings:
+        deck_cache.update_priority(chat_id, word_id, rating, dict_type=dict_type, shared_dict_id=dict_id)
+
+def flush_rating_queue():
+    """Write pending rating changes now (used by tests/scripts that read ratings back)"""
+    return rating_queue.flush()
+
+def get_rating_queue_stats():
+    """Return write-behind rating queue metrics"""
+    return rating_queue.stats()
+
+def shared_dictionary_exists(shared_dict_id):
+    """Return True if a shared dictionary with this ID exists."""
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
+            exists = cursor.fetchone() is not None
+            return exists
+    except Exception as e:
+        print(f"Error checking shared dictionary {shared_dict_id}: {e}")
         return False
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+Пул з'єднань SQLite для db_manager.
+
+Кожен потік отримує одне довготривале з'єднання, яке налаштовується
+(PRAGMA) лише один раз. Виклик close() на такому з'єднанні не закриває
+його фізично, а повертає до пулу, тому існуючий код у стилі
+``conn = get_connection() ... conn.close()`` працює без змін.
+"""
+
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# PRAGMA, що застосовуються один раз для кожного нового з'єднання
+DEFAULT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",     # ~16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",   # 128 MB memory-mapped I/O
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to the owning pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.release(self)
+
+    def close_physical(self):
+        """Really close the underlying SQLite handle"""
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Thread-local SQLite connection pool.
+
+    Nested acquisitions inside one thread (e.g. add_word -> get_user_language)
+    share the same connection; any uncommitted work is rolled back only when
+    the outermost holder releases it, mirroring the old close() semantics.
+    """
+
+    def __init__(self, db_path, timeout=30, pragmas=DEFAULT_PRAGMAS):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.pragmas = tuple(pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+        self._connect_hooks = []
+        self._created = 0
+        self._acquired = 0
+        self._reused = 0
+        self._rollbacks = 0
+        self._leaks = 0
+        self._connect_time = 0.0
+
+    def add_connect_hook(self, hook):
+        """Register a callable run on every new connection (and on the ones already open)"""
+        with self._lock:
+            self._connect_hooks.append(hook)
+            existing = list(self._connections)
+        for conn in existing:
+            try:
+                hook(conn)
+            except Exception as e:
+                print(f"Error applying connection hook: {e}")
+
+    def _connect(self):
+        started = time.perf_counter()
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            factory=PooledConnection,
+            check_same_thread=False,
+        )
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        for hook in list(self._connect_hooks):
+            try:
+                hook(conn)
+            except Exception as e:
+                print(f"Error applying connection hook: {e}")
+        conn._pool = self
+
+        with self._lock:
+            self._connections.add(conn)
+            self._created += 1
+            self._connect_time += time.perf_counter() - started
+        return conn
+
+    def acquire(self):
+        """Return this thread's connection, opening it on first use
+
+        An outermost acquire starts from a clean connection: a transaction
+        left open by a caller that never released (or committed) is rolled
+        back so this thread does not keep holding the SQLite write lock.
+        """
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            local.conn = conn
+            local.depth = 0
+        else:
+            self._reused += 1
+            if local.depth == 0 and conn.in_transaction:
+                try:
+                    conn.rollback()
+                    self._rollbacks += 1
+                except sqlite3.Error as e:
+                    print(f"Error rolling back pooled connection: {e}")
+                    self.discard(conn)
+                    conn = self._connect()
+                    local.conn = conn
+                    local.depth = 0
+        local.depth += 1
+        self._acquired += 1
+        return conn
+
+    def release(self, conn):
+        """Give a connection back; the outermost release drops uncommitted work"""
+        local = self._local
+        if getattr(local, "conn", None) is not conn:
+            # Connection handed across threads - its owner will clean it up
+            return
+        local.depth = max(local.depth - 1, 0)
+        if local.depth == 0 and conn.in_transaction:
+            try:
+                conn.rollback()
+                self._rollbacks += 1
+            except sqlite3.Error as e:
+                print(f"Error rolling back pooled connection: {e}")
+                self.discard(conn)
+
+    def reset_thread(self):
+        """Bring this thread's connection back to a clean state between tasks
+
+        A caller that acquired without releasing leaves depth above zero, so
+        neither acquire nor release would roll back its uncommitted writes and
+        the next commit on this thread would save them. Worker loops call this
+        before each task so one missed close() cannot leak into the next one.
+        """
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            return
+        if local.depth == 0 and not conn.in_transaction:
+            return
+        if local.depth:
+            self._leaks += 1
+            print(f"Warning: pooled connection was not released (depth {local.depth}), resetting")
+        local.depth = 0
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+                self._rollbacks += 1
+            except sqlite3.Error as e:
+                print(f"Error rolling back pooled connection: {e}")
+                self.discard(conn)
+
+    def discard(self, conn):
+        """Drop a broken connection so the next acquire opens a fresh one"""
+        if getattr(self._local, "conn", None) is conn:
+            self._local.conn = None
+            self._local.depth = 0
+        try:
+            conn.close_physical()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager that hands out a pooled connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every open connection (used on shutdown)"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.close_physical()
+            except Exception as e:
+                print(f"Error closing pooled connection: {e}")
+        self._local = threading.local()
+
+    def stats(self):
+        """Return pool usage counters"""
+        with self._lock:
+            open_connections = len(self._connections)
+            created = self._created
+            connect_time = self._connect_time
+        return {
+            "db_path": self.db_path,
+            "open_connections": open_connections,
+            "connections_created": created,
+            "acquisitions": self._acquired,
+            "reuses": self._reused,
+            "rollbacks_on_release": self._rollbacks,
+            "leaked_acquires": self._leaks,
+            "avg_connect_ms": round(connect_time / created * 1000, 3) if created else 0.0,
+        }
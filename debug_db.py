@@ -36,7 +36,7 @@ def check_database():
         print(f"Users in database: {len(users)}")
         for user_id, lang in users:
             # Перевірка таблиці користувача
-            cursor.execute(f"SELECT COUNT(*) FROM user_{user_id}")
+            cursor.execute("SELECT COUNT(*) FROM user_words WHERE chat_id = ?", (user_id,))
             user_word_count = cursor.fetchone()[0]
             print(f"  - User {user_id} ({lang}): {user_word_count} words")
             
@@ -63,12 +63,13 @@ def check_word_ratings(chat_id=None):
     
     if chat_id:
         # Перевірка рейтингів для конкретного користувача
-        cursor.execute(f"""
+        cursor.execute("""
         SELECT w.word, u.rating 
-        FROM user_{chat_id} u
+        FROM user_words u
         JOIN words w ON u.word_id = w.id
+        WHERE u.chat_id = ?
         ORDER BY u.rating DESC
-        """)
+        """, (chat_id,))
         ratings = cursor.fetchall()
         
         print(f"User {chat_id} has {len(ratings)} words with ratings")
@@ -99,26 +100,28 @@ def check_word_ratings(chat_id=None):
         
         # Показати 5 слів з найвищим рейтингом
         print("\nTop 5 highest-rated words:")
-        cursor.execute(f"""
+        cursor.execute("""
         SELECT w.word, u.rating 
-        FROM user_{chat_id} u
+        FROM user_words u
         JOIN words w ON u.word_id = w.id
+        WHERE u.chat_id = ?
         ORDER BY u.rating DESC
         LIMIT 5
-        """)
+        """, (chat_id,))
         top_words = cursor.fetchall()
         for word, rating in top_words:
             print(f"  {word}: {rating}")
         
         # Показати 5 слів з найнижчим рейтингом
         print("\nTop 5 lowest-rated words:")
-        cursor.execute(f"""
+        cursor.execute("""
         SELECT w.word, u.rating 
-        FROM user_{chat_id} u
+        FROM user_words u
         JOIN words w ON u.word_id = w.id
+        WHERE u.chat_id = ?
         ORDER BY u.rating ASC
         LIMIT 5
-        """)
+        """, (chat_id,))
         bottom_words = cursor.fetchall()
         for word, rating in bottom_words:
             print(f"  {word}: {rating}")
@@ -129,10 +132,11 @@ def check_word_ratings(chat_id=None):
         
         for user_id in users:
             try:
-                cursor.execute(f"""
+                cursor.execute("""
                 SELECT COUNT(*), AVG(rating) 
-                FROM user_{user_id}
-                """)
+                FROM user_words
+                WHERE chat_id = ?
+                """, (user_id,))
                 count, avg = cursor.fetchone()
                 print(f"User {user_id}: {count} words, average rating: {avg:.2f}")
             except Exception as e:
@@ -1,23 +1,18 @@
 # -*- coding: utf-8 -*-
-import os
-import time
-import json
+import logging
 from datetime import datetime
-import inspect
-import telebot
 from config import ADMIN_ID  # Додано імпорт ADMIN_ID
+from log_pipeline import get_logger
 
-# Create logs directory if it doesn't exist
-LOGS_DIR = "logs"
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-# Log file paths
-DEBUG_LOG = os.path.join(LOGS_DIR, "debug.log")
-ERROR_LOG = os.path.join(LOGS_DIR, "error.log")
-COMMAND_LOG = os.path.join(LOGS_DIR, "commands.log")
-USER_INPUT_LOG = os.path.join(LOGS_DIR, "user_inputs.log")
-NAVIGATION_LOG = os.path.join(LOGS_DIR, "navigation.log")
+# Записи йдуть у спільний конвеєр (log_pipeline): один запис замість
+# кількох файлів і print() на кожне повідомлення
+_command_log = get_logger("command")
+_update_log = get_logger("update")
+_response_log = get_logger("response")
+_navigation_log = get_logger("navigation")
+_error_log = get_logger("error")
+_debug_log = get_logger("debug")
+_action_log = get_logger("action")
 
 def get_timestamp():
     """Return formatted timestamp for logging"""
@@ -25,8 +20,6 @@ def get_timestamp():
 
 def log_message(message, response=None):
     """Log incoming message with user info and timestamp"""
-    timestamp = get_timestamp()
-    
     # Extract user information
     user_id = message.from_user.id if message.from_user else "Unknown"
     username = message.from_user.username if message.from_user and message.from_user.username else "No username"
@@ -40,7 +33,7 @@ def log_message(message, response=None):
     
     # Create log entry
     log_entry = {
-        "timestamp": timestamp,
+        "timestamp": get_timestamp(),
         "user_id": user_id,
         "username": username,
         "first_name": first_name,
@@ -49,34 +42,19 @@ def log_message(message, response=None):
         "chat_id": message.chat.id if hasattr(message, 'chat') else None
     }
     
-    # Convert to string for logging
-    log_str = f"[{timestamp}] User {user_id} ({username}/{first_name}) sent: '{content}'"
-    
-    # Special handling for commands
-    if is_command:
-        with open(COMMAND_LOG, 'a', encoding='utf-8') as f:
-            f.write(f"{log_str}\n")
-    
-    # Always log all user input messages (commands and regular messages)
-    with open(USER_INPUT_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"📩 INPUT: {log_str}")
+    # Commands and regular messages are separate categories (sampled independently)
+    logger = _command_log if is_command else _update_log
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("User %s (%s/%s) sent: '%s'", user_id, username, first_name, content,
+                    extra={"user_id": user_id, "chat_id": log_entry["chat_id"]})
     
     return log_entry
 
 def log_response(user_id, response_text, original_entry=None):
     """Log bot's response with timestamp"""
-    timestamp = get_timestamp()
-    
     # Create log entry
     log_entry = {
-        "timestamp": timestamp,
+        "timestamp": get_timestamp(),
         "response_to_user": user_id,
         "response_text": response_text
     }
@@ -85,42 +63,19 @@ def log_response(user_id, response_text, original_entry=None):
     if original_entry:
         log_entry["original_message"] = original_entry
     
-    # Convert to string for logging
-    log_str = f"[{timestamp}] Response to User {user_id}: '{response_text[:100]}{'...' if len(response_text) > 100 else ''}'"
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"📤 OUTPUT: {log_str}")
+    if _response_log.isEnabledFor(logging.INFO):
+        short_text = response_text[:100] + ('...' if len(response_text) > 100 else '')
+        _response_log.info("Response to User %s: '%s'", user_id, short_text, extra={"chat_id": user_id})
     
     return log_entry
 
 def log_navigation(chat_id, from_section, to_section, via_button=None):
     """Log user navigation between sections"""
-    timestamp = get_timestamp()
-    
-    # Create log entry
-    log_str = f"[{timestamp}] NAVIGATION: User {chat_id} moved from '{from_section}' to '{to_section}'"
-    if via_button:
-        log_str += f" via button '{via_button}'"
-    
-    # Write to navigation log
-    with open(NAVIGATION_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"🧭 {log_str}")
+    _navigation_log.info("User %s moved from '%s' to '%s'%s", chat_id, from_section, to_section,
+                         f" via button '{via_button}'" if via_button else "", extra={"chat_id": chat_id})
 
 def log_callback(call):
     """Log callback query (button click) with user info and timestamp"""
-    timestamp = get_timestamp()
-    
     # Extract user information
     user_id = call.from_user.id if call.from_user else "Unknown"
     username = call.from_user.username if call.from_user and call.from_user.username else "No username"
@@ -129,87 +84,34 @@ def log_callback(call):
     # Get callback data
     callback_data = call.data if hasattr(call, 'data') else "No data"
     
-    # Create log entry
-    log_str = f"[{timestamp}] User {user_id} ({username}/{first_name}) clicked button: '{callback_data}'"
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Write to navigation log
-    with open(NAVIGATION_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"🔘 BUTTON: {log_str}")
+    _navigation_log.info("User %s (%s/%s) clicked button: '%s'", user_id, username, first_name, callback_data,
+                         extra={"user_id": user_id})
 
 def log_error(error, context=None):
     """Log errors with timestamp and context"""
-    timestamp = get_timestamp()
-    
     # Create log entry
     log_entry = {
-        "timestamp": timestamp,
+        "timestamp": get_timestamp(),
         "error": str(error),
         "context": context
     }
     
-    # Convert to string for logging
-    log_str = f"[{timestamp}] ERROR: {str(error)}"
-    if context:
-        log_str += f" | Context: {context}"
-    
-    # Write to error log
-    with open(ERROR_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Write to debug log as well
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"❌ {log_str}")
+    _error_log.error("%s%s", error, f" | Context: {context}" if context else "", extra={"context": context})
     
     return log_entry
 
 def log_dict_operation(chat_id, operation, dict_type, path, success=True):
     """Log dictionary operations with more detail"""
-    timestamp = get_timestamp()
-    
     is_admin = chat_id == ADMIN_ID
     admin_text = " (ADMIN)" if is_admin else ""
     
-    # Create log entry
-    log_str = f"[{timestamp}] Dictionary {operation}: User {chat_id}{admin_text} {operation} {dict_type} dictionary at {path}"
-    if not success:
-        log_str += " (FAILED)"
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"📚 {log_str}")
+    _debug_log.debug("Dictionary %s: User %s%s %s %s dictionary at %s%s", operation, chat_id, admin_text,
+                     operation, dict_type, path, "" if success else " (FAILED)", extra={"chat_id": chat_id})
 
 def log_section_change(chat_id, section_name, additional_info=None):
     """Log when a user enters a specific section of the bot"""
-    timestamp = get_timestamp()
-    
-    # Create log entry
-    log_str = f"[{timestamp}] SECTION: User {chat_id} entered section '{section_name}'"
-    if additional_info:
-        log_str += f" | {additional_info}"
-    
-    # Write to navigation log
-    with open(NAVIGATION_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(f"📋 {log_str}")
+    _navigation_log.info("User %s entered section '%s'%s", chat_id, section_name,
+                         f" | {additional_info}" if additional_info else "", extra={"chat_id": chat_id})
 
 # Create a decorator for message handlers that adds logging
 def log_handler(func):
@@ -229,11 +131,9 @@ def log_handler(func):
 # Add this function for scheduler logging
 def log_action(action_name, data=None, user_info=None):
     """Log an action with optional data and user info"""
-    timestamp = get_timestamp()
-    
     # Create log entry
     log_entry = {
-        "timestamp": timestamp,
+        "timestamp": get_timestamp(),
         "action": action_name
     }
     
@@ -243,15 +143,7 @@ def log_action(action_name, data=None, user_info=None):
     if user_info:
         log_entry["user"] = user_info
     
-    # Convert to string for logging
-    log_str = f"[{timestamp}] [INFO] Action '{action_name}' | {json.dumps(log_entry)}"
-    
-    # Write to debug log
-    with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{log_str}\n")
-    
-    # Print to console for immediate feedback
-    print(log_str)
+    _action_log.info("Action '%s'", action_name, extra={"data": data, "user": user_info})
     
     return log_entry
 
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+"""
+Кеш колод слів (DataFrame) для ігрових режимів.
+
+Ключ - (chat_id, dict_type, shared_dict_id, language, variant), де variant
+розрізняє повний словник ("all") і слова з артиклями ("articles").
+Записи витісняються за LRU, TTL та загальним обмеженням пам'яті.
+db_manager інвалідовує записи при зміні слів і точково оновлює рейтинг
+у кешованих колодах, щоб наступний раунд не перечитував весь словник.
+Для зваженого вибору слів кожна колода тримає FenwickSampler (word_sampler).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from word_sampler import FenwickSampler, rating_weight, sample_frame
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL = 300                    # seconds
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class _Deck:
+    __slots__ = ("df", "size", "expires_at", "sampler", "positions")
+
+    def __init__(self, df, size, expires_at):
+        self.df = df
+        self.size = size
+        self.expires_at = expires_at
+        self.sampler = None     # built lazily on the first weighted draw
+        self.positions = None   # word id -> row position, built lazily
+
+
+class DeckCache:
+    """Thread-safe LRU/TTL cache of word DataFrames with a memory ceiling"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._decks = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._patched_rows = 0
+        # Bumped on every write so a deck loaded during a write is not cached stale
+        self._generation = 0
+
+    @staticmethod
+    def make_key(chat_id, dict_type, shared_dict_id, language, variant="all"):
+        if dict_type != "shared":
+            shared_dict_id = None
+        return (chat_id, dict_type, shared_dict_id, language, variant)
+
+    def _lookup(self, key):
+        """Return the live deck for key (counting hit/miss), dropping it if expired"""
+        deck = self._decks.get(key)
+        if deck is None:
+            self._misses += 1
+            return None
+        if deck.expires_at < time.monotonic():
+            self._drop(key)
+            self._misses += 1
+            return None
+        self._decks.move_to_end(key)
+        self._hits += 1
+        return deck
+
+    def get(self, key):
+        """Return a private copy of the cached deck or None"""
+        with self._lock:
+            deck = self._lookup(key)
+            if deck is None:
+                return None
+            df = deck.df
+        # Callers change priorities/columns in place, so never hand out the cached frame
+        return df.copy()
+
+    def sample(self, key, k=1):
+        """Draw k distinct rows weighted by priority, or None if the deck is not cached"""
+        with self._lock:
+            deck = self._lookup(key)
+            if deck is None:
+                return None
+            df = deck.df
+            if deck.sampler is None:
+                if "priority" in df.columns:
+                    deck.sampler = FenwickSampler.from_ratings(df["priority"].to_numpy())
+                else:
+                    deck.sampler = FenwickSampler([1.0] * len(df))
+            positions = deck.sampler.sample(k)
+            return df.iloc[positions].copy()
+
+    @staticmethod
+    def _positions(deck):
+        if deck.positions is None:
+            ids = deck.df["id"].tolist() if "id" in deck.df.columns else []
+            deck.positions = {word_id: pos for pos, word_id in enumerate(ids)}
+        return deck.positions
+
+    def word_ids(self, key):
+        """Return the set-like view of word IDs in the cached deck, or None if not cached"""
+        with self._lock:
+            deck = self._lookup(key)
+            if deck is None:
+                return None
+            return self._positions(deck).keys()
+
+    def rows_by_ids(self, key, word_ids):
+        """Return cached rows for the given word IDs (in that order), or None if not cached"""
+        with self._lock:
+            deck = self._lookup(key)
+            if deck is None:
+                return None
+            positions = self._positions(deck)
+            return deck.df.iloc[[positions[w] for w in word_ids if w in positions]].copy()
+
+    def sample_or_load(self, key, loader, k=1, first_ids=None):
+        """
+        Weighted draw from the cached deck, loading it with loader() on a miss.
+
+        Rows for `first_ids` (e.g. words due for review) that are in the deck
+        come first; the rest of the k rows are drawn by weight. first_ids may
+        also be a callable that takes the deck's word IDs and returns the list.
+        """
+        rows = self._sample_with_ids(key, k, first_ids)
+        if rows is not None:
+            return rows
+        df = self.get_or_load(key, loader)
+        if df is None or df.empty:
+            return df
+        rows = self._sample_with_ids(key, k, first_ids)
+        if rows is None:
+            # Deck was not cacheable (e.g. raced with a write) - draw from the loaded copy
+            rows = sample_frame(df, k)
+        return rows
+
+    def _sample_with_ids(self, key, k, first_ids):
+        if callable(first_ids):
+            deck_ids = self.word_ids(key)
+            if deck_ids is None:
+                return None
+            first_ids = first_ids(deck_ids)
+        if not first_ids:
+            return self.sample(key, k)
+        first = self.rows_by_ids(key, first_ids[:k])
+        if first is None:
+            return None
+        if len(first) >= k:
+            return first
+        # Draw a few extra rows so duplicates of the due words can be dropped
+        rest = self.sample(key, k + len(first))
+        if rest is None:
+            return first
+        rest = rest[~rest["id"].isin(first["id"])].head(k - len(first))
+        return pd.concat([first, rest])
+
+    def put(self, key, df, generation=None):
+        """Store a copy of df under key and enforce the size limits"""
+        if df is None or (generation is not None and generation != self._generation):
+            return
+        stored = df.copy()
+        try:
+            size = int(stored.memory_usage(index=True, deep=True).sum())
+        except Exception:
+            size = 0
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._decks:
+                self._drop(key)
+            self._decks[key] = _Deck(stored, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._decks and (len(self._decks) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._decks))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached deck or call loader() and cache its result"""
+        df = self.get(key)
+        if df is not None:
+            return df
+        generation = self._generation
+        df = loader()
+        # Empty decks are cheap to reload and may come from a failed query, so skip them
+        if df is not None and not df.empty:
+            self.put(key, df, generation)
+        return df
+
+    def invalidate(self, chat_id=None, dict_type=None, shared_dict_id=None):
+        """Drop every deck that matches all given (non-None) fields; no filters clears the cache"""
+        with self._lock:
+            self._generation += 1
+            if chat_id is None and dict_type is None and shared_dict_id is None:
+                dropped = len(self._decks)
+                self._decks.clear()
+                self._bytes = 0
+            else:
+                keys = [
+                    key for key in self._decks
+                    if (chat_id is None or key[0] == chat_id)
+                    and (dict_type is None or key[1] == dict_type)
+                    and (shared_dict_id is None or key[2] == shared_dict_id)
+                ]
+                for key in keys:
+                    self._drop(key)
+                dropped = len(keys)
+            self._invalidations += dropped
+            return dropped
+
+    def update_priority(self, chat_id, word_id, priority, dict_type=None, shared_dict_id=None):
+        """Patch one word's priority in the user's cached decks instead of reloading them"""
+        with self._lock:
+            self._generation += 1
+            patched = 0
+            for key, deck in self._decks.items():
+                if key[0] != chat_id:
+                    continue
+                if dict_type is not None and key[1] != dict_type:
+                    continue
+                if shared_dict_id is not None and key[2] != shared_dict_id:
+                    continue
+                df = deck.df
+                if df.empty or "id" not in df.columns or "priority" not in df.columns:
+                    continue
+                mask = (df["id"] == word_id).to_numpy()
+                if mask.any():
+                    df.loc[mask, "priority"] = priority
+                    patched += int(mask.sum())
+                    if deck.sampler is not None:
+                        for position in mask.nonzero()[0]:
+                            deck.sampler.update(int(position), rating_weight(priority))
+            self._patched_rows += patched
+            return patched
+
+    def _drop(self, key):
+        deck = self._decks.pop(key, None)
+        if deck is not None:
+            self._bytes -= deck.size
+
+    def stats(self):
+        """Return cache usage counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._decks),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "patched_rows": self._patched_rows,
+            }
@@ -24,38 +24,6 @@ def save_word(chat_id, manual_translation=None):
     if dict_type == "common" and chat_id != ADMIN_ID:
         return False
     
-    if dict_type == "personal":
-        from storage import get_dataframe, save_dataframe, get_user_file_path
-        
-        file_path, language = get_user_file_path(chat_id)
-        try:
-            df = get_dataframe(chat_id)
-            
-            # Перевірка та виправлення структури DataFrame
-            if 'word' not in df.columns:
-                df['word'] = ""
-            if 'translation' not in df.columns:
-                df['translation'] = ""
-            if 'priority' not in df.columns:
-                df['priority'] = 0.0
-            
-            # Check if word already exists
-            if not df[df['word'] == word].empty:
-                return False
-            
-            # Add new word
-            df.loc[len(df)] = {
-                'word': word, 
-                'translation': translation, 
-                'priority': 0.0
-            }
-            
-            save_dataframe(chat_id, df, language)
-            return True
-        except Exception as e:
-            print(f"Error saving word to personal dictionary: {e}")
-            return False
-    
     # Пошук артикля у базі німецьких слів
     article, clean_word = find_german_article(word)
     print(f"Debug: Article finder returned article='{article}', clean_word='{clean_word}' for '{word}'")
@@ -78,60 +46,58 @@ def save_word(chat_id, manual_translation=None):
             article_to_save = None
     
     # Перевірка, чи слово вже існує в словнику користувача
-    conn = db_manager.get_connection()
-    cursor = conn.cursor()
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
     
-    exists_in_personal = False
+        exists_in_personal = False
     
-    if dict_type == "personal":
-        # Перевіряємо, чи слово вже є в словнику користувача
-        try:
-            cursor.execute(f"""
-                SELECT 1 FROM words w
-                JOIN user_{chat_id} u ON w.id = u.word_id
-                WHERE LOWER(w.word) = LOWER(?)
-            """, (word_to_save,))
-            exists_in_personal = cursor.fetchone() is not None
-        except Exception as e:
-            print(f"Error checking if word exists: {e}")
+        if dict_type == "personal":
+            # Перевіряємо, чи слово вже є в словнику користувача
+            try:
+                cursor.execute("""
+                    SELECT 1 FROM words w
+                    JOIN user_words u ON w.id = u.word_id
+                    WHERE u.chat_id = ? AND LOWER(w.word) = LOWER(?)
+                """, (chat_id, word_to_save))
+                exists_in_personal = cursor.fetchone() is not None
+            except Exception as e:
+                print(f"Error checking if word exists: {e}")
     
-    conn.close()
     
-    # Зберігаємо слово в базу даних із можливим артиклем
-    success = db_manager.add_word(chat_id, word_to_save, translation, dict_type, article_to_save)
+        # Зберігаємо слово в базу даних із можливим артиклем
+        success = db_manager.add_word(chat_id, word_to_save, translation, dict_type, article_to_save)
     
-    if success:
-        # Формуємо повідомлення в залежності від наявності артикля та існування слова
-        if exists_in_personal:
-            if article_to_save:
-                message = f"✅ Слово '{article_to_save} {word_to_save}' оновлено у вашому словнику!"
+        if success:
+            # Формуємо повідомлення в залежності від наявності артикля та існування слова
+            if exists_in_personal:
+                if article_to_save:
+                    message = f"✅ Слово '{article_to_save} {word_to_save}' оновлено у вашому словнику!"
+                else:
+                    message = f"✅ Слово '{word_to_save}' оновлено у вашому словнику!"
             else:
-                message = f"✅ Слово '{word_to_save}' оновлено у вашому словнику!"
-        else:
-            if article_to_save:
-                message = f"✅ Слово '{article_to_save} {word_to_save}' успішно додано!"
-            else:
-                message = f"✅ Слово '{word_to_save}' успішно додано!"
+                if article_to_save:
+                    message = f"✅ Слово '{article_to_save} {word_to_save}' успішно додано!"
+                else:
+                    message = f"✅ Слово '{word_to_save}' успішно додано!"
             
-        bot.send_message(
-            chat_id, 
-            message, 
-            reply_markup=main_menu_keyboard(chat_id)
-        )
-    else:
-        bot.send_message(
-            chat_id, 
-            "❌ Помилка при збереженні слова.", 
-            reply_markup=main_menu_keyboard(chat_id)
-        )
+            bot.send_message(
+                chat_id, 
+                message, 
+                reply_markup=main_menu_keyboard(chat_id)
+            )
+        else:
+            bot.send_message(
+                chat_id, 
+                "❌ Помилка при збереженні слова.", 
+                reply_markup=main_menu_keyboard(chat_id)
+            )
     
-    # Очищаємо стан користувача, зберігаючи тип словника для адміна
-    preserve_dict_type = (chat_id == ADMIN_ID and dict_type == "common")
-    clear_state(chat_id, preserve_dict_type=preserve_dict_type)
+        # Очищаємо стан користувача, зберігаючи тип словника для адміна
+        preserve_dict_type = (chat_id == ADMIN_ID and dict_type == "common")
+        clear_state(chat_id, preserve_dict_type=preserve_dict_type)
 
 def start_activity(chat_id, mode, exclude_max_rating=False):
     """Start learning or repetition activity"""
-    from storage import get_dataframe, save_dataframe, get_user_file_path
     import db_manager
     
     # Оновлений імпорт - з easy_level замість core
@@ -151,7 +117,7 @@ def start_activity(chat_id, mode, exclude_max_rating=False):
         if dict_type == "shared" and shared_dict_id:
             df = db_manager.get_shared_dictionary_words(chat_id, shared_dict_id)
         else:
-            df = get_dataframe(chat_id, dict_type)
+            df = db_manager.get_user_words(chat_id, dict_type)
         
         # Check result
         if df is None or df.empty:
@@ -217,6 +183,7 @@ def set_dictionary_type(chat_id, dict_type):
         if dict_type == "personal":
             cursor.execute("UPDATE users SET dict_type = 'personal', shared_dict_id = NULL WHERE chat_id = ?", (chat_id,))
             conn.commit()
+            db_manager.invalidate_user_profile(chat_id)
             
             message = get_text("switched_to_personal_dict", chat_id)
             bot.send_message(chat_id, message, reply_markup=main_menu_keyboard(chat_id))
@@ -286,13 +253,12 @@ def get_current_dictionary_display(chat_id):
     
     if dict_type == "shared" and shared_dict_id:
         # Get shared dictionary name
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
-        result = cursor.fetchone()
-        dict_name = result[0] if result else get_text("shared_dictionary", chat_id)
-        conn.close()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
+            result = cursor.fetchone()
+            dict_name = result[0] if result else get_text("shared_dictionary", chat_id)
         
-        return get_text("current_shared_dict_display", chat_id).format(dict_name=dict_name)
+            return get_text("current_shared_dict_display", chat_id).format(dict_name=dict_name)
     else:
         return get_text("current_personal_dict_display", chat_id)
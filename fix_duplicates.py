@@ -71,28 +71,22 @@ def find_word_duplicates():
             
             print(f"  Keeping entry {choice_idx+1} (ID={primary_id}) and merging {len(duplicate_ids)} duplicates...")
             
-            # Оновлюємо посилання на слово в таблицях користувачів
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'user_%'")
-            user_tables = [table[0] for table in cursor.fetchall()]
-            
-            for table in user_tables:
-                for dup_id in duplicate_ids:
-                    # Перевіряємо чи користувач має дублікат
-                    cursor.execute(f"SELECT 1 FROM {table} WHERE word_id = ?", (dup_id,))
-                    if cursor.fetchone():
-                        # Перевіряємо чи користувач вже має основне слово
-                        cursor.execute(f"SELECT 1 FROM {table} WHERE word_id = ?", (primary_id,))
-                        has_primary = cursor.fetchone() is not None
-                        
-                        if has_primary:
-                            # Видаляємо дублікат, основне слово вже є
-                            cursor.execute(f"DELETE FROM {table} WHERE word_id = ?", (dup_id,))
-                            print(f"    Deleted duplicate {dup_id} from {table}, already has primary word")
-                        else:
-                            # Оновлюємо word_id з дубліката на основне слово
-                            cursor.execute(f"UPDATE {table} SET word_id = ? WHERE word_id = ?", 
-                                         (primary_id, dup_id))
-                            print(f"    Updated in {table}: word_id {dup_id} -> {primary_id}")
+            # Оновлюємо посилання на слово в персональних словниках (user_words),
+            # окремо для кожного користувача (chat_id)
+            for dup_id in duplicate_ids:
+                # Користувачі, які вже мають основне слово - дублікат просто видаляємо
+                cursor.execute("""
+                DELETE FROM user_words
+                WHERE word_id = ?
+                  AND chat_id IN (SELECT chat_id FROM user_words WHERE word_id = ?)
+                """, (dup_id, primary_id))
+                if cursor.rowcount:
+                    print(f"    Deleted duplicate {dup_id} for {cursor.rowcount} users who already have the primary word")
+                
+                # Решта користувачів отримує основне слово замість дубліката
+                cursor.execute("UPDATE user_words SET word_id = ? WHERE word_id = ?", (primary_id, dup_id))
+                if cursor.rowcount:
+                    print(f"    Updated user_words for {cursor.rowcount} users: word_id {dup_id} -> {primary_id}")
             
             # Видаляємо дублікати з таблиці words
             for dup_id in duplicate_ids:
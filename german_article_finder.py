@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
-import sqlite3
+
+from query_profiler import profiler
 
 # Шлях до бази даних німецьких іменників
 NOUNS_DB_PATH = os.path.join('assets', 'sqlite', 'nouns.sqlite')
@@ -41,7 +42,7 @@ def find_german_article(word):
     
     try:
         # Підключаємося до бази даних
-        conn = sqlite3.connect(NOUNS_DB_PATH)
+        conn = profiler.connect(NOUNS_DB_PATH)
         cursor = conn.cursor()
         
         # Шукаємо спочатку в таблиці declensions (це основна таблиця іменників) для однини
@@ -132,7 +133,7 @@ def get_completions(prefix, limit=10):
     
     results = []
     try:
-        conn = sqlite3.connect(NOUNS_DB_PATH)
+        conn = profiler.connect(NOUNS_DB_PATH)
         cursor = conn.cursor()
         
         # Шукаємо у таблиці declensions
@@ -6,19 +6,18 @@ Handlers for adding new words to user's dictionary.
 
 import telebot
 import db_manager
-from config import bot, user_state, translator
+from config import bot, user_state
 from utils.language_utils import get_text
+from utils.command_router import on
 from utils import clear_state, main_menu_keyboard, main_menu_cancel
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input
 from utils.state_helpers import save_message_id
-import asyncio
 from german_article_finder import find_german_article  # Added for German article lookup
-from googletrans import Translator  # Added for synchronous translation fallback
 
 # Import the functions that were previously undefined
 from utils.input_handlers import is_menu_navigation_command, handle_exit_from_activity
 
-@bot.message_handler(func=lambda message: message.text.strip() == "➕ Додати нове слово" or message.text == get_text("add_new_word", message.chat.id))
+@bot.message_handler(func=on("add_new_word", aliases=["➕ Додати нове слово"]))
 def add_word_started(message):
     try:
         chat_id = message.chat.id
@@ -106,10 +105,11 @@ def process_word_input(message):
                 bot.send_message(chat_id, get_text("language_not_selected", chat_id, "❌ Translation language not selected. Try /start."))
                 return            # Translate from German to user's language
             try:
-                # Create a new translator instance to avoid async issues
-                sync_translator = Translator()
-                translation_result = asyncio.run(sync_translator.translate(word_to_add, src='de', dest=language))
-                translation = translation_result.text
+                # Shared client + translation cache instead of a new Translator per word
+                from translation_service import translate
+                translation = translate(word_to_add, src='de', dest=language)
+                if not translation:
+                    raise ValueError("no translation returned")
             except Exception as e:
                 print(f"Translation error: {e}")
                 bot.send_message(chat_id, get_text("translation_failed", chat_id, "Не вдалося перекласти слово. Спробуйте ще раз."))
@@ -248,13 +248,12 @@ def process_translation_confirm(message, word_to_add, translation_to_add, articl
                             # Try to get shared dictionary name for a more informative message
                             dict_name_for_msg = shared_add_message # Default to code/message from add_word_to_shared_dictionary
                             try:
-                                conn = db_manager.get_connection()
-                                cursor = conn.cursor()
-                                cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
-                                name_res = cursor.fetchone()
-                                if name_res:
-                                    dict_name_for_msg = f"«{name_res[0]}»"
-                                conn.close()
+                                with db_manager.connection() as conn:
+                                    cursor = conn.cursor()
+                                    cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
+                                    name_res = cursor.fetchone()
+                                    if name_res:
+                                        dict_name_for_msg = f"«{name_res[0]}»"
                             except Exception: # pylint: disable=broad-except
                                 pass # Ignore error, use default message
                         
@@ -11,9 +11,11 @@ def test_fire(message):
     """Test the reminder functionality by manually triggering it"""
     if message.from_user.id == ADMIN_ID:
         try:
+            import time
             from scheduler import send_reminder
-            send_reminder()
-            bot.reply_to(message, "Нагадування відправлено всім неактивним користувачам!")
+            # Окремий запуск з власним прогресом; розсилка йде у фоні APScheduler
+            scheduler.add_job(send_reminder, args=[f"manual-{int(time.time())}"])
+            bot.reply_to(message, "Розсилку нагадувань запущено, прогрес у /dbstats.")
         except Exception as e:
             print(f"Помилка в /fire: {e}")
             bot.reply_to(message, f"Помилка: {str(e)}")
@@ -28,3 +30,105 @@ def stop_bot(message):
         scheduler.shutdown(wait=False)
         print("Бот зупинено!")
         exit(0)
+
+@bot.message_handler(commands=['dbstats'])
+def show_db_stats(message):
+    """Show database pool, deck cache, rating queue and translation statistics (admin only)"""
+    if message.from_user.id != ADMIN_ID:
+        return
+    import db_manager
+    stats = db_manager.get_pool_stats()
+    lines = ["🗄 DB pool:"]
+    for key, value in stats.items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("🃏 Deck cache:")
+    for key, value in db_manager.get_deck_cache_stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("👤 User profiles:")
+    for key, value in db_manager.get_user_profile_stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("💾 Sessions:")
+    from config import user_state
+    for key, value in user_state.stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("🧵 Work scheduler:")
+    from config import work_scheduler
+    for key, value in work_scheduler.stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("📤 Outbound queue:")
+    from config import outbound
+    for key, value in outbound.stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("⏰ Reminders:")
+    from scheduler import reminders
+    for key, value in {**reminders.stats(), **reminders.schedule_stats()}.items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("✍️ Rating write queue:")
+    for key, value in db_manager.get_rating_queue_stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("🔁 Translation backfill:")
+    for key, value in db_manager.get_translation_backfill_stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("📝 Logging:")
+    import log_pipeline
+    for key, value in log_pipeline.get_pipeline().stats().items():
+        lines.append(f"• {key}: {value}")
+    lines.append("")
+    lines.append("🌐 Translation cache:")
+    from translation_cache import get_translation_cache_stats
+    for key, value in get_translation_cache_stats().items():
+        lines.append(f"• {key}: {value}")
+    bot.reply_to(message, "\n".join(lines))
+
+@bot.message_handler(commands=['perf'])
+def show_perf(message):
+    """Show the slowest handlers by p99 plus DB and Telegram API latency (admin only)"""
+    if message.from_user.id != ADMIN_ID:
+        return
+    import metrics
+    sections = (
+        ("🐢 Slow handlers", metrics.slow_handlers(limit=10)),
+        ("🗄 execute_query", metrics.latency_rows(metrics.db_query_seconds, metrics.db_query_errors)),
+        ("📡 Telegram API", metrics.latency_rows(metrics.api_seconds, metrics.api_errors)),
+    )
+    lines = []
+    for title, rows in sections:
+        if lines:
+            lines.append("")
+        lines.append(f"{title} (p99 / p50 / mean, ms):")
+        if not rows:
+            lines.append("• no calls yet")
+        for name, calls, errors, mean, p50, p99 in rows:
+            lines.append(f"• {name}: {p99 * 1000:.1f} / {p50 * 1000:.1f} / {mean * 1000:.1f} "
+                         f"({calls} calls, {errors} errors)")
+    bot.reply_to(message, "\n".join(lines))
+
+@bot.message_handler(commands=['queries'])
+def show_slow_queries(message):
+    """Show the SQL fingerprints with the most time, their p50/p99 and query plans (admin only)
+
+    /queries [total|p99|count] [N], /queries reset
+    """
+    if message.from_user.id != ADMIN_ID:
+        return
+    from db_manager import query_profiler
+    from query_profiler import format_report
+    arguments = (message.text or "").split()[1:]
+    if arguments[:1] == ["reset"]:
+        query_profiler.reset()
+        bot.reply_to(message, "SQL profile cleared.")
+        return
+    order = next((argument for argument in arguments if argument in ("total", "p99", "count")), "total")
+    limit = next((int(argument) for argument in arguments if argument.isdigit()), 8)
+    text = format_report(query_profiler.report(limit=limit, order=order), limit)
+    # Telegram message limit
+    bot.reply_to(message, text[:4000])
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Асинхронні версії обробників навігації для BOT_RUNTIME=async.
+
+Кожна корутина замінює синхронний обробник (runtime.replaces) і
+використовує ту саму підготовку меню (prepare_main_menu,
+prepare_difficulty_menu); відрізняється лише тим, що БД читається на
+потоках AsyncDB, а повідомлення видаляються й надсилаються через
+AsyncTeleBot.
+"""
+
+import asyncio
+
+from config import user_state
+from utils import clear_state, state_message_ids
+from utils.console_logger import log_menu_transition, MENU_MAIN
+from utils.state_helpers import save_message_id
+from handlers.dictionaries import prepare_difficulty_menu, set_difficulty_level as sync_set_difficulty_level
+from handlers.main_menu import prepare_main_menu, return_to_main_menu as sync_return_to_main_menu
+
+
+async def _delete_messages(abot, chat_id, message_ids):
+    # Silently ignore message deletion errors, as clear_state() does
+    await asyncio.gather(
+        *(abot.delete_message(chat_id, message_id) for message_id in message_ids),
+        return_exceptions=True)
+
+
+async def clear_state_async(abot, chat_id, **kwargs):
+    """clear_state() that deletes the old messages through the async bot"""
+    message_ids = state_message_ids(chat_id)
+    clear_state(chat_id, preserve_messages=True, **kwargs)
+    if message_ids:
+        await _delete_messages(abot, chat_id, message_ids)
+
+
+def register(runtime):
+    """Register the native handlers on runtime.bot"""
+    abot = runtime.bot
+
+    @runtime.replaces(sync_set_difficulty_level)
+    async def set_difficulty_level(message):
+        chat_id = message.chat.id
+        await runtime.db.prefetch(chat_id)
+
+        # Зберігаємо тип словника, але видаляємо повідомлення активності
+        await clear_state_async(abot, chat_id, preserve_dict_type=True)
+
+        message_text, keyboard = prepare_difficulty_menu(message)
+        sent_message = await abot.send_message(chat_id, message_text, reply_markup=keyboard)
+        save_message_id(chat_id, sent_message.message_id)
+
+    @runtime.replaces(sync_return_to_main_menu)
+    async def return_to_main_menu(message):
+        chat_id = message.chat.id
+        await runtime.db.prefetch(chat_id)
+
+        from_menu = user_state.get(chat_id, {}).get("current_menu", "UNKNOWN")
+        log_menu_transition(chat_id, from_menu, MENU_MAIN, "Action: Return to main menu")
+
+        # Очищаем состояние, сохраняя тип словаря
+        await clear_state_async(abot, chat_id, preserve_dict_type=True)
+        if chat_id in user_state:
+            user_state[chat_id]["current_menu"] = "main"
+        else:
+            user_state[chat_id] = {"current_menu": "main"}
+
+        # Синхронізація словника з БД - на потоці БД
+        menu_message, keyboard = await runtime.db.run(prepare_main_menu, chat_id)
+        sent_message = await abot.send_message(chat_id, menu_message, reply_markup=keyboard)
+        save_message_id(chat_id, sent_message.message_id)
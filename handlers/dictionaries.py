@@ -7,19 +7,16 @@
 from config import bot, user_state, ADMIN_ID
 from utils import main_menu_keyboard, clear_state, easy_level_keyboard, medium_level_keyboard, hard_level_keyboard
 from utils.keyboards import shared_dictionary_keyboard
+from utils.keyboard_cache import button_texts as keyboard_button_texts
 from utils.state_helpers import save_message_id
 import db_manager
 from utils.language_utils import get_text
+from utils.command_router import on, matches
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input
 from utils.console_logger import log_menu_transition, log_displayed_buttons, MENU_MAIN, MENU_EASY, MENU_MEDIUM, MENU_HARD, MENU_SHARED
 
 # Універсальний обробник для встановлення рівня складності
-@bot.message_handler(func=lambda message: message.text in [
-    "🟢 Легкий рівень", "🟠 Середній рівень", "🔴 Складний рівень", 
-    get_text("easy_level", message.chat.id), 
-    get_text("medium_level", message.chat.id), 
-    get_text("hard_level", message.chat.id)
-])
+@bot.message_handler(func=on("easy_level", "medium_level", "hard_level"))
 def set_difficulty_level(message):
     """Set difficulty level based on button pressed"""
     chat_id = message.chat.id
@@ -27,14 +24,32 @@ def set_difficulty_level(message):
     # Зберігаємо тип словника, але видаляємо повідомлення активності
     clear_state(chat_id, preserve_dict_type=True, preserve_messages=False)
     
+    message_text, keyboard = prepare_difficulty_menu(message)
+    
+    # Відправляємо меню відповідного рівня
+    sent_message = bot.send_message(
+        chat_id, 
+        message_text, 
+        reply_markup=keyboard
+    )
+    save_message_id(chat_id, sent_message.message_id)
+
+def prepare_difficulty_menu(message):
+    """Update the user's level in state and return (text, keyboard) of the level menu.
+    
+    Shared with the asyncio runtime (handlers/async_navigation.py), which only
+    differs in how the old messages are deleted and the menu is sent.
+    """
+    chat_id = message.chat.id
+    
     # Визначаємо рівень та клавіатуру в залежності від кнопки
-    if message.text in ["🟢 Легкий рівень", get_text("easy_level", chat_id)]:
+    if matches(message, "easy_level"):
         level = "easy"
         menu_type = MENU_EASY
         keyboard = easy_level_keyboard(chat_id)  # Передаємо chat_id для локалізації
         message_text = get_text("easy_level_select_activity", chat_id)
         log_menu_transition(chat_id, user_state.get(chat_id, {}).get("current_menu", "UNKNOWN"), MENU_EASY, f"Button: {message.text}")
-    elif message.text in ["🟠 Середній рівень", get_text("medium_level", chat_id)]:
+    elif matches(message, "medium_level"):
         level = "medium"
         menu_type = MENU_MEDIUM
         keyboard = medium_level_keyboard(chat_id)  # Передаємо chat_id для локалізації
@@ -67,15 +82,9 @@ def set_difficulty_level(message):
         user_state[chat_id]["shared_dict_id"] = shared_dict_id
         
     # Safely extract button texts for logging
+    button_texts = None
     try:
-        button_texts = []
-        if hasattr(keyboard, 'keyboard'):
-            for row in keyboard.keyboard:
-                for button in row:
-                    if hasattr(button, 'text'):
-                        button_texts.append(button.text)
-                    elif isinstance(button, dict) and 'text' in button:
-                        button_texts.append(button['text'])
+        button_texts = keyboard_button_texts(keyboard)
     except Exception as e:
         print(f"Error extracting button texts: {e}")
     
@@ -85,34 +94,28 @@ def set_difficulty_level(message):
     else:
         print(f"Warning: Could not extract button texts for user {chat_id} in {menu_type} menu")
     
-    # Відправляємо меню відповідного рівня
-    sent_message = bot.send_message(
-        chat_id, 
-        message_text, 
-        reply_markup=keyboard
-    )
-    save_message_id(chat_id, sent_message.message_id)
+    return message_text, keyboard
 
-@bot.message_handler(func=lambda message: message.text.startswith("👤") or message.text == get_text("personal_dictionary", message.chat.id))
+@bot.message_handler(func=lambda message: message.text.startswith("👤") or matches(message, "personal_dictionary"))
 def personal_dictionary_handler(message):
     """Handle switching to the personal dictionary."""
     chat_id = message.chat.id
     
     # Switch to Personal Dictionary
-    conn = db_manager.get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE users SET dict_type = ?, shared_dict_id = ? WHERE chat_id = ?", ('personal', None, chat_id))
-    conn.commit()
-    conn.close()
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET dict_type = ?, shared_dict_id = ? WHERE chat_id = ?", ('personal', None, chat_id))
+        conn.commit()
+        db_manager.invalidate_user_profile(chat_id)
 
-    db_manager.sync_user_state_with_db(chat_id)
+        db_manager.sync_user_state_with_db(chat_id)
     
-    log_menu_transition(chat_id, user_state.get(chat_id, {}).get("current_menu", "UNKNOWN"), MENU_MAIN, "Switched to personal dictionary")
+        log_menu_transition(chat_id, user_state.get(chat_id, {}).get("current_menu", "UNKNOWN"), MENU_MAIN, "Switched to personal dictionary")
 
-    from .main_menu import return_to_main_menu
-    return_to_main_menu(message)
+        from .main_menu import return_to_main_menu
+        return_to_main_menu(message)
 
-@bot.message_handler(func=lambda message: message.text == get_text("edit_word", message.chat.id) or message.text == "✏️ Редаггувати слово")
+@bot.message_handler(func=on("edit_word", aliases=["✏️ Редаггувати слово"]))
 def edit_word_menu(message):
     """Show word management menu - same logic as level buttons"""
     chat_id = message.chat.id
@@ -146,14 +149,7 @@ def edit_word_menu(message):
         
     # Логирование кнопок
     try:
-        button_texts = []
-        if hasattr(keyboard, 'keyboard'):
-            for row in keyboard.keyboard:
-                for button in row:
-                    if hasattr(button, 'text'):
-                        button_texts.append(button.text)
-                    elif isinstance(button, dict) and 'text' in button:
-                        button_texts.append(button['text'])
+        button_texts = keyboard_button_texts(keyboard)
     except Exception as e:
         print(f"Error extracting button texts: {e}")
     
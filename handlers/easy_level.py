@@ -8,22 +8,19 @@ import random
 import telebot
 import traceback
 import db_manager
-from config import bot, user_state
+from config import bot, user_state, work_scheduler
 from dictionary import return_to_appropriate_menu
 from utils.language_utils import get_text, is_command
 from utils import clear_state, easy_level_keyboard
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input, is_menu_navigation_command
 from utils.state_management import get_user_state_value, set_user_state_value, update_user_state, ensure_dict_state
 from utils.dictionary_helpers import update_word_rating
+from spaced_repetition import record_answer, sample_due_first
 from utils.game_helpers import handle_game_error
 from utils.grammar_helpers import get_case_explanation, get_pronoun_translation, get_case_name_in_ukrainian
-from concurrent.futures import ThreadPoolExecutor
-
-executor = ThreadPoolExecutor()
-
 @bot.message_handler(func=lambda message: is_command(message, "learning_new_words"))
 def learn_words(message):
-    executor.submit(_async_learn_words, message)
+    work_scheduler.submit(message.chat.id, _async_learn_words, message)
 
 def _async_learn_words(message):
     chat_id = message.chat.id
@@ -101,12 +98,8 @@ def start_learning(chat_id, df):
             bot.send_message(chat_id, "❌ Помилка структури словника. Спробуйте пізніше або зверніться до адміністратора.")
             return False
     
-    # Сортуємо за пріоритетом для правильного вибору слів
-    if "priority" in df.columns:
-        df = df.sort_values(by="priority", ascending=False)
-    
-    # Вибираємо слова для вивчення
-    words = df.sample(min(10, len(df)))
+    # Спершу слова, що чекають на повторення, решта - пропорційно до рейтингу
+    words = sample_due_first(chat_id, df, 10)
     
     translations = words['translation'].tolist()
     de_words = words['word'].tolist()
@@ -178,6 +171,7 @@ def handle_pairs(call):
                             rating_change = -0.1 if correct else 0.1
                             db_manager.update_word_rating_shared_dict(
                                 chat_id, word_id, rating_change, shared_dict_id)
+                            record_answer(chat_id, word_id, correct, "easy")
                             break
             else:
                 # For personal dictionary, use DB API
@@ -188,6 +182,7 @@ def handle_pairs(call):
                             rating_change = -0.1 if correct else 0.1
                             db_manager.update_word_rating_personal_dict(
                                 chat_id, word_id, rating_change)
+                            record_answer(chat_id, word_id, correct, "easy")
                             break
             
             if correct:
@@ -233,7 +228,7 @@ def handle_pairs(call):
 
 @bot.message_handler(func=lambda message: is_command(message, "repetition"))
 def repeat_words(message):
-    executor.submit(_async_repeat_words, message)
+    work_scheduler.submit(message.chat.id, _async_repeat_words, message)
 
 def _async_repeat_words(message):
     chat_id = message.chat.id
@@ -253,12 +248,11 @@ def _async_repeat_words(message):
             df = db_manager.get_shared_dictionary_words(chat_id, shared_dict_id)
             
             # Get shared dictionary name
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
-            result = cursor.fetchone()
-            dict_name = f"«{result[0]}»" if result else get_text("shared_dictionary", chat_id)
-            conn.close()
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
+                result = cursor.fetchone()
+                dict_name = f"«{result[0]}»" if result else get_text("shared_dictionary", chat_id)
         else:
             # Force personal dictionary key regardless of dict_type value
             dict_name = get_text("personal_dictionary", chat_id)
@@ -289,7 +283,7 @@ def start_repetition(chat_id, df):
     if df.empty:
         return False
         
-    word = df.sample(1).iloc[0]
+    word = sample_due_first(chat_id, df, 1).iloc[0]
     
     # --- Debugging: Log the selected word ---
     print(f"DEBUG: easy_level.py:start_repetition: Selected word object: {word}")
@@ -350,29 +344,15 @@ def handle_answer(call):
     dict_type = user_state[chat_id].get("dict_type", "personal")
     shared_dict_id = user_state[chat_id].get("shared_dict_id")
     
+    # Розклад повторень ведеться для будь-якого типу словника
+    record_answer(chat_id, user_state[chat_id]["current_word"].get('id'), is_correct, "easy")
+    
     try:
-        if dict_type == "shared" and shared_dict_id:
-            try:
-                word_id = db_manager.get_word_id_by_german(user_state[chat_id]["current_word"]['word'])
-                if word_id:
-                    rating_change = -0.1 if is_correct else 0.1
-                    db_manager.update_word_rating_shared_dict(chat_id, word_id, rating_change, shared_dict_id)
-                    print(f"Updated rating for shared dict word {word_id}: {rating_change}")
-            except Exception as e:
-                print(f"Error updating shared dict rating: {e}")
-        else:
-            from storage import get_dataframe, save_dataframe, get_user_file_path
-            df = get_dataframe(chat_id)
-            
-            if 'word' in df.columns and 'priority' in df.columns:
-                mask = df['word'] == user_state[chat_id]["current_word"]['word']
-                if mask.any():
-                    rating_change = -0.1 if is_correct else 0.1
-                    df.loc[mask, 'priority'] += rating_change
-                    print(f"Updated rating for personal dict word {user_state[chat_id]['current_word']['word']}: {rating_change}")
-                    
-            file_path, lang = get_user_file_path(chat_id) if dict_type == "personal" else (None, None)
-            save_dataframe(chat_id, df, lang if lang else "common")
+        # Рейтинг оновлюється через чергу запису в БД - без читання словника
+        current_word = user_state[chat_id]["current_word"]
+        word_id = current_word.get('id') or db_manager.get_word_id_by_german(current_word['word'])
+        rating_change = -0.1 if is_correct else 0.1
+        db_manager.update_word_rating_for_dict(chat_id, word_id, rating_change, dict_type, shared_dict_id)
         
         if is_correct:
             bot.answer_callback_query(call.id, get_text("correct", chat_id))
@@ -417,9 +397,6 @@ def start_article_activity(chat_id):
         
         # Отримуємо останнє слово, яке було показано, щоб не повторювати його
         last_word_id = user_state.get(chat_id, {}).get("last_article_word_id", None)
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        
         language = db_manager.get_user_language(chat_id) or "uk"
         
         # Для персонального словника перевіряємо наявність таблиці користувача
@@ -432,174 +409,176 @@ def start_article_activity(chat_id):
                 return_to_appropriate_menu(chat_id, False, get_text("no_words_in_dictionary", chat_id))
                 return False
         
-        # Отримуємо всі слова з артиклями, виключаючи артикль з ID=4 (порожній) 
-        # і останнє показане слово
-        results = None
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        if dict_type == "shared" and shared_dict_id:
-            # Для спільного словника використовуємо відповідний запит
-            exclude_condition = f"AND w.id != {last_word_id}" if last_word_id else ""
-            query = f"""
-            SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation
-            FROM shared_dict_{shared_dict_id} sd
-            JOIN words w ON sd.word_id = w.id
-            JOIN article a ON w.article_id = a.id
-            WHERE w.article_id != 4 AND w.article_id IS NOT NULL
-            {exclude_condition}
-            ORDER BY RANDOM()
-            LIMIT 20
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            if not results:
-                # Якщо не знайдено слів з виключенням, спробуємо без нього
+            # Отримуємо всі слова з артиклями, виключаючи артикль з ID=4 (порожній) 
+            # і останнє показане слово
+            results = None
+        
+            if dict_type == "shared" and shared_dict_id:
+                # Для спільного словника використовуємо відповідний запит
+                exclude_condition = f"AND w.id != {last_word_id}" if last_word_id else ""
                 query = f"""
                 SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation
-                FROM shared_dict_{shared_dict_id} sd
+                FROM shared_dict_words sd
                 JOIN words w ON sd.word_id = w.id
                 JOIN article a ON w.article_id = a.id
-                WHERE w.article_id != 4 AND w.article_id IS NOT NULL
+                WHERE sd.dict_id = ? AND w.article_id != 4 AND w.article_id IS NOT NULL
+                {exclude_condition}
                 ORDER BY RANDOM()
                 LIMIT 20
                 """
-                cursor.execute(query)
+                cursor.execute(query, (shared_dict_id,))
                 results = cursor.fetchall()
             
-        elif dict_type == "common":
-            # Для загального словника
-            exclude_condition = f"AND w.id != {last_word_id}" if last_word_id else ""
-            query = f"""
-            SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation
-            FROM words w
-            JOIN article a ON w.article_id = a.id
-            WHERE w.article_id != 4 AND w.article_id IS NOT NULL
-            {exclude_condition}
-            ORDER BY RANDOM()
-            LIMIT 20
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
+                if not results:
+                    # Якщо не знайдено слів з виключенням, спробуємо без нього
+                    query = f"""
+                    SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation
+                    FROM shared_dict_words sd
+                    JOIN words w ON sd.word_id = w.id
+                    JOIN article a ON w.article_id = a.id
+                    WHERE sd.dict_id = ? AND w.article_id != 4 AND w.article_id IS NOT NULL
+                    ORDER BY RANDOM()
+                    LIMIT 20
+                    """
+                    cursor.execute(query, (shared_dict_id,))
+                    results = cursor.fetchall()
             
-            if not results:
-                query = query.replace(exclude_condition, "")
+            elif dict_type == "common":
+                # Для загального словника
+                exclude_condition = f"AND w.id != {last_word_id}" if last_word_id else ""
+                query = f"""
+                SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation
+                FROM words w
+                JOIN article a ON w.article_id = a.id
+                WHERE w.article_id != 4 AND w.article_id IS NOT NULL
+                {exclude_condition}
+                ORDER BY RANDOM()
+                LIMIT 20
+                """
                 cursor.execute(query)
                 results = cursor.fetchall()
+            
+                if not results:
+                    query = query.replace(exclude_condition, "")
+                    cursor.execute(query)
+                    results = cursor.fetchall()
         
-        else:
-            # Переконуємось, що dict_type встановлено як "personal" для особистого словника
-            dict_type = "personal"
-            if chat_id in user_state:
-                user_state[chat_id]["dict_type"] = "personal"
+            else:
+                # Переконуємось, що dict_type встановлено як "personal" для особистого словника
+                dict_type = "personal"
+                if chat_id in user_state:
+                    user_state[chat_id]["dict_type"] = "personal"
                 
-            # Персональний словник - фільтруємо слова з максимальним рейтингом (5.0) для не-складного рівня
-            level = user_state.get(chat_id, {}).get("level", "easy")
+                # Персональний словник - фільтруємо слова з максимальним рейтингом (5.0) для не-складного рівня
+                level = user_state.get(chat_id, {}).get("level", "easy")
             
-            # Якщо це не складний рівень, обмежуємо показ слів з максимальним рейтингом
-            exclude_max_rating_words = level != "hard"
+                # Якщо це не складний рівень, обмежуємо показ слів з максимальним рейтингом
+                exclude_max_rating_words = level != "hard"
             
-            exclude_condition = f"AND w.id != {last_word_id}" if last_word_id else ""
-            max_rating_filter = " AND u.rating < 4.9" if exclude_max_rating_words else ""
+                exclude_condition = f"AND w.id != {last_word_id}" if last_word_id else ""
+                max_rating_filter = " AND u.rating < 4.9" if exclude_max_rating_words else ""
             
-            query = f"""
-            SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation, u.rating
-            FROM user_{chat_id} u
-            JOIN words w ON u.word_id = w.id
-            JOIN article a ON w.article_id = a.id
-            WHERE w.article_id != 4 AND w.article_id IS NOT NULL
-            {exclude_condition} {max_rating_filter}
-            ORDER BY u.rating ASC
-            LIMIT 15
-            """
+                query = f"""
+                SELECT w.id, w.word, a.article, a.id as article_id, w.{language}_tran as translation, u.rating
+                FROM user_words u
+                JOIN words w ON u.word_id = w.id
+                JOIN article a ON w.article_id = a.id
+                WHERE u.chat_id = ? AND w.article_id != 4 AND w.article_id IS NOT NULL
+                {exclude_condition} {max_rating_filter}
+                ORDER BY u.rating ASC
+                LIMIT 15
+                """
             
-            cursor.execute(query)
-            results = cursor.fetchall()
+                cursor.execute(query, (chat_id,))
+                results = cursor.fetchall()
             
-            if not results:
-                # Якщо немає слів з урахуванням фільтру, спробуємо знову без фільтрації максимального рейтингу
-                if exclude_max_rating_words:
-                    query = query.replace(" AND u.rating < 4.9", "")
-                    cursor.execute(query)
-                    results = cursor.fetchall()
+                if not results:
+                    # Якщо немає слів з урахуванням фільтру, спробуємо знову без фільтрації максимального рейтингу
+                    if exclude_max_rating_words:
+                        query = query.replace(" AND u.rating < 4.9", "")
+                        cursor.execute(query, (chat_id,))
+                        results = cursor.fetchall()
         
-        conn.close()
         
-        if not results:
-            # IMPORTANT: Preserve shared_dict_id when sending error message
-            preserved_dict_type = user_state.get(chat_id, {}).get("dict_type", "personal")
-            preserved_shared_id = user_state.get(chat_id, {}).get("shared_dict_id")
-            preserved_level = user_state.get(chat_id, {}).get("level", "easy")
-            preserved_language = language  # Always preserve language
+            if not results:
+                # IMPORTANT: Preserve shared_dict_id when sending error message
+                preserved_dict_type = user_state.get(chat_id, {}).get("dict_type", "personal")
+                preserved_shared_id = user_state.get(chat_id, {}).get("shared_dict_id")
+                preserved_level = user_state.get(chat_id, {}).get("level", "easy")
+                preserved_language = language  # Always preserve language
             
-            from dictionary import return_to_appropriate_menu
+                from dictionary import return_to_appropriate_menu
             
-            # Use clear_state with proper preservation
-            clear_state(chat_id, preserve_dict_type=True, preserve_messages=False)
+                # Use clear_state with proper preservation
+                clear_state(chat_id, preserve_dict_type=True, preserve_messages=False)
             
-            # Manually restore shared_dict_id if it existed
-            if chat_id in user_state:
-                user_state[chat_id]["shared_dict_id"] = preserved_shared_id if preserved_shared_id else None
-                user_state[chat_id]["dict_type"] = preserved_dict_type
-                user_state[chat_id]["level"] = preserved_level
-                user_state[chat_id]["language"] = preserved_language  # Restore language
-                print(f"Debug: Preserved data for user {chat_id}: dict_type={preserved_dict_type}, shared_dict_id={preserved_shared_id}, language={preserved_language}")
+                # Manually restore shared_dict_id if it existed
+                if chat_id in user_state:
+                    user_state[chat_id]["shared_dict_id"] = preserved_shared_id if preserved_shared_id else None
+                    user_state[chat_id]["dict_type"] = preserved_dict_type
+                    user_state[chat_id]["level"] = preserved_level
+                    user_state[chat_id]["language"] = preserved_language  # Restore language
+                    print(f"Debug: Preserved data for user {chat_id}: dict_type={preserved_dict_type}, shared_dict_id={preserved_shared_id}, language={preserved_language}")
             
-            # Only send the message once through return_to_appropriate_menu
-            return_to_appropriate_menu(chat_id, False, get_text("no_words_with_articles", chat_id, "У словнику немає слів з артиклями для вивчення."))
-            return False
+                # Only send the message once through return_to_appropriate_menu
+                return_to_appropriate_menu(chat_id, False, get_text("no_words_with_articles", chat_id, "У словнику немає слів з артиклями для вивчення."))
+                return False
             
-        # Вибираємо випадкове слово з результатів
-        result = random.choice(results)
-        print(f"Debug: Selected result: {result}")
+            # Вибираємо випадкове слово з результатів
+            result = random.choice(results)
+            print(f"Debug: Selected result: {result}")
         
-        # Отримуємо дані зі слова, враховуючи, що результат може мати різну кількість полів
-        if dict_type == "personal":
-            # Для персонального словника результат містить 6 полів (включно з рейтингом)
-            if len(result) >= 6:
-                word_id, word, correct_article, article_id, translation, _ = result
+            # Отримуємо дані зі слова, враховуючи, що результат може мати різну кількість полів
+            if dict_type == "personal":
+                # Для персонального словника результат містить 6 полів (включно з рейтингом)
+                if len(result) >= 6:
+                    word_id, word, correct_article, article_id, translation, _ = result
+                else:
+                    # Захист від помилок, якщо запит повернув менше полів
+                    word_id, word, correct_article, article_id, translation = result[:5]
             else:
-                # Захист від помилок, якщо запит повернув менше полів
-                word_id, word, correct_article, article_id, translation = result[:5]
-        else:
-            # Для спільного або загального словника результат містить 5 полів
-            if len(result) >= 5:
-                word_id, word, correct_article, article_id, translation = result[:5]
-            else:
-                # Захист від помилок
-                print(f"Warning: Unexpected result format: {result}")
-                raise ValueError(f"Unexpected result format: got {len(result)} values, expected at least 5")
+                # Для спільного або загального словника результат містить 5 полів
+                if len(result) >= 5:
+                    word_id, word, correct_article, article_id, translation = result[:5]
+                else:
+                    # Захист від помилок
+                    print(f"Warning: Unexpected result format: {result}")
+                    raise ValueError(f"Unexpected result format: got {len(result)} values, expected at least 5")
         
-        # Зберігаємо ID слова, щоб не повторювати його наступного разу
-        user_state[chat_id] = {
-            "word_id": word_id,
-            "word": word,
-            "correct_article": correct_article,
-            "dict_type": dict_type,
-            "level": "easy",
-            "translation": translation,
-            "last_article_word_id": word_id  # Зберігаємо для наступного запуску
-        }
+            # Зберігаємо ID слова, щоб не повторювати його наступного разу
+            user_state[chat_id] = {
+                "word_id": word_id,
+                "word": word,
+                "correct_article": correct_article,
+                "dict_type": dict_type,
+                "level": "easy",
+                "translation": translation,
+                "last_article_word_id": word_id  # Зберігаємо для наступного запуску
+            }
         
-        if shared_dict_id:
-            user_state[chat_id]["shared_dict_id"] = shared_dict_id
+            if shared_dict_id:
+                user_state[chat_id]["shared_dict_id"] = shared_dict_id
             
-        # Створюємо інлайн клавіатуру з артиклями
-        markup = telebot.types.InlineKeyboardMarkup(row_width=3)
-        markup.add(
-            telebot.types.InlineKeyboardButton("der", callback_data=f"art_der_{word_id}"),
-            telebot.types.InlineKeyboardButton("die", callback_data=f"art_die_{word_id}"),
-            telebot.types.InlineKeyboardButton("das", callback_data=f"art_das_{word_id}")
-        )
+            # Створюємо інлайн клавіатуру з артиклями
+            markup = telebot.types.InlineKeyboardMarkup(row_width=3)
+            markup.add(
+                telebot.types.InlineKeyboardButton("der", callback_data=f"art_der_{word_id}"),
+                telebot.types.InlineKeyboardButton("die", callback_data=f"art_die_{word_id}"),
+                telebot.types.InlineKeyboardButton("das", callback_data=f"art_das_{word_id}")
+            )
         
-        sent_message = bot.send_message(
-            chat_id,
-            get_text("select_article",chat_id) + f"\n\n<b>{word}</b>\n\n" + get_text("translation",chat_id) + f"<i>: {translation}</i>",
-            reply_markup=markup,
-            parse_mode="HTML"
-        )
+            sent_message = bot.send_message(
+                chat_id,
+                get_text("select_article",chat_id) + f"\n\n<b>{word}</b>\n\n" + get_text("translation",chat_id) + f"<i>: {translation}</i>",
+                reply_markup=markup,
+                parse_mode="HTML"
+            )
         
-        user_state[chat_id]["message_id"] = sent_message.message_id
-        return True
+            user_state[chat_id]["message_id"] = sent_message.message_id
+            return True
     except Exception as e:
         print(f"Error in start_article_activity: {e}")
         traceback.print_exc()
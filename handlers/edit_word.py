@@ -7,52 +7,47 @@
 import telebot  # Add explicit import for telebot
 from googletrans import Translator
 import asyncio
-from config import bot, user_state, translator
+from config import bot, user_state, translator, work_scheduler
 from utils import clear_state, main_menu_keyboard, main_menu_cancel
 from utils.state_helpers import save_message_id
-from utils.language_utils import get_text
+from utils.language_utils import get_text, get_user_language
+from utils.command_router import on
+from utils.keyboard_cache import get_keyboard, layout
+from utils.keyboards import role_for
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input, is_system_command, is_menu_navigation_command, handle_exit_from_activity
 import db_manager
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
 from german_article_finder import find_german_article
 
-# Створюємо пул потоків для асинхронної обробки запитів до БД
-executor = ThreadPoolExecutor()
-
 WORDS_PER_PAGE_EDIT = 18
 
 # Helper function to create the word management menu keyboard
+@layout("word_management")
+def _word_management_layout(text, role):
+    return [
+        [text("edit_delete_single_word_button", "✏️ Редагувати/Видалити слово")],
+        [text("bulk_delete_words_button", "🗑️ Масове видалення слів")],
+        [text("bulk_add_words_button", "➕ Масове додавання слів")],
+        [text("back_to_main_menu", "↩️ Повернутися до головного меню")],
+    ]
+
 def word_management_menu_keyboard(chat_id):
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
-    keyboard.add(
-        telebot.types.KeyboardButton(get_text("edit_delete_single_word_button", chat_id, "✏️ Редагувати/Видалити слово"))
-    )
-    keyboard.add(
-        telebot.types.KeyboardButton(get_text("bulk_delete_words_button", chat_id, "🗑️ Масове видалення слів"))
-    )
-    keyboard.add(
-        telebot.types.KeyboardButton(get_text("bulk_add_words_button", chat_id, "➕ Масове додавання слів")) # Placeholder for bulk add
-    )
-    keyboard.add(
-        telebot.types.KeyboardButton(get_text("back_to_main_menu", chat_id, "↩️ Повернутися до головного меню"))
-    )
-    return keyboard
+    return get_keyboard("word_management", get_user_language(chat_id), role_for(chat_id))
 
 # Удален старый обработчик edit_word_start - теперь обрабатывается в dictionaries.py
 
 # Обработчики кнопок меню редактирования - работают как кнопки активностей в уровнях
-@bot.message_handler(func=lambda message: message.text == get_text("edit_delete_single_word_button", message.chat.id))
+@bot.message_handler(func=on("edit_delete_single_word_button"))
 def handle_edit_delete_single_word(message):
     """Handle single word edit/delete button"""
     initiate_single_word_edit_or_delete(message)
 
-@bot.message_handler(func=lambda message: message.text == get_text("bulk_delete_words_button", message.chat.id))
+@bot.message_handler(func=on("bulk_delete_words_button"))
 def handle_bulk_delete_words(message):
     """Handle bulk delete words button"""
     initiate_bulk_delete(message)
 
-@bot.message_handler(func=lambda message: message.text == get_text("bulk_add_words_button", message.chat.id))
+@bot.message_handler(func=on("bulk_add_words_button"))
 def handle_bulk_add_words(message):
     """Handle bulk add words button"""
     initiate_bulk_add_words(message)
@@ -73,7 +68,7 @@ def initiate_single_word_edit_or_delete(message):
         "shared_dict_id": user_state.get(chat_id, {}).get("shared_dict_id")
     }
     # Запуск завантаження даних у окремому потоці
-    executor.submit(_async_load_words_for_edit, chat_id, current_state, message)
+    work_scheduler.submit(chat_id, _async_load_words_for_edit, chat_id, current_state, message)
 
 def _async_load_words_for_edit(chat_id, state, message):
     """Асинхронно завантажує слова для редагування."""
@@ -535,7 +530,7 @@ def initiate_bulk_delete(message):
         "shared_dict_id": user_state.get(chat_id, {}).get("shared_dict_id")
     }
     # Запуск завантаження даних у окремому потоці
-    executor.submit(_async_load_words_for_bulk_delete, chat_id, current_state, message)
+    work_scheduler.submit(chat_id, _async_load_words_for_bulk_delete, chat_id, current_state, message)
 
 def _async_load_words_for_bulk_delete(chat_id, state, message):
     """Асинхронно завантажує слова для масового видалення."""
@@ -694,7 +689,7 @@ def perform_bulk_delete(chat_id):
 def refresh_bulk_delete_word_list(chat_id):
     """Refreshes the list of available words for bulk deletion from the DB."""
     # Запускаємо в окремому потоці для уникнення блокування
-    executor.submit(_async_refresh_bulk_delete_word_list, chat_id)
+    work_scheduler.submit(chat_id, _async_refresh_bulk_delete_word_list, chat_id)
 
 def _async_refresh_bulk_delete_word_list(chat_id):
     """Асинхронно оновлює список слів для масового видалення."""
@@ -825,7 +820,7 @@ def initiate_bulk_add_words(message):
     can_add = True
     if current_dict_type == "shared":
         # Перевіряємо права адміна у окремому потоці, щоб не блокувати основний
-        executor.submit(_async_check_admin_and_start_bulk_add, chat_id, current_dict_type, current_shared_dict_id, message)
+        work_scheduler.submit(chat_id, _async_check_admin_and_start_bulk_add, chat_id, current_dict_type, current_shared_dict_id, message)
         return
     elif current_dict_type == "common" and str(chat_id) != str(db_manager.ADMIN_ID): # Ensure ADMIN_ID is string for comparison if chat_id is string
         can_add = False
@@ -946,28 +941,16 @@ def handle_bulk_words_input(message):
             "article": article, 
             "translation": ""
         })
-      # Translation with proper error handling for async issues
+    # Translate the whole list at once: cached words skip the network, the rest go out in batches
+    failed_text = get_text("translation_failed_short", chat_id, "Помилка перекладу")
     try:
-        # Use synchronous translation helper
-        from translation_sync import safe_translate
-        
-        for i, word_to_translate in enumerate(words_to_translate):
-            try:
-                translation = safe_translate(word_to_translate, src='de', dest=current_language)
-                
-                if translation:
-                    words_data_pre_translation[i]["translation"] = translation
-                else:
-                    words_data_pre_translation[i]["translation"] = get_text("translation_failed_short", chat_id, "Помилка перекладу")
-                    
-            except Exception as e:
-                print(f"Translation error for word '{word_to_translate}': {e}")
-                words_data_pre_translation[i]["translation"] = get_text("translation_failed_short", chat_id, "Помилка перекладу")
-                
+        from translation_sync import batch_translate
+        translations = batch_translate(words_to_translate, src='de', dest=current_language)
     except Exception as e:
         print(f"Bulk add translation error: {e}")
-        for info in words_data_pre_translation:
-            info["translation"] = get_text("translation_failed_short", chat_id, "Помилка перекладу")
+        translations = [None] * len(words_to_translate)
+    for info, translation in zip(words_data_pre_translation, translations):
+        info["translation"] = translation or failed_text
     
     # Process words one-by-one to get IDs for interactive editing
     bulk_add_data_list = []
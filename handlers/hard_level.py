@@ -6,22 +6,22 @@
 
 import traceback
 import db_manager
-from config import bot, user_state
+from config import bot, user_state, work_scheduler
 from utils import clear_state, main_menu_keyboard, hard_level_keyboard
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input, is_menu_navigation_command, handle_exit_from_activity
 from dictionary import return_to_appropriate_menu
 from utils.language_utils import get_text
+from utils.command_router import on
+from spaced_repetition import record_answer
 from utils.console_logger import log_menu_transition, log_displayed_buttons, MENU_MAIN, MENU_EASY, MENU_MEDIUM, MENU_HARD, MENU_SHARED
 # Add import for grammar helpers
 from utils.grammar_helpers import get_case_explanation, get_pronoun_translation, get_case_name_in_ukrainian
-from concurrent.futures import ThreadPoolExecutor
-executor = ThreadPoolExecutor()  # default max_workers, can be omitted or tuned per навантаження
 
 # Додаємо константи для зміни рейтингу на високому рівні
 HARD_RATING_DECREASE = -0.1    # Зменшення рейтингу при правильній відповіді
 HARD_RATING_INCREASE = 0.2     # Збільшення рейтингу при неправильній відповіді
 
-@bot.message_handler(func=lambda message: message.text == "🧩 Складна гра" or message.text == get_text("advanced_game", message.chat.id))
+@bot.message_handler(func=on("advanced_game", aliases=["🧩 Складна гра"]))
 def hard_game(message):
     """Placeholder for a complex game (to be developed)"""
     chat_id = message.chat.id
@@ -57,7 +57,7 @@ def hard_game(message):
         reply_markup=hard_level_keyboard(chat_id)
     )
 
-@bot.message_handler(func=lambda message: message.text == "📝 Введення слів" or message.text == get_text("word_typing", message.chat.id))
+@bot.message_handler(func=on("word_typing", aliases=["📝 Введення слів"]))
 def word_typing_game(message):
     chat_id = message.chat.id
     clear_state(chat_id, preserve_dict_type=True, preserve_messages=False, preserve_level=True)
@@ -72,9 +72,9 @@ def word_typing_game(message):
         }
     dict_type = user_state[chat_id].get("dict_type","personal")
     shared_dict_id = user_state[chat_id].get("shared_dict_id")
-    executor.submit(_load_and_start_word_typing, chat_id, dict_type, shared_dict_id)
+    work_scheduler.submit(chat_id, _load_and_start_word_typing, chat_id, dict_type, shared_dict_id)
 
-@bot.message_handler(func=lambda message: message.text == "🏷️ Введення артиклів" or message.text == get_text("article_typing", message.chat.id))
+@bot.message_handler(func=on("article_typing", aliases=["🏷️ Введення артиклів"]))
 def article_typing_game(message):
     chat_id = message.chat.id
     clear_state(chat_id, preserve_dict_type=True, preserve_messages=False, preserve_level=True)
@@ -89,15 +89,16 @@ def article_typing_game(message):
         }
     dict_type = user_state[chat_id].get("dict_type","personal")
     shared_dict_id = user_state[chat_id].get("shared_dict_id")
-    executor.submit(_load_and_start_article_typing, chat_id, dict_type, shared_dict_id)
+    work_scheduler.submit(chat_id, _load_and_start_article_typing, chat_id, dict_type, shared_dict_id)
 
 # асинхронні хелпери
 def _load_and_start_word_typing(chat_id, dict_type, shared_dict_id):
     try:
+        # Зважений вибір: складніші слова (вищий рейтинг) випадають частіше
         if dict_type == "shared" and shared_dict_id:
-            df = db_manager.get_shared_dictionary_words(chat_id, shared_dict_id)
+            df = db_manager.sample_words(chat_id, 1, "shared", shared_dict_id)
         else:
-            df = db_manager.get_user_words(chat_id, dict_type)
+            df = db_manager.sample_words(chat_id, 1, dict_type)
         if df is None or df.empty:
             dict_name = (get_text("shared_dictionary",chat_id) if dict_type=="shared"
                          else get_text("personal_dictionary",chat_id))
@@ -107,7 +108,7 @@ def _load_and_start_word_typing(chat_id, dict_type, shared_dict_id):
                 reply_markup=hard_level_keyboard(chat_id)
             )
             return
-        word = df.sample(1).iloc[0]
+        word = df.iloc[0]
         user_state[chat_id].update({
             "word_id": word["id"],
             "word": word["word"],
@@ -127,13 +128,13 @@ def _load_and_start_word_typing(chat_id, dict_type, shared_dict_id):
 def _load_and_start_article_typing(chat_id, dict_type, shared_dict_id):
     try:
         if dict_type == "shared" and shared_dict_id:
-            df = db_manager.get_shared_dictionary_words_with_articles(chat_id, shared_dict_id)
+            df = db_manager.sample_words(chat_id, 1, "shared", shared_dict_id, with_articles=True)
         else:
-            df = db_manager.get_user_words_with_articles(chat_id, dict_type)
+            df = db_manager.sample_words(chat_id, 1, dict_type, with_articles=True)
         if df is None or df.empty:
             bot.send_message(chat_id, get_text("no_words_with_articles",chat_id), reply_markup=hard_level_keyboard(chat_id))
             return
-        word = df.sample(1).iloc[0]
+        word = df.iloc[0]
         user_state[chat_id].update({
             "word_id": word["id"],
             "word": word["word"],
@@ -226,6 +227,7 @@ def handle_word_typing_answer(message):
             db_manager.update_word_rating_shared_dict(chat_id, word_id, rating_change, shared_dict_id)
         else:
             db_manager.update_word_rating(chat_id, word_id, rating_change)
+        record_answer(chat_id, word_id, is_correct, "hard")
         
         # Продовжуємо з новим словом
         bot.send_message(chat_id, get_text("continue_game", chat_id))
@@ -272,6 +274,7 @@ def handle_article_typing_answer(message):
             db_manager.update_word_rating_shared_dict(chat_id, word_id, HARD_RATING_DECREASE, shared_dict_id)
         else:
             db_manager.update_word_rating(chat_id, word_id, HARD_RATING_DECREASE)
+        record_answer(chat_id, word_id, True, "hard")
         
         # Продовжуємо з новим словом
         bot.send_message(chat_id, get_text("continue_game", chat_id))
@@ -286,6 +289,9 @@ def handle_article_typing_answer(message):
             db_manager.update_word_rating_shared_dict(chat_id, word_id, HARD_RATING_INCREASE, shared_dict_id)
         else:
             db_manager.update_word_rating(chat_id, word_id, HARD_RATING_INCREASE)
+        # У розклад повторень іде лише перша помилка по слову
+        if attempts == 1:
+            record_answer(chat_id, word_id, False, "hard")
         
         # Якщо це вже друга спроба, показуємо правильну відповідь і продовжуємо
         if attempts >= 2:  # Змінено з 3 на 2 спроби
@@ -9,6 +9,8 @@ import telebot
 from config import bot, user_state
 from utils import clear_state, track_activity, main_menu_keyboard
 from utils.language_utils import get_text
+from utils.command_router import on
+from utils.keyboard_cache import button_texts as keyboard_button_texts
 from utils.state_helpers import save_message_id
 from handlers.start import show_language_selection
 from utils.console_logger import log_menu_transition, log_displayed_buttons, MENU_MAIN
@@ -64,15 +66,7 @@ def main_menu(message):
         
         # Fix for the button_text extraction - make it safe
         try:
-            button_texts = []
-            if hasattr(keyboard, 'keyboard'):
-                for row in keyboard.keyboard:
-                    for button in row:
-                        # Handle both ReplyButton objects and dictionaries
-                        if hasattr(button, 'text'):
-                            button_texts.append(button.text)
-                        elif isinstance(button, dict) and 'text' in button:
-                            button_texts.append(button['text'])
+            button_texts = keyboard_button_texts(keyboard)
         
             # Log displayed buttons (only if we have the button texts)
             if button_texts:
@@ -87,8 +81,7 @@ def main_menu(message):
         )
         save_message_id(chat_id, sent_message.message_id)
 
-@bot.message_handler(func=lambda message: message.text in ["✖️ Відміна", "Відміна"] or 
-                                        message.text == get_text("cancel", message.chat.id))
+@bot.message_handler(func=on("cancel", aliases=["✖️ Відміна", "Відміна"]))
 def cancel_action(message):
     """Cancel current action and return to main menu"""
     chat_id = message.chat.id
@@ -105,15 +98,7 @@ def cancel_action(message):
     
     # Safely extract button texts for logging
     try:
-        button_texts = []
-        if hasattr(keyboard, 'keyboard'):
-            for row in keyboard.keyboard:
-                for button in row:
-                    # Handle both ReplyButton objects and dictionaries
-                    if hasattr(button, 'text'):
-                        button_texts.append(button.text)
-                    elif isinstance(button, dict) and 'text' in button:
-                        button_texts.append(button['text'])
+        button_texts = keyboard_button_texts(keyboard)
         
         # Log displayed buttons only if we successfully extracted texts
         if button_texts:
@@ -128,8 +113,7 @@ def cancel_action(message):
     )
     save_message_id(chat_id, sent_message.message_id)
 
-@bot.message_handler(func=lambda message: message.text == "↩️ Повернутися до головного меню" or 
-                                        message.text == get_text("back_to_main_menu", message.chat.id))
+@bot.message_handler(func=on("back_to_main_menu", aliases=["↩️ Повернутися до головного меню"]))
 def return_to_main_menu(message):
     """Return to main menu"""
     chat_id = message.chat.id
@@ -145,10 +129,22 @@ def return_to_main_menu(message):
     if chat_id in user_state:
         user_state[chat_id]["current_menu"] = "main"
     else:
-        user_state[chat_id] = {"current_menu": "main"}    # Get dictionary info
-    dict_type = user_state.get(chat_id, {}).get("dict_type", "personal")
-    shared_dict_id = user_state.get(chat_id, {}).get("shared_dict_id")
+        user_state[chat_id] = {"current_menu": "main"}
     
+    menu_message, keyboard = prepare_main_menu(chat_id)
+    
+    sent_message = bot.send_message(
+        chat_id, 
+        menu_message,
+        reply_markup=keyboard
+    )
+    save_message_id(chat_id, sent_message.message_id)
+
+def prepare_main_menu(chat_id):
+    """Sync the dictionary state with the DB and return (text, keyboard) of the main menu.
+    
+    Reads the database; the asyncio runtime runs it on its DB threads.
+    """
     # Sync state with database to ensure consistency
     db_manager.sync_user_state_with_db(chat_id)
     
@@ -163,15 +159,7 @@ def return_to_main_menu(message):
     
     # Safely extract button texts for logging
     try:
-        button_texts = []
-        if hasattr(keyboard, 'keyboard'):
-            for row in keyboard.keyboard:
-                for button in row:
-                    # Handle both ReplyButton objects and dictionaries
-                    if hasattr(button, 'text'):
-                        button_texts.append(button.text)
-                    elif isinstance(button, dict) and 'text' in button:
-                        button_texts.append(button['text'])
+        button_texts = keyboard_button_texts(keyboard)
         
         # Log displayed buttons only if we successfully extracted texts
         if button_texts:
@@ -179,12 +167,7 @@ def return_to_main_menu(message):
     except Exception as e:
         print(f"Error logging buttons: {e}")
     
-    sent_message = bot.send_message(
-        chat_id, 
-        menu_message,
-        reply_markup=keyboard
-    )
-    save_message_id(chat_id, sent_message.message_id)
+    return menu_message, keyboard
 
 @bot.message_handler(commands=["refresh_keyboard", "refresh"])
 def refresh_keyboard_command(message):
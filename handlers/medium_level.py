@@ -8,13 +8,13 @@ import random
 import string
 import telebot
 import pandas as pd
-from config import bot, user_state
+from config import bot, user_state, work_scheduler
 from utils import clear_state, medium_level_keyboard, main_menu_keyboard
 import db_manager
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input, is_menu_navigation_command, handle_exit_from_activity
 from utils.language_utils import get_text
-from concurrent.futures import ThreadPoolExecutor
-executor = ThreadPoolExecutor()  # default max_workers, підходить для IO-bound завдань
+from utils.command_router import on
+from spaced_repetition import record_answer, sample_due_first
 
 # Константи для зміни рейтингу
 MEDIUM_RATING_DECREASE = -0.1  # Зменшення рейтингу при правильній відповіді
@@ -91,7 +91,7 @@ def create_misspelled_versions(word, num_versions=3):
     
     return misspelled[:num_versions]
 
-@bot.message_handler(func=lambda message: message.text == "🔤 Вибір правильного написання" or message.text == get_text("choose_correct_spelling", message.chat.id))
+@bot.message_handler(func=on("choose_correct_spelling", aliases=["🔤 Вибір правильного написання"]))
 def spelling_choice_game(message):
     """Game where user selects the correct spelling from 4 options"""
     chat_id = message.chat.id
@@ -113,8 +113,8 @@ def spelling_choice_game(message):
     if shared_dict_id:
         user_state[chat_id]["shared_dict_id"] = shared_dict_id
     
-    # делегуємо завантаження даних в окремий потік
-    executor.submit(_load_and_start_spelling_choice, message)
+    # делегуємо завантаження даних у чергу чату
+    work_scheduler.submit(chat_id, _load_and_start_spelling_choice, message)
 
 def _load_and_start_spelling_choice(message):
     chat_id = message.chat.id
@@ -122,16 +122,16 @@ def _load_and_start_spelling_choice(message):
         dict_type = user_state.get(chat_id,{}).get("dict_type","personal")
         shared_dict_id = user_state.get(chat_id,{}).get("shared_dict_id")
         
-        # Отримуємо слова для гри
+        # Отримуємо слово для гри (зважений вибір за рейтингом)
         df = None
         if dict_type == "shared":
             if shared_dict_id:
-                df = db_manager.get_shared_dictionary_words(chat_id, shared_dict_id)
+                df = db_manager.sample_words(chat_id, 1, "shared", shared_dict_id)
             else:
                 bot.send_message(chat_id, "❌ Не вказано спільний словник", reply_markup=medium_level_keyboard())
                 return
         else:
-            df = db_manager.get_user_words(chat_id, dict_type)
+            df = db_manager.sample_words(chat_id, 1, dict_type)
         
         # Перевіряємо наявність слів
         if df is None or df.empty:
@@ -139,8 +139,7 @@ def _load_and_start_spelling_choice(message):
             bot.send_message(chat_id, f"{get_text('in', chat_id)} {dict_name} {get_text('no_words', chat_id)}", reply_markup=medium_level_keyboard(chat_id))
             return
             
-        # Вибираємо випадкове слово
-        word_row = df.sample(1).iloc[0]
+        word_row = df.iloc[0]
         
         # Створюємо неправильні варіанти написання
         misspelled_versions = create_misspelled_versions(word_row['word'])
@@ -213,6 +212,7 @@ def handle_spelling_choice(call):
         else:
             db_manager.update_word_rating_personal_dict(chat_id, word_id, rating_change)
             print(f"Updated personal dict rating for word {word_id}: {rating_change}")
+        record_answer(chat_id, word_id, is_correct, "medium")
                 
         if is_correct:
             bot.answer_callback_query(call.id, get_text("correct",chat_id))
@@ -242,10 +242,8 @@ def handle_spelling_choice(call):
         import traceback
         traceback.print_exc()
     
-    # Запускаємо нову гру після паузи
+    # Запускаємо нову гру після паузи (без потоку, що спить)
     def next_word_task():
-        import time
-        time.sleep(2)
         try:
             if chat_id in user_state and user_state[chat_id].get("game") == "spelling_choice":
                 bot.send_message(chat_id, get_text("next_word", chat_id))
@@ -253,7 +251,7 @@ def handle_spelling_choice(call):
         except Exception as e:
             print(f"Error starting new spelling game: {e}")
 
-    executor.submit(next_word_task)
+    work_scheduler.submit_later(2, chat_id, next_word_task)
 
 def spelling_choice_game_new_word(chat_id):
     """Start a new round of the spelling choice game"""
@@ -274,7 +272,7 @@ def spelling_choice_game_new_word(chat_id):
     except Exception as e:
         print(f"Error starting new spelling game: {e}")
 
-@bot.message_handler(func=lambda message: message.text == "📝 Заповніть пропуски" or message.text == get_text("fill_in_gaps", message.chat.id))
+@bot.message_handler(func=on("fill_in_gaps", aliases=["📝 Заповніть пропуски"]))
 def missing_letters_game(message):
     """Game where user needs to fill in missing letters"""
     chat_id = message.chat.id
@@ -331,7 +329,7 @@ def generate_missing_letters_exercise(chat_id):
         if filtered_df.empty:
             filtered_df = df  # Якщо нема довгих слів, беремо будь-які
             
-        word_row = filtered_df.sample(1).iloc[0]
+        word_row = sample_due_first(chat_id, filtered_df, 1).iloc[0]
         word = word_row['word']
         
         # Визначаємо кількість букв, які треба пропустити (25-35% довжини слова)
@@ -413,6 +411,10 @@ def handle_missing_letters_answer(message):
     shared_dict_id = user_state[chat_id].get("shared_dict_id")
     
     try:
+        # Розклад повторень: правильна відповідь або перша помилка по слову
+        if is_correct or not user_state[chat_id].get("attempts"):
+            record_answer(chat_id, word_id, is_correct, "medium")
+        
         if is_correct:
             # Зменшуємо рейтинг слова (воно стає легшим)
             rating_change = MEDIUM_RATING_DECREASE
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+Команда /reminder: час щоденного нагадування користувача.
+
+/reminder            - показати поточний час
+/reminder 19:30      - обрати час (час бота)
+/reminder auto       - підлаштовуватися під звичний час активності
+/reminder off        - вимкнути нагадування
+"""
+
+import datetime
+
+from config import bot
+import db_manager
+from reminder_broadcast import (SOURCE_INFERRED, SOURCE_OFF, SOURCE_USER, default_minute, format_minute,
+                                minute_of_day, parse_minute, set_reminder_minute)
+from utils.language_utils import get_text
+
+
+def _current_slot(cursor, chat_id):
+    cursor.execute("SELECT minute, source FROM reminder_slots WHERE chat_id = ?", (chat_id,))
+    row = cursor.fetchone()
+    return row if row is not None else (default_minute(chat_id), None)
+
+
+@bot.message_handler(commands=['reminder', 'reminders'])
+def reminder_time_command(message):
+    """Show or change the user's daily reminder time"""
+    chat_id = message.chat.id
+    argument = (message.text or "").partition(" ")[2].strip().lower()
+    now = format_minute(minute_of_day(datetime.datetime.now()))
+
+    conn = db_manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        if argument in ("off", "stop"):
+            set_reminder_minute(cursor, chat_id, None, SOURCE_OFF)
+            text = get_text("reminder_time_off", chat_id)
+        elif argument == "auto":
+            minute, source = _current_slot(cursor, chat_id)
+            if minute is None:
+                minute = default_minute(chat_id)
+            # Наступна активність зсуне час у бік звичного (record_activity_minute)
+            set_reminder_minute(cursor, chat_id, minute, SOURCE_INFERRED)
+            text = get_text("reminder_time_auto", chat_id, time=format_minute(minute))
+        elif argument:
+            try:
+                minute = parse_minute(argument)
+            except ValueError:
+                minute = None
+            if minute is None:
+                minute, _ = _current_slot(cursor, chat_id)
+                text = get_text("reminder_time_usage", chat_id,
+                                time=format_minute(minute) if minute is not None else "—", now=now)
+            else:
+                set_reminder_minute(cursor, chat_id, minute, SOURCE_USER)
+                text = get_text("reminder_time_set", chat_id, time=format_minute(minute), now=now)
+        else:
+            minute, source = _current_slot(cursor, chat_id)
+            if source == SOURCE_OFF:
+                text = get_text("reminder_time_off", chat_id)
+            else:
+                text = get_text("reminder_time_usage", chat_id, time=format_minute(minute), now=now)
+        conn.commit()
+    finally:
+        conn.close()
+
+    bot.reply_to(message, text)
@@ -11,12 +11,14 @@ from utils import clear_state
 from utils.state_helpers import save_message_id
 import db_manager
 from utils.language_utils import get_text
+from utils.command_router import on, derived
+from utils.keyboard_cache import button_texts as keyboard_button_texts
 from utils.input_handlers import safe_next_step_handler, sanitize_user_input
 from utils.console_logger import log_menu_transition, log_displayed_buttons, MENU_MAIN, MENU_SHARED
 from datetime import datetime
 
 # Updated handler to work with all localized button texts
-@bot.message_handler(func=lambda message: message.text == get_text("shared_dictionary", message.chat.id) or message.text == "👥 Спільний словник")
+@bot.message_handler(func=on("shared_dictionary", aliases=["👥 Спільний словник"]))
 def shared_dictionary_menu(message):
     """Show shared dictionary menu"""
     chat_id = message.chat.id
@@ -47,14 +49,7 @@ def shared_dictionary_menu(message):
 
     # Safely extract button texts for logging
     try:
-        button_texts = []
-        if hasattr(keyboard, 'keyboard'):
-            for row in keyboard.keyboard:
-                for button in row:
-                    if hasattr(button, 'text'):
-                        button_texts.append(button.text)
-                    elif isinstance(button, dict) and 'text' in button:
-                        button_texts.append(button['text'])
+        button_texts = keyboard_button_texts(keyboard)
 
         if button_texts:
             print(f"[DEBUG] Button texts: {button_texts}")
@@ -77,8 +72,7 @@ def shared_dictionary_menu(message):
     save_message_id(chat_id, sent_message.message_id)
     print(f"[DEBUG] Message ID saved for chat_id: {chat_id}")
 
-@bot.message_handler(func=lambda message: message.text == "🆕 Створити спільний словник" or
-                    message.text == get_text("create_shared_dict", message.chat.id))
+@bot.message_handler(func=on("create_shared_dict", aliases=["🆕 Створити спільний словник"]))
 def create_shared_dictionary(message):
     """Create a new shared dictionary"""
     chat_id = message.chat.id
@@ -146,8 +140,7 @@ def handle_shared_dict_name(message):
         )
         clear_state(chat_id)
 
-@bot.message_handler(func=lambda message: message.text == "🔑 Вступити до спільного словника" or
-                    message.text == get_text("join_shared_dict", message.chat.id))
+@bot.message_handler(func=on("join_shared_dict", aliases=["🔑 Вступити до спільного словника"]))
 def join_shared_dictionary(message):
     """Join an existing shared dictionary"""
     chat_id = message.chat.id
@@ -211,8 +204,9 @@ def handle_shared_dict_code(message):
         )
         clear_state(chat_id)
 
-@bot.message_handler(func=lambda message: message.text == "📋 Мої спільні словники" or
-                    message.text == get_text("your_dict", message.chat.id).split(":")[0].strip())
+derived("my_shared_dicts_button", lambda strings: strings["your_dict"].split(":")[0].strip())
+
+@bot.message_handler(func=on("my_shared_dicts_button", aliases=["📋 Мої спільні словники"]))
 def my_shared_dictionaries(message):
     """Show user's shared dictionaries"""
     chat_id = message.chat.id
@@ -265,88 +259,89 @@ def use_shared_dictionary(call):
     shared_dict_id = int(call.data.replace("use_shared_dict_", ""))
     
     # Перевіряємо, чи користувач є творцем словника (першочергова перевірка)
-    conn = db_manager.get_connection()
-    cursor = conn.cursor()
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('SELECT created_by FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
-    creator_result = cursor.fetchone()
-    is_creator = creator_result and creator_result[0] == chat_id
+        cursor.execute('SELECT created_by FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
+        creator_result = cursor.fetchone()
+        is_creator = creator_result and creator_result[0] == chat_id
     
-    # Якщо користувач є творцем, він точно адміністратор
-    if is_creator:
-        is_admin = True
-    else:
-        # Якщо не творець, перевіряємо статус в shared_dict_users
-        cursor.execute('''
-        SELECT is_admin FROM shared_dict_users 
-        WHERE user_id = ? AND dict_id = ?
-        ''', (chat_id, shared_dict_id))
-        admin_result = cursor.fetchone()
-        is_admin = bool(admin_result and admin_result[0])
+        # Якщо користувач є творцем, він точно адміністратор
+        if is_creator:
+            is_admin = True
+        else:
+            # Якщо не творець, перевіряємо статус в shared_dict_users
+            cursor.execute('''
+            SELECT is_admin FROM shared_dict_users 
+            WHERE user_id = ? AND dict_id = ?
+            ''', (chat_id, shared_dict_id))
+            admin_result = cursor.fetchone()
+            is_admin = bool(admin_result and admin_result[0])
     
-    # Оновлюємо записи в БД - встановлюємо і тип, і ID
-    if is_admin:
-        cursor.execute('UPDATE users SET dict_type = \'shared\', shared_dict_id = ?, shared_dict_admin = 1 WHERE chat_id = ?', 
-                     (shared_dict_id, chat_id))
+        # Оновлюємо записи в БД - встановлюємо і тип, і ID
+        if is_admin:
+            cursor.execute('UPDATE users SET dict_type = \'shared\', shared_dict_id = ?, shared_dict_admin = 1 WHERE chat_id = ?', 
+                         (shared_dict_id, chat_id))
         
-        # Переконаємося, що є відповідний запис у shared_dict_users
-        cursor.execute('''
-        INSERT OR REPLACE INTO shared_dict_users (user_id, dict_id, is_admin, joined_at)
-        VALUES (?, ?, 1, datetime(\'now\'))
-        ''', (chat_id, shared_dict_id))
-    else:
-        cursor.execute('UPDATE users SET dict_type = \'shared\', shared_dict_id = ?, shared_dict_admin = 0 WHERE chat_id = ?', 
-                     (shared_dict_id, chat_id))
+            # Переконаємося, що є відповідний запис у shared_dict_users
+            cursor.execute('''
+            INSERT OR REPLACE INTO shared_dict_users (user_id, dict_id, is_admin, joined_at)
+            VALUES (?, ?, 1, datetime(\'now\'))
+            ''', (chat_id, shared_dict_id))
+        else:
+            cursor.execute('UPDATE users SET dict_type = \'shared\', shared_dict_id = ?, shared_dict_admin = 0 WHERE chat_id = ?', 
+                         (shared_dict_id, chat_id))
         
-        # Переконаємося, що є запис у shared_dict_users
-        cursor.execute('''
-        INSERT OR IGNORE INTO shared_dict_users (user_id, dict_id, is_admin, joined_at)
-        VALUES (?, ?, 0, datetime(\'now\'))
-        ''', (chat_id, shared_dict_id))
+            # Переконаємося, що є запис у shared_dict_users
+            cursor.execute('''
+            INSERT OR IGNORE INTO shared_dict_users (user_id, dict_id, is_admin, joined_at)
+            VALUES (?, ?, 0, datetime(\'now\'))
+            ''', (chat_id, shared_dict_id))
     
-    conn.commit()
+        conn.commit()
+        db_manager.user_profiles.update(chat_id, dict_type="shared", shared_dict_id=shared_dict_id,
+                                        shared_dict_exists=True, is_admin=is_admin)
     
-    try:
-        # Отримуємо назву словника для повідомлення
-        cursor.execute('SELECT name FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
-        dict_name = cursor.fetchone()[0]
-        conn.close()
+        try:
+            # Отримуємо назву словника для повідомлення
+            cursor.execute('SELECT name FROM shared_dictionaries WHERE id = ?', (shared_dict_id,))
+            dict_name = cursor.fetchone()[0]
         
-        # Оновлюємо стан в пам'яті
-        level = user_state.get(chat_id, {}).get("level", "easy")
+            # Оновлюємо стан в пам'яті
+            level = user_state.get(chat_id, {}).get("level", "easy")
         
-        user_state[chat_id] = {
-            "dict_type": "shared", 
-            "shared_dict_id": shared_dict_id,
-            "level": level,
-            "is_admin": is_admin
-        }
+            user_state[chat_id] = {
+                "dict_type": "shared", 
+                "shared_dict_id": shared_dict_id,
+                "level": level,
+                "is_admin": is_admin
+            }
         
-        # Показуємо повідомлення
-        bot.answer_callback_query(call.id, get_text("selected_dict", chat_id) + f"{dict_name}")
+            # Показуємо повідомлення
+            bot.answer_callback_query(call.id, get_text("selected_dict", chat_id) + f"{dict_name}")
         
-        # Видаляємо попереднє повідомлення
-        try:
-            bot.delete_message(chat_id, call.message.message_id)
-        except:
-            pass
+            # Видаляємо попереднє повідомлення
+            try:
+                bot.delete_message(chat_id, call.message.message_id)
+            except:
+                pass
         
-        admin_text = get_text("you_admin",chat_id) if is_admin else ""
+            admin_text = get_text("you_admin",chat_id) if is_admin else ""
         
-        sent_message = bot.send_message(
-            chat_id,
-            get_text("selected_dict", chat_id) +
-            f"<b>{dict_name}</b>{admin_text}\n"+
-            get_text("moves_in_dict", chat_id),
-            parse_mode="HTML",
-            reply_markup=main_menu_keyboard(chat_id)
-        )
-        save_message_id(chat_id, sent_message.message_id)
+            sent_message = bot.send_message(
+                chat_id,
+                get_text("selected_dict", chat_id) +
+                f"<b>{dict_name}</b>{admin_text}\n"+
+                get_text("moves_in_dict", chat_id),
+                parse_mode="HTML",
+                reply_markup=main_menu_keyboard(chat_id)
+            )
+            save_message_id(chat_id, sent_message.message_id)
         
-    except Exception as e:
-        print(f"Error switching to shared dictionary: {e}")
-        bot.send_message(
-            chat_id, 
-            get_text("error_occurred", chat_id), 
-            reply_markup=main_menu_keyboard(chat_id)
-        )
+        except Exception as e:
+            print(f"Error switching to shared dictionary: {e}")
+            bot.send_message(
+                chat_id, 
+                get_text("error_occurred", chat_id), 
+                reply_markup=main_menu_keyboard(chat_id)
+            )
@@ -4,7 +4,6 @@
 Start handler for the bot.
 """
 
-import telebot
 from config import bot, user_state
 import db_manager
 from utils import main_menu_keyboard
@@ -53,22 +52,8 @@ def start_handler(message):
 
 def show_language_selection(chat_id):
     """Show language selection keyboard to user"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    # Add language buttons in rows of 2
-    row = []
-    for flag, code in LANGUAGE_FLAGS.items():
-        name = LANGUAGE_NAMES.get(code, code.upper())
-        button_text = f"{flag} {name}"
-        row.append(button_text)
-        
-        if len(row) == 2:
-            keyboard.row(*row)
-            row = []
-    
-    # Add any remaining buttons
-    if row:
-        keyboard.row(*row)
+    from utils.language_utils import create_language_keyboard
+    keyboard = create_language_keyboard()
     
     sent_message = bot.send_message(
         chat_id,
@@ -124,12 +109,9 @@ def handle_language_button(message):
         
         try:
             # Update language in database
+            # (write-through: the cached user profile gets the new language too)
             success = db_manager.set_user_language(chat_id, language_code)
             
-            # Clear language cache explicitly
-            from utils.language_utils import clear_language_cache
-            clear_language_cache(chat_id)
-            
             if success:
                 # Update user state
                 user_state[chat_id] = {
@@ -234,7 +216,9 @@ import time
 import threading
 from config import user_state
 from config import bot, scheduler
+import config
 import db_manager
+import log_pipeline
 import requests
 # Шлях до PID файлу для запобігання запуску кількох екземплярів бота
 PID_FILE = "bot.pid"
@@ -374,7 +358,7 @@ def setup_scheduler():
         job = schedule_reminders()
         
         # Log success with standard logging instead of log_action
-        print(f"Daily reminder scheduled for {job[0]} (job id: {job[1]})")
+        print(f"Reminders scheduled {job[0]} (job id: {job[1]})")
         logging.info(f"Scheduler initialized with job ID: {job[1]}")
         return True
     except Exception as e:
@@ -391,87 +375,54 @@ def setup_database():
         db_manager.init_db()
         
         # Ensure the active_days column exists in users table
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if active_days column exists
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [col[1] for col in cursor.fetchall()]
+            # Check if active_days column exists
+            cursor.execute("PRAGMA table_info(users)")
+            columns = [col[1] for col in cursor.fetchall()]
         
-        if 'active_days' not in columns:
-            print("Adding active_days column to users table")
-            try:
-                cursor.execute("ALTER TABLE users ADD COLUMN active_days INTEGER DEFAULT 0")
-                conn.commit()
-                print("Successfully added active_days column")
-            except Exception as e:
-                print(f"Error adding active_days column: {e}")
+            if 'active_days' not in columns:
+                print("Adding active_days column to users table")
+                try:
+                    cursor.execute("ALTER TABLE users ADD COLUMN active_days INTEGER DEFAULT 0")
+                    conn.commit()
+                    print("Successfully added active_days column")
+                except Exception as e:
+                    print(f"Error adding active_days column: {e}")
         
-        conn.close()
-        print("Database setup check complete.")
+            print("Database setup check complete.")
     except Exception as e:
         print(f"Error during database setup: {e}")
         import traceback
         traceback.print_exc()
 
 def setup_logging():
-    """Set up logging for the application"""
-    try:
-        import logging
-        import os
-        
-        # Create logs directory if it doesn't exist
-        log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
-        # Configure logging
-        log_file = os.path.join(log_dir, 'bot.log')
-        
-        # Set up basic configuration
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
-        
-        # Create logger
-        logger = logging.getLogger(__name__)
-        logger.info("Logging initialized")
-        
-        return logger
-    except Exception as e:
-        print(f"Error setting up logging: {e}")
-        # Fallback to basic print if logging setup fails
-        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-        logging.error(f"Logging setup failed: {e}", exc_info=True)
-        return logging.getLogger(__name__) # Return a basic logger
+    """Start the logging pipeline with the profile and options from config"""
+    log_pipeline.configure(config.LOG_PROFILE, **config.LOG_OPTIONS)
+    logger = logging.getLogger(__name__)
+    logger.info("Logging initialized: %s", log_pipeline.get_pipeline().stats())
+    return logger
+
+_update_log = log_pipeline.get_logger("update")
 
-# configure file logging for all bot traffic
-logging.basicConfig(
-    filename='bot2.log', level=logging.INFO,
-    format='%(asctime)s %(message)s'
-)
 # listener to log every incoming update
 def log_all_updates(messages):
+    if not _update_log.isEnabledFor(logging.INFO):
+        return
     for message in messages:
         if hasattr(message, 'text'):
-            chat_id = message.chat.id
-            text = message.text
-            log_str = f"INCOMING | From: {chat_id} | Text: {text}"
-            logging.info(log_str)
-            print(f"[SERVER LOG] {log_str}")
-# attach listener
-bot.set_update_listener(log_all_updates)
+            _update_log.info("INCOMING | From: %s | Text: %s", message.chat.id, message.text,
+                             extra={"chat_id": message.chat.id})
 
 def main():
     """Main entry point for the bot"""
     if not check_instance(): # Check if another instance is running
         return
 
+    # Setup logging first: it takes over the root logger (and print() in production)
+    setup_logging()
+
     # Register signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -486,9 +437,8 @@ def main():
     
     # Setup database
     setup_database()
-    
-    # Setup logging
-    setup_logging()
+    # main.py registers its own listener; only this entry point attaches this one
+    bot.set_update_listener(log_all_updates)
     
     # Set up message handlers
     import handlers.main_menu
@@ -500,6 +450,7 @@ def main():
     import handlers.hard_level
     import handlers.shared_dicts
     import handlers.possessive_articles
+    import handlers.reminders
     
     # Admin handlers
     import handlers.admin
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+"""
+Вікно останніх затримок і перцентилі для stats() черг і серверів.
+
+work_scheduler, outbound, webhook_server і query_profiler тримають
+останні LATENCY_WINDOW вимірів у deque з maxlen (window()) і
+рахують p50/p99 через percentile() під час читання stats().
+"""
+
+from collections import deque
+
+LATENCY_WINDOW = 2048           # recent samples kept for percentiles
+
+
+def window(size=LATENCY_WINDOW):
+    """Bounded buffer of recent samples; the oldest ones fall out"""
+    return deque(maxlen=size)
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of samples (0.0 when there are none)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
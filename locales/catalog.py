@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+Єдиний скомпільований каталог локалізацій.
+
+Усі locales/*.json читаються один раз. Для кожної мови будується плоский
+словник з уже змерженим англійським fallback, тож будь-який ключ
+знаходиться одним пошуком. Рядки інтернуються, шаблони розбираються під
+час завантаження: рядки без {плейсхолдерів} ніколи не проходять через
+str.format, а синтаксичні помилки та розбіжності плейсхолдерів з
+англійською версією потрапляють у звіт report().
+"""
+
+import json
+import os
+import string
+import sys
+import threading
+
+LOCALES_DIR = os.path.dirname(os.path.abspath(__file__))
+FALLBACK_LANGUAGE = "en"
+
+_formatter = string.Formatter()
+_UNKNOWN = frozenset()
+
+
+class _Entry:
+    __slots__ = ("text", "fields")
+
+    def __init__(self, text, fields):
+        self.text = text
+        self.fields = fields        # frozenset of placeholder names, None for plain strings (no str.format)
+
+
+def parse_placeholders(text):
+    """Return the frozenset of {placeholder} names (None for text without braces); raises ValueError"""
+    if "{" not in text and "}" not in text:
+        return None
+    fields = set()
+    for _, field, _, _ in _formatter.parse(text):
+        if field is not None:
+            # "{count:d}" / "{user.name}" / "{0}" -> базове ім'я аргументу
+            fields.add(field.split(".", 1)[0].split("[", 1)[0])
+    return frozenset(fields)
+
+
+class LocalizationCatalog:
+    """All locales loaded once, with the fallback language merged into every locale"""
+
+    def __init__(self, locales_dir=LOCALES_DIR, fallback=FALLBACK_LANGUAGE):
+        self.locales_dir = locales_dir
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._raw = {}          # language -> {key: str} exactly as in the JSON file
+        self._merged = {}       # language -> {key: _Entry} with fallback entries merged in
+        self._strings = {}      # language -> {key: str} (merged, for dict-style callers)
+        self.problems = []
+        self.version = 0        # bumped on every load(); caches built from the catalog compare it
+        self.load()
+
+    def load(self):
+        """(Re)load every locale file; returns the list of problems found"""
+        raw = {}
+        problems = []
+        for name in sorted(os.listdir(self.locales_dir)):
+            if not name.endswith(".json"):
+                continue
+            language = name[:-5]
+            try:
+                with open(os.path.join(self.locales_dir, name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                problems.append(f"{language}: cannot load {name}: {e}")
+                continue
+            raw[language] = {k: v for k, v in data.items() if isinstance(v, str)}
+            for key in data.keys() - raw[language].keys():
+                problems.append(f"{language}.{key}: value is not a string")
+
+        compiled = {}
+        for language, strings in raw.items():
+            entries = {}
+            for key, text in strings.items():
+                try:
+                    fields = parse_placeholders(text)
+                except ValueError as e:
+                    problems.append(f"{language}.{key}: bad template ({e}), used as plain text")
+                    fields = None
+                entries[key] = _Entry(sys.intern(text), fields)
+            compiled[language] = entries
+
+        base = compiled.get(self.fallback, {})
+        merged = {}
+        for language, entries in compiled.items():
+            merged[language] = {**base, **entries}
+            if language == self.fallback:
+                continue
+            for key, entry in entries.items():
+                reference = base.get(key)
+                if reference is not None and (entry.fields or frozenset()) != (reference.fields or frozenset()):
+                    problems.append(f"{language}.{key}: placeholders {sorted(entry.fields or ())} "
+                                    f"differ from {self.fallback} {sorted(reference.fields or ())}")
+
+        with self._lock:
+            self._raw = raw
+            self._merged = merged
+            self._strings = {lang: {k: e.text for k, e in entries.items()} for lang, entries in merged.items()}
+            self.problems = problems
+            self.version += 1
+        return problems
+
+    @property
+    def languages(self):
+        return sorted(self._raw)
+
+    def _entries(self, language):
+        entries = self._merged.get(language)
+        if entries is None:
+            entries = self._merged.get(self.fallback, {})
+        return entries
+
+    def has(self, key, language):
+        return key in self._entries(language)
+
+    def text(self, key, language, default=None):
+        """Raw (unformatted) text for key, with the fallback language already applied"""
+        entry = self._entries(language).get(key)
+        if entry is None:
+            return default if default is not None else key
+        return entry.text
+
+    def format(self, key, language, default=None, **kwargs):
+        """Text for key formatted with kwargs (plain strings are returned without str.format)"""
+        entry = self._entries(language).get(key)
+        if entry is None:
+            text = default if default is not None else key
+            fields = _UNKNOWN
+        else:
+            text, fields = entry.text, entry.fields
+        if not kwargs or fields is None:
+            return text
+        try:
+            return text.format(**kwargs)
+        except KeyError as e:
+            print(f"Error formatting text for key '{key}': Missing key {e}")
+        except Exception as e:
+            print(f"Error formatting text for key '{key}': {e}")
+        return text
+
+    def strings(self, language):
+        """Merged {key: text} mapping for a language (shared - do not modify)"""
+        strings = self._strings.get(language)
+        if strings is None:
+            strings = self._strings.get(self.fallback, {})
+        return strings
+
+    def raw_strings(self, language):
+        """{key: text} exactly as defined in the language's own JSON file"""
+        return self._raw.get(language, {})
+
+    def key_report(self):
+        """{language: (missing_keys, extra_keys)} compared with the fallback language"""
+        base = set(self._raw.get(self.fallback, {}))
+        report = {}
+        for language, strings in self._raw.items():
+            if language == self.fallback:
+                continue
+            keys = set(strings)
+            report[language] = (sorted(base - keys), sorted(keys - base))
+        return report
+
+    def report(self, verbose=False):
+        """Print missing/extra keys per locale and template problems; returns the number of problems"""
+        issues = 0
+        for language, (missing, extra) in sorted(self.key_report().items()):
+            print(f"[locales] {language}: {len(missing)} missing, {len(extra)} extra keys (vs {self.fallback})")
+            if verbose:
+                if missing:
+                    print(f"[locales]   missing: {', '.join(missing)}")
+                if extra:
+                    print(f"[locales]   extra: {', '.join(extra)}")
+            issues += len(missing) + len(extra)
+        for problem in self.problems:
+            print(f"[locales] {problem}")
+        return issues + len(self.problems)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return the process-wide catalog, loading it on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = LocalizationCatalog()
+    return _catalog
+
+
+def reload_catalog():
+    """Re-read locale files (e.g. after editing translations)"""
+    return get_catalog().load()
+
+
+if __name__ == "__main__":
+    # python -m locales.catalog - повний список відсутніх / зайвих ключів
+    sys.exit(1 if get_catalog().report(verbose=True) and "--strict" in sys.argv else 0)
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+
+"""
+Єдиний конвеєр логування бота (запускається з main.setup_logging()).
+
+Обробники й модулі логування (debug_logger, utils.logger,
+utils.logging_utils, ...) лише створюють запис і кладуть його в
+обмежену чергу (QueueHandler); форматування і запис на диск виконує
+окремий потік QueueListener. Якщо черга переповнена, запис
+відкидається, а не блокує обробник.
+
+- logs/bot.jsonl: усі записи у форматі JSON lines; logs/errors.jsonl:
+  WARNING і вище. Запис буферизований (скидається раз на
+  flush_interval), ротація за розміром і за часом, старі файли
+  стискаються gzip.
+- Категорії - логери "bot.<категорія>" (update, command, response,
+  navigation, language, action, ...). Для кожної можна задати частку
+  записів, що зберігаються (sampling); WARNING і вище зберігаються
+  завжди.
+- Профілі: development (DEBUG, усе в консоль) і production (типовий; INFO,
+  debug-категорії вимкнено, вхідні/вихідні повідомлення 10%, у консоль
+  лише WARNING і вище). У production print() з обробників теж іде в
+  конвеєр як категорія "stdout": рядки з "error"/"exception"/"failed"
+  пишуться як WARNING (консоль і errors.jsonl), решта - як INFO
+  (зменшити: LOG_SAMPLING="stdout=0.1").
+
+stats() повертає кількість записів, відкинутих і пропущених семплером.
+"""
+
+import atexit
+import datetime
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+
+CATEGORY_PREFIX = "bot"
+DEFAULT_LOG_DIR = "logs"
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_BACKUPS = 7
+DEFAULT_ROTATE_INTERVAL = 86400         # seconds; a new file at least once a day
+DEFAULT_FLUSH_INTERVAL = 1.0            # seconds buffered records may wait before hitting the disk
+
+# Captured print() lines that report a failure; they are logged at WARNING so sampling never drops them
+_ERROR_LINE = re.compile(r"\b(error|exception|failed|traceback)\b", re.IGNORECASE)
+
+PROFILES = {
+    "development": {
+        "level": logging.DEBUG,
+        "console_level": logging.DEBUG,
+        "sampling": {},
+        "capture_stdout": False,
+    },
+    "production": {
+        "level": logging.INFO,
+        "console_level": logging.WARNING,
+        # Частка записів категорії, що зберігається (0 - вимкнено)
+        "sampling": {"update": 0.1, "response": 0.1, "navigation": 0.1, "language": 0.0, "debug": 0.0},
+        "capture_stdout": True,
+    },
+}
+
+# Standard LogRecord attributes; anything else passed via extra= goes into the JSON record
+_RECORD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+def get_logger(category):
+    """Logger of a category ("update", "command", ...) inside the bot pipeline"""
+    return logging.getLogger(f"{CATEGORY_PREFIX}.{category}")
+
+
+def _category(name):
+    if name.startswith(CATEGORY_PREFIX + "."):
+        return name[len(CATEGORY_PREFIX) + 1:]
+    return name
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, category, msg and the record's extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "category": _category(record.name),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable console line in the style of the old print() logging"""
+
+    def format(self, record):
+        line = f"[{self.formatTime(record, '%Y-%m-%d %H:%M:%S')}] [{record.levelname}] " \
+               f"[{_category(record.name)}] {record.getMessage()}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class GzipRotatingFileHandler(logging.FileHandler):
+    """Buffered file handler that rotates by size and age and gzips the rotated files"""
+
+    def __init__(self, filename, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS,
+                 interval=DEFAULT_ROTATE_INTERVAL, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self._size = 0
+        self._rollover_at = 0.0
+        self._flushed = time.monotonic()
+        super().__init__(filename, encoding="utf-8", delay=True)
+
+    def _open(self):
+        # Великий буфер: диск бачить один запис на flush_interval, а не на кожен рядок
+        stream = open(self.baseFilename, self.mode, encoding=self.encoding, buffering=256 * 1024)
+        self._size = os.path.getsize(self.baseFilename)
+        opened = os.path.getmtime(self.baseFilename) if self._size else time.time()
+        self._rollover_at = opened + self.interval if self.interval else float("inf")
+        return stream
+
+    def _should_rollover(self, length):
+        if self._size == 0:
+            return False
+        return (self.max_bytes and self._size + length > self.max_bytes) or time.time() >= self._rollover_at
+
+    def _backup_name(self, index):
+        return f"{self.baseFilename}.{index}.gz"
+
+    def do_rollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        for index in range(self.backups - 1, 0, -1):
+            source = self._backup_name(index)
+            if os.path.exists(source):
+                os.replace(source, self._backup_name(index + 1))
+        if self.backups > 0 and os.path.exists(self.baseFilename):
+            with open(self.baseFilename, "rb") as source, gzip.open(self._backup_name(1), "wb") as target:
+                shutil.copyfileobj(source, target)
+        if os.path.exists(self.baseFilename):
+            os.remove(self.baseFilename)
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            length = len(line.encode("utf-8")) if not line.isascii() else len(line)
+            if self._should_rollover(length):
+                self.do_rollover()
+                self.stream = self._open()
+            self.stream.write(line)
+            self._size += length
+            if time.monotonic() - self._flushed >= self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._flushed = time.monotonic()
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of a category's records; WARNING and above always pass"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {f"{CATEGORY_PREFIX}.{category}": rate for category, rate in rates.items()}
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        if rate > 0.0 and random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops the record instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Лише підстановка аргументів у потоці, що логує; traceback зберігається окремо від msg.
+        # Без copy.copy: після start() цей обробник - останній (кореневий) для кожного запису
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes the buffered handlers whenever the queue goes idle"""
+
+    def __init__(self, log_queue, *handlers, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block=block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+    def enqueue_sentinel(self):
+        # The queue can be full at shutdown: wait for room instead of raising queue.Full
+        self.queue.put(self._sentinel)
+
+
+class _PrintToLog:
+    """sys.stdout replacement: each printed line becomes a record of the "stdout" category"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.logger = get_logger("stdout")
+        self._local = threading.local()
+
+    def write(self, text):
+        if not self.logger.isEnabledFor(logging.WARNING):
+            return len(text)
+        # print() пише текст і "\n" окремими викликами - рядок збирається по потоках
+        pending = getattr(self._local, "pending", "") + text
+        *lines, self._local.pending = pending.split("\n")
+        for line in lines:
+            if line:
+                level = logging.WARNING if _ERROR_LINE.search(line) else logging.INFO
+                self.logger.log(level, "%s", line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class LogPipeline:
+    """Queue-backed logging setup for the root and "bot.*" loggers"""
+
+    def __init__(self, profile="development", log_dir=DEFAULT_LOG_DIR, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS, interval=DEFAULT_ROTATE_INTERVAL,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, sampling=None, console=True):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown log profile: {profile}")
+        settings = PROFILES[profile]
+        self.profile = profile
+        self.level = settings["level"]
+        self.capture_stdout = settings["capture_stdout"]
+        self._stdout = None
+        self.log_dir = log_dir
+        rates = dict(settings["sampling"])
+        rates.update(sampling or {})
+        os.makedirs(log_dir, exist_ok=True)
+
+        main_file = GzipRotatingFileHandler(os.path.join(log_dir, "bot.jsonl"), max_bytes, backups, interval,
+                                            flush_interval)
+        main_file.setFormatter(JsonLinesFormatter())
+        error_file = GzipRotatingFileHandler(os.path.join(log_dir, "errors.jsonl"), max_bytes, backups, interval,
+                                             flush_interval)
+        error_file.setLevel(logging.WARNING)
+        error_file.setFormatter(JsonLinesFormatter())
+        handlers = [main_file, error_file]
+        if console:
+            # Справжній stdout: sys.stdout може бути перехоплений (capture_stdout)
+            console_handler = logging.StreamHandler(sys.__stdout__ or sys.stdout)
+            console_handler.setLevel(settings["console_level"])
+            console_handler.setFormatter(ConsoleFormatter())
+            handlers.append(console_handler)
+        self.handlers = handlers
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = _DroppingQueueHandler(self.queue)
+        self.sampler = SamplingFilter(rates)
+        self.queue_handler.addFilter(self.sampler)
+        self.listener = _FlushingQueueListener(self.queue, *handlers, flush_interval=flush_interval)
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Route the root logger (and with it every "bot.*" category) into the queue"""
+        with self._lock:
+            if self._started:
+                return self
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(self.queue_handler)
+            # DEBUG - лише для категорій бота, не для бібліотек (tzlocal, urllib3, ...)
+            root.setLevel(max(self.level, logging.INFO))
+            logging.getLogger(CATEGORY_PREFIX).setLevel(self.level)
+            # Категорії з частотою 0 не створюють записів взагалі
+            for name, rate in self.sampler.rates.items():
+                if rate <= 0.0:
+                    logging.getLogger(name).setLevel(logging.WARNING)
+            self.listener.start()
+            logging.logProcesses = logging.logMultiprocessing = False
+            if self.capture_stdout:
+                self._stdout = sys.stdout
+                sys.stdout = _PrintToLog(sys.stdout)
+            self._started = True
+        return self
+
+    def stop(self):
+        """Write out everything queued and close the files"""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            if self._stdout is not None:
+                sys.stdout, self._stdout = self._stdout, None
+            logging.getLogger().removeHandler(self.queue_handler)
+            self.listener.stop()
+            for handler in self.handlers:
+                handler.close()
+
+    def stats(self):
+        return {
+            "profile": self.profile,
+            "queued": self.queue.qsize(),
+            "enqueued": self.queue_handler.enqueued,
+            "dropped": self.queue_handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+_pipeline = None
+
+
+def configure(profile="development", **kwargs):
+    """Start the process-wide pipeline (once); returns it"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(profile, **kwargs).start()
+        atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def get_pipeline():
+    return _pipeline
+
+
+def shutdown():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def parse_sampling(value):
+    """"update=0.1,response=0.5" -> {"update": 0.1, "response": 0.5}"""
+    rates = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            category, _, rate = item.partition("=")
+            rates[category.strip()] = float(rate)
+    return rates
@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 import datetime
+import json
 import logging
 import os
+import secrets
 import signal
 import sys
 import time
 import threading
 from config import user_state
-from config import bot, scheduler
+from config import bot, scheduler, work_scheduler
+import config
 import db_manager
+import log_pipeline
+import metrics
 import requests
 # Шлях до PID файлу для запобігання запуску кількох екземплярів бота
 PID_FILE = "bot.pid"
@@ -60,6 +65,13 @@ def cleanup():
     except Exception as e:
         print(f"Unexpected error in cleanup: {e}")
 
+# Webhook server when BOT_MODE=webhook
+webhook_server = None
+# Asyncio runtime when BOT_RUNTIME=async
+async_runtime = None
+# GET /metrics server (config.METRICS_PORT)
+metrics_server = None
+
 def signal_handler(sig, frame):
     """Handle shutdown signals gracefully"""
     print("\nReceived shutdown signal. Stopping bot...")
@@ -67,9 +79,16 @@ def signal_handler(sig, frame):
     cleanup() # Call cleanup here to remove PID file on shutdown
 
     try:
-        # Stop bot polling first
-        bot.stop_polling()
-        print("Bot polling stopped.")
+        # Stop receiving updates first
+        if webhook_server is not None:
+            webhook_server.stop()
+            print(f"Webhook server stopped. Stats: {webhook_server.stats()}")
+        if async_runtime is not None:
+            async_runtime.stop()
+            print(f"Asyncio runtime stopped. Stats: {async_runtime.stats()}")
+        elif webhook_server is None:
+            bot.stop_polling()
+            print("Bot polling stopped.")
     except Exception as e:
         print(f"Error stopping bot polling: {e}")
     
@@ -83,6 +102,64 @@ def signal_handler(sig, frame):
     except Exception as e:
         print(f"Error stopping scheduler: {e}")
     
+    try:
+        # A reminder run stops at its checkpoint and resumes on the next start
+        from scheduler import reminders
+        reminders.stop()
+    except Exception as e:
+        print(f"Error stopping reminder broadcast: {e}")
+    
+    try:
+        # Finish queued handler and background tasks; they may still queue rating writes
+        work_scheduler.close()
+        print(f"Work scheduler drained. Stats: {work_scheduler.stats()}")
+    except Exception as e:
+        print(f"Error draining work scheduler: {e}")
+    
+    try:
+        # Deliver replies the drained tasks have queued
+        config.outbound.close()
+        print(f"Outbound queue drained. Stats: {config.outbound.stats()}")
+    except Exception as e:
+        print(f"Error draining outbound queue: {e}")
+    
+    try:
+        # Drain queued rating writes before the connections go away
+        flushed = db_manager.rating_queue.stop()
+        print(f"Rating queue drained ({flushed} items). Stats: {db_manager.get_rating_queue_stats()}")
+    except Exception as e:
+        print(f"Error draining rating queue: {e}")
+    
+    try:
+        # Untranslated words are simply queued again on the next read
+        db_manager.translation_backfill.stop()
+        print(f"Translation backfill stopped. Stats: {db_manager.get_translation_backfill_stats()}")
+    except Exception as e:
+        print(f"Error stopping translation backfill: {e}")
+    
+    try:
+        # Write translations still waiting in the cache's background writer
+        from translation_cache import translation_cache
+        translation_cache.close()
+        print(f"Translation cache saved. Stats: {translation_cache.stats()}")
+    except Exception as e:
+        print(f"Error saving translation cache: {e}")
+    
+    try:
+        # Persist in-flight sessions so games survive the restart
+        user_state.close()
+        print(f"Sessions saved. Stats: {user_state.stats()}")
+    except Exception as e:
+        print(f"Error saving sessions: {e}")
+    
+    try:
+        # Close pooled database connections
+        print(f"DB pool stats: {db_manager.get_pool_stats()}")
+        db_manager.pool.close_all()
+        print("Database connections closed.")
+    except Exception as e:
+        print(f"Error closing database connections: {e}")
+
     try:
         # Log the shutdown
         from debug_logger import log_action
@@ -90,7 +167,15 @@ def signal_handler(sig, frame):
     except Exception as e:
         print(f"Error logging shutdown: {e}")
     
+    try:
+        if metrics_server is not None:
+            metrics_server.stop()
+    except Exception as e:
+        print(f"Error stopping metrics server: {e}")
+    
     print("Bot shutdown complete.")
+    # Write out the queued log records last
+    log_pipeline.shutdown()
     sys.exit(0)
 
 def reset_dictionaries():
@@ -148,8 +233,17 @@ def setup_scheduler():
         job = schedule_reminders()
         
         # Log success with standard logging instead of log_action
-        print(f"Daily reminder scheduled for {job[0]} (job id: {job[1]})")
+        print(f"Reminders scheduled {job[0]} (job id: {job[1]})")
         logging.info(f"Scheduler initialized with job ID: {job[1]}")
+        
+        # Nightly spaced-repetition queue, plus one build now so today's queue exists
+        from spaced_repetition import schedule_daily_queue_job, build_daily_queues
+        schedule_daily_queue_job(scheduler)
+        build_daily_queues()
+        
+        if not scheduler.running:
+            scheduler.start()
+            print("Scheduler started.")
         return True
     except Exception as e:
         print(f"Error setting up scheduler: {e}")
@@ -157,6 +251,44 @@ def setup_scheduler():
         traceback.print_exc()
         return False
 
+def setup_metrics():
+    """Export component stats as gauges and serve GET /metrics"""
+    global metrics_server
+    from scheduler import reminders
+    from translation_cache import get_translation_cache_stats
+    
+    # Handler, DB and API timings are recorded by the hooks installed in config/db_manager;
+    # queue depths, cache hit rates and sessions are read from stats() at scrape time
+    metrics.registry.add_collector("work_scheduler", work_scheduler.stats)
+    metrics.registry.add_collector("outbound", config.outbound.stats)
+    metrics.registry.add_collector("sessions", user_state.stats)
+    metrics.registry.add_collector("db_pool", db_manager.get_pool_stats)
+    metrics.registry.add_collector("deck_cache", db_manager.get_deck_cache_stats)
+    metrics.registry.add_collector("user_profiles", db_manager.get_user_profile_stats)
+    metrics.registry.add_collector("rating_queue", db_manager.get_rating_queue_stats)
+    metrics.registry.add_collector("translation_backfill", db_manager.get_translation_backfill_stats)
+    metrics.registry.add_collector("translation_cache", get_translation_cache_stats)
+    metrics.registry.add_collector("reminders", reminders.stats)
+    metrics.registry.add_collector("logging", lambda: log_pipeline.get_pipeline().stats())
+    metrics.registry.add_collector("webhook", lambda: webhook_server.stats() if webhook_server else {})
+    metrics.registry.add_collector("async", lambda: async_runtime.stats() if async_runtime else {})
+    metrics.registry.add_collector("queries", db_manager.query_profiler.stats)
+    
+    if not config.METRICS_PORT:
+        return None
+    try:
+        metrics_server = metrics.MetricsServer(host=config.METRICS_HOST, port=config.METRICS_PORT)
+        # JSON for `python query_profiler.py report`
+        metrics_server.add_route("/queries", "application/json", lambda params: json.dumps(
+            db_manager.query_profiler.report(limit=int(params.get("limit", 20)), order=params.get("order", "total")),
+            ensure_ascii=False))
+        port = metrics_server.start()
+        print(f"Metrics: http://{config.METRICS_HOST}:{port}/metrics")
+    except OSError as e:
+        metrics_server = None
+        print(f"Error starting metrics server: {e}")
+    return metrics_server
+
 # Initialize the database schema on startup if needed
 def setup_database():
     """Initialize the database with necessary tables"""
@@ -172,87 +304,119 @@ def setup_database():
         db_manager.create_shared_dictionary_tables()
         
         # Ensure the active_days column exists in users table
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if active_days column exists
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [col[1] for col in cursor.fetchall()]
+            # Check if active_days column exists
+            cursor.execute("PRAGMA table_info(users)")
+            columns = [col[1] for col in cursor.fetchall()]
         
-        if 'active_days' not in columns:
-            print("Adding active_days column to users table")
-            try:
-                cursor.execute("ALTER TABLE users ADD COLUMN active_days INTEGER DEFAULT 0")
-                conn.commit()
-                print("Successfully added active_days column")
-            except Exception as e:
-                print(f"Error adding active_days column: {e}")
+            if 'active_days' not in columns:
+                print("Adding active_days column to users table")
+                try:
+                    cursor.execute("ALTER TABLE users ADD COLUMN active_days INTEGER DEFAULT 0")
+                    conn.commit()
+                    print("Successfully added active_days column")
+                except Exception as e:
+                    print(f"Error adding active_days column: {e}")
         
-        conn.close()
-        print("Database setup check complete.")
+            print("Database setup check complete.")
     except Exception as e:
         print(f"Error during database setup: {e}")
         import traceback
         traceback.print_exc()
 
 def setup_logging():
-    """Set up logging for the application"""
-    try:
-        import logging
-        import os
-        
-        # Create logs directory if it doesn't exist
-        log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
-        # Configure logging
-        log_file = os.path.join(log_dir, 'bot.log')
-        
-        # Set up basic configuration
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
-        
-        # Create logger
-        logger = logging.getLogger(__name__)
-        logger.info("Logging initialized")
-        
-        return logger
-    except Exception as e:
-        print(f"Error setting up logging: {e}")
-        # Fallback to basic print if logging setup fails
-        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-        logging.error(f"Logging setup failed: {e}", exc_info=True)
-        return logging.getLogger(__name__) # Return a basic logger
+    """Start the logging pipeline with the profile and options from config"""
+    log_pipeline.configure(config.LOG_PROFILE, **config.LOG_OPTIONS)
+    logger = logging.getLogger(__name__)
+    logger.info("Logging initialized: %s", log_pipeline.get_pipeline().stats())
+    return logger
+
+_update_log = log_pipeline.get_logger("update")
 
-# configure file logging for all bot traffic
-logging.basicConfig(
-    filename='bot2.log', level=logging.INFO,
-    format='%(asctime)s %(message)s'
-)
 # listener to log every incoming update
 def log_all_updates(messages):
+    if not _update_log.isEnabledFor(logging.INFO):
+        return
     for message in messages:
         if hasattr(message, 'text'):
-            chat_id = message.chat.id
-            text = message.text
-            log_str = f"INCOMING | From: {chat_id} | Text: {text}"
-            logging.info(log_str)
-            print(f"[SERVER LOG] {log_str}")
+            _update_log.info("INCOMING | From: %s | Text: %s", message.chat.id, message.text,
+                             extra={"chat_id": message.chat.id})
 # attach listener
 bot.set_update_listener(log_all_updates)
 
+def create_webhook_server(process_updates=None):
+    """Build the webhook server from config (not started)"""
+    from webhook_server import WebhookServer
+    
+    if not config.WEBHOOK_SECRET:
+        # Without a secret anyone who can reach the port could post forged updates
+        if not config.WEBHOOK_URL:
+            raise RuntimeError("WEBHOOK_SECRET must be set when the webhook is registered manually")
+        config.WEBHOOK_SECRET = secrets.token_urlsafe(32)
+        print("WEBHOOK_SECRET is not set, using a generated secret for this run")
+    
+    return WebhookServer(
+        bot,
+        host=config.WEBHOOK_HOST,
+        port=config.WEBHOOK_PORT,
+        path=config.WEBHOOK_PATH,
+        secret_token=config.WEBHOOK_SECRET,
+        record_path=config.WEBHOOK_RECORD,
+        ssl_cert=config.WEBHOOK_SSL_CERT,
+        ssl_key=config.WEBHOOK_SSL_KEY,
+        process_updates=process_updates,
+    )
+
+def register_webhook():
+    """Point Telegram at the webhook server once it is listening"""
+    if config.WEBHOOK_URL:
+        url = config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH
+        bot.remove_webhook()
+        bot.set_webhook(url=url, secret_token=config.WEBHOOK_SECRET, max_connections=40)
+        print(f"Webhook registered: {url}")
+    else:
+        print("WEBHOOK_URL is not set, the webhook must be registered manually")
+
+def run_webhook():
+    """Receive updates through the built-in webhook server instead of long polling"""
+    global webhook_server
+    
+    webhook_server = create_webhook_server()
+    webhook_server.start()
+    register_webhook()
+    webhook_server.wait()
+
+def run_async():
+    """Serve updates from one asyncio event loop (BOT_RUNTIME=async)"""
+    global async_runtime, webhook_server
+    from async_runtime import AsyncRuntime
+    import handlers.async_navigation
+    
+    async_runtime = AsyncRuntime(
+        config.TOKEN,
+        bot,
+        db_threads=config.ASYNC_DB_THREADS,
+        io_threads=config.ASYNC_IO_THREADS,
+    )
+    handlers.async_navigation.register(async_runtime)
+    
+    if config.BOT_MODE == "webhook":
+        webhook_server = create_webhook_server(process_updates=async_runtime.submit_updates)
+        async_runtime.run(webhook_server=webhook_server, on_start=register_webhook)
+    else:
+        print("Bot is starting to poll (asyncio runtime)...")
+        async_runtime.run()
+
 def main():
     """Main entry point for the bot"""
     if not check_instance(): # Check if another instance is running
         return
 
+    # Setup logging first: it takes over the root logger (and print() in production)
+    setup_logging()
+
     # Register signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -268,8 +432,9 @@ def main():
     # Setup database
     setup_database()
     
-    # Setup logging
-    setup_logging()
+    # Load localizations once and report missing/extra keys per locale
+    from locales.catalog import get_catalog
+    get_catalog().report()
     
     # Set up message handlers
     import handlers.main_menu
@@ -281,6 +446,7 @@ def main():
     import handlers.hard_level
     import handlers.shared_dicts
     import handlers.possessive_articles
+    import handlers.reminders
     
     # Admin handlers
     import handlers.admin
@@ -294,6 +460,16 @@ def main():
     # Initialize reminder scheduler
     setup_scheduler()
     
+    setup_metrics()
+    
+    if config.BOT_RUNTIME == "async":
+        run_async()
+        return
+    
+    if config.BOT_MODE == "webhook":
+        run_webhook()
+        return
+    
     print("Bot is starting to poll...")
     # Resilient polling loop to avoid breaking handler registration
     while True:
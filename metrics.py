@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+"""
+Метрики продуктивності у текстовому форматі Prometheus.
+
+- гістограми тривалості обробників (install(bot) обгортає кожен обробник,
+  next step і слухача оновлень), запитів db_manager і викликів Telegram API
+  (хук OutboundDispatcher);
+- лічильники помилок за обробником, типом SQL-запиту, методом і кодом API;
+- стан решти компонентів (глибина черг, hit rate кешів, активні сесії)
+  береться з їхніх stats() у момент запиту: add_collector("outbound", outbound.stats).
+
+MetricsServer віддає registry.render() на GET /metrics (за замовчуванням
+лише 127.0.0.1). Без додаткових залежностей: запис у гістограму - це
+bisect і додавання під блокуванням.
+"""
+
+import bisect
+import functools
+import inspect
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# seconds; handlers and Telegram calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# seconds; SQLite statements and pool acquisitions
+DB_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def metric_name(*parts):
+    """Prometheus-safe name from its parts: metric_name("bot", "deck cache", "hit_rate")"""
+    return _INVALID_NAME_CHARS.sub("_", "_".join(str(part) for part in parts if part)).lower()
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def values(self):
+        """{label values: count}"""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        for label_values, value in sorted(self.values().items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}       # label values -> [counts per bucket + overflow, sum, count, max]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            if value > series[3]:
+                series[3] = value
+
+    def time(self, *label_values):
+        """Decorator timing every call of the function"""
+        def decorator(func):
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *label_values)
+            return timed
+        return decorator
+
+    def snapshot(self):
+        """{label values: (counts per bucket, sum, count, max)}"""
+        with self._lock:
+            return {key: (list(counts), total, count, maximum)
+                    for key, (counts, total, count, maximum) in self._series.items()}
+
+    def quantile(self, counts, fraction, maximum=None):
+        """Estimate a quantile from bucket counts (linear inside the bucket, as histogram_quantile does).
+
+        With maximum (the largest observed value) the estimate never exceeds it,
+        so a handful of fast calls is not reported at the bucket's upper bound.
+        """
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = fraction * total
+        seen = 0
+        estimate = self.buckets[-1]
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if index < len(self.buckets):
+                    lower = self.buckets[index - 1] if index else 0.0
+                    estimate = lower + (self.buckets[index] - lower) * (rank - seen) / count
+                elif maximum is not None:
+                    estimate = maximum      # above the last bound
+                break
+            seen += count
+        return min(estimate, maximum) if maximum is not None else estimate
+
+    def samples(self):
+        for label_values, (counts, total, count, _) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labels, label_values, f'le="{_format_value(bound)}"'), cumulative)
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Registry:
+    """Metrics plus stats() collectors rendered together in the text exposition format"""
+
+    def __init__(self, prefix="bot"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = {}
+        self.collector_errors = 0
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(metric_name(self.prefix, name), documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(metric_name(self.prefix, name), documentation, labels, buckets))
+
+    def add_collector(self, name, stats):
+        """Export the numeric values of stats() as gauges bot_<name>_<key> at scrape time"""
+        with self._lock:
+            self._collectors[name] = stats
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        for collector, stats in collectors:
+            try:
+                values = stats() or {}
+            except Exception as e:
+                self.collector_errors += 1
+                lines.append(f"# collector {collector} failed: {_escape(e)}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = metric_name(self.prefix, collector, key)
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+handler_seconds = registry.histogram("handler_duration_seconds", "Time spent in a bot handler", ("handler",))
+handler_errors = registry.counter("handler_errors_total", "Handler calls that raised", ("handler",))
+db_query_seconds = registry.histogram("db_query_duration_seconds", "db_manager.execute_query time by statement type",
+                                      ("statement",), DB_BUCKETS)
+db_query_errors = registry.counter("db_query_errors_total", "db_manager.execute_query errors by statement type",
+                                   ("statement",))
+db_acquire_seconds = registry.histogram("db_connection_acquire_seconds", "db_manager.get_connection time",
+                                        buckets=DB_BUCKETS)
+api_seconds = registry.histogram("telegram_api_duration_seconds", "Telegram API call time (without queueing)",
+                                 ("method",))
+api_errors = registry.counter("telegram_api_errors_total", "Failed Telegram API calls", ("method", "code"))
+
+
+# --- handlers ---
+
+def handler_name(func):
+    """"module.function" of a handler; partials are named after the wrapped function"""
+    func = getattr(func, "func", func)
+    module = (getattr(func, "__module__", None) or "").rsplit(".", 1)[-1]
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    return f"{module}.{name}" if module else name
+
+
+def instrument_handler(func, name=None):
+    """Wrap a synchronous handler so its time and exceptions are recorded"""
+    if hasattr(func, "_metrics_handler") or inspect.iscoroutinefunction(func):
+        return func
+    name = name or handler_name(func)
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            handler_errors.inc(name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, name)
+    timed._metrics_handler = name
+    return timed
+
+
+def install(bot):
+    """Time every handler the bot runs (instance attributes, like OutboundDispatcher.install).
+
+    Registered handlers are wrapped once at registration; next step callbacks
+    and update listeners when they are queued. The bot's own dispatch method
+    (filters and middlewares around the handler) is not timed separately.
+    """
+    build_handler_dict = bot._build_handler_dict
+    exec_task = bot._exec_task
+
+    def _build_handler_dict(handler, pass_bot=False, **filters):
+        return build_handler_dict(instrument_handler(handler), pass_bot, **filters)
+
+    def _exec_task(task, *args, **kwargs):
+        if getattr(task, "__self__", None) is not bot:
+            task = instrument_handler(task)
+        return exec_task(task, *args, **kwargs)
+
+    bot._build_handler_dict = _build_handler_dict
+    bot._exec_task = _exec_task
+
+
+def latency_rows(histogram, errors=None):
+    """Series ordered by p99: [(first label, calls, errors, mean_s, p50_s, p99_s), ...]
+
+    errors is a Counter whose first label matches the histogram's (other labels are summed).
+    """
+    failed = {}
+    if errors is not None:
+        for label_values, value in errors.values().items():
+            failed[label_values[0]] = failed.get(label_values[0], 0) + value
+    rows = []
+    for label_values, (counts, total, count, maximum) in histogram.snapshot().items():
+        label = label_values[0] if label_values else ""
+        rows.append((label, count, failed.get(label, 0), total / count if count else 0.0,
+                     histogram.quantile(counts, 0.50, maximum), histogram.quantile(counts, 0.99, maximum)))
+    rows.sort(key=lambda row: (row[5], row[3]), reverse=True)
+    return rows
+
+
+def slow_handlers(limit=10):
+    """The slowest handlers: latency_rows() of handler_seconds"""
+    return latency_rows(handler_seconds, handler_errors)[:limit]
+
+
+# --- database and Telegram API ---
+
+STATEMENT_TYPES = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER",
+                             "PRAGMA", "WITH", "BEGIN", "COMMIT", "VACUUM", "ANALYZE"))
+
+
+def statement_type(query):
+    """SELECT / INSERT / UPDATE / ... (OTHER for the rest) - a label with a handful of values"""
+    head = query.lstrip().split(None, 1)
+    keyword = head[0].upper() if head else ""
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def observe_api_call(method, seconds, error=None):
+    """OutboundDispatcher request hook"""
+    api_seconds.observe(seconds, method)
+    if error is not None:
+        api_errors.inc(method, str(getattr(error, "error_code", None) or type(error).__name__))
+
+
+# --- /metrics endpoint ---
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    server_version = "LanguageLearnBot"
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        route = self.server.routes.get(path)
+        if route is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        content_type, render = route
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        try:
+            body = render(params).encode("utf-8")
+            status = 200
+        except Exception as e:
+            body, status, content_type = f"{type(e).__name__}: {e}\n".encode("utf-8"), 500, "text/plain"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # One line per scrape every few seconds is noise
+        pass
+
+
+class MetricsServer:
+    """Small HTTP server answering GET /metrics (and any added routes) in a daemon thread"""
+
+    def __init__(self, registry=registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.routes = {"/metrics": (CONTENT_TYPE, lambda params: registry.render())}
+        self._httpd = None
+        self._thread = None
+
+    def add_route(self, path, content_type, render):
+        """Serve render(query params) -> str on GET path"""
+        self.routes[path] = (content_type, render)
+
+    def start(self):
+        """Start serving (non-blocking); returns the bound port"""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _MetricsRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.routes = self.routes
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
@@ -6,6 +6,7 @@
 
 import sqlite3
 import os
+import re
 
 def migrate_shared_dictionary_users():
     """
@@ -169,6 +170,234 @@ def fix_dictionary_admin_status():
     print(f"Fixed admin status for {fixed_count} dictionaries")
     return True
 
+LEGACY_USER_TABLE_RE = re.compile(r'^user_(\d+)$')
+
+def migrate_user_tables_to_user_words(db_path=None, drop_legacy=True):
+    """
+    Міграція персональних словників зі старих таблиць user_{chat_id}
+    в єдину таблицю user_words(chat_id, word_id, rating).
+    
+    Кожна таблиця переноситься та (за замовчуванням) видаляється в одній
+    транзакції, тому міграцію можна безпечно перезапускати.
+    
+    Returns:
+        tuple: (migrated_tables, migrated_rows)
+    """
+    from db_init import DB_PATH as DEFAULT_DB_PATH, create_user_words_table
+    
+    db_path = db_path or DEFAULT_DB_PATH
+    if not os.path.exists(db_path):
+        print(f"Database file not found at {db_path}")
+        return (0, 0)
+    
+    conn = None
+    migrated_tables = 0
+    migrated_rows = 0
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        cursor = conn.cursor()
+        create_user_words_table(cursor)
+        conn.commit()
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'user\\_%' ESCAPE '\\'")
+        legacy_tables = []
+        for (name,) in cursor.fetchall():
+            match = LEGACY_USER_TABLE_RE.match(name)
+            if match:
+                legacy_tables.append((name, int(match.group(1))))
+        
+        if not legacy_tables:
+            return (0, 0)
+        
+        print(f"Migrating {len(legacy_tables)} legacy user tables into user_words...")
+        for table_name, chat_id in legacy_tables:
+            try:
+                cursor.execute(f'''
+                INSERT OR IGNORE INTO user_words (chat_id, word_id, rating)
+                SELECT ?, word_id, COALESCE(rating, 0.0)
+                FROM {table_name}
+                WHERE word_id IS NOT NULL
+                ''', (chat_id,))
+                migrated_rows += cursor.rowcount
+                if drop_legacy:
+                    cursor.execute(f"DROP TABLE {table_name}")
+                conn.commit()
+                migrated_tables += 1
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"SQLite error migrating table {table_name}: {e}")
+    except sqlite3.Error as e:
+        print(f"SQLite error during migrate_user_tables_to_user_words: {e}")
+    except Exception as e:
+        print(f"Unexpected error during migrate_user_tables_to_user_words: {e}")
+    finally:
+        if conn:
+            conn.close()
+    
+    print(f"Migration complete: {migrated_tables} user tables, {migrated_rows} rows moved to user_words")
+    return (migrated_tables, migrated_rows)
+
+LEGACY_SHARED_TABLE_RE = re.compile(r'^shared_dict_(\d+)$')
+
+def migrate_shared_dict_tables(db_path=None, drop_legacy=True):
+    """
+    Міграція спільних словників зі старих таблиць shared_dict_{id}
+    (одна колонка user_{chat_id} на кожного учасника) в нормалізовані
+    таблиці shared_dict_words(dict_id, word_id) та
+    shared_dict_ratings(dict_id, user_id, word_id, rating).
+    
+    Кожна таблиця переноситься в окремій транзакції; повторний запуск безпечний.
+    
+    Returns:
+        tuple: (migrated_tables, migrated_words, migrated_ratings)
+    """
+    from db_init import DB_PATH as DEFAULT_DB_PATH
+    
+    db_path = db_path or DEFAULT_DB_PATH
+    if not os.path.exists(db_path):
+        print(f"Database file not found at {db_path}")
+        return (0, 0, 0)
+    
+    conn = None
+    migrated_tables = 0
+    migrated_words = 0
+    migrated_ratings = 0
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'shared\\_dict\\_%' ESCAPE '\\'")
+        legacy_tables = []
+        for (name,) in cursor.fetchall():
+            match = LEGACY_SHARED_TABLE_RE.match(name)
+            if match:
+                legacy_tables.append((name, int(match.group(1))))
+        
+        if not legacy_tables:
+            return (0, 0, 0)
+        
+        print(f"Migrating {len(legacy_tables)} legacy shared dictionary tables...")
+        for table_name, dict_id in legacy_tables:
+            try:
+                cursor.execute(f'''
+                INSERT OR IGNORE INTO shared_dict_words (dict_id, word_id)
+                SELECT ?, word_id FROM {table_name}
+                WHERE word_id IS NOT NULL
+                ''', (dict_id,))
+                migrated_words += cursor.rowcount
+                
+                cursor.execute(f"PRAGMA table_info({table_name})")
+                for column in [col[1] for col in cursor.fetchall()]:
+                    match = LEGACY_USER_TABLE_RE.match(column)
+                    if not match:
+                        continue
+                    # Нульовий рейтинг - значення за замовчуванням, його не зберігаємо
+                    cursor.execute(f'''
+                    INSERT OR REPLACE INTO shared_dict_ratings (dict_id, user_id, word_id, rating)
+                    SELECT ?, ?, word_id, {column} FROM {table_name}
+                    WHERE word_id IS NOT NULL AND {column} IS NOT NULL AND {column} != 0
+                    ''', (dict_id, int(match.group(1))))
+                    migrated_ratings += cursor.rowcount
+                
+                if drop_legacy:
+                    cursor.execute(f"DROP TABLE {table_name}")
+                conn.commit()
+                migrated_tables += 1
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"SQLite error migrating table {table_name}: {e}")
+    except sqlite3.Error as e:
+        print(f"SQLite error during migrate_shared_dict_tables: {e}")
+    except Exception as e:
+        print(f"Unexpected error during migrate_shared_dict_tables: {e}")
+    finally:
+        if conn:
+            conn.close()
+    
+    print(f"Migration complete: {migrated_tables} shared tables, {migrated_words} words, "
+          f"{migrated_ratings} ratings moved")
+    return (migrated_tables, migrated_words, migrated_ratings)
+
+# Ті самі межі, що й db_manager.RATING_MIN/RATING_MAX (без імпорту конфігурації бота)
+CSV_RATING_MIN = 0.0
+CSV_RATING_MAX = 5.0
+CSV_DICT_NAME = "dictionary.csv"
+IMPORTED_SUFFIX = ".imported"
+
+def import_csv_priorities(db_path=None, dict_dir="user_dictionaries"):
+    """
+    Одноразове перенесення рейтингів зі старих CSV-словників
+    user_dictionaries/<chat_id>/dictionary.csv у user_words.rating.
+    
+    Для слів, які вже є в словнику користувача, зберігається більший з двох
+    рейтингів (обмежений 0..5). Оброблений файл перейменовується в
+    dictionary.csv.imported, тож повторний запуск його не чіпає.
+    
+    Returns:
+        tuple: (imported_files, updated_rows)
+    """
+    import csv
+    from db_init import DB_PATH as DEFAULT_DB_PATH, create_user_words_table
+    
+    db_path = db_path or DEFAULT_DB_PATH
+    if not os.path.exists(db_path) or not os.path.isdir(dict_dir):
+        return (0, 0)
+    
+    csv_files = []
+    for name in os.listdir(dict_dir):
+        path = os.path.join(dict_dir, name, CSV_DICT_NAME)
+        if name.isdigit() and os.path.isfile(path):
+            csv_files.append((path, int(name)))
+    if not csv_files:
+        return (0, 0)
+    
+    conn = None
+    imported_files = 0
+    updated_rows = 0
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        cursor = conn.cursor()
+        create_user_words_table(cursor)
+        
+        print(f"Importing priorities from {len(csv_files)} CSV dictionaries...")
+        for path, chat_id in csv_files:
+            try:
+                with open(path, newline="", encoding="utf-8-sig") as f:
+                    rows = []
+                    for row in csv.DictReader(f):
+                        try:
+                            priority = float(row.get("priority") or 0.0)
+                        except ValueError:
+                            continue
+                        word = (row.get("word") or "").strip()
+                        if word and priority == priority:   # skip NaN
+                            rows.append((min(CSV_RATING_MAX, max(CSV_RATING_MIN, priority)), chat_id, word))
+                
+                cursor.executemany('''
+                UPDATE user_words SET rating = MAX(rating, ?)
+                WHERE chat_id = ?
+                  AND word_id = (SELECT id FROM words WHERE word = ?)
+                ''', rows)
+                updated_rows += max(cursor.rowcount, 0)
+                conn.commit()
+                os.replace(path, path + IMPORTED_SUFFIX)
+                imported_files += 1
+            except (OSError, csv.Error, sqlite3.Error) as e:
+                conn.rollback()
+                print(f"Error importing priorities from {path}: {e}")
+    except sqlite3.Error as e:
+        print(f"SQLite error during import_csv_priorities: {e}")
+    finally:
+        if conn:
+            conn.close()
+    
+    print(f"CSV import complete: {imported_files} files, {updated_rows} ratings updated")
+    return (imported_files, updated_rows)
+
 if __name__ == "__main__":
+    import sys
     migrate_shared_dictionary_users()
     fix_dictionary_admin_status()
+    migrate_user_tables_to_user_words(drop_legacy="--keep-legacy" not in sys.argv)
+    migrate_shared_dict_tables(drop_legacy="--keep-legacy" not in sys.argv)
+    import_csv_priorities()
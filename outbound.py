@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+"""
+Черга вихідних запитів до Telegram API (config.outbound).
+
+Методи бота, що надсилають або змінюють повідомлення (send_message,
+edit_message_text, delete_message, answer_callback_query, ...), проходять
+через OutboundDispatcher:
+- token bucket на весь бот (~30 повідомлень/с) і на кожен чат (~1/с в
+  особистих чатах, 20/хв у групах);
+- відповідь 429 з retry_after призупиняє чат (або весь бот) і повторює
+  запит, замість блокувати потік обробника в urllib3 Retry;
+- інтерактивні відповіді мають пріоритет над розсилками
+  (with outbound.broadcast(): ...);
+- запити виконує фіксована кількість потоків відправки, під яку
+  розрахований пул keep-alive з'єднань requests (config.bot_session).
+
+Виклик лишається синхронним: bot.send_message() повертає Message, як і
+раніше, лише чекає своєї черги. stats() повертає затримки й лічильники
+обмежень; add_request_hook() отримує тривалість кожного виклику API.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from telebot.apihelper import ApiTelegramException
+
+from latency import percentile, window
+
+INTERACTIVE = 0
+BROADCAST = 1
+
+DEFAULT_GLOBAL_RATE = 30.0          # messages per second for the whole bot
+DEFAULT_CHAT_RATE = 1.0             # messages per second in a private chat
+DEFAULT_CHAT_BURST = 3
+DEFAULT_GROUP_RATE = 20 / 60.0      # messages per second in a group
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 3
+SCAN_LIMIT = 256                    # queued requests examined per dispatch
+
+# Methods that post or change a message count against the chat's limit;
+# the rest only against the bot-wide rate
+CHAT_METHODS = (
+    "send_message", "send_photo", "send_document", "send_audio", "send_voice", "send_video",
+    "send_animation", "send_sticker", "send_location", "send_media_group", "forward_message",
+    "copy_message", "edit_message_text", "edit_message_reply_markup", "edit_message_caption",
+)
+GLOBAL_METHODS = ("delete_message", "answer_callback_query")
+
+
+class TokenBucket:
+    """Non-blocking token bucket; the dispatcher asks when the next token is due"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available (0 if one is available now)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, until):
+        """retry_after: no tokens until the given monotonic time"""
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = 0
+
+    def idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class _Request:
+    __slots__ = ("chat_id", "method", "call", "priority", "future", "queued_at", "attempts", "throttled")
+
+    def __init__(self, chat_id, method, call, priority):
+        self.chat_id = chat_id
+        self.method = method
+        self.call = call
+        self.priority = priority
+        self.future = Future()
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+        self.throttled = False
+
+
+class OutboundDispatcher:
+    """Rate-limited, prioritized queue in front of the bot's Telegram API calls"""
+
+    def __init__(self, global_rate=DEFAULT_GLOBAL_RATE, chat_rate=DEFAULT_CHAT_RATE, chat_burst=DEFAULT_CHAT_BURST,
+                 group_rate=DEFAULT_GROUP_RATE, concurrency=DEFAULT_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 name="outbound"):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.name = name
+        # No burst for the whole bot: Telegram counts ~30 messages in any one-second window
+        self._global = TokenBucket(global_rate, 1)
+        self._chats = {}
+        self._queues = {INTERACTIVE: deque(), BROADCAST: deque()}
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._senders = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"{name}-send")
+        self._in_flight = 0
+        self._thread = None
+        self._closed = False
+        self._request_hooks = []
+        # metrics
+        self._sent = 0
+        self._failed = 0
+        self._throttled = 0
+        self._retry_after = 0
+        self._retries = 0
+        self._latency = window()     # enqueue -> response, ms
+        self._waits = window()       # enqueue -> sent to the API, ms
+
+    # --- public API ---
+
+    @contextmanager
+    def broadcast(self):
+        """Calls made by this thread inside the block yield to interactive replies"""
+        previous = getattr(self._local, "priority", INTERACTIVE)
+        self._local.priority = BROADCAST
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def submit(self, chat_id, method, call, priority=None):
+        """Queue call() (one API request); returns a Future with its result"""
+        if priority is None:
+            priority = getattr(self._local, "priority", INTERACTIVE)
+        request = _Request(chat_id, method, call, priority)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} dispatcher is closed")
+            self._queues[priority].append(request)
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-dispatch", daemon=True)
+                self._thread.start()
+        return request.future
+
+    def add_request_hook(self, hook):
+        """Register hook(method, seconds, error) called after every API request (error is None on success)"""
+        self._request_hooks.append(hook)
+
+    def install(self, bot):
+        """Route the bot's sending methods through the dispatcher (instance attributes)"""
+        for name in CHAT_METHODS + GLOBAL_METHODS:
+            original = getattr(bot, name, None)
+            if original is None:
+                continue
+            setattr(bot, name, self._wrap(name, original, name in CHAT_METHODS))
+
+    def _wrap(self, name, original, per_chat):
+        signature = inspect.signature(original)
+
+        @functools.wraps(original)
+        def send(*args, **kwargs):
+            chat_id = None
+            if per_chat:
+                try:
+                    chat_id = signature.bind_partial(*args, **kwargs).arguments.get("chat_id")
+                except TypeError:
+                    pass
+            if threading.current_thread().name.startswith(f"{self.name}-"):
+                # Already on a sender thread (e.g. a method calling another wrapped method)
+                return original(*args, **kwargs)
+            future = self.submit(chat_id, name, functools.partial(original, *args, **kwargs))
+            return future.result()
+        return send
+
+    # --- dispatching ---
+
+    def _bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 10000:
+                now = time.monotonic()
+                for key in [k for k, b in self._chats.items() if b.idle(now)]:
+                    del self._chats[key]
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _pick(self, now):
+        """Return (request, None) for the next sendable request, or (None, seconds to wait)"""
+        wait = None
+        global_delay = self._global.delay(now)
+        for priority in (INTERACTIVE, BROADCAST):
+            queue = self._queues[priority]
+            blocked = set()
+            for index, request in enumerate(queue):
+                if index >= SCAN_LIMIT:
+                    break
+                if request.chat_id in blocked:
+                    continue        # keep each chat's messages in order
+                delay = self._bucket(request.chat_id).delay(now) if request.chat_id is not None else 0.0
+                delay = max(delay, global_delay)
+                if delay <= 0:
+                    del queue[index]
+                    return request, None
+                blocked.add(request.chat_id)
+                if not request.throttled:
+                    request.throttled = True
+                    self._throttled += 1
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not any(self._queues.values()):
+                        return
+                    if self._in_flight < self.concurrency:
+                        request, wait = self._pick(time.monotonic())
+                        if request is not None:
+                            break
+                    else:
+                        wait = None     # a sender finishing will notify
+                    self._cond.wait(wait)
+                now = time.monotonic()
+                self._global.take(now)
+                if request.chat_id is not None:
+                    self._bucket(request.chat_id).take(now)
+                self._in_flight += 1
+            if request.attempts == 0:
+                self._waits.append((now - request.queued_at) * 1000)
+            self._senders.submit(self._send, request)
+
+    def _send(self, request):
+        request.attempts += 1
+        retry = False
+        error = None
+        started = time.monotonic()
+        try:
+            result = request.call()
+        except ApiTelegramException as e:
+            error = e
+            retry_after = (e.result_json.get("parameters") or {}).get("retry_after") if e.error_code == 429 else None
+            if retry_after is not None and request.attempts <= self.max_retries:
+                self._on_retry_after(request, retry_after)
+                retry = True
+            else:
+                self._failed += 1
+                request.future.set_exception(e)
+        except Exception as e:
+            error = e
+            self._failed += 1
+            request.future.set_exception(e)
+        else:
+            self._sent += 1
+            self._latency.append((time.monotonic() - request.queued_at) * 1000)
+            request.future.set_result(result)
+        finally:
+            self._run_hooks(request.method, time.monotonic() - started, error)
+            with self._cond:
+                self._in_flight -= 1
+                if retry:
+                    # Front of its queue: the chat's later messages must not overtake it
+                    self._queues[request.priority].appendleft(request)
+                self._cond.notify()
+
+    def _run_hooks(self, method, seconds, error):
+        for hook in self._request_hooks:
+            try:
+                hook(method, seconds, error)
+            except Exception as e:
+                print(f"Error in outbound request hook: {e}")
+
+    def _on_retry_after(self, request, retry_after):
+        self._retry_after += 1
+        self._retries += 1
+        until = time.monotonic() + float(retry_after)
+        with self._cond:
+            if request.chat_id is not None:
+                self._bucket(request.chat_id).pause(until)
+            else:
+                self._global.pause(until)
+        print(f"Telegram asked to retry {request.method} for chat {request.chat_id} after {retry_after} s")
+
+    def close(self, timeout=10.0):
+        """Send what is queued, then stop"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._senders.shutdown(wait=True)
+
+    def stats(self):
+        with self._cond:
+            interactive = len(self._queues[INTERACTIVE])
+            broadcast = len(self._queues[BROADCAST])
+            in_flight = self._in_flight
+            chats = len(self._chats)
+        latency = list(self._latency)
+        waits = list(self._waits)
+        return {
+            "queued_interactive": interactive,
+            "queued_broadcast": broadcast,
+            "in_flight": in_flight,
+            "concurrency": self.concurrency,
+            "chat_buckets": chats,
+            "sent": self._sent,
+            "failed": self._failed,
+            "throttled": self._throttled,
+            "retry_after": self._retry_after,
+            "retries": self._retries,
+            "wait_p50_ms": round(percentile(waits, 0.50), 1),
+            "wait_p99_ms": round(percentile(waits, 0.99), 1),
+            "latency_p50_ms": round(percentile(latency, 0.50), 1),
+            "latency_p99_ms": round(percentile(latency, 0.99), 1),
+        }
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+"""
+Профайлер SQLite-запитів: журнал повільних запитів з EXPLAIN QUERY PLAN.
+
+На кожне з'єднання (хук пулу db_manager або profiler.connect()) ставляться
+set_trace_callback - текст кожного виконаного запиту з підставленими
+параметрами - і set_progress_handler, який кожні PROGRESS_STEPS інструкцій
+VM SQLite позначає, що запит ще виконується. Час запиту - від його початку
+до останньої такої позначки, тобто час усередині VM; запити коротші за
+один крок (~0.1-0.3 мс) рахуються з нульовим часом, очікування
+поза VM (fsync на COMMIT, блокування) не входять. Запит зараховується,
+коли на тому ж з'єднанні починається наступний або з'єднання закривається.
+
+Запити нормалізуються у відбитки (літерали і списки IN замінюються на ?),
+для кожного - кількість, p50/p99, максимум і кроки VM. Для відбитків, що
+хоч раз перевищили поріг slow_ms, під час звіту один раз виконується
+EXPLAIN QUERY PLAN (окреме з'єднання лише для читання) і позначаються
+повні проходи таблиць (SCAN без індексу) і тимчасові B-дерева сортування.
+
+Звіт: адмін-команда /queries, GET /queries на сервері метрик і
+    python query_profiler.py report [--url http://127.0.0.1:9108/queries]
+    python query_profiler.py explain "SELECT ..." [--db database/german_words.db]
+"""
+
+import argparse
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from latency import percentile, window
+
+DEFAULT_SLOW_MS = 25.0
+PROGRESS_STEPS = 10000          # VM instructions between progress ticks
+FINGERPRINT_WINDOW = 512        # recent samples per fingerprint kept for p50/p99
+MAX_FINGERPRINTS = 1000
+RECENT_SLOW = 50
+MAX_SQL_LENGTH = 500
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+OVERFLOW_FINGERPRINT = "(other statements)"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*", re.IGNORECASE)
+# "SCAN users", "SCAN TABLE users" (older SQLite), but not "SCAN users USING INDEX ..."
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)(?!.*\bUSING\b.*\bINDEX\b)")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Statement shape without its values: literals -> ?, IN (?, ?, ...) -> IN (?), whitespace collapsed"""
+    # Runs in the trace callback of every statement: cached, and the rarer patterns only when possible
+    text = " ".join(sql.split())
+    if "'" in text:
+        text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    upper = text.upper()
+    if " IN" in upper:
+        text = _IN_LIST.sub("IN (?)", text)
+    if "VALUES" in upper:
+        text = _VALUES_LIST.sub("VALUES (?)", text)
+    return text.rstrip(";")[:MAX_SQL_LENGTH]
+
+
+def analyze_plan(rows):
+    """(plan lines, fully scanned tables, uses a temp B-tree) from EXPLAIN QUERY PLAN rows"""
+    plan = [row[-1] for row in rows]
+    scans = []
+    for detail in plan:
+        match = _FULL_SCAN.match(detail)
+        if match and not detail.startswith("SCAN CONSTANT ROW") and not match.group(1).startswith("("):
+            scans.append(match.group(1))
+    return plan, scans, any("TEMP B-TREE" in detail for detail in plan)
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN for one statement on the given connection (see analyze_plan)"""
+    return analyze_plan(conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall())
+
+
+class _StatementClock:
+    """Per-connection state: the statement running now and when the VM last reported progress"""
+
+    __slots__ = ("profiler", "db_path", "sql", "started", "last_tick", "ticks")
+
+    def __init__(self, profiler, db_path):
+        self.profiler = profiler
+        self.db_path = db_path
+        self.sql = None
+        self.started = 0.0
+        self.last_tick = 0.0
+        self.ticks = 0
+
+    def on_statement(self, sql):
+        if sql.startswith("--"):
+            return          # a trigger's sub-program is part of the statement that fired it
+        now = time.perf_counter()
+        if self.sql is not None:
+            self.profiler.record(self.db_path, self.sql, self.last_tick - self.started, self.ticks)
+        self.sql = sql
+        self.started = self.last_tick = now
+        self.ticks = 0
+
+    def on_progress(self):
+        self.ticks += 1
+        self.last_tick = time.perf_counter()
+        return 0
+
+    def finish(self):
+        if self.sql is not None:
+            self.profiler.record(self.db_path, self.sql, self.last_tick - self.started, self.ticks)
+            self.sql = None
+
+
+class _ProfiledConnection(sqlite3.Connection):
+    """Plain connection from profiler.connect(); close() counts its last statement"""
+
+    def close(self):
+        clock = getattr(self, "_query_clock", None)
+        if clock is not None:
+            clock.finish()
+        super().close()
+
+
+class _Fingerprint:
+    __slots__ = ("db_path", "count", "total", "maximum", "samples", "ticks", "slow", "example",
+                 "explained", "plan", "scans", "temp_btree", "explain_error")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples = window(FINGERPRINT_WINDOW)
+        self.ticks = 0
+        self.slow = 0
+        self.example = None
+        self.explained = False
+        self.plan = []
+        self.scans = []
+        self.temp_btree = False
+        self.explain_error = None
+
+
+class QueryProfiler:
+    """Per-fingerprint statement timings for every connection it is attached to"""
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS, progress_steps=PROGRESS_STEPS, enabled=True):
+        self.slow_ms = slow_ms
+        self.progress_steps = progress_steps
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._explain_lock = threading.Lock()
+        self._fingerprints = {}
+        self._recent_slow = deque(maxlen=RECENT_SLOW)
+        self._statements = 0
+        self._connections = 0
+
+    def configure(self, slow_ms=None, enabled=None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if enabled is not None:
+            self.enabled = enabled
+
+    def attach(self, conn, db_path):
+        """Trace every statement on conn (usable as a ConnectionPool connect hook via functools.partial)"""
+        if not self.enabled:
+            return conn
+        clock = _StatementClock(self, db_path)
+        conn.set_trace_callback(clock.on_statement)
+        conn.set_progress_handler(clock.on_progress, self.progress_steps)
+        try:
+            conn._query_clock = clock
+        except AttributeError:
+            pass        # plain sqlite3.Connection: the callbacks keep the clock alive
+        with self._lock:
+            self._connections += 1
+        return conn
+
+    def connect(self, db_path, **kwargs):
+        """sqlite3.connect() for modules outside the pool (german_article_finder), already attached"""
+        return self.attach(sqlite3.connect(db_path, factory=_ProfiledConnection, **kwargs), db_path)
+
+    def record(self, db_path, sql, seconds, ticks):
+        key = fingerprint(sql)
+        slow = seconds * 1000 >= self.slow_ms
+        with self._lock:
+            self._statements += 1
+            entry = self._fingerprints.get(key)
+            if entry is None:
+                if len(self._fingerprints) >= MAX_FINGERPRINTS:
+                    key = OVERFLOW_FINGERPRINT
+                    entry = self._fingerprints.get(key)
+                if entry is None:
+                    entry = self._fingerprints[key] = _Fingerprint(db_path)
+            entry.count += 1
+            entry.total += seconds
+            entry.ticks += ticks
+            entry.samples.append(seconds)
+            if seconds > entry.maximum:
+                entry.maximum = seconds
+            if slow:
+                entry.slow += 1
+                entry.example = sql[:MAX_SQL_LENGTH * 4]
+                self._recent_slow.append((time.time(), round(seconds * 1000, 2), key))
+
+    def _explain_pending(self):
+        """EXPLAIN QUERY PLAN once for each fingerprint that has been slow (on a separate read-only connection)"""
+        with self._lock:
+            pending = [(key, entry) for key, entry in self._fingerprints.items()
+                       if entry.slow and not entry.explained and key != OVERFLOW_FINGERPRINT]
+        if not pending:
+            return
+        with self._explain_lock:
+            connections = {}
+            try:
+                for key, entry in pending:
+                    entry.explained = True
+                    if not entry.example.lstrip().upper().startswith(EXPLAINABLE):
+                        continue
+                    try:
+                        conn = connections.get(entry.db_path)
+                        if conn is None:
+                            conn = connections[entry.db_path] = sqlite3.connect(
+                                f"file:{entry.db_path}?mode=ro", uri=True, check_same_thread=False)
+                        entry.plan, entry.scans, entry.temp_btree = explain(conn, entry.example)
+                    except sqlite3.Error as e:
+                        entry.explain_error = str(e)
+            finally:
+                for conn in connections.values():
+                    conn.close()
+
+    def report(self, limit=20, order="total"):
+        """JSON-ready report: the top fingerprints by total (or p99, count) time plus recent slow statements"""
+        self._explain_pending()
+        with self._lock:
+            entries = [(key, entry, list(entry.samples)) for key, entry in self._fingerprints.items()]
+            recent = list(self._recent_slow)
+            statements = self._statements
+        rows = []
+        for key, entry, samples in entries:
+            rows.append({
+                "fingerprint": key,
+                "count": entry.count,
+                "total_ms": round(entry.total * 1000, 2),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+                "max_ms": round(entry.maximum * 1000, 3),
+                "vm_steps": entry.ticks * self.progress_steps,
+                "slow": entry.slow,
+                "full_scans": entry.scans,
+                "temp_btree": entry.temp_btree,
+                "plan": entry.plan,
+                "explain_error": entry.explain_error,
+            })
+        sort_key = {"total": "total_ms", "p99": "p99_ms", "count": "count"}.get(order, "total_ms")
+        rows.sort(key=lambda row: row[sort_key], reverse=True)
+        return {
+            "slow_ms": self.slow_ms,
+            "statements": statements,
+            "fingerprints": len(rows),
+            "queries": rows[:limit],
+            "recent_slow": [{"at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(at)), "ms": ms,
+                             "fingerprint": key} for at, ms, key in reversed(recent)],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._fingerprints = {}
+            self._recent_slow.clear()
+            self._statements = 0
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._fingerprints.values())
+            statements = self._statements
+            connections = self._connections
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "connections": connections,
+            "statements": statements,
+            "fingerprints": len(entries),
+            "slow_statements": sum(entry.slow for entry in entries),
+            "full_scan_fingerprints": sum(1 for entry in entries if entry.scans),
+        }
+
+
+def format_report(report, limit=10):
+    """Plain-text report for the admin command and the CLI"""
+    lines = [f"🐌 SQL: {report['statements']} statements, {report['fingerprints']} fingerprints, "
+             f"slow >= {report['slow_ms']:g} ms"]
+    for row in report["queries"][:limit]:
+        lines.append("")
+        lines.append(f"• {row['fingerprint'][:300]}")
+        lines.append(f"  {row['count']}x, total {row['total_ms']:.1f} ms, p50 {row['p50_ms']:.2f} / "
+                     f"p99 {row['p99_ms']:.2f} / max {row['max_ms']:.2f} ms, slow {row['slow']}")
+        if row["full_scans"]:
+            lines.append(f"  ⚠️ full scan: {', '.join(row['full_scans'])}")
+        if row["temp_btree"]:
+            lines.append("  ⚠️ temp B-tree (sort/grouping without an index)")
+        if row["plan"]:
+            lines.append(f"  plan: {' | '.join(row['plan'])}")
+        if row["explain_error"]:
+            lines.append(f"  plan unavailable: {row['explain_error']}")
+    if report["recent_slow"]:
+        lines.append("")
+        lines.append("Recent slow statements:")
+        for event in report["recent_slow"][:5]:
+            lines.append(f"• {event['at']} {event['ms']:.1f} ms {event['fingerprint'][:120]}")
+    return "\n".join(lines)
+
+
+profiler = QueryProfiler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slow SQLite statements of the running bot, or one query plan")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_parser = commands.add_parser("report", help="fetch the running bot's report from its metrics server")
+    report_parser.add_argument("--url", default="http://127.0.0.1:9108/queries")
+    report_parser.add_argument("--limit", type=int, default=20)
+    report_parser.add_argument("--order", choices=("total", "p99", "count"), default="total")
+    report_parser.add_argument("--json", action="store_true", help="print the raw JSON")
+    explain_parser = commands.add_parser("explain", help="EXPLAIN QUERY PLAN for a statement")
+    explain_parser.add_argument("sql")
+    explain_parser.add_argument("--db", default="database/german_words.db")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        from urllib.request import urlopen
+        with urlopen(f"{args.url}?limit={args.limit}&order={args.order}", timeout=10) as response:
+            report = json.loads(response.read().decode("utf-8"))
+        print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else format_report(report, args.limit))
+        return
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        plan, scans, temp_btree = explain(conn, args.sql)
+    finally:
+        conn.close()
+    print(f"fingerprint: {fingerprint(args.sql)}")
+    for detail in plan:
+        print(f"  {detail}")
+    if scans:
+        print(f"full scan: {', '.join(scans)}")
+    if temp_btree:
+        print("temp B-tree: sorting or grouping without an index")
+
+
+if __name__ == "__main__":
+    main()
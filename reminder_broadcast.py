@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+
+"""
+Розсилка щоденних нагадувань неактивним користувачам (scheduler.reminders).
+
+Отримувачі читаються сторінками по первинному ключу
+(chat_id > останній оброблений), тож з'єднання з БД не тримається всю
+розсилку, а кожна сторінка - один короткий запит. Текст будується з
+каталогу локалізацій один раз на (мову, ключ, active_days) замість
+запиту мови для кожного користувача. Відправка йде через send_fn, який
+повертає Future (config.outbound з пріоритетом розсилки), не більше
+max_in_flight повідомлень одночасно.
+
+Прогрес зберігається в reminder_runs після кожної завершеної сторінки:
+перервана розсилка з тим самим run_id продовжується з останнього
+chat_id. Користувачі, що заблокували бота (403, "chat not found"),
+позначаються users.blocked_at і пропускаються, доки знову не проявлять
+активність. Порожній хвилинний кошик рядка не створює, а кошики, старші
+за вікно наздоганяння (CATCHUP_MINUTES), видаляються purge_runs().
+
+Кожен користувач має власну хвилину доби для нагадування
+(reminder_slots): обрану командою /reminder, виведену зі звичного часу
+активності або типову (розкидану на 17:00-18:59). Типовий слот
+створюється разом з користувачем (db_manager.initialize_user), а run_due()
+періодично дописує його тим, хто з'явився іншим шляхом. run_due(), який
+викликається раз на хвилину, надсилає лише кошик поточної хвилини (і
+пропущені після перезапуску), тож навантаження розподілене по добі.
+"""
+
+import datetime
+import threading
+import time
+import traceback
+from collections import deque
+
+from telebot.apihelper import ApiTelegramException
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_MAX_IN_FLIGHT = 200
+DEFAULT_LANGUAGE = "uk"
+FALLBACK_TEXT = "Time to practice German! You've been active for {active_days} days."
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_MINUTE = 18 * 60            # users without a known activity time: around 18:00 ...
+DEFAULT_SPREAD = 120                # ... spread over 17:00-18:59 by chat_id
+INFER_WEIGHT = 0.3                  # share of the latest activity time in the inferred minute
+CATCHUP_MINUTES = 30                # missed buckets sent after a restart
+
+# reminder_slots.source
+SOURCE_USER = "user"
+SOURCE_INFERRED = "inferred"
+SOURCE_DEFAULT = "default"
+SOURCE_OFF = "off"
+
+
+def reminder_key(active_days):
+    """Localization key of the reminder for a user's activity streak"""
+    if active_days == 0:
+        return "reminder_new"
+    if active_days < 3:
+        return "reminder_short_streak"
+    if active_days < 7:
+        return "reminder_medium_streak"
+    return "reminder_long_streak"
+
+
+def is_blocked_error(error):
+    """True if Telegram will never deliver to this chat (bot blocked, user deactivated, chat gone)"""
+    if not isinstance(error, ApiTelegramException):
+        return False
+    if error.error_code == 403:
+        return True
+    return error.error_code == 400 and "chat not found" in str(error.description).lower()
+
+
+def minute_of_day(when):
+    return when.hour * 60 + when.minute
+
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def parse_minute(text):
+    """'HH:MM' (or 'H') -> minute of day; raises ValueError"""
+    hours, _, minutes = text.strip().partition(":")
+    hours, minutes = int(hours), int(minutes or 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"invalid time: {text}")
+    return hours * 60 + minutes
+
+
+def blend_minute(previous, current, weight=INFER_WEIGHT):
+    """Move previous towards current along the shorter way round the clock"""
+    diff = (current - previous + MINUTES_PER_DAY // 2) % MINUTES_PER_DAY - MINUTES_PER_DAY // 2
+    return (previous + round(diff * weight)) % MINUTES_PER_DAY
+
+
+def default_minute(chat_id):
+    return DEFAULT_MINUTE - DEFAULT_SPREAD // 2 + abs(chat_id) % DEFAULT_SPREAD
+
+
+def record_activity_minute(cursor, chat_id, when):
+    """Update the inferred reminder time from an activity at `when` (chosen or disabled times are kept)"""
+    cursor.execute("SELECT minute, source FROM reminder_slots WHERE chat_id = ?", (chat_id,))
+    row = cursor.fetchone()
+    current = minute_of_day(when)
+    if row is None or row[1] == SOURCE_DEFAULT:
+        minute = current
+    elif row[1] == SOURCE_INFERRED:
+        minute = blend_minute(row[0], current)
+    else:
+        return
+    set_reminder_minute(cursor, chat_id, minute, SOURCE_INFERRED)
+
+
+def set_reminder_minute(cursor, chat_id, minute, source):
+    """Store the chat's reminder minute (None with SOURCE_OFF disables reminders)"""
+    cursor.execute("""
+        INSERT INTO reminder_slots (chat_id, minute, source, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(chat_id) DO UPDATE SET minute = excluded.minute, source = excluded.source,
+                                           updated_at = excluded.updated_at
+    """, (chat_id, minute, source, time.time()))
+
+
+def assign_default_slot(cursor, chat_id):
+    """Give one new user the default reminder time unless they already have a slot"""
+    cursor.execute("""
+        INSERT OR IGNORE INTO reminder_slots (chat_id, minute, source, updated_at) VALUES (?, ?, ?, ?)
+    """, (chat_id, default_minute(chat_id), SOURCE_DEFAULT, time.time()))
+
+
+def assign_default_slots(cursor):
+    """Give every user without a reminder slot the default, spread time; returns how many were added"""
+    cursor.execute("""
+        INSERT INTO reminder_slots (chat_id, minute, source, updated_at)
+        SELECT chat_id, ? + abs(chat_id) % ?, ?, ?
+        FROM users
+        WHERE chat_id NOT IN (SELECT chat_id FROM reminder_slots)
+    """, (DEFAULT_MINUTE - DEFAULT_SPREAD // 2, DEFAULT_SPREAD, SOURCE_DEFAULT, time.time()))
+    return cursor.rowcount
+
+
+class ReminderBroadcast:
+    """Paged, resumable reminder broadcast with a bounded number of sends in flight"""
+
+    def __init__(self, connect, send_fn, catalog_fn=None, page_size=DEFAULT_PAGE_SIZE,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        # connect() -> sqlite3 connection; send_fn(chat_id, text) -> Future
+        self.connect = connect
+        self.send_fn = send_fn
+        self.catalog_fn = catalog_fn
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_in_flight)
+        self._stopping = False
+        self._texts = {}
+        self._blocked_ids = []
+        # metrics of the current / last run
+        self._run_id = None
+        self._state = "idle"
+        self._sent = 0
+        self._failed = 0
+        self._blocked = 0
+        self._pages = 0
+        self._in_flight = 0
+        self._started_at = None
+        self._elapsed = 0.0
+        self._last_tick = None
+        self._last_purge = 0.0
+
+    # --- rendering ---
+
+    def _catalog(self):
+        if self.catalog_fn is not None:
+            return self.catalog_fn()
+        from locales.catalog import get_catalog
+        return get_catalog()
+
+    def render(self, language, active_days):
+        """Reminder text for a language and streak (memoized for the run)"""
+        cache_key = (language, active_days)
+        text = self._texts.get(cache_key)
+        if text is None:
+            text = self._catalog().format(reminder_key(active_days), language, FALLBACK_TEXT,
+                                          active_days=active_days)
+            self._texts[cache_key] = text
+        return text
+
+    # --- database ---
+
+    def _load_run(self, run_id):
+        """(cutoff, minute, last_chat_id, finished) of a recorded run, or None"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT cutoff, minute, last_chat_id, finished_at FROM reminder_runs WHERE run_id = ?",
+                           (run_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return row[0], row[1], row[2] or 0, row[3] is not None
+        finally:
+            conn.close()
+
+    def _create_run(self, run_id, cutoff, minute):
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute("""
+                INSERT INTO reminder_runs (run_id, cutoff, minute, last_chat_id, started_at, updated_at)
+                VALUES (?, ?, ?, 0, ?, ?)
+            """, (run_id, cutoff, minute, now, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def purge_runs(self, now=None):
+        """Delete minute-bucket runs that are past the catch-up window (finished, or abandoned for a day)"""
+        now = now or time.time()
+        conn = self.connect()
+        try:
+            deleted = conn.execute("""
+                DELETE FROM reminder_runs
+                WHERE minute IS NOT NULL
+                  AND (finished_at < ? OR started_at < ?)
+            """, (now - 2 * CATCHUP_MINUTES * 60, now - 86400)).rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+
+    def _fetch_page(self, after_chat_id, cutoff, minute=None):
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            # Діапазон по первинному ключу: кожна сторінка продовжує попередню без OFFSET
+            if minute is None:
+                cursor.execute("""
+                    SELECT chat_id, language, active_days
+                    FROM users
+                    WHERE chat_id > ?
+                      AND (last_active < ? OR last_active IS NULL)
+                      AND blocked_at IS NULL
+                    ORDER BY chat_id
+                    LIMIT ?
+                """, (after_chat_id, cutoff, self.page_size))
+            else:
+                # Кошик однієї хвилини - по індексу reminder_slots(minute, chat_id)
+                cursor.execute("""
+                    SELECT u.chat_id, u.language, u.active_days
+                    FROM reminder_slots s
+                    JOIN users u ON u.chat_id = s.chat_id
+                    WHERE s.minute = ? AND s.chat_id > ?
+                      AND (u.last_active < ? OR u.last_active IS NULL)
+                      AND u.blocked_at IS NULL
+                    ORDER BY s.chat_id
+                    LIMIT ?
+                """, (minute, after_chat_id, cutoff, self.page_size))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def assign_default_slots(self):
+        """Default reminder times for users that have none (e.g. imported before slots existed)"""
+        conn = self.connect()
+        try:
+            added = assign_default_slots(conn.cursor())
+            conn.commit()
+            return added
+        finally:
+            conn.close()
+
+    def schedule_stats(self):
+        """Users per reminder source and the size of the busiest minute"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT source, COUNT(*) FROM reminder_slots GROUP BY source")
+            stats = {f"slots_{source}": count for source, count in cursor.fetchall()}
+            cursor.execute("""
+                SELECT minute, COUNT(*) AS n FROM reminder_slots
+                WHERE minute IS NOT NULL GROUP BY minute ORDER BY n DESC LIMIT 1
+            """)
+            row = cursor.fetchone()
+            stats["busiest_minute"] = f"{format_minute(row[0])} ({row[1]})" if row else None
+            return stats
+        finally:
+            conn.close()
+
+    def _checkpoint(self, run_id, last_chat_id, finished=False):
+        with self._lock:
+            blocked_ids, self._blocked_ids = self._blocked_ids, []
+            sent, failed, blocked = self._sent, self._failed, self._blocked
+        now = time.time()
+        blocked_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            if blocked_ids:
+                cursor.executemany("UPDATE users SET blocked_at = ? WHERE chat_id = ?",
+                                   [(blocked_at, chat_id) for chat_id in blocked_ids])
+            cursor.execute("""
+                UPDATE reminder_runs
+                SET last_chat_id = ?, sent = ?, failed = ?, blocked = ?, updated_at = ?, finished_at = ?
+                WHERE run_id = ?
+            """, (last_chat_id, sent, failed, blocked, now, now if finished else None, run_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def unfinished_runs(self, max_age=86400):
+        """run_ids of runs that started within max_age seconds and did not finish"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT run_id FROM reminder_runs
+                WHERE finished_at IS NULL AND started_at > ?
+                ORDER BY started_at
+            """, (time.time() - max_age,))
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    # --- sending ---
+
+    def _on_done(self, chat_id, future):
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled():
+                self._failed += 1
+            elif error is None:
+                self._sent += 1
+            elif is_blocked_error(error):
+                self._blocked += 1
+                self._blocked_ids.append(chat_id)
+            else:
+                self._failed += 1
+        if error is not None and not is_blocked_error(error):
+            print(f"Failed to send reminder to user {chat_id}: {error}")
+
+    def _send(self, chat_id, text):
+        self._slots.acquire()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self.send_fn(chat_id, text)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(chat_id, f))
+        return future
+
+    def run(self, run_id=None, cutoff=None, minute=None):
+        """Send (or resume) the run; returns stats(), or None if it already finished or another run is in progress.
+
+        minute limits the run to users whose reminder slot is that minute of the day.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            print("Reminder broadcast is already running")
+            return None
+        try:
+            self._stopping = False
+            return self._run(run_id, cutoff, minute)
+        finally:
+            self._run_lock.release()
+
+    def run_due(self, now=None):
+        """Send the minute buckets due since the last call (the last CATCHUP_MINUTES after a restart)"""
+        now = (now or datetime.datetime.now()).replace(second=0, microsecond=0)
+        with self._run_lock:
+            if self._last_tick is None:
+                # Перша хвилина після запуску: спершу дописуємо перервані розсилки
+                for run_id in self.unfinished_runs():
+                    self._run(run_id, None, None)
+                start = now - datetime.timedelta(minutes=CATCHUP_MINUTES)
+            else:
+                start = max(self._last_tick + datetime.timedelta(minutes=1),
+                            now - datetime.timedelta(minutes=CATCHUP_MINUTES))
+            tick = start
+            while tick <= now and not self._stopping:
+                # Нагадування лише тим, хто сьогодні (на дату кошика) ще не займався
+                self._run(tick.strftime('%Y-%m-%dT%H:%M'), tick.date().isoformat(), minute_of_day(tick))
+                self._last_tick = tick
+                tick += datetime.timedelta(minutes=1)
+            if time.time() - self._last_purge > CATCHUP_MINUTES * 60:
+                self._last_purge = time.time()
+                self.purge_runs()
+                # Users created outside initialize_user (e.g. by a language upsert) get their slot here
+                added = self.assign_default_slots()
+                if added:
+                    print(f"Assigned default reminder times to {added} users")
+
+    def _run(self, run_id, cutoff, minute):
+        run_id = run_id or datetime.date.today().isoformat()
+        if cutoff is None:
+            cutoff = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+        first_page = None
+        run = self._load_run(run_id)
+        if run is None:
+            # Порожній кошик не залишає рядка в reminder_runs
+            first_page = self._fetch_page(0, cutoff, minute)
+            if not first_page:
+                if minute is None:
+                    print(f"Reminder run {run_id}: nobody to remind")
+                return None
+            self._create_run(run_id, cutoff, minute)
+            last_chat_id = 0
+        else:
+            cutoff, minute, last_chat_id, finished = run
+            if finished:
+                if minute is None:
+                    print(f"Reminder run {run_id} already finished")
+                return None
+
+        with self._lock:
+            self._run_id = run_id
+            self._state = "running"
+            self._sent = self._failed = self._blocked = self._pages = 0
+            self._blocked_ids = []
+            self._started_at = time.monotonic()
+        self._texts = {}
+        if last_chat_id:
+            print(f"Resuming reminder run {run_id} after chat {last_chat_id}")
+
+        # (last chat_id of the page, its futures) - checkpointed in page order once sent
+        pages = deque()
+        after = last_chat_id
+        try:
+            while not self._stopping:
+                rows = first_page or self._fetch_page(after, cutoff, minute)
+                first_page = None
+                if not rows:
+                    break
+                futures = []
+                for chat_id, language, active_days in rows:
+                    if self._stopping:
+                        break
+                    text = self.render(language or DEFAULT_LANGUAGE, active_days or 0)
+                    futures.append(self._send(chat_id, text))
+                    after = chat_id
+                pages.append((after, futures))
+                self._pages += 1
+                while pages and all(f.done() for f in pages[0][1]):
+                    self._checkpoint(run_id, pages.popleft()[0])
+            for page_last, futures in pages:
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception:
+                        pass    # counted in _on_done
+                self._checkpoint(run_id, page_last)
+            finished = not self._stopping
+            self._checkpoint(run_id, after, finished=finished)
+        except Exception as e:
+            print(f"Error in reminder run {run_id}: {e}")
+            traceback.print_exc()
+            finished = False
+
+        with self._lock:
+            self._elapsed = time.monotonic() - self._started_at
+            self._state = "finished" if finished else "interrupted"
+        stats = self.stats()
+        if minute is None or stats["pages"] or not finished:
+            print(f"Reminder run {run_id} {stats['state']}: sent {stats['sent']}, blocked {stats['blocked']}, "
+                  f"failed {stats['failed']} in {stats['elapsed_s']} s ({stats['per_second']} msg/s)")
+        return stats
+
+    def stop(self):
+        """Stop after the messages already handed to send_fn; the run resumes from its checkpoint"""
+        self._stopping = True
+
+    def stats(self):
+        with self._lock:
+            elapsed = self._elapsed
+            if self._state == "running":
+                elapsed = time.monotonic() - self._started_at
+            done = self._sent + self._failed + self._blocked
+            return {
+                "run_id": self._run_id,
+                "state": self._state,
+                "pages": self._pages,
+                "sent": self._sent,
+                "blocked": self._blocked,
+                "failed": self._failed,
+                "in_flight": self._in_flight,
+                "elapsed_s": round(elapsed, 1),
+                "per_second": round(done / elapsed, 1) if elapsed > 0 else 0.0,
+            }
@@ -4,11 +4,12 @@
 Планувальник для відправки нагадувань про вивчення слів.
 """
 
-import datetime
-from config import scheduler, bot
+import functools
+from config import scheduler, bot, outbound
 import db_manager
 import logging
-from utils import language_utils
+from outbound import BROADCAST
+from reminder_broadcast import ReminderBroadcast
 from utils.path_helpers import get_user_params_path
 def send_streak_info(chat_id):
     """Send streak info to user"""
@@ -52,85 +53,63 @@ def send_streak_info(chat_id):
         update_streak(chat_id)
         send_streak_info(chat_id)
 
-def send_reminder():
-    """Send reminders to users who haven't been active for more than 24 hours"""
+def _send_reminder_message(chat_id, text):
+    """Queue one reminder behind interactive replies; returns the outbound Future"""
+    return outbound.submit(chat_id, "send_message", functools.partial(bot.send_message, chat_id, text),
+                           BROADCAST)
+
+# Сторінки отримувачів, прогрес у reminder_runs, відправка через outbound
+reminders = ReminderBroadcast(db_manager.get_connection, _send_reminder_message)
+
+def send_reminder(run_id=None):
+    """Send reminders to users who haven't been active for more than 24 hours.
+
+    run_id defaults to today's date, so a second call on the same day only
+    finishes an interrupted run instead of messaging everyone again.
+    """
     print("Running scheduled reminder task...")
-    
     try:
-        # Get users who were last active more than 24 hours ago
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        
-        # Get current time minus 24 hours to find inactive users
-        yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Select users who were active more than 24 hours ago or have never been active
-        cursor.execute("""
-            SELECT chat_id, language, active_days 
-            FROM users 
-            WHERE last_activity < ? OR last_activity IS NULL
-        """, (yesterday,))
-        
-        inactive_users = cursor.fetchall()
-        
-        # Count of messages sent
-        sent_count = 0
-        
-        for user_id, language, active_days in inactive_users:
-            try:
-                # Active days might be NULL in the database
-                if active_days is None:
-                    active_days = 0
-                
-                # Construct message based on activity streak
-                if active_days == 0:
-                    message_key = "reminder_new"
-                elif active_days < 3:
-                    message_key = "reminder_short_streak"
-                elif active_days < 7:
-                    message_key = "reminder_medium_streak" 
-                else:
-                    message_key = "reminder_long_streak"
-                
-                # Get localized message
-                message = language_utils.get_text(message_key, user_id, f"Time to practice German! You've been active for {active_days} days.")
-                
-                # Send reminder
-                bot.send_message(user_id, message)
-                sent_count += 1
-                
-                print(f"Sent reminder to user {user_id} with {active_days} active days")
-                
-            except Exception as e:
-                print(f"Failed to send reminder to user {user_id}: {e}")
-        
-        print(f"Reminder task completed: sent {sent_count} reminders")
-        conn.close()
-        
+        return reminders.run(run_id)
     except Exception as e:
         print(f"Error in send_reminder: {e}")
         import traceback
         traceback.print_exc()
 
+def send_due_reminders():
+    """Minute tick: send the reminders of users whose reminder time is this minute"""
+    try:
+        reminders.run_due()
+    except Exception as e:
+        print(f"Error in send_due_reminders: {e}")
+        import traceback
+        traceback.print_exc()
+
 def schedule_reminders():
-    """Schedule the daily reminder job"""
-    # Set reminder time to 18:00
-    reminder_time = datetime.time(hour=18, minute=0)
+    """Schedule the per-minute reminder job (one job for all users, see reminder_slots)"""
+    try:
+        added = reminders.assign_default_slots()
+        if added:
+            print(f"Assigned default reminder times to {added} users")
+    except Exception as e:
+        print(f"Error assigning default reminder times: {e}")
     
-    # Schedule the job
+    # One job wakes every minute and sends only that minute's bucket;
+    # a tick still running when the next one is due is skipped and caught up later
     job = scheduler.add_job(
-        send_reminder, 
-        'cron', 
-        hour=reminder_time.hour, 
-        minute=reminder_time.minute,
-        id='daily_reminder'
+        send_due_reminders,
+        'cron',
+        minute='*',
+        id='minute_reminders',
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1
     )
     
-    print(f"Daily reminder scheduled for {reminder_time.strftime('%H:%M')} (job id: {job.id})")
-    logging.info(f"Scheduled daily reminder for {reminder_time.strftime('%H:%M')}")
+    print(f"Per-user reminders scheduled every minute (job id: {job.id})")
+    logging.info("Scheduled per-minute reminder buckets")
     
-    # Return time and job ID
-    return (reminder_time.strftime("%H:%M"), job.id)
+    # Return description and job ID
+    return ("every minute", job.id)
 
 # When imported directly
 if __name__ == "__main__":
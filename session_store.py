@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+
+"""
+Сховище сесій користувачів (config.user_state).
+
+SessionStore поводиться як dict {chat_id: сесія}, тож обробники й далі
+пишуть user_state[chat_id]["step"] = ..., але сесії:
+- мають обмежений час життя без активності (idle TTL);
+- мають стелю пам'яті: найдавніше використані сесії витісняються;
+- за SQLiteSessionBackend періодично записуються в таблицю sessions
+  (write-back) і піднімаються з неї після перезапуску або витіснення,
+  тож незавершені ігри переживають рестарт, а пам'ять не росте разом із
+  кількістю користувачів.
+
+Фоновий потік раз на sweep_interval серіалізує змінені сесії (pickle:
+pandas Series у current_word теж зберігається), рахує їхній розмір і
+витісняє неактивні. Значення, які не серіалізуються, лишаються лише в
+пам'яті.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+DEFAULT_IDLE_TTL = 30 * 60               # seconds without access before a session leaves memory
+DEFAULT_PERSIST_TTL = 7 * 24 * 3600      # seconds a persisted session is kept
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024     # pickled size of all resident sessions
+DEFAULT_SWEEP_INTERVAL = 30              # seconds between write-back/eviction passes
+DEFAULT_MIN_RESIDENT = 60                # never evict a session used in the last N seconds
+
+
+class Session(MutableMapping):
+    """One chat's state: a dict payload plus bookkeeping for eviction and write-back"""
+
+    __slots__ = ("chat_id", "data", "created_at", "last_access", "flushed_at", "size")
+
+    def __init__(self, chat_id, data=None, created_at=None):
+        now = time.time()
+        self.chat_id = chat_id
+        # The caller's dict is kept as is: handlers may keep mutating the dict they assigned
+        self.data = data if data is not None else {}
+        self.created_at = created_at or now
+        self.last_access = now
+        self.flushed_at = 0.0       # last_access value that was written to the backend
+        self.size = 0               # pickled size from the last sweep
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.last_access = time.time()
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.last_access = time.time()
+
+    def __iter__(self):
+        return iter(list(self.data))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def copy(self):
+        return dict(self.data)
+
+    @property
+    def dirty(self):
+        # Nested values (lists, sets, Series) are mutated in place, so any access counts as a change
+        return self.last_access > self.flushed_at
+
+    def __repr__(self):
+        return f"Session({self.chat_id}, {self.data!r})"
+
+
+def dumps(data):
+    """Pickle a session payload, dropping values that cannot be pickled; returns (blob, skipped_keys)"""
+    try:
+        return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), []
+    except Exception:
+        pass
+    kept, skipped = {}, []
+    for key, value in data.items():
+        try:
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            kept[key] = value
+        except Exception:
+            skipped.append(key)
+    return pickle.dumps(kept, protocol=pickle.HIGHEST_PROTOCOL), skipped
+
+
+class MemorySessionBackend:
+    """No persistence: evicted sessions are dropped"""
+
+    persistent = False
+
+    def load(self, chat_id):
+        return None
+
+    def save_many(self, rows):
+        pass
+
+    def delete(self, chat_id):
+        pass
+
+    def purge(self, older_than):
+        return 0
+
+
+def _default_connect():
+    import db_manager
+    from db_pool import DEFAULT_PRAGMAS
+    conn = sqlite3.connect(db_manager.DB_PATH, timeout=30, check_same_thread=False)
+    for pragma in DEFAULT_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class SQLiteSessionBackend:
+    """Sessions pickled into the sessions table of the bot database
+
+    The backend keeps one connection of its own (not the handler's pooled
+    one), so its commits never touch a transaction a handler has open.
+    The sessions table is created by init_db.
+    """
+
+    persistent = True
+
+    def __init__(self, connect=None):
+        self._connect = connect or _default_connect
+        self._db = None
+        self._db_lock = threading.Lock()
+
+    @contextmanager
+    def _conn(self):
+        with self._db_lock:
+            if self._db is None:
+                self._db = self._connect()
+            try:
+                yield self._db
+            except Exception:
+                if self._db.in_transaction:
+                    self._db.rollback()
+                raise
+
+    def load(self, chat_id):
+        """Return (data, created_at) or None"""
+        with self._conn() as conn:
+            row = conn.execute('SELECT data, created_at FROM sessions WHERE chat_id = ?', (chat_id,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception as e:
+            print(f"Error loading session for {chat_id}: {e}")
+            return None
+
+    def save_many(self, rows):
+        """rows: [(chat_id, blob, created_at, updated_at), ...]"""
+        with self._conn() as conn:
+            conn.executemany('''
+                INSERT INTO sessions (chat_id, data, created_at, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            ''', rows)
+            conn.commit()
+
+    def delete(self, chat_id):
+        with self._conn() as conn:
+            conn.execute('DELETE FROM sessions WHERE chat_id = ?', (chat_id,))
+            conn.commit()
+
+    def purge(self, older_than):
+        with self._conn() as conn:
+            deleted = conn.execute('DELETE FROM sessions WHERE updated_at < ?', (older_than,)).rowcount
+            conn.commit()
+            return deleted
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class SessionStore(MutableMapping):
+    """Dict-like {chat_id: Session} with idle TTL, a memory ceiling and a pluggable backend"""
+
+    def __init__(self, backend=None, idle_ttl=DEFAULT_IDLE_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 persist_ttl=DEFAULT_PERSIST_TTL, sweep_interval=DEFAULT_SWEEP_INTERVAL,
+                 min_resident=DEFAULT_MIN_RESIDENT, name="session-store"):
+        self.backend = backend if backend is not None else MemorySessionBackend()
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.persist_ttl = persist_ttl
+        self.sweep_interval = sweep_interval
+        self.min_resident = min_resident
+        self.name = name
+        self._sessions = {}
+        self._absent = set()        # chat ids known to have no persisted session
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+        # metrics
+        self._hits = 0
+        self._loads = 0
+        self._created = 0
+        self._flushed = 0
+        self._evicted_idle = 0
+        self._evicted_memory = 0
+        self._unpicklable = 0
+        self._bytes = 0
+        self._last_sweep_ms = 0.0
+
+    # --- mapping interface ---
+
+    def _resident(self, chat_id):
+        session = self._sessions.get(chat_id)
+        if session is not None:
+            self._hits += 1
+            return session
+        if chat_id in self._absent or not self.backend.persistent:
+            return None
+        try:
+            loaded = self.backend.load(chat_id)
+        except Exception as e:
+            print(f"Error reading session {chat_id}: {e}")
+            return None
+        if loaded is None:
+            if len(self._absent) > 100000:
+                self._absent.clear()
+            self._absent.add(chat_id)
+            return None
+        data, created_at = loaded
+        session = Session(chat_id, data, created_at)
+        session.flushed_at = session.last_access
+        self._sessions[chat_id] = session
+        self._loads += 1
+        return session
+
+    def __getitem__(self, chat_id):
+        with self._lock:
+            session = self._resident(chat_id)
+            if session is None:
+                raise KeyError(chat_id)
+            session.last_access = time.time()
+            return session
+
+    def __setitem__(self, chat_id, value):
+        with self._lock:
+            current = self._sessions.get(chat_id)
+            if value is current:
+                current.last_access = time.time()
+                return
+            created_at = current.created_at if current is not None else None
+            data = value.data if isinstance(value, Session) else value
+            self._sessions[chat_id] = Session(chat_id, data, created_at)
+            self._absent.discard(chat_id)
+            if current is None:
+                self._created += 1
+        self._ensure_thread()
+
+    def __delitem__(self, chat_id):
+        with self._lock:
+            present = self._resident(chat_id) is not None
+            self._sessions.pop(chat_id, None)
+            self._absent.add(chat_id)
+        if not present:
+            raise KeyError(chat_id)
+        try:
+            self.backend.delete(chat_id)
+        except Exception as e:
+            print(f"Error deleting session {chat_id}: {e}")
+
+    def __contains__(self, chat_id):
+        with self._lock:
+            return self._resident(chat_id) is not None
+
+    def get(self, chat_id, default=None):
+        with self._lock:
+            session = self._resident(chat_id)
+            if session is None:
+                return default
+            session.last_access = time.time()
+            return session
+
+    def is_resident(self, chat_id):
+        """True if the session is in memory or known to be absent, i.e. access will not hit the backend"""
+        with self._lock:
+            return chat_id in self._sessions or chat_id in self._absent or not self.backend.persistent
+
+    def __iter__(self):
+        # Only sessions resident in memory; persisted ones are loaded on access
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    # --- write-back and eviction ---
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() or self._stop.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error in {self.name} sweep: {e}")
+                traceback.print_exc()
+
+    def sweep(self, now=None, evict=True):
+        """Write back changed sessions, then evict idle ones and enforce the memory ceiling"""
+        started = time.perf_counter()
+        now = now or time.time()
+        with self._lock:
+            dirty = [s for s in self._sessions.values() if s.dirty]
+        rows = []
+        for session in dirty:
+            accessed = session.last_access
+            try:
+                blob, skipped = dumps(dict(session.data))
+            except Exception as e:
+                # A nested value changed while it was being pickled - retry next sweep
+                print(f"Error serializing session {session.chat_id}: {e}")
+                continue
+            if skipped:
+                self._unpicklable += 1
+            session.size = len(blob)
+            rows.append((session, accessed, blob))
+        if rows and self.backend.persistent:
+            try:
+                self.backend.save_many([(s.chat_id, blob, s.created_at, accessed) for s, accessed, blob in rows])
+            except Exception as e:
+                print(f"Error writing back {len(rows)} sessions: {e}")
+                rows = []
+        for session, accessed, _ in rows:
+            session.flushed_at = max(session.flushed_at, accessed)
+        self._flushed += len(rows)
+
+        with self._lock:
+            if evict:
+                self._evict(now)
+            self._bytes = sum(s.size for s in self._sessions.values())
+        if self.backend.persistent and now - self._last_purge > 3600:
+            self._last_purge = now
+            try:
+                self.backend.purge(now - self.persist_ttl)
+            except Exception as e:
+                print(f"Error purging old sessions: {e}")
+        self._last_sweep_ms = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+    def _evict(self, now):
+        def evictable(session):
+            # Unsaved changes would be lost if a persistent backend has not stored them yet
+            return not (self.backend.persistent and session.dirty)
+
+        for chat_id, session in list(self._sessions.items()):
+            if now - session.last_access > self.idle_ttl and evictable(session):
+                del self._sessions[chat_id]
+                self._evicted_idle += 1
+        total = sum(s.size for s in self._sessions.values())
+        if total > self.max_bytes:
+            for session in sorted(self._sessions.values(), key=lambda s: s.last_access):
+                if total <= self.max_bytes:
+                    break
+                if now - session.last_access < self.min_resident or not evictable(session):
+                    continue
+                del self._sessions[session.chat_id]
+                total -= session.size
+                self._evicted_memory += 1
+
+    def flush(self):
+        """Write back every changed session now (shutdown)"""
+        return self.sweep(evict=False)
+
+    def close(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=5)
+        self.flush()
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+    def stats(self):
+        with self._lock:
+            resident = len(self._sessions)
+        return {
+            "backend": type(self.backend).__name__,
+            "resident": resident,
+            "bytes": self._bytes,
+            "hits": self._hits,
+            "loaded": self._loads,
+            "created": self._created,
+            "flushed": self._flushed,
+            "evicted_idle": self._evicted_idle,
+            "evicted_memory": self._evicted_memory,
+            "unpicklable": self._unpicklable,
+            "last_sweep_ms": round(self._last_sweep_ms, 1),
+        }
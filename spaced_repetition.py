@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+Інтервальні повторення (SM-2) поверх словників користувачів.
+
+Для кожної пари (користувач, слово) зберігається дата наступного
+повторення, інтервал, коефіцієнт легкості (ease), кількість повторень і
+помилок (lapses). Ігри записують кожну відповідь через record_answer(),
+а вибір слів спочатку бере ті, що вже "дозріли" (get_due_word_ids).
+
+Нічне завдання build_daily_queues() заздалегідь формує чергу на день,
+тож перше питання сесії - один індексований запит до review_queue.
+"""
+
+import datetime
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+import db_manager
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+RELEARN_DELAY = 10 * 60          # повтор слова з помилкою через 10 хвилин
+DAY = 24 * 60 * 60
+DAILY_QUEUE_SIZE = 50
+
+# Якість відповіді за шкалою SM-2 (0-5): складніша вправа - сильніший сигнал
+QUALITY_BY_LEVEL = {"easy": 3, "medium": 4, "hard": 5}
+FAIL_QUALITY = 1
+
+ReviewState = namedtuple("ReviewState", "interval_days ease reps lapses due_at")
+
+NEW_STATE = ReviewState(0.0, DEFAULT_EASE, 0, 0, 0)
+
+
+def answer_quality(is_correct, level="easy"):
+    """Map a game answer to an SM-2 quality grade"""
+    if not is_correct:
+        return FAIL_QUALITY
+    return QUALITY_BY_LEVEL.get(level, QUALITY_BY_LEVEL["easy"])
+
+
+def next_state(state, quality, now=None):
+    """Pure SM-2 step: return the ReviewState after a review graded 0-5"""
+    now = int(now if now is not None else time.time())
+    ease = state.ease + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    ease = max(MIN_EASE, ease)
+
+    if quality < 3:
+        # Помилка: слово повертається на повторне вивчення в цій же сесії
+        return ReviewState(0.0, ease, 0, state.lapses + 1, now + RELEARN_DELAY)
+
+    reps = state.reps + 1
+    if reps == 1:
+        interval = 1.0
+    elif reps == 2:
+        interval = 6.0
+    else:
+        interval = max(1.0, state.interval_days) * ease
+    return ReviewState(interval, ease, reps, state.lapses, now + int(interval * DAY))
+
+
+def record_answer(chat_id, word_id, is_correct, level="easy", now=None):
+    """Apply one game answer to the word's schedule; returns the new ReviewState or None"""
+    if not word_id:
+        return None
+    try:
+        word_id = int(word_id)
+        now = int(now if now is not None else time.time())
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+            SELECT interval_days, ease, reps, lapses, due_at
+            FROM review_schedule WHERE chat_id = ? AND word_id = ?
+            ''', (chat_id, word_id))
+            row = cursor.fetchone()
+            state = ReviewState(*row) if row else NEW_STATE
+
+            new = next_state(state, answer_quality(is_correct, level), now)
+            cursor.execute('''
+            INSERT OR REPLACE INTO review_schedule
+                (chat_id, word_id, due_at, interval_days, ease, reps, lapses, last_review)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (chat_id, word_id, new.due_at, new.interval_days, new.ease, new.reps, new.lapses, now))
+
+            # Правильна відповідь знімає слово з денної черги; помилкове лишається в ній
+            if is_correct:
+                cursor.execute('DELETE FROM review_queue WHERE chat_id = ? AND word_id = ?', (chat_id, word_id))
+
+            conn.commit()
+            return new
+    except Exception as e:
+        print(f"Error recording review for user {chat_id}, word {word_id}: {e}")
+        return None
+
+
+def _take_ids(cursor, limit, word_ids):
+    """First `limit` word IDs of the cursor's rows, keeping only those in word_ids (if given)"""
+    if word_ids is None:
+        return [row[0] for row in cursor.fetchall()]
+    ids = []
+    for (word_id,) in cursor:
+        if word_id in word_ids:
+            ids.append(word_id)
+            if len(ids) >= limit:
+                break
+    return ids
+
+
+def get_due_word_ids(chat_id, limit=10, now=None, word_ids=None):
+    """
+    Return up to `limit` word IDs that are due for review, most overdue first.
+
+    The precomputed daily queue is used when present; otherwise the
+    (chat_id, due_at) index answers the range query directly. Review state
+    is per user, not per dictionary, so callers drawing from one deck pass
+    its word IDs: due words outside the deck are skipped before the limit
+    is applied.
+    """
+    now = int(now if now is not None else time.time())
+    # Filtered lookups read rows until `limit` of them match (LIMIT -1: no limit)
+    row_limit = limit if word_ids is None else -1
+    try:
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT q.word_id
+            FROM review_queue q
+            JOIN review_schedule s ON s.chat_id = q.chat_id AND s.word_id = q.word_id
+            WHERE q.chat_id = ? AND q.queue_date = ? AND s.due_at <= ?
+            ORDER BY q.position
+            LIMIT ?
+            ''', (chat_id, datetime.date.today().isoformat(), now, row_limit))
+            ids = _take_ids(cursor, limit, word_ids)
+            if not ids:
+                cursor.execute('''
+                SELECT word_id FROM review_schedule
+                WHERE chat_id = ? AND due_at <= ?
+                ORDER BY due_at
+                LIMIT ?
+                ''', (chat_id, now, row_limit))
+                ids = _take_ids(cursor, limit, word_ids)
+            cursor.close()
+            return ids
+    except Exception as e:
+        print(f"Error getting due words for user {chat_id}: {e}")
+        return []
+
+
+def get_review_stats(chat_id, now=None):
+    """Return (due_now, scheduled_total, lapses_total) for a user"""
+    now = int(now if now is not None else time.time())
+    row = db_manager.execute_query('''
+    SELECT COALESCE(SUM(due_at <= ?), 0), COUNT(*), COALESCE(SUM(lapses), 0)
+    FROM review_schedule WHERE chat_id = ?
+    ''', (now, chat_id), fetch_mode='one', commit=False)
+    return tuple(row) if row else (0, 0, 0)
+
+
+def build_daily_queues(queue_size=DAILY_QUEUE_SIZE, now=None):
+    """
+    Precompute today's review queue for every user with due words.
+
+    Everything due before the end of the day goes into review_queue
+    (top `queue_size` per user, most overdue first). Returns the number of
+    queued rows.
+    """
+    now = now if now is not None else time.time()
+    today = datetime.date.fromtimestamp(now)
+    end_of_day = int(time.mktime((today + datetime.timedelta(days=1)).timetuple()))
+    try:
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM review_queue')
+            cursor.execute('''
+            INSERT INTO review_queue (chat_id, position, word_id, queue_date)
+            SELECT chat_id, pos, word_id, ?
+            FROM (
+                SELECT chat_id, word_id,
+                       ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY due_at) AS pos
+                FROM review_schedule
+                WHERE due_at < ?
+            )
+            WHERE pos <= ?
+            ''', (today.isoformat(), end_of_day, queue_size))
+            queued = cursor.rowcount
+            conn.commit()
+            print(f"Daily review queues built: {queued} words queued")
+            return queued
+    except Exception as e:
+        print(f"Error building daily review queues: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0
+
+
+def schedule_daily_queue_job(scheduler, hour=3, minute=0):
+    """Register the nightly queue build with the APScheduler instance"""
+    job = scheduler.add_job(
+        build_daily_queues,
+        'cron',
+        hour=hour,
+        minute=minute,
+        id='daily_review_queue',
+        replace_existing=True
+    )
+    print(f"Daily review queue job scheduled for {hour:02d}:{minute:02d} (job id: {job.id})")
+    return job
+
+
+def sample_due_first(chat_id, df, k=1):
+    """Pick k rows from df: words due for review first, the rest weighted by rating"""
+    from word_sampler import sample_frame
+
+    if df is None or df.empty or "id" not in df.columns:
+        return sample_frame(df, k)
+    due_ids = set(get_due_word_ids(chat_id, k, word_ids=set(df["id"])))
+    due = df[df["id"].isin(due_ids)].head(k) if due_ids else df.iloc[0:0]
+    if len(due) >= k:
+        return due
+    rest = sample_frame(df[~df["id"].isin(due["id"])], k - len(due))
+    if rest is None or rest.empty:
+        return due
+    return rest if due.empty else pd.concat([due, rest])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for statement fingerprints and plan analysis in query_profiler.py.
+"""
+
+import os
+import sys
+
+# Add the current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from query_profiler import MAX_SQL_LENGTH, analyze_plan, fingerprint
+
+
+def test_literals_become_placeholders():
+    assert fingerprint("SELECT word FROM words WHERE id = 42") == "SELECT word FROM words WHERE id = ?"
+    assert fingerprint("SELECT 1 FROM t WHERE a = -3.5e2 AND b = 'x'") == "SELECT ? FROM t WHERE a = ? AND b = ?"
+    assert fingerprint("SELECT id FROM users WHERE name = 'O''Neil'") == "SELECT id FROM users WHERE name = ?"
+
+
+def test_identifiers_with_digits_are_kept():
+    assert fingerprint("SELECT uk_tran, w.col1 FROM user_123 w") == "SELECT uk_tran, w.col1 FROM user_123 w"
+
+
+def test_same_shape_gives_same_fingerprint():
+    a = fingerprint("SELECT * FROM user_words WHERE chat_id = 1 AND word_id IN (1, 2, 3)")
+    b = fingerprint("SELECT *\n  FROM user_words\n WHERE chat_id = 99 AND word_id IN (?,?)")
+    assert a == b == "SELECT * FROM user_words WHERE chat_id = ? AND word_id IN (?)"
+
+
+def test_values_lists_collapse():
+    assert fingerprint("INSERT INTO t (a, b) VALUES ('x', 2), ('y', 3);") == "INSERT INTO t (a, b) VALUES (?)"
+    assert fingerprint("INSERT INTO t VALUES (?, ?)") == "INSERT INTO t VALUES (?)"
+
+
+def test_long_statements_are_truncated():
+    sql = "SELECT " + ", ".join(f"column_{i}" for i in range(200)) + " FROM t"
+    assert len(fingerprint(sql)) == MAX_SQL_LENGTH
+
+
+def test_analyze_plan():
+    rows = [
+        (2, 0, 0, "SCAN words"),
+        (5, 0, 0, "SEARCH article USING INTEGER PRIMARY KEY (rowid=?)"),
+        (9, 0, 0, "SCAN user_words USING COVERING INDEX idx_user_words_rating"),
+        (12, 0, 0, "SCAN CONSTANT ROW"),
+        (14, 0, 0, "USE TEMP B-TREE FOR ORDER BY"),
+    ]
+    plan, scans, temp_btree = analyze_plan(rows)
+    assert plan == [row[-1] for row in rows]
+    assert scans == ["words"]
+    assert temp_btree
+    assert analyze_plan([(2, 0, 0, "SEARCH words USING INDEX idx_word (word=?)")])[1:] == ([], False)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
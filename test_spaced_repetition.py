@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the SM-2 scheduling in spaced_repetition.py.
+"""
+
+import os
+import sqlite3
+import sys
+
+# Add the current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from spaced_repetition import (DAY, DEFAULT_EASE, FAIL_QUALITY, MIN_EASE, NEW_STATE, RELEARN_DELAY,
+                               ReviewState, _take_ids, answer_quality, next_state)
+
+NOW = 1_700_000_000
+
+
+def test_answer_quality():
+    assert answer_quality(False, "hard") == FAIL_QUALITY
+    assert answer_quality(True, "easy") == 3
+    assert answer_quality(True, "medium") == 4
+    assert answer_quality(True, "hard") == 5
+    assert answer_quality(True, "unknown") == 3
+
+
+def test_first_intervals_are_one_and_six_days():
+    first = next_state(NEW_STATE, 4, now=NOW)
+    assert first.reps == 1 and first.interval_days == 1.0
+    assert first.due_at == NOW + DAY
+    second = next_state(first, 4, now=NOW)
+    assert second.reps == 2 and second.interval_days == 6.0
+    assert second.due_at == NOW + 6 * DAY
+
+
+def test_later_intervals_grow_by_ease():
+    state = ReviewState(6.0, 2.5, 2, 0, 0)
+    third = next_state(state, 5, now=NOW)
+    # q=5 raises the ease by 0.1 before it is applied
+    assert abs(third.ease - 2.6) < 1e-9
+    assert abs(third.interval_days - 6.0 * 2.6) < 1e-9
+    assert third.due_at == NOW + int(6.0 * 2.6 * DAY)
+
+
+def test_ease_changes_with_quality():
+    assert abs(next_state(NEW_STATE, 4, now=NOW).ease - DEFAULT_EASE) < 1e-9
+    assert next_state(NEW_STATE, 3, now=NOW).ease < DEFAULT_EASE
+    assert next_state(NEW_STATE, 5, now=NOW).ease > DEFAULT_EASE
+
+
+def test_ease_never_drops_below_minimum():
+    state = NEW_STATE
+    for _ in range(20):
+        state = next_state(state, 0, now=NOW)
+    assert state.ease == MIN_EASE
+
+
+def test_failure_resets_reps_and_relearns_soon():
+    state = ReviewState(15.0, 2.5, 4, 1, 0)
+    failed = next_state(state, FAIL_QUALITY, now=NOW)
+    assert failed.reps == 0 and failed.interval_days == 0.0
+    assert failed.lapses == 2
+    assert failed.due_at == NOW + RELEARN_DELAY
+    # The next correct answer starts the 1 day / 6 days ladder again
+    assert next_state(failed, 4, now=NOW).interval_days == 1.0
+
+
+def test_due_ids_are_limited_to_the_deck():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE due (word_id INTEGER, due_at INTEGER)")
+    conn.executemany("INSERT INTO due VALUES (?, ?)", [(word_id, word_id) for word_id in range(1, 11)])
+    query = "SELECT word_id FROM due ORDER BY due_at LIMIT ?"
+    assert _take_ids(conn.execute(query, (3,)), 3, None) == [1, 2, 3]
+    # Due words of other dictionaries do not take the deck's slots
+    assert _take_ids(conn.execute(query, (-1,)), 3, {2, 5, 8, 9}) == [2, 5, 8]
+    assert _take_ids(conn.execute(query, (-1,)), 3, {42}) == []
+    conn.close()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for batching, backend fallback and caching in translation_service.py.
+"""
+
+import os
+import sqlite3
+import sys
+
+# Add the current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import translation_service
+from db_init import create_translation_cache_table
+from translation_cache import TranslationCache
+from translation_service import OfflineBackend, TranslationService
+
+WORDS = {("de", "uk"): {"Haus": "будинок", "Buch": "книга", "Auto": "автомобіль", "Wasser": "вода",
+                        "Brot": "хліб", "Mann": "чоловік", "Frau": "жінка"}}
+
+
+class RecordingBackend(OfflineBackend):
+    """OfflineBackend that records the batches it receives and can fail"""
+
+    def __init__(self, words=WORDS, name="offline", max_batch=1000, max_chars=4500, failures=0):
+        super().__init__(words)
+        self.name = name
+        self.max_batch = max_batch
+        self.max_chars = max_chars
+        self.failures = failures
+        self.batches = []
+
+    def translate_batch(self, texts, src, dest):
+        self.batches.append(list(texts))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("429 Too Many Requests")
+        return super().translate_batch(texts, src, dest)
+
+
+def make_service(*backends, **kwargs):
+    kwargs.setdefault("use_cache", False)
+    kwargs.setdefault("backoff", 0)
+    return TranslationService(list(backends), **kwargs)
+
+
+def test_order_duplicates_and_blanks():
+    backend = RecordingBackend()
+    service = make_service(backend)
+    result = service.translate_many(["Haus", " Buch ", "", "Haus", "Unbekannt"])
+    assert result == ["будинок", "книга", None, "будинок", None]
+    # Duplicates and blanks never reach the backend
+    assert sorted(sum(backend.batches, [])) == ["Buch", "Haus", "Unbekannt"]
+    assert service.stats()["translated"] == 2
+    service.shutdown()
+
+
+def test_texts_are_split_into_backend_sized_batches():
+    backend = RecordingBackend(max_batch=3)
+    service = make_service(backend)
+    words = list(WORDS[("de", "uk")])
+    assert service.translate_many(words) == [WORDS[("de", "uk")][w] for w in words]
+    assert sorted(len(batch) for batch in backend.batches) == [1, 3, 3]
+    assert service.stats()["requests"] == 3
+    service.shutdown()
+
+
+def test_batches_respect_max_chars():
+    backend = RecordingBackend(max_chars=12)
+    service = make_service(backend)
+    service.translate_many(["Haus", "Buch", "Auto", "Wasser"])
+    # Each text costs len + 1 for the separator
+    assert all(sum(len(t) + 1 for t in batch) <= 12 for batch in backend.batches)
+    assert sorted(sum(backend.batches, [])) == ["Auto", "Buch", "Haus", "Wasser"]
+    service.shutdown()
+
+
+def test_failing_backend_is_retried_then_falls_back():
+    broken = RecordingBackend(name="network", failures=10)
+    offline = RecordingBackend()
+    service = make_service(broken, offline, retries=2)
+    assert service.translate_many(["Haus", "Brot"]) == ["будинок", "хліб"]
+    assert len(broken.batches) == 2
+    assert offline.batches == [["Haus", "Brot"]]
+    stats = service.stats()
+    assert stats["retries"] == 1 and stats["failures"] == 1
+    service.shutdown()
+
+
+def test_fallback_only_gets_what_the_first_backend_missed():
+    partial = RecordingBackend(words={("de", "uk"): {"Haus": "дім"}}, name="network")
+    offline = RecordingBackend()
+    service = make_service(partial, offline)
+    assert service.translate_many(["Haus", "Brot"]) == ["дім", "хліб"]
+    assert offline.batches == [["Brot"]]
+    service.shutdown()
+
+
+def test_translate_many_uses_and_fills_the_cache(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(db_path)
+    create_translation_cache_table(conn.cursor())
+    conn.commit()
+    conn.close()
+    cache = TranslationCache(connect=lambda: sqlite3.connect(db_path, check_same_thread=False))
+    monkeypatch.setattr(translation_service, "translation_cache", cache)
+
+    network = RecordingBackend(words={("de", "uk"): {"Haus": "дім"}}, name="network")
+    offline = RecordingBackend()
+    service = make_service(network, offline, use_cache=True)
+    assert service.translate_many(["Haus", "Brot"]) == ["дім", "хліб"]
+    calls = len(network.batches) + len(offline.batches)
+    assert service.translate_many(["Brot", "Haus"]) == ["хліб", "дім"]
+    assert len(network.batches) + len(offline.batches) == calls
+    assert service.stats()["cache_hits"] == 2
+
+    # Rows reach SQLite with the backend that produced them
+    cache.close()
+    assert cache.stats()["writes"] == 2 and cache.stats()["unsaved"] == 0
+    fresh = TranslationCache(connect=lambda: sqlite3.connect(db_path))
+    assert fresh.get("Haus", "de", "uk", backend="network") == "дім"
+    assert fresh.get("Brot", "de", "uk", backend="offline") == "хліб"
+    assert fresh.get("Brot", "de", "uk", backend="network") is None
+    fresh.close()
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
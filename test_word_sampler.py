@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the Fenwick-tree word sampler (word_sampler.py).
+"""
+
+import os
+import random
+import sys
+
+import pandas as pd
+
+# Add the current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from word_sampler import FenwickSampler, rating_weight, sample_frame
+
+
+def test_prefix_sums_match_weights():
+    weights = [0.5, 2.0, 0.0, 1.5, 3.0, 1.0, 4.0]
+    sampler = FenwickSampler(weights)
+    assert len(sampler) == len(weights)
+    for i in range(len(weights) + 1):
+        assert abs(sampler._prefix(i) - sum(weights[:i])) < 1e-9
+    assert abs(sampler.total - sum(weights)) < 1e-9
+
+
+def test_update_changes_only_one_weight():
+    sampler = FenwickSampler([1.0] * 10)
+    sampler.update(3, 5.0)
+    assert sampler.weight(3) == 5.0
+    assert abs(sampler.total - 14.0) < 1e-9
+    assert abs(sampler._prefix(3) - 3.0) < 1e-9
+    assert abs(sampler._prefix(4) - 8.0) < 1e-9
+
+
+def test_negative_weights_are_rejected():
+    for build in (lambda: FenwickSampler([1.0, -1.0]), lambda: FenwickSampler([1.0]).update(0, -2.0)):
+        try:
+            build()
+        except ValueError:
+            continue
+        raise AssertionError("negative weight accepted")
+
+
+def test_sample_is_distinct_and_leaves_weights_unchanged():
+    weights = [1.0, 2.0, 3.0, 4.0, 5.0]
+    sampler = FenwickSampler(weights)
+    rng = random.Random(7)
+    for _ in range(200):
+        picked = sampler.sample(3, rng)
+        assert len(picked) == 3
+        assert len(set(picked)) == 3
+    assert [sampler.weight(i) for i in range(len(weights))] == weights
+    assert abs(sampler.total - sum(weights)) < 1e-9
+
+
+def test_sample_clips_k_and_skips_zero_weights():
+    sampler = FenwickSampler([0.0, 2.0, 0.0, 1.0])
+    rng = random.Random(1)
+    for _ in range(100):
+        assert sorted(sampler.sample(10, rng)) == [1, 3]
+    assert FenwickSampler([]).sample(3, rng) == []
+    assert FenwickSampler([0.0, 0.0]).sample(1, rng) == []
+
+
+def test_draws_are_proportional_to_weight():
+    weights = [1.0, 2.0, 3.0, 4.0]
+    sampler = FenwickSampler(weights)
+    rng = random.Random(42)
+    draws = 40000
+    counts = [0] * len(weights)
+    for _ in range(draws):
+        counts[sampler.sample(1, rng)[0]] += 1
+    for count, weight in zip(counts, weights):
+        expected = draws * weight / sum(weights)
+        assert abs(count - expected) < expected * 0.05
+
+
+def test_from_ratings_maps_ratings_like_rating_weight():
+    ratings = [0.0, 2.5, float("nan"), -1.0, 5.0]
+    sampler = FenwickSampler.from_ratings(ratings)
+    assert [sampler.weight(i) for i in range(len(ratings))] == [rating_weight(r) for r in ratings]
+    assert rating_weight(None) == rating_weight("bad") == 1.0
+
+
+def test_sample_frame():
+    df = pd.DataFrame({"id": [10, 20, 30], "priority": [0.0, 0.0, 5.0]})
+    rows = sample_frame(df, 2, rng=random.Random(3))
+    assert len(rows) == 2 and rows["id"].is_unique
+    # Without the rating column every row is equally likely
+    rows = sample_frame(df.drop(columns="priority"), 5, rng=random.Random(3))
+    assert sorted(rows["id"]) == [10, 20, 30]
+    assert sample_frame(df.iloc[0:0], 2).empty
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the coalescing write-behind queue (write_queue.py).
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add the current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from write_queue import CoalescingWriteQueue
+
+
+class Recorder:
+    """flush_fn that records batches and can be told to fail"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.flushed = threading.Event()
+
+    def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.batches.append(dict(batch))
+        self.flushed.set()
+
+
+def test_deltas_for_one_key_are_summed():
+    recorder = Recorder()
+    queue = CoalescingWriteQueue(recorder, flush_interval=60)
+    queue.add(("personal", None, 1, 10), 0.5)
+    queue.add(("personal", None, 1, 10), -0.2)
+    queue.add(("personal", None, 1, 11), 1.0)
+    assert queue.pending() == 2
+    assert queue.flush() == 2
+    batch, = recorder.batches
+    assert set(batch) == {("personal", None, 1, 10), ("personal", None, 1, 11)}
+    assert abs(batch[("personal", None, 1, 10)] - 0.3) < 1e-9
+    stats = queue.stats()
+    assert stats["enqueued"] == 3 and stats["coalesced"] == 1 and stats["flushed_items"] == 2
+    assert queue.flush() == 0
+    queue.stop()
+
+
+def test_full_queue_is_flushed_in_the_background():
+    recorder = Recorder()
+    queue = CoalescingWriteQueue(recorder, flush_interval=60, max_items=3)
+    for word_id in range(3):
+        queue.add(("personal", None, 1, word_id), 1.0)
+    assert recorder.flushed.wait(5), "max_items did not wake the flusher"
+    assert len(recorder.batches[0]) == 3
+    queue.stop()
+
+
+def test_failed_flush_is_retried_with_new_deltas_merged():
+    recorder = Recorder(failures=1)
+    queue = CoalescingWriteQueue(recorder, flush_interval=60)
+    queue.add("a", 1.0)
+    assert queue.flush() == 0
+    queue.add("a", 2.0)
+    queue.add("b", 1.0)
+    assert queue.flush() == 2
+    assert recorder.batches == [{"a": 3.0, "b": 1.0}]
+    assert queue.stats()["errors"] == 1
+    queue.stop()
+
+
+def test_failed_deltas_are_kept_up_to_max_pending():
+    recorder = Recorder(failures=5)
+    queue = CoalescingWriteQueue(recorder, flush_interval=60, max_pending=2)
+    queue.add("a", 1.0)
+    queue.add("b", 1.0)
+    for _ in range(4):
+        assert queue.flush() == 0
+    assert queue.pending() == 2 and queue.stats()["dropped"] == 0
+    # Only keys that no longer fit are dropped; deltas for kept keys still merge
+    queue.add("a", 1.0)
+    queue.add("c", 1.0)
+    assert queue.flush() == 0
+    assert queue.stats()["dropped"] == 1
+    assert queue.flush() == 2
+    assert len(recorder.batches) == 1 and recorder.batches[0]["a"] == 2.0
+    queue.stop()
+
+
+def test_retries_back_off_when_the_queue_is_full():
+    recorder = Recorder(failures=100)
+    queue = CoalescingWriteQueue(recorder, flush_interval=0.05, max_items=1, max_backoff=0.4)
+    queue.add("a", 1.0)
+    time.sleep(0.5)
+    # Back to back retries would fail thousands of times; backoff allows a handful
+    assert 1 <= queue.stats()["errors"] <= 5
+    assert queue.pending() == 1
+    queue.stop()
+
+
+def test_stop_drains_and_later_adds_write_through():
+    recorder = Recorder()
+    queue = CoalescingWriteQueue(recorder, flush_interval=60)
+    queue.add("a", 1.0)
+    queue.stop()
+    # Drained by the flusher thread on its way out or by stop() itself
+    assert recorder.batches == [{"a": 1.0}]
+    queue.add("b", 2.0)
+    assert recorder.batches[-1] == {"b": 2.0}
+    assert queue.pending() == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+Фонове заповнення відсутніх перекладів слів (translation backfill).
+
+Читання спільних словників більше не перекладає слова синхронно: пари
+(word_id, мова), яким бракує перекладу, ставляться в чергу, а колода
+повертається одразу лише зі словами, які вже можна показати. Фоновий
+потік збирає чергу пакетами, перекладає їх одним translate_many() на
+кожну пару мов і зберігає результат через store_fn.
+"""
+
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_PENDING = 5000
+DEFAULT_IDLE_WAIT = 1.0     # seconds to wait for more work before flushing a partial batch
+DEFAULT_RETRY_AFTER = 3600  # seconds before a word that failed to translate is queued again
+
+
+class TranslationBackfill:
+    """Deduplicating queue of missing (word_id, language) translations filled by a background thread"""
+
+    def __init__(self, store_fn, translate_fn=None, batch_size=DEFAULT_BATCH_SIZE,
+                 max_pending=DEFAULT_MAX_PENDING, idle_wait=DEFAULT_IDLE_WAIT,
+                 retry_after=DEFAULT_RETRY_AFTER, name="translation-backfill"):
+        # store_fn(dest_language, [(word_id, translation), ...]) -> number of rows written
+        self.store_fn = store_fn
+        self.translate_fn = translate_fn
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.idle_wait = idle_wait
+        self.retry_after = retry_after
+        self.name = name
+        self._pending = OrderedDict()     # (word_id, dest) -> (source_text, src)
+        self._in_flight = set()
+        self._failed_at = {}              # (word_id, dest) -> monotonic time of the last failure
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        # metrics
+        self._enqueued = 0
+        self._duplicates = 0
+        self._rejected = 0
+        self._batches = 0
+        self._filled = 0
+        self._failed = 0
+        self._errors = 0
+        self._busy_time = 0.0
+        self._last_batch_ms = 0.0
+        self._started_at = time.monotonic()
+
+    def _translate(self, texts, src, dest):
+        if self.translate_fn is not None:
+            return self.translate_fn(texts, src, dest)
+        from translation_service import translate_many
+        return translate_many(texts, src, dest)
+
+    def enqueue(self, word_id, source_text, src, dest):
+        """Queue one missing translation; returns False if it was already queued or the queue is full"""
+        return self.enqueue_many([(word_id, source_text)], src, dest) > 0
+
+    def enqueue_many(self, items, src, dest):
+        """Queue [(word_id, source_text), ...] for translation src -> dest; returns how many were added"""
+        added = 0
+        now = time.monotonic()
+        with self._cond:
+            if self._stopping:
+                return 0
+            for word_id, source_text in items:
+                if not source_text:
+                    continue
+                key = (int(word_id), dest)
+                if key in self._pending or key in self._in_flight:
+                    self._duplicates += 1
+                    continue
+                failed_at = self._failed_at.get(key)
+                if failed_at is not None and now - failed_at < self.retry_after:
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    self._rejected += 1
+                    continue
+                self._pending[key] = (source_text, src)
+                added += 1
+            self._enqueued += added
+            if added:
+                self._cond.notify()
+        if added:
+            self._ensure_thread()
+        return added
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping or self._pending, timeout=self.idle_wait)
+                if self._stopping:
+                    return
+                if not self._pending:
+                    continue
+            self.process_batch()
+
+    def _take_batch(self):
+        with self._cond:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                key, value = self._pending.popitem(last=False)
+                self._in_flight.add(key)
+                batch.append((key, value))
+            return batch
+
+    def process_batch(self):
+        """Translate and store one batch from the queue; returns the number of translations stored"""
+        batch = self._take_batch()
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        stored = 0
+        try:
+            groups = {}
+            for (word_id, dest), (text, src) in batch:
+                groups.setdefault((src, dest), []).append((word_id, text))
+            for (src, dest), items in groups.items():
+                translations = self._translate([text for _, text in items], src, dest)
+                rows = [(word_id, tr) for (word_id, _), tr in zip(items, translations) if tr]
+                self._mark_failed([(word_id, dest) for (word_id, _), tr in zip(items, translations) if not tr])
+                if rows:
+                    stored += self.store_fn(dest, rows) or 0
+        except Exception as e:
+            self._errors += 1
+            print(f"Error in {self.name} ({len(batch)} words): {e}")
+            traceback.print_exc()
+        finally:
+            with self._cond:
+                for key, _ in batch:
+                    self._in_flight.discard(key)
+        elapsed = time.perf_counter() - started
+        self._batches += 1
+        self._filled += stored
+        self._busy_time += elapsed
+        self._last_batch_ms = elapsed * 1000
+        return stored
+
+    def _mark_failed(self, keys):
+        if not keys:
+            return
+        now = time.monotonic()
+        with self._cond:
+            if len(self._failed_at) > self.max_pending:
+                self._failed_at = {k: t for k, t in self._failed_at.items() if now - t < self.retry_after}
+            for key in keys:
+                self._failed_at[key] = now
+        self._failed += len(keys)
+
+    def drain(self):
+        """Process everything queued right now in the calling thread (scripts/tests)"""
+        total = 0
+        while self.pending():
+            total += self.process_batch()
+        return total
+
+    def stop(self, timeout=5.0):
+        """Stop the worker; queued words stay missing and are re-queued by the next read"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+    def stats(self):
+        """Return queue depth and fill rate"""
+        uptime = time.monotonic() - self._started_at
+        with self._cond:
+            pending = len(self._pending)
+            in_flight = len(self._in_flight)
+        return {
+            "pending": pending,
+            "in_flight": in_flight,
+            "enqueued": self._enqueued,
+            "duplicates": self._duplicates,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "filled": self._filled,
+            "failed": self._failed,
+            "errors": self._errors,
+            "fill_rate_per_s": round(self._filled / self._busy_time, 1) if self._busy_time else 0.0,
+            "fill_rate_per_min": round(self._filled / uptime * 60, 1) if uptime else 0.0,
+            "last_batch_ms": round(self._last_batch_ms, 1),
+        }
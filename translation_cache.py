@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+"""
+Єдиний кеш перекладів для всіх місць, де бот щось перекладає.
+
+Ключ - (нормалізований текст, src, dest, backend). Перед SQLite-таблицею
+translation_cache стоїть LRU у пам'яті, тож повторне слово (у іншого
+користувача чи іншого спільного словника) не читає навіть БД, не кажучи
+вже про мережу. Пошук з backend=None приймає переклад від будь-якого
+бекенда (найсвіжіший).
+
+Таблицю створює init_db (db_init.create_translation_cache_table) - кеш
+лише читає і пише рядки. Кеш має власне з'єднання, а нові переклади
+записує фоновий потік: виклик put_many() посеред незавершеної транзакції
+обробника не комітить її і не чекає на її блокування запису. Модуль не
+залежить від конфігурації бота: скрипти можуть створити
+TranslationCache(connect=lambda: sqlite3.connect(path)) самостійно,
+попередньо створивши таблицю, і викликати close() наприкінці.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_WRITE_INTERVAL = 1.0    # seconds new translations may wait before they are written
+ANY_BACKEND = None
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Cache key form of a text: NFC, trimmed, inner whitespace collapsed (case is kept)"""
+    if not isinstance(text, str):
+        return ""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _default_connect():
+    import db_manager
+    from db_pool import DEFAULT_PRAGMAS
+    conn = sqlite3.connect(db_manager.DB_PATH, timeout=30, check_same_thread=False)
+    for pragma in DEFAULT_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class TranslationCache:
+    """Thread-safe in-process LRU backed by the SQLite translation_cache table
+
+    The cache keeps one connection of its own (not the caller's pooled one)
+    and writes new rows from a background thread, so storing a translation
+    never commits, or waits for, a transaction the caller has open.
+    """
+
+    def __init__(self, connect=None, max_entries=DEFAULT_MAX_ENTRIES, write_interval=DEFAULT_WRITE_INTERVAL):
+        self._connect = connect or _default_connect
+        self.max_entries = max_entries
+        self.write_interval = write_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._unsaved = {}          # (norm, src, dest, backend) -> (translation, created_at)
+        self._write_cond = threading.Condition()
+        self._writer = None
+        self._stopping = False
+        self._write_errors = 0
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+
+    def _remember(self, key, translation):
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, text, src, dest, backend=ANY_BACKEND):
+        """Return the cached translation or None"""
+        return self.get_many([text], src, dest, backend).get(text)
+
+    def get_many(self, texts, src, dest, backend=ANY_BACKEND):
+        """Return {text: translation} for every text that is cached (memory first, then SQLite)"""
+        found = {}
+        wanted = {}
+        with self._lock:
+            for text in texts:
+                norm = normalize_text(text)
+                if not norm:
+                    continue
+                key = (norm, src, dest, backend)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[text] = self._entries[key]
+                    self._memory_hits += 1
+                else:
+                    wanted.setdefault(norm, []).append(text)
+
+        if wanted:
+            rows = self._select(list(wanted), src, dest, backend)
+            with self._lock:
+                for norm, originals in wanted.items():
+                    translation = rows.get(norm)
+                    if translation is None:
+                        self._misses += len(originals)
+                        continue
+                    self._remember((norm, src, dest, backend), translation)
+                    self._db_hits += len(originals)
+                    for text in originals:
+                        found[text] = translation
+        return found
+
+    @contextmanager
+    def _conn(self):
+        with self._db_lock:
+            if self._db is None:
+                self._db = self._connect()
+            try:
+                yield self._db
+            except Exception:
+                if self._db.in_transaction:
+                    self._db.rollback()
+                raise
+
+    def _select(self, norms, src, dest, backend):
+        rows = {}
+        try:
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                # Ліміт параметрів SQLite - читаємо частинами
+                for start in range(0, len(norms), 500):
+                    part = norms[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    if backend is ANY_BACKEND:
+                        # Найсвіжіший переклад від будь-якого бекенда
+                        cursor.execute(f'''
+                        SELECT word, translation FROM translation_cache
+                        WHERE src = ? AND dest = ? AND word IN ({placeholders})
+                        ORDER BY created_at
+                        ''', (src, dest, *part))
+                    else:
+                        cursor.execute(f'''
+                        SELECT word, translation FROM translation_cache
+                        WHERE src = ? AND dest = ? AND backend = ? AND word IN ({placeholders})
+                        ''', (src, dest, backend, *part))
+                    rows.update(cursor.fetchall())
+        except Exception as e:
+            print(f"Error reading translation cache: {e}")
+        return rows
+
+    def put(self, text, src, dest, translation, backend=""):
+        self.put_many([(text, translation)], src, dest, backend)
+
+    def put_many(self, pairs, src, dest, backend=""):
+        """Store [(text, translation), ...] produced by `backend`; the SQLite write happens in the background"""
+        backend = backend or ""
+        now = int(time.time())
+        rows = {}
+        with self._lock:
+            for text, translation in pairs:
+                norm = normalize_text(text)
+                if not norm or not translation:
+                    continue
+                self._remember((norm, src, dest, backend), translation)
+                self._remember((norm, src, dest, ANY_BACKEND), translation)
+                rows[(norm, src, dest, backend)] = (translation, now)
+        if not rows:
+            return 0
+        with self._write_cond:
+            self._unsaved.update(rows)
+            stopped = self._stopping
+        if stopped:
+            # After close() there is no writer thread - write through
+            self.flush()
+        else:
+            self._ensure_writer()
+        return len(rows)
+
+    def _ensure_writer(self):
+        with self._write_cond:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._run_writer, name="translation-cache", daemon=True)
+            self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            with self._write_cond:
+                self._write_cond.wait_for(lambda: self._stopping, timeout=self.write_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self):
+        """Write every unsaved translation now; returns the number of rows written"""
+        with self._write_cond:
+            batch = self._unsaved
+            self._unsaved = {}
+        if not batch:
+            return 0
+        try:
+            with self._conn() as conn:
+                conn.executemany('''
+                INSERT OR REPLACE INTO translation_cache (word, src, dest, backend, translation, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(*key, translation, created_at) for key, (translation, created_at) in batch.items()])
+                conn.commit()
+        except Exception as e:
+            print(f"Error writing translation cache ({len(batch)} rows): {e}")
+            with self._lock:
+                self._write_errors += 1
+            with self._write_cond:
+                # Retry on the next tick unless a newer translation replaced the row meanwhile
+                for key, value in batch.items():
+                    self._unsaved.setdefault(key, value)
+            return 0
+        with self._lock:
+            self._writes += len(batch)
+        return len(batch)
+
+    def close(self, timeout=5.0):
+        """Stop the writer thread, write what is still unsaved and close the connection"""
+        with self._write_cond:
+            self._stopping = True
+            self._write_cond.notify_all()
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            writer.join(timeout)
+        written = self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        return written
+
+    def cached(self, text, src, dest, fetch, backend=""):
+        """Return the cached translation of text or fetch(text) it and remember the result"""
+        translation = self.get(text, src, dest, backend or ANY_BACKEND)
+        if translation is not None:
+            return translation
+        translation = fetch(text)
+        if translation:
+            self.put(text, src, dest, translation, backend)
+        return translation
+
+    def clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters for the memory and SQLite tiers"""
+        with self._lock:
+            lookups = self._memory_hits + self._db_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._memory_hits + self._db_hits) / lookups, 3) if lookups else 0.0,
+                "writes": self._writes,
+                "unsaved": len(self._unsaved),
+                "write_errors": self._write_errors,
+                "evictions": self._evictions,
+            }
+
+
+translation_cache = TranslationCache()
+
+
+def get_translation_cache_stats():
+    return translation_cache.stats()
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+
+"""
+Сервіс перекладу слів для масового додавання та автоперекладу.
+
+Один спільний клієнт на кожен бекенд (без нового Translator/event loop на
+кожне слово), обмежений пул потоків, token bucket на бекенд, повтори з
+експоненційною затримкою та пакетування кількох слів в один запит
+(рядки, розділені "\\n"), якщо бекенд це підтримує.
+
+Готові переклади зберігаються через translation_cache (LRU + SQLite),
+тож повторний переклад того ж слова не йде в мережу. OfflineBackend
+перекладає зі словника в пам'яті - для тестів і як останній запасний
+варіант.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from translation_cache import normalize_text, translation_cache
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5           # seconds, doubled on every retry
+BATCH_SEPARATOR = "\n"
+
+# Запасний словник для найпоширеніших слів (раніше жив у translation_sync)
+FALLBACK_WORDS = {
+    ('de', 'uk'): {
+        'Haus': 'будинок',
+        'Buch': 'книга',
+        'Auto': 'автомобіль',
+        'Wasser': 'вода',
+        'Brot': 'хліб',
+        'Mann': 'чоловік',
+        'Frau': 'жінка',
+        'Kind': 'дитина',
+        'Hund': 'собака',
+        'Katze': 'кіт',
+    },
+}
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` calls per second with bursts up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available; returns the time waited in seconds"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class TranslationBackend:
+    """
+    Base class for translation backends.
+
+    translate_batch() gets up to `max_batch` texts and returns a list of the
+    same length (None for texts it could not translate). Raising an exception
+    marks the whole call as failed so the service can retry it.
+    """
+
+    name = "base"
+    max_batch = 1           # texts per request
+    max_chars = 4500        # request size limit for joined batches
+    rate = 5.0              # requests per second
+    burst = 5
+
+    def translate_batch(self, texts, src, dest):
+        raise NotImplementedError
+
+    def _translate_joined(self, texts, src, dest, translate_one):
+        """Translate several texts as one multi-line request, falling back to one by one"""
+        if len(texts) == 1:
+            return [translate_one(texts[0], src, dest)]
+        joined = translate_one(BATCH_SEPARATOR.join(texts), src, dest)
+        parts = joined.split(BATCH_SEPARATOR) if joined else []
+        if len(parts) == len(texts):
+            return [part.strip() or None for part in parts]
+        # Бекенд об'єднав або розбив рядки - перекладаємо кожне слово окремо
+        return [translate_one(text, src, dest) for text in texts]
+
+
+class GoogletransBackend(TranslationBackend):
+    """googletrans with one shared Translator; coroutine results run on one private loop"""
+
+    name = "googletrans"
+    max_batch = 20
+
+    def __init__(self):
+        from googletrans import Translator
+        self._translator = Translator()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _run(self, result):
+        # Newer googletrans releases are async; keep one loop thread instead of a loop per call
+        if not hasattr(result, '__await__'):
+            return result
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="googletrans-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(result, self._loop).result()
+
+    def _translate_one(self, text, src, dest):
+        result = self._run(self._translator.translate(text, src=src, dest=dest))
+        text = getattr(result, 'text', None)
+        return text if isinstance(text, str) and text else None
+
+    def translate_batch(self, texts, src, dest):
+        return self._translate_joined(texts, src, dest, self._translate_one)
+
+
+class DeepTranslatorBackend(TranslationBackend):
+    """deep_translator.GoogleTranslator, one client per language pair"""
+
+    name = "deep_translator"
+    max_batch = 20
+
+    def __init__(self):
+        from deep_translator import GoogleTranslator
+        self._factory = GoogleTranslator
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, src, dest):
+        with self._lock:
+            client = self._clients.get((src, dest))
+            if client is None:
+                client = self._factory(source=src, target=dest)
+                self._clients[(src, dest)] = client
+            return client
+
+    def _translate_one(self, text, src, dest):
+        return self._client(src, dest).translate(text) or None
+
+    def translate_batch(self, texts, src, dest):
+        return self._translate_joined(texts, src, dest, self._translate_one)
+
+
+class OfflineBackend(TranslationBackend):
+    """Dictionary lookup without network access (tests, fallback for common words)"""
+
+    name = "offline"
+    max_batch = 1000
+    rate = 1000.0
+    burst = 1000
+
+    def __init__(self, words=None):
+        # words: {(src, dest): {text: translation}}
+        self.words = words if words is not None else FALLBACK_WORDS
+        self.calls = 0
+
+    def translate_batch(self, texts, src, dest):
+        self.calls += 1
+        table = self.words.get((src, dest), {})
+        return [table.get(text) for text in texts]
+
+
+def default_backends():
+    """Network backends that can be imported here, followed by the offline fallback"""
+    backends = []
+    for backend_cls in (DeepTranslatorBackend, GoogletransBackend):
+        try:
+            backends.append(backend_cls())
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"Translation backend {backend_cls.name} unavailable: {e}")
+    backends.append(OfflineBackend())
+    return backends
+
+
+class TranslationService:
+    """Cached, rate-limited, concurrent translation over a chain of backends"""
+
+    def __init__(self, backends=None, max_workers=DEFAULT_MAX_WORKERS, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, use_cache=True):
+        self.backends = list(backends) if backends is not None else default_backends()
+        self.retries = retries
+        self.backoff = backoff
+        self.use_cache = use_cache
+        self._limiters = {id(b): RateLimiter(b.rate, b.burst) for b in self.backends}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._cache_hits = 0
+        self._translated = 0
+
+    def translate(self, text, src='de', dest='uk'):
+        """Translate one text; returns None if no backend could translate it"""
+        return self.translate_many([text], src, dest)[0]
+
+    def translate_many(self, texts, src='de', dest='uk'):
+        """
+        Translate a list of texts, preserving order.
+
+        Duplicates are translated once, cached translations are served from
+        translation_cache, and the rest are split into backend-sized batches
+        that run concurrently on the service's thread pool.
+        """
+        texts = [normalize_text(t) for t in texts]
+        unique = list(dict.fromkeys(t for t in texts if t))
+        if not unique:
+            return [None] * len(texts)
+
+        found = translation_cache.get_many(unique, src, dest) if self.use_cache else {}
+        missing = [t for t in unique if t not in found]
+        with self._stats_lock:
+            self._cache_hits += len(unique) - len(missing)
+
+        if missing:
+            translated = {}
+            futures = [self._executor.submit(self._translate_chunk, chunk, src, dest)
+                       for chunk in self._chunks(missing)]
+            for future in futures:
+                translated.update(future.result())
+            found.update({t: tr for t, (tr, _) in translated.items() if tr})
+            if self.use_cache:
+                by_backend = {}
+                for t, (tr, backend) in translated.items():
+                    if tr:
+                        by_backend.setdefault(backend, []).append((t, tr))
+                for backend, pairs in by_backend.items():
+                    translation_cache.put_many(pairs, src, dest, backend)
+            with self._stats_lock:
+                self._translated += sum(1 for tr, _ in translated.values() if tr)
+
+        return [found.get(t) if t else None for t in texts]
+
+    def _chunks(self, texts):
+        # Batch size is bounded by the first backend; fallbacks re-split if they need smaller batches
+        backend = self.backends[0] if self.backends else OfflineBackend()
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and (len(chunk) >= backend.max_batch or size + len(text) + 1 > backend.max_chars):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + 1
+        if chunk:
+            yield chunk
+
+    def _translate_chunk(self, texts, src, dest):
+        """Run one chunk through the backend chain; returns {text: (translation, backend_name)}"""
+        result = {}
+        pending = list(texts)
+        for backend in self.backends:
+            if not pending:
+                break
+            for start in range(0, len(pending), backend.max_batch):
+                part = pending[start:start + backend.max_batch]
+                translations = self._call_with_retries(backend, part, src, dest)
+                for text, translation in zip(part, translations):
+                    if translation:
+                        result[text] = (translation, backend.name)
+            pending = [t for t in pending if t not in result]
+        for text in pending:
+            result[text] = (None, None)
+        return result
+
+    def _call_with_retries(self, backend, texts, src, dest):
+        limiter = self._limiters[id(backend)]
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            limiter.acquire()
+            with self._stats_lock:
+                self._requests += 1
+            try:
+                translations = backend.translate_batch(texts, src, dest)
+                if len(translations) == len(texts):
+                    return translations
+                raise ValueError(f"expected {len(texts)} translations, got {len(translations)}")
+            except Exception as e:
+                print(f"Translation backend {backend.name} failed (attempt {attempt}/{self.retries}): {e}")
+                if attempt < self.retries:
+                    with self._stats_lock:
+                        self._retries += 1
+                    time.sleep(delay)
+                    delay *= 2
+        with self._stats_lock:
+            self._failures += 1
+        return [None] * len(texts)
+
+    def stats(self):
+        """Return request/retry/cache counters"""
+        with self._stats_lock:
+            return {
+                "backends": [b.name for b in self.backends],
+                "requests": self._requests,
+                "retries": self._retries,
+                "failures": self._failures,
+                "cache_hits": self._cache_hits,
+                "translated": self._translated,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_translation_service():
+    """Return the process-wide TranslationService, creating it on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TranslationService()
+    return _service
+
+
+def set_translation_service(service):
+    """Replace the process-wide service (e.g. TranslationService([OfflineBackend(words)]) in tests)"""
+    global _service
+    with _service_lock:
+        old, _service = _service, service
+    if old is not None and old is not service:
+        old.shutdown()
+    return service
+
+
+def translate(text, src='de', dest='uk'):
+    return get_translation_service().translate(text, src, dest)
+
+
+def translate_many(texts, src='de', dest='uk'):
+    return get_translation_service().translate_many(texts, src, dest)
+
+
+def get_translation_stats():
+    return get_translation_service().stats()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Кеш профілів користувачів.
+
+Профіль (мова, тип словника, спільний словник, права адміністратора
+словника, серія днів) читається одним запитом і тримається в обмеженому
+LRU. Функції db_manager, що змінюють ці поля, оновлюють запис у кеші
+(write-through) або інвалідовують його, тож обробники та ігрові раунди
+не відкривають з'єднання з БД лише щоб дізнатися мову чи словник.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL = 600           # seconds; a safety net for writes that bypass db_manager
+
+
+class UserProfile:
+    __slots__ = ("chat_id", "exists", "language", "dict_type", "shared_dict_id",
+                 "shared_dict_exists", "is_admin", "streak", "loaded_at")
+
+    def __init__(self, chat_id, exists=True, language=None, dict_type="personal", shared_dict_id=None,
+                 shared_dict_exists=False, is_admin=False, streak=0):
+        self.chat_id = chat_id
+        self.exists = exists
+        self.language = language
+        self.dict_type = dict_type or "personal"
+        self.shared_dict_id = shared_dict_id
+        self.shared_dict_exists = shared_dict_exists
+        self.is_admin = is_admin            # admin of the selected shared dictionary
+        self.streak = streak or 0
+        self.loaded_at = time.monotonic()
+
+    def replace(self, **fields):
+        """Return a copy with some fields changed (cached records are never mutated)"""
+        values = {name: getattr(self, name) for name in self.__slots__ if name != "loaded_at"}
+        values.update(fields)
+        return UserProfile(**values)
+
+    def __repr__(self):
+        return (f"UserProfile({self.chat_id}, language={self.language!r}, dict_type={self.dict_type!r}, "
+                f"shared_dict_id={self.shared_dict_id}, is_admin={self.is_admin}, streak={self.streak})")
+
+
+class UserProfileCache:
+    """Thread-safe bounded LRU of UserProfile records loaded by load_fn(chat_id)"""
+
+    def __init__(self, load_fn, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.load_fn = load_fn
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a profile loaded during a write is not cached stale
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._updates = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    def get(self, chat_id):
+        """Return the cached profile, loading it with one query on a miss"""
+        with self._lock:
+            profile = self._profiles.get(chat_id)
+            if profile is not None and time.monotonic() - profile.loaded_at < self.ttl:
+                self._profiles.move_to_end(chat_id)
+                self._hits += 1
+                return profile
+            self._misses += 1
+            generation = self._generation
+        profile = self.load_fn(chat_id)
+        with self._lock:
+            self._loads += 1
+            if profile is not None and generation == self._generation:
+                self._store(chat_id, profile)
+        return profile
+
+    def peek(self, chat_id):
+        """Return the cached profile if it is fresh, without loading or counting a lookup"""
+        with self._lock:
+            profile = self._profiles.get(chat_id)
+            if profile is not None and time.monotonic() - profile.loaded_at < self.ttl:
+                return profile
+            return None
+
+    def put(self, profile):
+        """Store a complete profile (e.g. right after creating the user)"""
+        with self._lock:
+            self._generation += 1
+            self._store(profile.chat_id, profile)
+
+    def update(self, chat_id, **fields):
+        """Write-through: apply fields the caller has just written to the DB"""
+        with self._lock:
+            self._generation += 1
+            profile = self._profiles.get(chat_id)
+            if profile is not None:
+                self._store(chat_id, profile.replace(**fields))
+                self._updates += 1
+
+    def invalidate(self, chat_id=None):
+        """Drop one user's profile, or all profiles when chat_id is None"""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if chat_id is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(chat_id, None)
+
+    def _store(self, chat_id, profile):
+        self._profiles[chat_id] = profile
+        self._profiles.move_to_end(chat_id)
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+            self._evictions += 1
+
+    def stats(self):
+        """Return size and hit-rate counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._profiles),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "loads": self._loads,
+                "updates": self._updates,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+            }
@@ -37,22 +37,10 @@ def clear_state(chat_id, preserve_dict_type=False, preserve_messages=False, pres
         pass
     
     # Delete messages if they exist and we are not preserving them
-    if not preserve_messages and chat_id in user_state:
-        # Delete active messages
-        active_messages = user_state[chat_id].get("active_messages", [])
-        if active_messages:
-            for msg_id in active_messages:
-                try:
-                    bot.delete_message(chat_id, msg_id)
-                except Exception as e:
-                    # Silently ignore message deletion errors
-                    pass
-                    
-        # Delete single message if exists
-        message_id = user_state[chat_id].get("message_id")
-        if message_id:
+    if not preserve_messages:
+        for msg_id in state_message_ids(chat_id):
             try:
-                bot.delete_message(chat_id, message_id)
+                bot.delete_message(chat_id, msg_id)
             except Exception as e:
                 # Silently ignore message deletion errors
                 pass
@@ -77,47 +65,23 @@ def clear_state(chat_id, preserve_dict_type=False, preserve_messages=False, pres
         if preserve_level and level:
             user_state[chat_id]["level"] = level
             
+def state_message_ids(chat_id):
+    """Message ids clear_state() deletes: the activity messages plus the single message_id"""
+    from config import user_state
+    
+    state = user_state.get(chat_id)
+    if not state:
+        return []
+    message_ids = list(state.get("active_messages", []))
+    if state.get("message_id"):
+        message_ids.append(state["message_id"])
+    return message_ids
+
 # Backward compatibility
 def get_user_params_path(chat_id):
     from .path_helpers import get_user_params_path as gup
     return gup(chat_id)
 
-def medium_level_keyboard(chat_id=None):
-    """Create medium level keyboard with localized buttons if chat_id provided"""
-    from telebot.types import ReplyKeyboardMarkup
-    keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
-
-    if chat_id:
-        from utils.language_utils import get_text
-        keyboard.row(get_text("choose_correct_spelling", chat_id), get_text("fill_in_gaps", chat_id))
-        keyboard.row(get_text("learn_possessive_pronouns", chat_id) + " (" + get_text("medium_level", chat_id) + ")")
-        keyboard.row(get_text("back_to_main_menu", chat_id))
-    else:
-        keyboard.row("🔤 Вибір правильного написання", "📝 Заповніть пропуски")
-        keyboard.row("🧩 Вивчати присвійні займенники (середній)")
-        keyboard.row("↩️ Повернутися до головного меню")
-    
-    return keyboard
-
-def hard_level_keyboard(chat_id=None):
-    """Create hard level keyboard with localized buttons if chat_id provided"""
-    from telebot.types import ReplyKeyboardMarkup
-    keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
-
-    if chat_id:
-        from utils.language_utils import get_text
-        keyboard.row(get_text("advanced_game", chat_id), get_text("word_typing", chat_id))
-        keyboard.row(get_text("article_typing", chat_id))
-        keyboard.row(get_text("learn_possessive_pronouns", chat_id) + " (" + get_text("hard_level", chat_id) + ")")
-        keyboard.row(get_text("back_to_main_menu", chat_id))
-    else:
-        keyboard.row("🧩 Складна гра", "📝 Введення слів")
-        keyboard.row("🏷️ Введення артиклів")
-        keyboard.row("🧩 Вивчати присвійні займенники (складний)")
-        keyboard.row("↩️ Повернутися до головного меню")
-    
-    return keyboard
-
 def shared_dictionary_keyboard(chat_id=None):
     """Create keyboard for shared dictionary menu"""
     try:
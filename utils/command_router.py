@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+Маршрутизація локалізованих кнопок меню за один пошук у словнику.
+
+Під час першого звернення з locales/*.json будується зворотний індекс
+{текст кнопки будь-якою мовою -> множина ключів локалізації}. Предикати
+обробників (on("repetition")) та перевірки команд виходу більше не
+викликають get_text для кожного повідомлення: ключі команди шукаються
+один раз і запам'ятовуються на самому об'єкті повідомлення.
+"""
+
+import threading
+
+from locales.catalog import FALLBACK_LANGUAGE as FALLBACK_LOCALE, get_catalog
+
+_EMPTY = frozenset()
+_MESSAGE_ATTR = "_command_keys"
+
+_index = None
+_index_lock = threading.Lock()
+_aliases = {}       # text -> set(keys), legacy hard-coded button texts
+_derived = {}       # key -> fn(locale_dict) returning the button text for that locale
+
+
+def _load_locales():
+    catalog = get_catalog()
+    return {language: catalog.raw_strings(language) for language in catalog.languages}
+
+
+def _build_index():
+    locales = _load_locales()
+    fallback = locales.get(FALLBACK_LOCALE, {})
+    index = {}
+    for strings in locales.values():
+        for key, text in strings.items():
+            if isinstance(text, str) and text:
+                index.setdefault(text, set()).add(key)
+        # Похідні кнопки (наприклад "<вправа> (<рівень>)") з англійськими значеннями для відсутніх ключів
+        merged = {**fallback, **strings}
+        for key, fn in _derived.items():
+            try:
+                text = fn(merged)
+            except (KeyError, AttributeError, TypeError):
+                continue
+            if text:
+                index.setdefault(text, set()).add(key)
+    # get_text повертає сам ключ, якщо його немає ні в мові користувача, ні в англійській
+    all_keys = set().union(*locales.values()) if locales else set()
+    for key in all_keys - set(fallback):
+        if any(key not in strings for strings in locales.values()):
+            index.setdefault(key, set()).add(key)
+    for text, keys in _aliases.items():
+        index.setdefault(text, set()).update(keys)
+    return {text: frozenset(keys) for text, keys in index.items()}
+
+
+def _get_index():
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build_index()
+            index = _index
+    return index
+
+
+def rebuild_index():
+    """Reload locales/*.json (e.g. after editing translations); returns the number of indexed texts"""
+    global _index
+    get_catalog().load()
+    with _index_lock:
+        _index = _build_index()
+        return len(_index)
+
+
+def alias(key, *texts):
+    """Register extra (non-localized) button texts for a command key"""
+    global _index
+    with _index_lock:
+        for text in texts:
+            _aliases.setdefault(text, set()).add(key)
+        _index = None
+
+
+def derived(key, fn):
+    """Register a button whose text is computed from a locale dict, e.g. lambda s: s["your_dict"].split(":")[0]"""
+    global _index
+    with _index_lock:
+        _derived[key] = fn
+        _index = None
+
+
+def template(key, pattern):
+    """Register a button built from other keys, e.g. template("x", "{learn_possessive_pronouns} ({hard_level})")"""
+    derived(key, lambda strings: pattern.format_map(strings))
+
+
+def command_keys(text):
+    """Return the frozenset of localization keys whose text (in any locale) equals text"""
+    if not isinstance(text, str) or not text:
+        return _EMPTY
+    index = _get_index()
+    keys = index.get(text)
+    if keys is None:
+        stripped = text.strip()
+        keys = index.get(stripped, _EMPTY) if stripped != text else _EMPTY
+    return keys
+
+
+def message_keys(message):
+    """command_keys(message.text), computed once per message and cached on the message object"""
+    keys = getattr(message, _MESSAGE_ATTR, None)
+    if keys is None:
+        keys = command_keys(getattr(message, "text", None))
+        try:
+            setattr(message, _MESSAGE_ATTR, keys)
+        except AttributeError:
+            pass
+    return keys
+
+
+def matches(message, *keys):
+    """True if the message text is the button for any of the given keys"""
+    found = message_keys(message)
+    if not found:
+        return False
+    for key in keys:
+        if key in found:
+            return True
+    return False
+
+
+def on(*keys, aliases=()):
+    """
+    Predicate for @bot.message_handler(func=...) matching localized buttons.
+
+    Usage:
+        @bot.message_handler(func=on("word_typing", aliases=["📝 Введення слів"]))
+    """
+    if aliases:
+        alias(keys[0], *aliases)
+    return lambda message: matches(message, *keys)
+
+
+def stats():
+    """Return index size (texts and distinct keys)"""
+    index = _get_index()
+    return {
+        "texts": len(index),
+        "keys": len({key for keys in index.values() for key in keys}),
+        "aliases": len(_aliases),
+        "derived": len(_derived),
+    }
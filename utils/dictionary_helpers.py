@@ -167,13 +167,12 @@ def load_user_dictionary(chat_id):
                 df = db_manager.get_shared_dictionary_words(chat_id, shared_dict_id)
                 
                 # Get actual dictionary name from database
-                conn = db_manager.get_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
-                result = cursor.fetchone()
-                if result:
-                    dict_name = result[0]
-                conn.close()
+                with db_manager.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
+                    result = cursor.fetchone()
+                    if result:
+                        dict_name = result[0]
         else:
             # Load personal dictionary
             df = db_manager.get_user_words(chat_id, dict_type)
@@ -210,12 +209,11 @@ def handle_empty_dictionary(chat_id, level_keyboard=None, dict_name=None):
         
         if dict_type == "shared" and shared_dict_id:
             # Get shared dictionary name
-            conn = db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
-            result = cursor.fetchone()
-            dict_name = f"«{result[0]}»" if result else get_text("shared_dictionary", chat_id)
-            conn.close()
+            with db_manager.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM shared_dictionaries WHERE id = ?", (shared_dict_id,))
+                result = cursor.fetchone()
+                dict_name = f"«{result[0]}»" if result else get_text("shared_dictionary", chat_id)
         else:
             dict_name = get_text(f"{dict_type}_dictionary", chat_id)
     
@@ -275,3 +273,7 @@ def update_word_rating(chat_id, word_id, is_correct, level="easy"):
                     del user_state[chat_id]["shared_dict_id"]
     else:
         db_manager.update_word_rating(chat_id, word_id, rating_change)
+    
+    # Update the spaced-repetition schedule for this word
+    from spaced_repetition import record_answer
+    record_answer(chat_id, word_id, is_correct, level)
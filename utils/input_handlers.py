@@ -7,6 +7,7 @@
 import telebot
 from config import bot, user_state
 from utils.language_utils import get_text
+from utils.command_router import matches
 from utils import clear_state, main_menu_keyboard, easy_level_keyboard, medium_level_keyboard, hard_level_keyboard
 from utils.console_logger import log_menu_transition, MENU_MAIN
 
@@ -20,6 +21,16 @@ EXIT_COMMANDS = [
     "Відміна"
 ]
 
+# Ключі локалізованих кнопок меню, які переривають поточний крок (command_router)
+SYSTEM_COMMAND_KEYS = (
+    "back_to_main_menu", "easy_level", "medium_level", "hard_level", "cancel",
+    "add_new_word", "learning_new_words", "repetition", "advanced_game", "word_typing",
+    "article_typing", "personal_dictionary", "shared_dictionary", "choose_correct_spelling",
+    "fill_in_gaps",
+)
+EXIT_COMMAND_KEYS = ("back_to_main_menu", "cancel")
+MENU_NAVIGATION_KEYS = ("back_to_main_menu", "easy_level", "medium_level", "hard_level", "cancel")
+
 def is_system_command(message):
     """Check if message text is a system command or menu button
     
@@ -32,33 +43,12 @@ def is_system_command(message):
     if not hasattr(message, 'text') or not message.text:
         return False
     
-    chat_id = message.chat.id
-        
     # Перевірка команд з / на початку
     if message.text.startswith('/'):
         return True
     
-    # Перевірка локалізованих кнопок меню
-    localized_commands = [
-        get_text("back_to_main_menu", chat_id),
-        get_text("easy_level", chat_id),
-        get_text("medium_level", chat_id),
-        get_text("hard_level", chat_id),
-        get_text("cancel", chat_id),
-        get_text("add_new_word", chat_id),
-        get_text("learning_new_words", chat_id),
-        get_text("repetition", chat_id),
-        get_text("advanced_game", chat_id),
-        get_text("word_typing", chat_id),
-        get_text("article_typing", chat_id),
-        get_text("personal_dictionary", chat_id),
-        get_text("shared_dictionary", chat_id),
-        get_text("choose_correct_spelling", chat_id),
-        get_text("fill_in_gaps", chat_id)
-    ]
-    
-    # Перевірка основних кнопок меню (нелокалізованих)
-    if message.text in EXIT_COMMANDS or message.text in localized_commands:
+    # Перевірка основних кнопок меню (нелокалізованих та локалізованих будь-якою мовою)
+    if message.text in EXIT_COMMANDS or matches(message, *SYSTEM_COMMAND_KEYS):
         return True
     
     # Перевірка команд вибору мови
@@ -156,14 +146,8 @@ def safe_next_step_handler(message, callback, *args, **kwargs):
         *args, **kwargs: Arguments to pass to the callback
     """
     def wrapper(message):
-        chat_id = message.chat.id
-        
-        # Отримуємо локалізовані команди виходу
-        localized_back_to_main = get_text("back_to_main_menu", chat_id)
-        localized_cancel = get_text("cancel", chat_id)
-        
         # Перевіряємо на локалізовані та стандартні команди виходу
-        if message.text in EXIT_COMMANDS or message.text == localized_back_to_main or message.text == localized_cancel:
+        if message.text in EXIT_COMMANDS or matches(message, *EXIT_COMMAND_KEYS):
             # Обробка команди виходу
             handle_exit_from_activity(message)
             return
@@ -199,17 +183,8 @@ def is_menu_navigation_command(message):
         if message.text in common_menu_commands:
             return True
         
-        # Try to match with localized text if available
-        if message.chat and hasattr(message, 'chat'):
-            chat_id = message.chat.id
-            back_text = get_text("back_to_main_menu", chat_id, "")
-            easy_text = get_text("easy_level", chat_id, "")
-            medium_text = get_text("medium_level", chat_id, "")
-            hard_text = get_text("hard_level", chat_id, "")
-            cancel_text = get_text("cancel", chat_id, "")
-            
-            localized_commands = [back_text, easy_text, medium_text, hard_text, cancel_text]
-            if message.text in localized_commands:
-                return True
+        # Localized versions in any language (one index lookup)
+        if matches(message, *MENU_NAVIGATION_KEYS):
+            return True
     
     return False
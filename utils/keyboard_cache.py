@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Кеш готових reply-клавіатур.
+
+Розкладки меню залежать лише від мови (і ролі користувача), тому кожна
+клавіатура будується один раз на (назва, мова, роль): тексти кнопок
+беруться з каталогу локалізацій, а JSON для Telegram серіалізується
+одразу. Усі наступні покази меню повертають той самий незмінний об'єкт.
+Кеш скидається, коли каталог локалізацій перезавантажується.
+"""
+
+import json
+import sys
+import threading
+from collections import namedtuple
+
+from telebot.types import JsonSerializable
+
+from locales.catalog import get_catalog
+
+ROLE_USER = "user"
+ROLE_ADMIN = "admin"
+
+Button = namedtuple("Button", ["text"])
+
+
+class CachedReplyKeyboard(JsonSerializable):
+    """Immutable reply keyboard with its Telegram JSON serialized once"""
+
+    __slots__ = ("name", "language", "role", "keyboard", "button_texts", "_json")
+
+    def __init__(self, name, language, role, rows, resize_keyboard=True):
+        self.name = name
+        self.language = language
+        self.role = role
+        # Button(text) keeps the `button.text` access used when logging displayed buttons
+        self.keyboard = tuple(tuple(Button(sys.intern(text)) for text in row) for row in rows if row)
+        self.button_texts = tuple(button.text for row in self.keyboard for button in row)
+        self._json = json.dumps({
+            "keyboard": [[{"text": button.text} for button in row] for row in self.keyboard],
+            "resize_keyboard": resize_keyboard,
+        })
+
+    def to_json(self):
+        return self._json
+
+    def __repr__(self):
+        return f"<CachedReplyKeyboard {self.name} {self.language}/{self.role} {len(self.keyboard)} rows>"
+
+
+def static_keyboard(name, rows):
+    """Keyboard with fixed (non-localized) texts"""
+    return CachedReplyKeyboard(name, None, ROLE_USER, rows)
+
+
+_layouts = {}               # name -> fn(text, role) returning a list of rows
+_cache = {}                 # (name, language, role) -> CachedReplyKeyboard
+_cache_version = None
+_lock = threading.Lock()
+_hits = 0
+_builds = 0
+
+
+def layout(name):
+    """
+    Register a keyboard layout.
+
+    Usage:
+        @layout("main_menu")
+        def _main_menu(text, role):
+            return [[text("add_new_word"), text("edit_word")], ...]
+
+    text(key, default=None) returns the localized string for the cached language.
+    """
+    def decorator(fn):
+        with _lock:
+            _layouts[name] = fn
+            for key in [k for k in _cache if k[0] == name]:
+                del _cache[key]
+        return fn
+    return decorator
+
+
+def get_keyboard(name, language, role=ROLE_USER):
+    """Return the cached keyboard for (name, language, role), building it on first use"""
+    global _cache_version, _hits, _builds
+    catalog = get_catalog()
+    key = (name, language, role)
+    keyboard = _cache.get(key)
+    if keyboard is not None and _cache_version == catalog.version:
+        _hits += 1
+        return keyboard
+    with _lock:
+        if _cache_version != catalog.version:
+            _cache.clear()
+            _cache_version = catalog.version
+        keyboard = _cache.get(key)
+        if keyboard is None:
+            rows = _layouts[name](lambda k, default=None: catalog.text(k, language, default), role)
+            keyboard = CachedReplyKeyboard(name, language, role, rows)
+            _cache[key] = keyboard
+            _builds += 1
+        else:
+            _hits += 1
+    return keyboard
+
+
+def clear():
+    """Drop all cached keyboards (they are rebuilt on next use)"""
+    with _lock:
+        _cache.clear()
+
+
+def button_texts(markup):
+    """Texts of all buttons of a reply markup (cached or a plain ReplyKeyboardMarkup)"""
+    texts = getattr(markup, "button_texts", None)
+    if texts is not None:
+        return list(texts)
+    texts = []
+    for row in getattr(markup, "keyboard", None) or []:
+        for button in row:
+            if hasattr(button, "text"):
+                texts.append(button.text)
+            elif isinstance(button, dict) and "text" in button:
+                texts.append(button["text"])
+    return texts
+
+
+def stats():
+    return {
+        "layouts": len(_layouts),
+        "keyboards": len(_cache),
+        "hits": _hits,
+        "builds": _builds,
+    }
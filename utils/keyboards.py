@@ -2,152 +2,155 @@
 
 """
 Утиліти для створення клавіатур.
+
+Клавіатури меню беруться з utils.keyboard_cache: кожна розкладка будується
+один раз на мову (і роль), тож показ меню не створює новий
+ReplyKeyboardMarkup і не викликає get_text для кожної кнопки.
 """
 
-import telebot
-from utils.language_utils import get_text
+from config import ADMIN_ID
+from utils.keyboard_cache import ROLE_ADMIN, ROLE_USER, get_keyboard, layout, static_keyboard
+from utils.language_utils import get_user_language
+
+
+def role_for(chat_id):
+    return ROLE_ADMIN if chat_id == ADMIN_ID else ROLE_USER
+
+
+def _cached(name, chat_id):
+    return get_keyboard(name, get_user_language(chat_id), role_for(chat_id))
+
+
+@layout("main_menu")
+def _main_menu_layout(text, role):
+    return [
+        # Основні кнопки
+        [text("add_new_word"), text("edit_word")],
+        # Рівні складності - по два в ряд
+        [text("easy_level"), text("medium_level")],
+        [text("hard_level")],
+        # Словники - по два в ряд
+        [text("personal_dictionary"), text("shared_dictionary")],
+    ]
+
+
+@layout("cancel")
+def _cancel_layout(text, role):
+    return [[text("cancel")]]
+
+
+@layout("easy_level")
+def _easy_level_layout(text, role):
+    return [
+        # По дві кнопки в ряд для активностей
+        [text("learning_new_words"), text("repetition")],
+        [text("learn_articles"), text("learn_possessive_pronouns")],
+        # Окрема кнопка повернення на весь рядок
+        [text("back_to_main_menu")],
+    ]
+
+
+@layout("medium_level")
+def _medium_level_layout(text, role):
+    return [
+        [text("choose_correct_spelling"), text("fill_in_gaps")],
+        [text("learn_possessive_pronouns") + " (" + text("medium_level") + ")"],
+        [text("back_to_main_menu")],
+    ]
+
+
+@layout("hard_level")
+def _hard_level_layout(text, role):
+    return [
+        [text("advanced_game"), text("word_typing")],
+        [text("article_typing")],
+        [text("learn_possessive_pronouns") + " (" + text("hard_level") + ")"],
+        [text("back_to_main_menu")],
+    ]
+
+
+@layout("shared_dictionary")
+def _shared_dictionary_layout(text, role):
+    return [
+        # Перша кнопка на весь рядок
+        [text("your_dict").split(":")[0].strip()],
+        # Дві кнопки в одному рядку
+        [text("create_shared_dict"), text("join_shared_dict")],
+        # Кнопка повернення на весь рядок
+        [text("back_to_main_menu")],
+    ]
+
+
+@layout("yes_no_cancel")
+def _yes_no_cancel_layout(text, role):
+    return [
+        ["✅ " + text("yes"), "❌ " + text("no")],
+        [text("cancel")],
+    ]
+
+
+# Fallback на українську, якщо chat_id не передано
+_CANCEL_DEFAULT = static_keyboard("cancel", [["✖️ Відміна"]])
+_EASY_LEVEL_DEFAULT = static_keyboard("easy_level", [
+    ["📖 Вчити нові слова", "🔄 Повторити"],
+    ["🏷️ Вивчати артиклі", "🧩 Вивчати присвійні займенники"],
+    ["↩️ Повернутися до головного меню"],
+])
+_MEDIUM_LEVEL_DEFAULT = static_keyboard("medium_level", [
+    ["🔤 Вибір правильного написання", "📝 Заповніть пропуски"],
+    ["🧩 Вивчати присвійні займенники (середній)"],
+    ["↩️ Повернутися до головного меню"],
+])
+_HARD_LEVEL_DEFAULT = static_keyboard("hard_level", [
+    ["🧩 Складна гра", "📝 Введення слів"],
+    ["🏷️ Введення артиклів"],
+    ["🧩 Вивчати присвійні займенники (складний)"],
+    ["↩️ Повернутися до головного меню"],
+])
+_SHARED_DICTIONARY_DEFAULT = static_keyboard("shared_dictionary", [
+    ["📋 Мої спільні словники"],
+    ["🆕 Створити спільний словник", "🔑 Вступити до спільного словника"],
+    ["↩️ Повернутися до головного меню"],
+])
+_YES_NO_CANCEL_DEFAULT = static_keyboard("yes_no_cancel", [
+    ["✅ Так", "❌ Ні"],
+    ["✖️ Відміна"],
+])
+_LANGUAGE_SELECTION = static_keyboard("language_selection", [
+    ["🇺🇦 Українська", "🇬🇧 English"],
+    ["🇷🇺 Русский", "🇹🇷 Türkçe"],
+    ["🇸🇾 العربية"],
+])
+
 
 def main_menu_keyboard(chat_id):
     """Create main menu keyboard with localized buttons"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    # Основні кнопки
-    keyboard.row(get_text("add_new_word", chat_id), get_text("edit_word", chat_id))
-    
-    # Рівні складності - по два в ряд
-    keyboard.row(
-        get_text("easy_level", chat_id), 
-        get_text("medium_level", chat_id)
-    )
-    keyboard.row(get_text("hard_level", chat_id))
-    
-    # Словники - по два в ряд
-    keyboard.row(
-        get_text("personal_dictionary", chat_id), 
-        get_text("shared_dictionary", chat_id)
-    )
-    
-    return keyboard
+    return _cached("main_menu", chat_id)
 
 def main_menu_cancel(chat_id=None):
     """Create a keyboard with just the cancel button (localized)"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    # Якщо chat_id не передано, повертаємо стандартну кнопку на українській
-    cancel_text = get_text("cancel", chat_id) if chat_id else "✖️ Відміна"
-    keyboard.row(cancel_text)
-    
-    return keyboard
+    return _cached("cancel", chat_id) if chat_id else _CANCEL_DEFAULT
 
 def easy_level_keyboard(chat_id=None):
     """Create keyboard for easy level activities with localized buttons"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    if chat_id:
-        # По дві кнопки в ряд для активностей
-        keyboard.row(
-            get_text("learning_new_words", chat_id),
-            get_text("repetition", chat_id)
-        )
-        keyboard.row(
-            get_text("learn_articles", chat_id),
-            get_text("learn_possessive_pronouns", chat_id)
-        )
-        # Окрема кнопка повернення на весь рядок
-        keyboard.row(get_text("back_to_main_menu", chat_id))
-    else:
-        # Fallback на українську, якщо chat_id не передано
-        keyboard.row("📖 Вчити нові слова", "🔄 Повторити")
-        keyboard.row("🏷️ Вивчати артиклі", "🧩 Вивчати присвійні займенники")
-        keyboard.row("↩️ Повернутися до головного меню")
-    
-    return keyboard
+    return _cached("easy_level", chat_id) if chat_id else _EASY_LEVEL_DEFAULT
 
 def medium_level_keyboard(chat_id=None):
     """Medium level activity keyboard"""
-    markup = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    # Use localized button texts when chat_id is provided
-    if chat_id:
-        from utils.language_utils import get_text
-        markup.row(get_text("choose_correct_spelling", chat_id), 
-                  get_text("fill_in_gaps", chat_id))
-        markup.row(get_text("learn_possessive_pronouns", chat_id) + " (" + get_text("medium_level", chat_id) + ")")
-        markup.row(get_text("back_to_main_menu", chat_id))
-    else:
-        # Fallback to default Ukrainian
-        markup.row("🔤 Вибір правильного написання", "📝 Заповніть пропуски")
-        markup.row("🧩 Вивчати присвійні займенники (середній)")
-        markup.row("↩️ Повернутися до головного меню")
-    
-    return markup
+    return _cached("medium_level", chat_id) if chat_id else _MEDIUM_LEVEL_DEFAULT
 
 def hard_level_keyboard(chat_id=None):
     """Hard level activity keyboard"""
-    markup = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    # Use localized button texts when chat_id is provided
-    if chat_id:
-        from utils.language_utils import get_text
-        markup.row(get_text("advanced_game", chat_id))
-        markup.row(get_text("word_typing", chat_id), 
-                  get_text("article_typing", chat_id))
-        markup.row(get_text("learn_possessive_pronouns", chat_id) + " (" + get_text("hard_level", chat_id) + ")")
-        markup.row(get_text("back_to_main_menu", chat_id))
-    else:
-        # Fallback to default Ukrainian
-        markup.row("🧩 Складна гра")
-        markup.row("📝 Введення слів", "🏷️ Введення артиклів")
-        markup.row("🧩 Вивчати присвійні займенники (складний)")
-        markup.row("↩️ Повернутися до головного меню")
-    
-    return markup
+    return _cached("hard_level", chat_id) if chat_id else _HARD_LEVEL_DEFAULT
 
 def shared_dictionary_keyboard(chat_id=None):
     """Create keyboard for shared dictionary options with localized buttons"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    if chat_id:
-        # Перша кнопка на весь рядок
-        keyboard.row(get_text("your_dict", chat_id).split(":")[0].strip())
-        
-        # Дві кнопки в одному рядку
-        keyboard.row(
-            get_text("create_shared_dict", chat_id), 
-            get_text("join_shared_dict", chat_id)
-        )
-        
-        # Кнопка повернення на весь рядок
-        keyboard.row(get_text("back_to_main_menu", chat_id))
-    else:
-        # Fallback на українську
-        keyboard.row("📋 Мої спільні словники")
-        keyboard.row("🆕 Створити спільний словник", "🔑 Вступити до спільного словника")
-        keyboard.row("↩️ Повернутися до головного меню")
-    
-    return keyboard
+    return _cached("shared_dictionary", chat_id) if chat_id else _SHARED_DICTIONARY_DEFAULT
 
 def language_selection_keyboard():
     """Create language selection keyboard - this one doesn't need localization"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    keyboard.row("🇺🇦 Українська", "🇬🇧 English")
-    keyboard.row("🇷🇺 Русский", "🇹🇷 Türkçe")
-    keyboard.row("🇸🇾 العربية")
-    return keyboard
+    return _LANGUAGE_SELECTION
 
 def yes_no_cancel_keyboard(chat_id=None):
     """Create yes/no/cancel keyboard with localized buttons"""
-    keyboard = telebot.types.ReplyKeyboardMarkup(resize_keyboard=True)
-    
-    if chat_id:
-        keyboard.row(
-            "✅ " + get_text("yes", chat_id),
-            "❌ " + get_text("no", chat_id)
-        )
-        keyboard.row(get_text("cancel", chat_id))
-    else:
-        # Fallback на українську
-        keyboard.row("✅ Так", "❌ Ні")
-        keyboard.row("✖️ Відміна")
-    
-    return keyboard
+    return _cached("yes_no_cancel", chat_id) if chat_id else _YES_NO_CANCEL_DEFAULT
@@ -2,22 +2,14 @@
 
 """
 Уніфікована система логування для бота.
-Всі події логуються в одному форматі та в один файл.
+Всі події логуються в одному форматі через спільний конвеєр (log_pipeline).
 """
 
-import os
-import json
+import logging
 import traceback
 from datetime import datetime
 from config import ADMIN_ID
-
-# Створення директорії для логів, якщо вона не існує
-LOGS_DIR = "logs"
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-# Шлях до єдиного файлу логу
-LOG_FILE = os.path.join(LOGS_DIR, "bot_log.log")
+from log_pipeline import get_logger
 
 # Рівні логування
 LOG_LEVEL_INFO = "INFO"
@@ -25,27 +17,25 @@ LOG_LEVEL_WARNING = "WARNING"
 LOG_LEVEL_ERROR = "ERROR"
 LOG_LEVEL_DEBUG = "DEBUG"
 
+_LEVELS = {
+    LOG_LEVEL_INFO: logging.INFO,
+    LOG_LEVEL_WARNING: logging.WARNING,
+    LOG_LEVEL_ERROR: logging.ERROR,
+    LOG_LEVEL_DEBUG: logging.DEBUG,
+    "COMMAND": logging.INFO,
+}
+
 def _get_timestamp():
     """Повертає відформатований timestamp для логування"""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
 
-def _format_log_entry(level, message, additional_data=None):
-    """Форматує запис логу в єдиний формат"""
-    timestamp = _get_timestamp()
-    log_entry = f"[{timestamp}] [{level}] {message}"
-    
-    # Додаємо деталі, якщо вони є
-    if additional_data:
-        if isinstance(additional_data, dict):
-            # Форматуємо словник в JSON
-            try:
-                log_entry += f" | {json.dumps(additional_data, ensure_ascii=False)}"
-            except Exception:
-                log_entry += f" | {str(additional_data)}"
-        else:
-            log_entry += f" | {str(additional_data)}"
-    
-    return log_entry
+def _enabled(category, level):
+    return get_logger(category).isEnabledFor(_LEVELS.get(level, logging.INFO))
+
+def _write_to_log(category, level, message, additional_data=None):
+    """Передає запис у конвеєр логування (log_pipeline); дані запису - окреме поле JSON"""
+    get_logger(category).log(_LEVELS.get(level, logging.INFO), "%s", message,
+                             extra={"data": additional_data} if additional_data else None)
 
 def extract_user_info(message):
     """Витягує інформацію про користувача з повідомлення"""
@@ -84,13 +74,16 @@ def log_message(message, level=LOG_LEVEL_INFO):
     if not message:
         return
     
-    user_info = extract_user_info(message)
-    
     # Отримуємо вміст повідомлення
     content = message.text if hasattr(message, 'text') and message.text else "No text"
     
     # Визначаємо, чи це команда
     is_command = content.startswith('/') if isinstance(content, str) else False
+    category = "command" if is_command else "update"
+    if not _enabled(category, level):
+        return None
+    
+    user_info = extract_user_info(message)
     
     # Формуємо запис логу
     log_data = {
@@ -113,18 +106,13 @@ def log_message(message, level=LOG_LEVEL_INFO):
     log_text = f"Received message from {user_str}{admin_mark}: '{content}'"
     
     # Записуємо в лог
-    log_entry = _format_log_entry(
-        LOG_LEVEL_INFO if not is_command else "COMMAND", 
-        log_text, 
-        log_data
-    )
-    _write_to_log(log_entry)
+    _write_to_log(category, level, log_text, log_data)
     
     return log_data
 
 def log_callback(callback, level=LOG_LEVEL_INFO):
     """Логує callback запити з інлайн кнопок"""
-    if not callback:
+    if not callback or not _enabled("navigation", level):
         return
     
     user_info = extract_user_info(callback)
@@ -153,8 +141,7 @@ def log_callback(callback, level=LOG_LEVEL_INFO):
     log_text = f"Received callback from {user_str}{admin_mark}: '{callback_data}'"
     
     # Записуємо в лог
-    log_entry = _format_log_entry(level, log_text, log_data)
-    _write_to_log(log_entry)
+    _write_to_log("navigation", level, log_text, log_data)
     
     return log_data
 
@@ -184,8 +171,7 @@ def log_response(user_id, username, first_name, last_name, response_text, level=
     log_text = f"Bot response to {user_str}{admin_mark}: '{short_response}'"
     
     # Записуємо в лог
-    log_entry = _format_log_entry(level, log_text, log_data)
-    _write_to_log(log_entry)
+    _write_to_log("response", level, log_text, log_data)
     
     return log_data
 
@@ -219,8 +205,7 @@ def log_error(error, context=None, user=None, level=LOG_LEVEL_ERROR):
         log_text += f" | Context: {context}"
     
     # Записуємо в лог
-    log_entry = _format_log_entry(level, log_text, log_data)
-    _write_to_log(log_entry)
+    _write_to_log("error", level, log_text, log_data)
     
     return log_data
 
@@ -255,15 +240,13 @@ def log_action(action, data=None, user=None, level=LOG_LEVEL_INFO):
         log_text += f" | {data}"
     
     # Записуємо в лог
-    log_entry = _format_log_entry(level, log_text, log_data)
-    _write_to_log(log_entry)
+    _write_to_log("action", level, log_text, log_data)
     
     return log_data
 
 def log_activity(message, level=LOG_LEVEL_INFO):
     """Logs user activity messages."""
-    log_entry = _format_log_entry(level, message)
-    _write_to_log(log_entry)
+    _write_to_log("activity", level, message)
 
 # Створюємо декоратор для логування обробників
 def log_handler(func):
@@ -2,53 +2,32 @@
 
 """
 Utilities for logging and debugging.
-"""
 
-import os
-import time
-import datetime
-import traceback
-import json  # Add import for JSON serialization
+Records go through the shared logging pipeline (log_pipeline); the
+"language" category is off in the production profile.
+"""
 
-# Directory for log files
-LOG_DIR = "logs"
+import sys
 
-# Ensure log directory exists
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+from log_pipeline import get_logger
 
-# Log file paths
-DEBUG_LOG = os.path.join(LOG_DIR, "debug.log")
-LANGUAGE_LOG = os.path.join(LOG_DIR, "language_selection.log")
-ERROR_LOG = os.path.join(LOG_DIR, "error.log")
+_debug_log = get_logger("debug")
+_language_log = get_logger("language")
+_error_log = get_logger("error")
+_action_log = get_logger("action")
 
 def log_debug(message):
     """Log a debug message"""
-    _write_log(DEBUG_LOG, f"[DEBUG] {message}")
+    _debug_log.debug("%s", message)
 
 def log_language(action, chat_id, details):
     """Log language-related actions"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    message = f"[{timestamp}] [LANG] [User {chat_id}] {action}: {details}"
-    
-    # Print to console with highlighting for better visibility
-    print(f"\033[1;33m{message}\033[0m")  # Yellow color and bold
-    
-    # Write to log file
-    _write_log(LANGUAGE_LOG, message)
+    _language_log.info("[User %s] %s: %s", chat_id, action, details, extra={"chat_id": chat_id})
 
 def log_error(error, context=""):
     """Log an error with traceback"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    message = f"[{timestamp}] [ERROR] {context}: {str(error)}"
-    traceback_msg = traceback.format_exc()
-    
-    # Print to console with highlighting for errors
-    print(f"\033[1;31m{message}\033[0m")  # Red color
-    print(f"\033[0;31m{traceback_msg}\033[0m")  # Lighter red for traceback
-    
-    # Write to log file
-    _write_log(ERROR_LOG, f"{message}\n{traceback_msg}")
+    # Traceback of the exception being handled, if any
+    _error_log.error("%s: %s", context, error, exc_info=sys.exc_info()[0] is not None)
 
 def log_language_event(chat_id, event_type, details):
     """
@@ -59,35 +38,8 @@ def log_language_event(chat_id, event_type, details):
         event_type: Type of event (e.g., BUTTON_PRESSED, LANGUAGE_IDENTIFIED)
         details: Additional details about the event
     """
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    message = f"[{timestamp}] [User {chat_id}] [{event_type}] {details}"
-    
-    # Print to console with highlighting for better visibility
-    print(f"\033[1;36m{message}\033[0m")  # Cyan color and bold
-    
-    # Write to log file
-    try:
-        with open(LANGUAGE_LOG, "a", encoding="utf-8") as f:
-            f.write(f"{message}\n")
-    except Exception as e:
-        print(f"\033[1;31mERROR writing to language log: {e}\033[0m")  # Red color for errors
+    _language_log.info("[User %s] [%s] %s", chat_id, event_type, details, extra={"chat_id": chat_id})
 
 def log_action(action, data=None):
     """Log a generic action with optional data payload"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = {"action": action, "data": data}
-    message = f"[{timestamp}] [ACTION] {action}: {json.dumps(data, ensure_ascii=False)}"
-
-    # Print to console for visibility
-    print(f"\033[1;35m{message}\033[0m")  # Magenta color and bold
-
-    # Write to debug log
-    _write_log(DEBUG_LOG, message)
-
-def _write_log(log_file, message):
-    """Write a message to a log file"""
-    try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"{message}\n")
-    except Exception as e:
-        print(f"\033[1;31mError writing to log file {log_file}: {e}\033[0m")
+    _action_log.info("%s", action, extra={"data": data})
@@ -80,24 +80,20 @@ def ensure_dict_state(chat_id):
     dict_type = user_state.get(chat_id, {}).get("dict_type", "personal")
     shared_dict_id = user_state.get(chat_id, {}).get("shared_dict_id")
     
-    # Double-check with database
+    # Double-check with the cached user profile (one query per user, not per round)
     try:
         import db_manager
-        db_info = db_manager.get_user_dictionary_info(chat_id)
-        if db_info:
-            db_dict_type, db_shared_id, _ = db_info
-            dict_type = db_dict_type
-            shared_dict_id = db_shared_id
-            
-            # Validate that the shared dictionary actually exists if dict_type is "shared"
-            if dict_type == "shared" and shared_dict_id:
-                # Check if the shared dictionary exists
-                if not db_manager.shared_dictionary_exists(shared_dict_id):
-                    print(f"WARNING: Shared dictionary {shared_dict_id} does not exist for user {chat_id}, resetting to personal")
-                    dict_type = "personal"
-                    shared_dict_id = None
-                    # Update the database to reset user's dictionary to personal
-                    db_manager.reset_user_dictionary(chat_id)
+        profile = db_manager.get_user_profile(chat_id)
+        dict_type = profile.dict_type
+        shared_dict_id = profile.shared_dict_id
+        
+        # Validate that the shared dictionary actually exists if dict_type is "shared"
+        if dict_type == "shared" and shared_dict_id and not profile.shared_dict_exists:
+            print(f"WARNING: Shared dictionary {shared_dict_id} does not exist for user {chat_id}, resetting to personal")
+            dict_type = "personal"
+            shared_dict_id = None
+            # Update the database to reset user's dictionary to personal
+            db_manager.reset_user_dictionary(chat_id)
     except Exception as e:
         print(f"Error getting dictionary info from database: {e}")
     
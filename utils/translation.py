@@ -4,8 +4,7 @@
 Translation utilities for handling multiple languages.
 """
 
-from googletrans import Translator
-from config import translator
+from translation_service import translate
 
 def translate_to_user_language(text, target_language, source_language='de'):
     """
@@ -28,8 +27,9 @@ def translate_to_user_language(text, target_language, source_language='de'):
         if target_language not in supported_languages:
             target_language = 'en'
         
-        translation = translator.translate(text, src=source_language, dest=target_language)
-        return translation.text
+        # translation_service goes through the shared translation cache
+        translation = translate(text, src=source_language, dest=target_language)
+        return translation if translation else text
     except Exception as e:
         print(f"Translation error: {e}")
         return text
@@ -46,35 +46,34 @@ def update_all_translations_for_word(word_id, original_language, original_transl
     import db_manager
     
     try:
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
+        with db_manager.connection() as conn:
+            cursor = conn.cursor()
         
-        # Languages to update
-        languages = ['en', 'uk', 'ru', 'tr', 'ar']
+            # Languages to update
+            languages = ['en', 'uk', 'ru', 'tr', 'ar']
         
-        for lang in languages:
-            # Skip the original language
-            if lang == original_language:
-                continue
+            for lang in languages:
+                # Skip the original language
+                if lang == original_language:
+                    continue
             
-            # Check if translation already exists
-            cursor.execute(f'SELECT {lang}_tran FROM words WHERE id = ?', (word_id,))
-            result = cursor.fetchone()
+                # Check if translation already exists
+                cursor.execute(f'SELECT {lang}_tran FROM words WHERE id = ?', (word_id,))
+                result = cursor.fetchone()
             
-            if not result or not result[0]:
-                # Translate to this language
-                translated_text = translate_to_user_language(
-                    original_translation, 
-                    target_language=lang, 
-                    source_language=original_language
-                )
+                if not result or not result[0]:
+                    # Translate to this language
+                    translated_text = translate_to_user_language(
+                        original_translation, 
+                        target_language=lang, 
+                        source_language=original_language
+                    )
                 
-                # Update the database
-                cursor.execute(f'UPDATE words SET {lang}_tran = ? WHERE id = ?', 
-                             (translated_text, word_id))
-                print(f"Added {lang} translation for word {word_id}: '{translated_text}'")
+                    # Update the database
+                    cursor.execute(f'UPDATE words SET {lang}_tran = ? WHERE id = ?', 
+                                 (translated_text, word_id))
+                    print(f"Added {lang} translation for word {word_id}: '{translated_text}'")
         
-        conn.commit()
-        conn.close()
+            conn.commit()
     except Exception as e:
         print(f"Error updating translations: {e}")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+Приймання оновлень Telegram через webhook.
+
+Вбудований HTTP-сервер (http.server, без додаткових залежностей) приймає
+POST з оновленням, перевіряє заголовок X-Telegram-Bot-Api-Secret-Token
+(секрет обов'язковий: без нього будь-хто міг би надсилати підроблені оновлення),
+кладе тіло запиту в обмежену чергу і одразу відповідає 200. Один потік
+диспетчера розбирає чергу пакетами і передає оновлення в
+bot.process_new_updates(), а обробники виконуються в пулі потоків бота -
+так само, як при polling, але без затримок між запитами getUpdates.
+
+Якщо черга переповнена, сервер відповідає 503, і Telegram повторить
+доставку пізніше. GET /healthz повертає статистику у форматі JSON.
+Із record_path кожне прийняте оновлення дописується у JSON Lines файл,
+який потім можна програти через benchmark_webhook.py.
+"""
+
+import hmac
+import json
+import queue
+import ssl
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot import types
+
+from latency import percentile, window
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_MAX_BODY = 1024 * 1024
+DEFAULT_BATCH_SIZE = 100
+
+
+class _WebhookRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive for Telegram's parallel connections
+    server_version = "LanguageLearnBot"
+
+    def _reply(self, status, body=b"", content_type="text/plain", close=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if close:
+            # Request body left unread: the connection cannot carry another request
+            self.send_header("Connection", "close")
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        webhook = self.server.webhook
+        if self.path != webhook.path:
+            self._reply(404, close=True)
+            return
+        if not hmac.compare_digest(
+                self.headers.get(SECRET_HEADER, ""), webhook.secret_token):
+            webhook.count("rejected_secret")
+            self._reply(403, close=True)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > webhook.max_body:
+            webhook.count("bad_request")
+            self._reply(413 if length > 0 else 400, close=True)
+            return
+        body = self.rfile.read(length)
+        self._reply(webhook.accept(body))
+
+    def do_GET(self):
+        webhook = self.server.webhook
+        if self.path == "/healthz":
+            self._reply(200, json.dumps(webhook.stats()).encode("utf-8"), "application/json")
+        else:
+            self._reply(404)
+
+    def log_message(self, format, *args):
+        # Access log per update would flood the console; counters are in stats()
+        pass
+
+
+class WebhookServer:
+    """Threaded HTTP server that queues Telegram updates for one dispatcher thread"""
+
+    def __init__(self, bot, host="0.0.0.0", port=8443, path="/webhook", secret_token=None,
+                 max_queue=DEFAULT_MAX_QUEUE, max_body=DEFAULT_MAX_BODY, batch_size=DEFAULT_BATCH_SIZE,
+                 record_path=None, ssl_cert=None, ssl_key=None, process_updates=None):
+        if not secret_token:
+            raise ValueError("secret_token is required: Telegram sends it with every update")
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.max_body = max_body
+        self.batch_size = batch_size
+        self.record_path = record_path
+        self.ssl_cert = ssl_cert
+        self.ssl_key = ssl_key
+        # process_updates([Update, ...]); defaults to bot.process_new_updates
+        self.process_updates = process_updates or bot.process_new_updates
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._httpd = None
+        self._threads = []
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._record_lock = threading.Lock()
+        self._waits = window()
+        self._counters = {
+            "received": 0,
+            "dispatched": 0,
+            "rejected_secret": 0,
+            "rejected_full": 0,
+            "bad_request": 0,
+            "bad_update": 0,
+            "errors": 0,
+            "batches": 0,
+        }
+
+    def count(self, name, amount=1):
+        with self._stats_lock:
+            self._counters[name] += amount
+
+    def accept(self, body):
+        """Queue one raw update; returns the HTTP status for Telegram"""
+        try:
+            self._queue.put_nowait((time.perf_counter(), body))
+        except queue.Full:
+            self.count("rejected_full")
+            return 503
+        self.count("received")
+        if self.record_path:
+            self._record(body)
+        return 200
+
+    def _record(self, body):
+        try:
+            with self._record_lock, open(self.record_path, "ab") as f:
+                f.write(body.replace(b"\n", b" ") + b"\n")
+        except OSError as e:
+            print(f"Error recording webhook update: {e}")
+
+    def _take_batch(self):
+        try:
+            items = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _dispatch_loop(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            items = self._take_batch()
+            if not items:
+                continue
+            updates = []
+            now = time.perf_counter()
+            for queued_at, body in items:
+                try:
+                    update = types.Update.de_json(body.decode("utf-8"))
+                except Exception as e:
+                    print(f"Error parsing webhook update: {e}")
+                    self.count("bad_update")
+                    continue
+                if update is not None:
+                    updates.append(update)
+                with self._stats_lock:
+                    self._waits.append((now - queued_at) * 1000)
+            if not updates:
+                continue
+            try:
+                self.process_updates(updates)
+                self.count("dispatched", len(updates))
+            except Exception as e:
+                self.count("errors")
+                print(f"Error dispatching {len(updates)} webhook updates: {e}")
+                traceback.print_exc()
+            self.count("batches")
+
+    def start(self):
+        """Start listening and dispatching (non-blocking); returns the bound port"""
+        self._stopped.clear()
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _WebhookRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.webhook = self
+        if self.ssl_cert:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.ssl_cert, self.ssl_key)
+            self._httpd.socket = context.wrap_socket(self._httpd.socket, server_side=True)
+        self.port = self._httpd.server_address[1]
+        self._threads = [
+            threading.Thread(target=self._httpd.serve_forever, name="webhook-http", daemon=True),
+            threading.Thread(target=self._dispatch_loop, name="webhook-dispatch", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+        return self.port
+
+    def wait(self):
+        """Block until stop() is called"""
+        while not self._stopped.wait(1.0):
+            pass
+
+    def stop(self, timeout=5.0):
+        """Stop accepting updates and dispatch what is already queued"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        self._stopped.set()
+        for thread in self._threads:
+            if thread.name == "webhook-dispatch":
+                thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._counters)
+            waits = list(self._waits)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_wait_p50_ms"] = round(percentile(waits, 0.50), 2)
+        stats["queue_wait_p99_ms"] = round(percentile(waits, 0.99), 2)
+        return stats
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+Вибір слів пропорційно до рейтингу складності.
+
+Рейтинг росте при помилках, тому складніші слова показуються частіше,
+але кожне слово має ненульову вагу (1 + rating). FenwickSampler тримає
+префіксні суми ваг у дереві Фенвіка: k різних слів вибираються за
+O(k log n), а вага одного слова оновлюється за O(log n).
+"""
+
+import random
+
+import numpy as np
+
+BASE_WEIGHT = 1.0
+
+
+def rating_weight(rating):
+    """Map a word rating (0 = learned .. 5 = hardest) to a sampling weight"""
+    try:
+        rating = float(rating)
+    except (TypeError, ValueError):
+        rating = 0.0
+    if rating != rating or rating < 0:   # NaN or negative
+        rating = 0.0
+    return BASE_WEIGHT + rating
+
+
+class FenwickSampler:
+    """Binary indexed tree over non-negative weights supporting weighted draws"""
+
+    __slots__ = ("_n", "_tree", "_weights", "_top_bit")
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        if weights.size and (weights < 0).any():
+            raise ValueError("weights must be non-negative")
+        self._n = int(weights.size)
+        self._weights = weights.tolist()
+
+        # O(n) build: tree[i] = sum(w[i - lowbit(i) + 1 .. i]) (1-based)
+        prefix = np.concatenate(([0.0], np.cumsum(weights)))
+        idx = np.arange(1, self._n + 1)
+        tree = prefix[idx] - prefix[idx - (idx & -idx)]
+        self._tree = [0.0] + tree.tolist()
+
+        self._top_bit = 1 << (self._n.bit_length() - 1) if self._n else 0
+
+    @classmethod
+    def from_ratings(cls, ratings):
+        # Vectorized equivalent of rating_weight() for whole decks
+        ratings = np.asarray(ratings, dtype=float)
+        return cls(BASE_WEIGHT + np.clip(np.nan_to_num(ratings, nan=0.0), 0.0, None))
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def total(self):
+        return self._prefix(self._n)
+
+    def weight(self, i):
+        return self._weights[i]
+
+    def _prefix(self, i):
+        tree = self._tree
+        s = 0.0
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    def _add(self, i, delta):
+        tree = self._tree
+        i += 1
+        while i <= self._n:
+            tree[i] += delta
+            i += i & -i
+
+    def update(self, i, weight):
+        """Set the weight of position i in O(log n)"""
+        if weight < 0:
+            raise ValueError("weight must be non-negative")
+        delta = weight - self._weights[i]
+        if delta:
+            self._weights[i] = weight
+            self._add(i, delta)
+
+    def _find(self, target):
+        """Smallest position whose prefix sum exceeds target"""
+        tree = self._tree
+        pos = 0
+        step = self._top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self._n and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return min(pos, self._n - 1)
+
+    def sample(self, k=1, rng=random):
+        """Draw up to k distinct positions with probability proportional to weight"""
+        k = min(k, self._n)
+        picked = []
+        removed = []
+        try:
+            for _ in range(k):
+                total = self.total
+                if total <= 0:
+                    break
+                i = self._find(rng.random() * total)
+                # Float drift can land on an already-removed slot; fall back to a scan
+                if self._weights[i] <= 0:
+                    candidates = [j for j, w in enumerate(self._weights) if w > 0]
+                    if not candidates:
+                        break
+                    i = candidates[0]
+                picked.append(i)
+                removed.append((i, self._weights[i]))
+                self.update(i, 0.0)
+        finally:
+            # Put the drawn weights back so the structure is unchanged for the next call
+            for i, w in removed:
+                self.update(i, w)
+        return picked
+
+
+def sample_frame(df, k=1, column="priority", rng=random):
+    """Weighted draw of k distinct rows from an arbitrary DataFrame (one-off, O(n) build)"""
+    if df is None or df.empty:
+        return df
+    try:
+        sampler = FenwickSampler.from_ratings(df[column].tolist())
+        positions = sampler.sample(k, rng)
+    except (KeyError, TypeError, ValueError):
+        # No usable rating column - fall back to a uniform draw
+        positions = rng.sample(range(len(df)), min(k, len(df)))
+    return df.iloc[positions]
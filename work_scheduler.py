@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+"""
+Єдиний планувальник фонової роботи бота (config.work_scheduler).
+
+Кожен чат має власну чергу завдань (mailbox): завдання одного чату
+виконуються строго по черзі, тож два швидкі натискання не змагаються за
+user_state[chat_id], а різні чати виконуються паралельно на обмеженому
+пулі потоків. Обробники telebot (ScheduledTeleBot) і фонові завантаження
+з обробників ідуть через той самий планувальник.
+
+Обмеження:
+- max_per_chat: при переповненні черги чату найстаріше завдання
+  відкидається (користувач уже натиснув щось нове);
+- max_pending: при переповненні загальної черги submit() чекає
+  (backpressure для потоку отримання оновлень), а після submit_timeout
+  відхиляє завдання;
+- stale_after: завдання, що чекало довше, не виконується.
+
+stats() повертає глибину черги, час очікування (p50/p99) і лічильники
+відкинутих завдань.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+
+import telebot
+
+from latency import percentile, window
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_PENDING = 10000
+DEFAULT_MAX_PER_CHAT = 20
+DEFAULT_STALE_AFTER = 120.0         # seconds a task may wait before it is dropped
+DEFAULT_SUBMIT_TIMEOUT = 5.0        # seconds submit() blocks when the scheduler is full
+
+
+class _Task:
+    __slots__ = ("chat_id", "fn", "args", "kwargs", "future", "submitted_at")
+
+    def __init__(self, chat_id, fn, args, kwargs):
+        self.chat_id = chat_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class ChatScheduler:
+    """Bounded worker pool with one FIFO mailbox per chat_id"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 max_per_chat=DEFAULT_MAX_PER_CHAT, stale_after=DEFAULT_STALE_AFTER,
+                 submit_timeout=DEFAULT_SUBMIT_TIMEOUT, name="work"):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_per_chat = max_per_chat
+        self.stale_after = stale_after
+        self.submit_timeout = submit_timeout
+        self.name = name
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)     # a chat became ready
+        self._space = threading.Condition(self._lock)    # pending dropped below max_pending
+        self._mailboxes = {}        # key -> deque of _Task; present while queued or running
+        self._ready = deque()       # keys with queued tasks and nothing running
+        self._pending = 0
+        self._running = 0
+        self._workers = []
+        self._worker_idents = set()
+        self._closed = False
+        self._delayed = []          # heap of (due, seq, chat_id, fn, args, kwargs)
+        self._delayed_seq = itertools.count()
+        self._timer = None
+        self._timer_wake = threading.Condition(self._lock)
+        self._task_hooks = []       # run on the worker thread before every task
+        # metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._dropped_overflow = 0
+        self._dropped_stale = 0
+        self._rejected = 0
+        self._max_depth = 0
+        self._waits = window()
+        self._runs = window()
+
+    def add_task_hook(self, hook):
+        """Register a callable run on the worker thread before every task"""
+        self._task_hooks.append(hook)
+
+    # --- submitting ---
+
+    def submit(self, chat_id, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) behind the chat's earlier tasks; returns a Future.
+
+        chat_id=None means the task has no ordering constraint. A rejected or
+        dropped task's Future is cancelled.
+        """
+        task = _Task(chat_id, fn, args, kwargs)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} scheduler is closed")
+            if not self._wait_for_space():
+                self._rejected += 1
+                task.future.cancel()
+                print(f"{self.name} scheduler is full, rejected {getattr(fn, '__name__', fn)} for chat {chat_id}")
+                return task.future
+            key = chat_id if chat_id is not None else object()
+            box = self._mailboxes.get(key)
+            if box is None:
+                box = self._mailboxes[key] = deque()
+                self._ready.append(key)
+                self._work.notify()
+            box.append(task)
+            self._pending += 1
+            self._submitted += 1
+            if len(box) > self.max_per_chat:
+                stale = box.popleft()
+                stale.future.cancel()
+                self._pending -= 1
+                self._dropped_overflow += 1
+            self._max_depth = max(self._max_depth, self._pending)
+        self._ensure_workers()
+        return task.future
+
+    def busy(self, chat_id):
+        """True while the chat has a task queued or running"""
+        with self._lock:
+            return chat_id in self._mailboxes
+
+    def _wait_for_space(self):
+        if self._pending < self.max_pending:
+            return True
+        if threading.get_ident() in self._worker_idents:
+            # A task queuing follow-up work must not wait for the workers (itself included)
+            return True
+        deadline = time.monotonic() + self.submit_timeout
+        while self._pending >= self.max_pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._closed:
+                return False
+            self._space.wait(remaining)
+        return True
+
+    def submit_later(self, delay, chat_id, fn, *args, **kwargs):
+        """Queue the task after delay seconds without holding a worker while waiting"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} scheduler is closed")
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._delayed_seq),
+                                           chat_id, fn, args, kwargs))
+            self._timer_wake.notify()
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name=f"{self.name}-timer", daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            with self._lock:
+                while not self._closed and (not self._delayed or self._delayed[0][0] > time.monotonic()):
+                    timeout = self._delayed[0][0] - time.monotonic() if self._delayed else None
+                    self._timer_wake.wait(timeout)
+                if self._closed:
+                    return
+                _, _, chat_id, fn, args, kwargs = heapq.heappop(self._delayed)
+            try:
+                self.submit(chat_id, fn, *args, **kwargs)
+            except RuntimeError:
+                return
+
+    # --- running ---
+
+    def _ensure_workers(self):
+        if len(self._workers) >= self.max_workers:
+            return
+        with self._lock:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._run_worker, name=f"{self.name}-{len(self._workers)}",
+                                          daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def _run_worker(self):
+        with self._lock:
+            self._worker_idents.add(threading.get_ident())
+        while True:
+            with self._lock:
+                while not self._ready and not self._closed:
+                    self._work.wait()
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                box = self._mailboxes[key]
+                task = box.popleft()
+                self._pending -= 1
+                self._running += 1
+                self._space.notify()
+            self._execute(task)
+            with self._lock:
+                self._running -= 1
+                if box:
+                    # Back of the line: other chats get a turn between this chat's tasks
+                    self._ready.append(key)
+                    self._work.notify()
+                else:
+                    del self._mailboxes[key]
+
+    def _execute(self, task):
+        waited = time.monotonic() - task.submitted_at
+        self._waits.append(waited * 1000)
+        if self.stale_after and waited > self.stale_after:
+            self._dropped_stale += 1
+            task.future.cancel()
+            return
+        if not task.future.set_running_or_notify_cancel():
+            return
+        for hook in list(self._task_hooks):
+            try:
+                hook()
+            except Exception as e:
+                print(f"Error in task hook {getattr(hook, '__name__', hook)}: {e}")
+        started = time.perf_counter()
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except Exception as e:
+            self._failed += 1
+            task.future.set_exception(e)
+            print(f"Error in task {getattr(task.fn, '__name__', task.fn)} for chat {task.chat_id}: {e}")
+            traceback.print_exc()
+        else:
+            self._completed += 1
+            task.future.set_result(result)
+        finally:
+            self._runs.append((time.perf_counter() - started) * 1000)
+
+    def close(self, timeout=10.0):
+        """Stop accepting work, run what is already queued and stop the workers"""
+        with self._lock:
+            self._closed = True
+            self._delayed.clear()
+            self._work.notify_all()
+            self._space.notify_all()
+            self._timer_wake.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            if worker.ident != threading.get_ident():
+                worker.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            depth = self._pending
+            chats = len(self._mailboxes)
+            running = self._running
+            delayed = len(self._delayed)
+        waits = list(self._waits)
+        runs = list(self._runs)
+        return {
+            "workers": len(self._workers),
+            "running": running,
+            "queue_depth": depth,
+            "max_depth": self._max_depth,
+            "chats_queued": chats,
+            "delayed": delayed,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "dropped_overflow": self._dropped_overflow,
+            "dropped_stale": self._dropped_stale,
+            "rejected": self._rejected,
+            "wait_p50_ms": round(percentile(waits, 0.50), 2),
+            "wait_p99_ms": round(percentile(waits, 0.99), 2),
+            "run_p99_ms": round(percentile(runs, 0.99), 2),
+        }
+
+
+def chat_key(obj):
+    """chat_id a handler argument belongs to (Message, CallbackQuery, ...), or None"""
+    chat = getattr(obj, "chat", None)
+    if chat is not None:
+        return chat.id
+    message = getattr(obj, "message", None)
+    if message is not None and getattr(message, "chat", None) is not None:
+        return message.chat.id
+    user = getattr(obj, "from_user", None)
+    return user.id if user is not None else None
+
+
+class _SchedulerWorkerPool:
+    """Stands in for telebot's ThreadPool: polling only checks its exception event"""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.exception_event = threading.Event()    # never set: task errors are logged by the scheduler
+        self.exception_info = None
+
+    def put(self, func, *args, **kwargs):
+        self.scheduler.submit(chat_key(args[0]) if args else None, func, *args, **kwargs)
+
+    def raise_exceptions(self):
+        pass
+
+    def clear_exceptions(self):
+        pass
+
+    def close(self):
+        self.scheduler.close()
+
+
+class ScheduledTeleBot(telebot.TeleBot):
+    """TeleBot that runs its handlers on a ChatScheduler instead of its own thread pool"""
+
+    def __init__(self, token, scheduler, **kwargs):
+        # threaded=False: no ThreadPool of its own is started
+        super().__init__(token, threaded=False, **kwargs)
+        self.scheduler = scheduler
+        self.threaded = True
+        self.worker_pool = _SchedulerWorkerPool(scheduler)
+
+    def _exec_task(self, task, *args, **kwargs):
+        self.worker_pool.put(task, *args, **kwargs)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+Черга відкладеного запису (write-behind) для змін рейтингу слів.
+
+Обробники відповідей лише додають дельту в пам'ять і одразу повертаються
+до користувача. Дельти для однакового ключа (словник, користувач, слово)
+підсумовуються, а фоновий потік скидає їх однією транзакцією кожні
+flush_interval секунд або як тільки набереться max_items ключів.
+Після невдалого запису дельти лишаються в черзі, а наступна спроба
+чекає flush_interval * 2**failures (до max_backoff); відкидаються лише
+дельти, що не вміщаються в max_pending ключів.
+"""
+
+import threading
+import time
+import traceback
+
+DEFAULT_FLUSH_INTERVAL = 0.25   # seconds
+DEFAULT_MAX_ITEMS = 200
+DEFAULT_MAX_PENDING = 50000     # keys kept while the database keeps failing
+DEFAULT_MAX_BACKOFF = 30.0      # seconds
+
+
+class CoalescingWriteQueue:
+    """Thread-safe buffer of additive deltas flushed in batches by a background thread"""
+
+    def __init__(self, flush_fn, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_items=DEFAULT_MAX_ITEMS, max_pending=DEFAULT_MAX_PENDING,
+                 max_backoff=DEFAULT_MAX_BACKOFF, name="write-queue"):
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.max_items = max_items
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.name = name
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._failures = 0
+        # metrics
+        self._enqueued = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._flushed_items = 0
+        self._max_batch = 0
+        self._last_batch = 0
+        self._flush_time = 0.0
+        self._max_flush_time = 0.0
+        self._errors = 0
+        self._dropped = 0
+
+    def add(self, key, delta):
+        """Add delta to key; returns immediately"""
+        with self._cond:
+            if key in self._pending:
+                self._pending[key] += delta
+                self._coalesced += 1
+            else:
+                self._pending[key] = delta
+            self._enqueued += 1
+            if len(self._pending) >= self.max_items:
+                self._cond.notify()
+            stopped = self._stopping
+        if stopped:
+            # After shutdown there is no flusher thread - write through
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _backoff(self):
+        """Seconds to wait before retrying after consecutive failed flushes"""
+        return min(self.flush_interval * 2 ** self._failures, self.max_backoff)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._failures:
+                    # A full queue must not turn retries into a busy loop against a failing database
+                    self._cond.wait_for(lambda: self._stopping, timeout=self._backoff())
+                else:
+                    self._cond.wait_for(
+                        lambda: self._stopping or len(self._pending) >= self.max_items,
+                        timeout=self.flush_interval,
+                    )
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self):
+        """Write every pending delta in one batch; returns the number of keys written"""
+        with self._flush_lock:
+            with self._cond:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                self._errors += 1
+                self._failures += 1
+                print(f"Error flushing {self.name} ({len(batch)} items, attempt {self._failures}): {e}")
+                traceback.print_exc()
+                # Put the batch back (merging with anything added meanwhile) and retry after the backoff
+                with self._cond:
+                    dropped = 0
+                    for key, delta in batch.items():
+                        if key in self._pending:
+                            self._pending[key] += delta
+                        elif len(self._pending) < self.max_pending:
+                            self._pending[key] = delta
+                        else:
+                            dropped += 1
+                if dropped:
+                    print(f"Dropping {dropped} items from {self.name}: more than {self.max_pending} keys pending")
+                    self._dropped += dropped
+                return 0
+
+            elapsed = time.perf_counter() - started
+            self._failures = 0
+            self._flushes += 1
+            self._flushed_items += len(batch)
+            self._last_batch = len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._flush_time += elapsed
+            self._max_flush_time = max(self._max_flush_time, elapsed)
+            return len(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the flusher thread and drain everything still pending"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        return self.flush()
+
+    def stats(self):
+        """Return queue metrics (batch sizes, flush latency, backlog)"""
+        flushes = self._flushes
+        return {
+            "pending": self.pending(),
+            "enqueued": self._enqueued,
+            "coalesced": self._coalesced,
+            "flushes": flushes,
+            "flushed_items": self._flushed_items,
+            "avg_batch": round(self._flushed_items / flushes, 1) if flushes else 0.0,
+            "last_batch": self._last_batch,
+            "max_batch": self._max_batch,
+            "avg_flush_ms": round(self._flush_time / flushes * 1000, 3) if flushes else 0.0,
+            "max_flush_ms": round(self._max_flush_time * 1000, 3),
+            "errors": self._errors,
+            "consecutive_failures": self._failures,
+            "dropped": self._dropped,
+        }